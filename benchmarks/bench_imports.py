@@ -0,0 +1,157 @@
+"""
+Costo de importacion y cold start de las funciones callable.
+
+Cada muestra corre en un proceso nuevo (como una instancia fria de Cloud
+Functions) y mide:
+- import: importar src.tikun_service y construir el registro, lo que hace
+  main.py antes de atender la primera peticion
+- process_sefira: import + la primera process_sefira de una sola Sefira
+  (construirla y una llamada al proveedor falso)
+- process_sefira_eager_sdks: lo mismo importando antes google.generativeai
+  y anthropic, como ocurria cuando los modulos los importaban al cargarse
+- tiempo de pared del proceso (incluye arrancar el interprete)
+
+Ademas reporta que SDK quedaron cargados en cada escenario y los modulos
+que mas tardan en importarse segun python -X importtime.
+
+Uso:
+    python benchmarks/bench_imports.py [--sefira binah] [--repeat 7] [--top 15]
+        [--output resultados.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SDKS = ('google.generativeai', 'anthropic')
+
+# Corre en el proceso hijo; imprime una linea JSON con sus tiempos
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+for sdk in {eager}:
+    __import__(sdk)
+sdks_at = time.perf_counter()
+from src.core.sefira_registry import get_registry
+from src.tikun_service import TikunService
+service = TikunService(get_registry())
+imported = time.perf_counter()
+if {call}:
+    service.process_sefira({{'sefira': {sefira!r}, 'input_data': {{'action': 'Abrir un comedor comunitario'}}}})
+done = time.perf_counter()
+print(json.dumps({{
+    'sdks_ms': (sdks_at - start) * 1000,
+    'import_ms': (imported - start) * 1000,
+    'total_ms': (done - start) * 1000,
+    'sdks': sorted(m for m in {sdks!r} if m in sys.modules)
+}}))
+"""
+
+SCENARIOS = {
+    'import': {'call': False, 'eager': ()},
+    'process_sefira': {'call': True, 'eager': ()},
+    'process_sefira_eager_sdks': {'call': True, 'eager': SDKS}
+}
+
+
+def child_env() -> dict:
+    # Proveedor falso: la llamada no sale a la red y no importa ningun SDK
+    env = dict(os.environ, TIKUN_LLM_PROVIDER='fake', TIKUN_LLM_CACHE='0', PYTHONWARNINGS='ignore')
+    env.pop('TIKUN_TRACE', None)
+    env.pop('TIKUN_TRACE_CHROME', None)
+    return env
+
+
+def run_child(code: str, extra_args=()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *extra_args, '-c', code],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True
+    )
+
+
+def sample(scenario: dict, sefira: str) -> dict:
+    code = CHILD.format(eager=tuple(scenario['eager']), call=scenario['call'], sefira=sefira, sdks=SDKS)
+    start = time.perf_counter()
+    out = run_child(code)
+    wall_ms = (time.perf_counter() - start) * 1000
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    report['wall_ms'] = wall_ms
+    return report
+
+
+def measure(scenario: dict, sefira: str, repeat: int) -> dict:
+    samples = [sample(scenario, sefira) for _ in range(repeat)]
+    summary = {
+        key: {
+            'median': statistics.median(s[key] for s in samples),
+            'min': min(s[key] for s in samples)
+        }
+        for key in ('import_ms', 'total_ms', 'wall_ms')
+    }
+    summary['sdks'] = samples[-1]['sdks']
+    return summary
+
+
+def importtime(sefira: str, top: int) -> list:
+    """Modulos con mas tiempo acumulado de importacion en el escenario process_sefira"""
+    code = CHILD.format(eager=(), call=True, sefira=sefira, sdks=SDKS)
+    out = run_child(code, ('-X', 'importtime'))
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append({'module': name.strip(), 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sefira', default='binah', help='Sefira de process_sefira')
+    parser.add_argument('--repeat', type=int, default=7, help='procesos por escenario')
+    parser.add_argument('--top', type=int, default=15, help='modulos del reporte de importtime')
+    parser.add_argument('--output', help='archivo JSON de resultados')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'sefira': args.sefira,
+            'repeat': args.repeat
+        },
+        'scenarios': {name: measure(scenario, args.sefira, args.repeat) for name, scenario in SCENARIOS.items()},
+        'importtime': importtime(args.sefira, args.top)
+    }
+
+    print(f"{'escenario':<28} {'import ms':>10} {'total ms':>10} {'pared ms':>10}  sdk cargados")
+    for name, report in results['scenarios'].items():
+        print(
+            f"{name:<28} {report['import_ms']['median']:>10.1f} {report['total_ms']['median']:>10.1f} "
+            f"{report['wall_ms']['median']:>10.1f}  {', '.join(report['sdks']) or '-'}"
+        )
+    lazy = results['scenarios']['process_sefira']['total_ms']['median']
+    eager = results['scenarios']['process_sefira_eager_sdks']['total_ms']['median']
+    print(f"\ncold start de process_sefira: {lazy:.1f} ms vs {eager:.1f} ms con los SDK importados al cargar")
+
+    print(f"\n{'modulo':<48} {'acumulado ms':>13} {'propio ms':>10}")
+    for row in results['importtime']:
+        print(f"{row['module']:<48} {row['cumulative_ms']:>13.1f} {row['self_ms']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
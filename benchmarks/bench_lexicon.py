@@ -0,0 +1,132 @@
+"""
+Microbenchmark del motor de keywords (src/core/lexicon.py).
+
+Compara, sobre respuestas largas sinteticas, tres formas de contar keywords:
+- naive: como estaban los heuristicos, text.lower() por scorer + `kw in text`
+- regex: una sola regex con todas las keywords (lookahead para solapamientos)
+- lexicon: Lexicon.scan(), una normalizacion compartida por todos los grupos
+
+Uso:
+    python benchmarks/bench_lexicon.py [--sizes 4000 40000 400000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.lexicon import Lexicon, fold  # noqa: E402
+
+
+# Mismos grupos que Keter, ChochmahGemini y Binah
+GROUPS = {
+    'suffering_positive': ['ayuda', 'cura', 'alivia', 'mejora', 'beneficia', 'florece', 'eleva'],
+    'suffering_negative': ['dana', 'hiere', 'perjudica', 'destruye', 'sufre', 'dolor'],
+    'free_will_coercion': ['forzar', 'obligar', 'coaccionar', 'manipular', 'enganar'],
+    'free_will_respect': ['elegir', 'decidir', 'consenso', 'voluntario', 'autonomia'],
+    'harmony': ['paz', 'union', 'colabora', 'armonia', 'coopera', 'reconcilia'],
+    'discord': ['conflicto', 'division', 'guerra', 'enfrentamiento', 'hostilidad'],
+    'uncertainty_markers': [
+        'no estoy seguro', 'incertidumbre', 'ambiguo', 'posiblemente', 'quizas',
+        'tal vez', 'necesito mas informacion', 'no esta claro', 'podria ser',
+        'dificil determinar', 'unclear', 'uncertain', 'possibly', 'maybe',
+        'might be', 'desconozco', 'no se', 'es dificil', 'depende de',
+        'varia segun', 'puede que', 'not certain', 'hard to say', 'difficult to predict'
+    ],
+    'epistemic_qualifiers': [
+        'probablemente', 'posiblemente', 'quizas', 'tal vez', 'puede que',
+        'potencialmente', 'aparentemente', 'presumiblemente', 'likely',
+        'probably', 'perhaps', 'potentially', 'seemingly'
+    ],
+    'temporal': ['historico', 'pasado', 'futuro', 'largo plazo', 'corto plazo'],
+    'social': ['social', 'comunidad', 'grupo', 'sociedad', 'personas'],
+    'economica': ['economico', 'financiero', 'recursos', 'costo', 'incentivos'],
+    'cultural': ['cultural', 'valores', 'normas', 'creencias', 'tradiciones'],
+    'ambiental': ['ambiental', 'ecologico', 'sostenibilidad', 'medio ambiente'],
+    'politica': ['politico', 'poder', 'gobierno', 'institucional', 'governance']
+}
+
+FILLER = (
+    "El analisis considera el contexto de la accion propuesta y sus efectos "
+    "sobre las personas involucradas en el largo plazo Esta respuesta describe "
+    "opciones concretas con Transparencia y Autonomía para cada parte "
+).split()
+
+
+def synthetic_response(size: int, seed: int = 7) -> str:
+    """Texto de ~size caracteres con keywords repartidas entre relleno"""
+    rng = random.Random(seed)
+    keywords = [kw for kws in GROUPS.values() for kw in kws]
+    words, length = [], 0
+    while length < size:
+        word = rng.choice(keywords) if rng.random() < 0.05 else rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def naive_counts(text: str) -> dict:
+    """Como lo hacian los scorers: un lower() por scorer y `kw in text` por keyword"""
+    counts = {}
+    for group, keywords in GROUPS.items():
+        lowered = text.lower()
+        counts[group] = sum(1 for kw in keywords if kw in lowered)
+    return counts
+
+
+def build_regex():
+    """Una regex con todas las keywords, de mayor a menor longitud"""
+    keywords = sorted({kw for kws in GROUPS.values() for kw in kws}, key=lambda kw: -len(kw))
+    return re.compile('(?=(' + '|'.join(re.escape(kw) for kw in keywords) + '))')
+
+
+def regex_counts(pattern, text: str) -> dict:
+    """Una pasada de la regex; los prefijos en la misma posicion no se cuentan (solo referencia)"""
+    present = {match.group(1) for match in pattern.finditer(text.lower())}
+    return {group: sum(1 for kw in keywords if kw in present) for group, keywords in GROUPS.items()}
+
+
+def lexicon_counts(lexicon: Lexicon, text: str) -> dict:
+    return lexicon.scan(text).counts()
+
+
+def best_of(fn, repeat: int) -> float:
+    """Mejor tiempo (s) de 'repeat' ejecuciones"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4_000, 40_000, 400_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    lexicon = Lexicon(GROUPS)
+    pattern = build_regex()
+
+    print(f"{'chars':>10} {'naive ms':>10} {'regex ms':>10} {'lexicon ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        text = synthetic_response(size)
+        # Mismos conteos que `kw in text` (sobre texto sin acentos)
+        assert lexicon_counts(lexicon, text) == naive_counts(fold(text))
+
+        naive = best_of(lambda: naive_counts(text), args.repeat)
+        regex = best_of(lambda: regex_counts(pattern, text), args.repeat)
+        scanned = best_of(lambda: lexicon_counts(lexicon, text), args.repeat)
+        print(
+            f"{size:>10} {naive*1000:>10.3f} {regex*1000:>10.3f} "
+            f"{scanned*1000:>11.3f} {naive/scanned:>7.2f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+Benchmark de punta a punta del Arbol (Keter -> Malchut) sin red.
+
+Corre el grafo completo de TikunEngine contra el proveedor falso (o un
+cassette grabado, ver src/core/cassette.py) y mide:
+- CPU por etapa: process() de cada Sefira con las entradas de una corrida
+  real, en el hilo principal (prompt, parsing, scoring)
+- overhead del orquestador: CPU de una corrida completa menos la suma de
+  las etapas (DAG, gating, hilos y loop)
+- req/s de run_batch() a varios niveles de concurrencia
+- memoria pico (tracemalloc) de un lote por nivel de concurrencia
+
+Escribe los resultados en JSON y los compara con una linea base: cada
+metrica con muestras pasa un test t de Welch, y se marca como regresion si
+empeora de forma significativa (p < --alpha) y en mas de --min-change.
+Con regresiones el proceso termina con codigo 1.
+
+La linea base no esta en el repositorio: depende de la maquina, y una
+grabada en otra daria regresiones falsas. Primer paso en cada maquina
+(o despues de un cambio de rendimiento aceptado):
+    python benchmarks/bench_pipeline.py --update-baseline
+Sin linea base el benchmark lo avisa y no compara; si se pidio una con
+--baseline y no existe, termina con codigo 2.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--latency 0.01] [--concurrency 1 4 16]
+        [--batch 32] [--repeat 5] [--output resultados.json]
+        [--baseline benchmarks/results/pipeline_baseline.json] [--update-baseline]
+        [--cassette run.cassette --latency-model recorded]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loguru import logger  # noqa: E402
+
+from src.core.llm_provider import FakeProvider, set_provider  # noqa: E402
+from src.core.sefira_registry import SefiraRegistry  # noqa: E402
+from src.tikun_engine import TikunEngine  # noqa: E402
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'results', 'pipeline_baseline.json')
+
+ACTIONS = [
+    "Implementar programa de becas educativas en comunidad rural con transparencia",
+    "Crear un fondo comunitario de microcreditos gestionado por cooperativas locales",
+    "Reducir el presupuesto de salud publica para financiar infraestructura vial",
+    "Abrir un centro de mediacion para resolver conflictos entre vecinos",
+    "Instalar paneles solares en escuelas publicas con participacion de las familias",
+    "Automatizar la atencion al cliente y despedir al equipo de soporte",
+    "Restaurar el humedal de la cuenca con voluntarios y monitoreo abierto",
+    "Publicar los datos de contratos municipales en un portal accesible"
+]
+
+# Metrica -> True si mas alto es mejor
+HIGHER_IS_BETTER = {'cpu_ms': False, 'overhead_ms': False, 'rps': True}
+
+
+# =============================================================================
+# Estadistica
+# =============================================================================
+
+def summary(samples):
+    return {
+        'samples': samples,
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'min': min(samples)
+    }
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Fraccion continua de la beta incompleta (Lentz)"""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return result
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Beta incompleta regularizada I_x(a, b)"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def welch_t_test(a, b):
+    """(t, grados de libertad, p bilateral) para medias de muestras con varianzas distintas"""
+    n1, n2 = len(a), len(b)
+    m1, m2 = statistics.fmean(a), statistics.fmean(b)
+    v1 = statistics.variance(a) if n1 > 1 else 0.0
+    v2 = statistics.variance(b) if n2 > 1 else 0.0
+    se2 = v1 / n1 + v2 / n2
+    if se2 == 0:
+        return (0.0, float('inf'), 1.0) if m1 == m2 else (math.copysign(float('inf'), m1 - m2), float('inf'), 0.0)
+    t = (m1 - m2) / math.sqrt(se2)
+    denominator = (v1 / n1) ** 2 / max(n1 - 1, 1) + (v2 / n2) ** 2 / max(n2 - 1, 1)
+    df = se2 ** 2 / denominator
+    return t, df, _betainc(df / 2.0, 0.5, df / (df + t * t))
+
+
+# =============================================================================
+# Mediciones
+# =============================================================================
+
+def build_engine(args):
+    """Motor con las diez Sefirot del registro, conectadas al proveedor sin red"""
+    if args.cassette:
+        from src.core.cassette import CassetteProvider
+        provider = CassetteProvider(
+            upstream='gemini', path=args.cassette, mode='replay',
+            latency=args.latency_model, on_miss='fake'
+        )
+        os.environ['TIKUN_LLM_PROVIDER'] = 'cassette'
+        set_provider(provider, kind='gemini')
+    else:
+        provider = FakeProvider(latency=args.latency)
+        os.environ['TIKUN_LLM_PROVIDER'] = 'fake'
+        set_provider(provider)
+    # Cada corrida debe llegar al "LLM": sin cache de respuestas
+    os.environ['TIKUN_LLM_CACHE'] = '0'
+    return TikunEngine(sefirot=SefiraRegistry().get_all()), provider
+
+
+def stage_cpu(engine, actions, repeat):
+    """CPU (ms) de process() por Sefira, con las entradas de una corrida real de cada accion"""
+    inputs = []
+    for action in actions:
+        run = engine.run(action)
+        request = {'action': run['effective_action'], 'context': '', 'expected_outcome': ''}
+        inputs.append((request, run['results']))
+
+    samples = {node.name: [] for node in engine.nodes}
+    for _ in range(repeat):
+        for node in engine.nodes:
+            sefira = engine.sefirot[node.name]
+            total = 0.0
+            for request, results in inputs:
+                data = node.build_input(request, results)
+                start = time.process_time()
+                sefira.process(data)
+                total += time.process_time() - start
+            samples[node.name].append(total / len(inputs) * 1000)
+    return {name: summary(values) for name, values in samples.items()}
+
+
+def orchestrator_overhead(engine, actions, repeat, stages):
+    """CPU (ms) de una corrida completa menos la suma de las etapas"""
+    stage_total = sum(stage['mean'] for stage in stages.values())
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for action in actions:
+            engine.run(action)
+        per_run = (time.process_time() - start) / len(actions) * 1000
+        samples.append(per_run - stage_total)
+    return summary(samples)
+
+
+def throughput(engine, actions, concurrency, repeat):
+    """req/s de run_batch() y memoria pico de un lote (MB)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.run_batch(actions, concurrency=concurrency)
+        samples.append(len(actions) / (time.perf_counter() - start))
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    engine.run_batch(actions, concurrency=concurrency)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = summary(samples)
+    report['peak_mb'] = peak / (1024 * 1024)
+    return report
+
+
+# =============================================================================
+# Comparacion con la linea base
+# =============================================================================
+
+def metrics_with_samples(results):
+    """(nombre, tipo, muestras) de cada metrica comparable"""
+    for name, stage in results['stages'].items():
+        yield f"stage.{name}.cpu_ms", 'cpu_ms', stage['samples']
+    yield 'orchestrator.overhead_ms', 'overhead_ms', results['orchestrator_overhead']['samples']
+    for level, report in results['concurrency'].items():
+        yield f"concurrency.{level}.rps", 'rps', report['samples']
+
+
+def compare(results, baseline, alpha, min_change):
+    """Metricas que cambiaron de forma significativa respecto a la linea base"""
+    previous = {name: samples for name, _, samples in metrics_with_samples(baseline)}
+    rows = []
+    for name, kind, samples in metrics_with_samples(results):
+        if name not in previous:
+            continue
+        before, after = statistics.fmean(previous[name]), statistics.fmean(samples)
+        _, _, p = welch_t_test(samples, previous[name])
+        change = (after - before) / before if before else 0.0
+        worse = change < 0 if HIGHER_IS_BETTER[kind] else change > 0
+        significant = p < alpha and abs(change) > min_change
+        rows.append({
+            'metric': name,
+            'baseline': before,
+            'current': after,
+            'change': change,
+            'p_value': p,
+            'status': ('regression' if worse else 'improvement') if significant else 'same'
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.01, help='segundos por llamada del proveedor falso')
+    parser.add_argument('--cassette', help='reproducir un cassette en lugar del proveedor falso')
+    parser.add_argument('--latency-model', default='recorded', help='latencia del cassette (ver parse_latency)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--batch', type=int, default=32, help='acciones por lote')
+    parser.add_argument('--repeat', type=int, default=5, help='muestras por metrica')
+    parser.add_argument('--output', help='archivo JSON de resultados')
+    parser.add_argument('--baseline', help=f'linea base a comparar (por defecto {DEFAULT_BASELINE})')
+    parser.add_argument('--update-baseline', action='store_true', help='guardar estos resultados como linea base')
+    parser.add_argument('--alpha', type=float, default=0.01)
+    parser.add_argument('--min-change', type=float, default=0.05, help='cambio relativo minimo a reportar')
+    args = parser.parse_args()
+    explicit_baseline = args.baseline is not None
+    args.baseline = args.baseline or DEFAULT_BASELINE
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    engine, provider = build_engine(args)
+    batch = [ACTIONS[i % len(ACTIONS)] for i in range(args.batch)]
+
+    stages = stage_cpu(engine, ACTIONS, args.repeat)
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'provider': provider.stats(),
+            'latency': args.latency if not args.cassette else args.latency_model,
+            'batch': args.batch,
+            'repeat': args.repeat
+        },
+        'stages': stages,
+        'orchestrator_overhead': orchestrator_overhead(engine, ACTIONS, args.repeat, stages),
+        'concurrency': {
+            str(level): throughput(engine, batch, level, args.repeat) for level in args.concurrency
+        }
+    }
+
+    print(f"{'etapa':>10} {'cpu ms':>10} {'stdev':>8}")
+    for name, stage in stages.items():
+        print(f"{name:>10} {stage['mean']:>10.3f} {stage['stdev']:>8.3f}")
+    overhead = results['orchestrator_overhead']
+    print(f"{'overhead':>10} {overhead['mean']:>10.3f} {overhead['stdev']:>8.3f}")
+    print(f"\n{'concurr.':>10} {'req/s':>10} {'stdev':>8} {'pico MB':>9}")
+    for level, report in results['concurrency'].items():
+        print(f"{level:>10} {report['mean']:>10.2f} {report['stdev']:>8.2f} {report['peak_mb']:>9.2f}")
+
+    regressions = []
+    missing_baseline = False
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            rows = compare(results, json.load(f), args.alpha, args.min_change)
+        results['comparison'] = {'baseline': args.baseline, 'alpha': args.alpha, 'metrics': rows}
+        regressions = [row for row in rows if row['status'] == 'regression']
+        print(f"\nvs {args.baseline} (alpha {args.alpha}, cambio minimo {args.min_change:.0%})")
+        for row in rows:
+            if row['status'] != 'same':
+                print(
+                    f"{row['status']:>12} {row['metric']:<28} {row['baseline']:>10.3f} -> "
+                    f"{row['current']:>10.3f} ({row['change']:+.1%}, p={row['p_value']:.4f})"
+                )
+        if not any(row['status'] != 'same' for row in rows):
+            print("sin cambios significativos")
+    elif not args.update_baseline:
+        print(f"\nsin linea base en {args.baseline}: no se compara (crearla con --update-baseline)")
+        missing_baseline = explicit_baseline
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nlinea base guardada en {args.baseline}")
+
+    sys.exit(1 if regressions else 2 if missing_baseline else 0)
+
+
+if __name__ == '__main__':
+    main()
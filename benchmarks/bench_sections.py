@@ -0,0 +1,162 @@
+"""
+Microbenchmark del tokenizador de secciones (src/core/section_tokenizer.py).
+
+Compara, sobre respuestas largas sinteticas con el formato que piden los
+prompts, los parsers anteriores contra SectionTokenizer:
+- lineas: if/elif por encabezado sobre cada linea (Gevurah, Tiferet, Netzach...)
+- regex: un re.search por seccion sobre toda la respuesta (Chochmah)
+- marcadores: str.find por marcador y por seccion siguiente (Hod, Yesod)
+
+Uso:
+    python benchmarks/bench_sections.py [--sizes 4000 40000 400000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sefirot.chochmah import Chochmah  # noqa: E402
+from src.sefirot.gevurah import Gevurah  # noqa: E402
+from src.sefirot.hod import Hod  # noqa: E402
+
+
+FILLER = (
+    "El analisis considera el contexto de la accion propuesta y sus efectos "
+    "sobre las personas involucradas en el largo plazo con limites claros"
+).split()
+
+
+def synthetic_response(headers, size: int, seed: int = 7) -> str:
+    """Respuesta de ~size caracteres: los encabezados dados, con lineas de relleno"""
+    rng = random.Random(seed)
+    per_section = max(1, size // len(headers))
+    parts = []
+    for header in headers:
+        parts.append(header)
+        length = 0
+        while length < per_section:
+            line = '- ' + ' '.join(rng.choice(FILLER) for _ in range(rng.randint(6, 14)))
+            parts.append(line)
+            length += len(line) + 1
+        parts.append('')
+    return '\n'.join(parts)
+
+
+# --- Parsers anteriores (referencia) ---
+
+GEVURAH_HEADERS = [
+    ('chesed_excesses', ['EXCESOS DE CHESED:', 'CHESED EXCESSES:']),
+    ('necessary_boundaries', ['LIMITES NECESARIOS:', 'NECESSARY BOUNDARIES:', 'NECESSARY LIMITS:']),
+    ('justice_criteria', ['CRITERIOS DE JUSTICIA:', 'JUSTICE CRITERIA:']),
+    ('restrictions', ['RESTRICCIONES:', 'RESTRICTIONS:']),
+    ('warnings', ['ADVERTENCIAS:', 'WARNINGS:']),
+    ('balance_analysis', ['BALANCE REQUERIDO:', 'REQUIRED BALANCE:', 'BALANCE ANALYSIS:'])
+]
+
+
+def legacy_lines(response: str) -> dict:
+    """Como Gevurah._parse_response: cadena if/elif por linea"""
+    sections = {key: [] for key, _ in GEVURAH_HEADERS}
+    current = None
+    for line in response.split('\n'):
+        line_upper = line.strip().upper()
+        for key, aliases in GEVURAH_HEADERS:
+            if any(alias in line_upper for alias in aliases):
+                current = key
+                break
+        else:
+            if current and line.strip():
+                sections[current].append(line.strip())
+    return sections
+
+
+CHOCHMAH_PATTERNS = {
+    'understanding': r'(?:UNDERSTANDING|COMPRENSION|COMPRENSIÓN):\s*',
+    'analysis': r'(?:ANALYSIS|ANALISIS|ANÁLISIS):\s*',
+    'insights': r'(?:INSIGHTS):\s*',
+    'uncertainties': r'(?:UNCERTAINTIES|INCERTIDUMBRES):\s*',
+    'recommendation': r'(?:RECOMMENDATION|RECOMENDACION|RECOMENDACIÓN):\s*'
+}
+
+
+def legacy_regex(response: str) -> dict:
+    """Como Chochmah._parse_response: un re.search por seccion"""
+    sections = {}
+    for key, pattern in CHOCHMAH_PATTERNS.items():
+        match = re.search(
+            pattern + r'(.*?)(?=' + '|'.join(CHOCHMAH_PATTERNS.values()) + r'|\Z)',
+            response,
+            re.DOTALL | re.IGNORECASE
+        )
+        sections[key] = match.group(1).strip() if match else ''
+    return sections
+
+
+HOD_MARKERS = [
+    'PLAN ESTRUCTURADO:', 'ESTRATEGIA DE COMUNICACION:', 'FRAMEWORK DE METRICAS:',
+    'DOCUMENTACION:', 'MENSAJES CLAVE:', 'EVALUACION DE PRECISION:'
+]
+
+
+def legacy_markers(response: str) -> dict:
+    """Como Hod._extract_section, una vez por marcador"""
+    sections = {}
+    for marker in HOD_MARKERS:
+        if marker not in response:
+            sections[marker] = ''
+            continue
+        start = response.find(marker) + len(marker)
+        end = len(response)
+        for next_marker in HOD_MARKERS:
+            if next_marker != marker and next_marker in response[start:]:
+                end = min(end, response.find(next_marker, start))
+        sections[marker] = response[start:end].strip()
+    return sections
+
+
+def best_of(fn, repeat: int) -> float:
+    """Mejor tiempo (s) de 'repeat' ejecuciones"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4_000, 40_000, 400_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ('lineas', [aliases[0] for _, aliases in GEVURAH_HEADERS], legacy_lines,
+         lambda text: Gevurah.SECTIONS.split_lines(text, include_inline=False)),
+        ('regex', ['UNDERSTANDING:', 'ANALYSIS:', 'INSIGHTS:', 'UNCERTAINTIES:', 'RECOMMENDATION:'],
+         legacy_regex, Chochmah.SECTIONS.split),
+        ('marcadores', HOD_MARKERS, legacy_markers, Hod.SECTIONS.split)
+    ]
+
+    print(f"{'parser':>10} {'chars':>10} {'antes ms':>10} {'tokenizer ms':>13} {'speedup':>8}")
+    for name, headers, legacy, tokenized in cases:
+        for size in args.sizes:
+            text = synthetic_response(headers, size)
+            # Mismo contenido por seccion
+            assert [v for v in legacy(text).values()] == [v for v in tokenized(text).values()]
+
+            before = best_of(lambda: legacy(text), args.repeat)
+            after = best_of(lambda: tokenized(text), args.repeat)
+            print(
+                f"{name:>10} {size:>10} {before*1000:>10.3f} "
+                f"{after*1000:>13.3f} {before/after:>7.2f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
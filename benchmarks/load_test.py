@@ -0,0 +1,504 @@
+"""
+Prueba de carga de las funciones callable contra una instancia local.
+
+Levanta el servidor callable local (src/callable_server.py: una instancia
+caliente, con su limite de concurrencia y su cola) sobre el proveedor
+falso con latencia de LLM realista (log-normal por llamada, o un cassette
+grabado), o apunta a uno ya levantado (--url, p.ej. el emulador de
+Functions), y rampa la carga sobre process_action o process_sefira:
+
+- lazo cerrado (--users): N usuarios que esperan su respuesta y piensan
+  --think-time segundos (exponencial) antes de la siguiente
+- lazo abierto (--rates): llegadas de Poisson a R peticiones/s que no
+  esperan respuestas; la latencia se mide desde la llegada programada,
+  asi que la cola del cliente tambien cuenta (sin omision coordinada)
+
+Por nivel reporta p50/p95/p99 de latencia, errores por codigo, throughput,
+espera por un turno de la instancia (X-Tikun-Queue-Seconds) y p50/p95/p99
+de cada etapa (timings.stages de la respuesta). El punto de saturacion de
+una rampa es el primer nivel donde los errores pasan de --max-error-rate,
+el throughput queda por debajo de --throughput-ratio del esperado (lo
+ofrecido en lazo abierto; N / (latencia base + think time) en lazo
+cerrado) o el p99 pasa de --latency-factor veces el del primer nivel; el
+de cada etapa, donde su p95 lo hace.
+
+Uso:
+    python benchmarks/load_test.py [--function process_action] [--users 10 50 200]
+        [--rates 2 5 10 20] [--duration 30] [--think-time 1.0]
+        [--llm-latency lognormal:1.5:0.5] [--concurrency 80] [--output carga.json]
+    python benchmarks/load_test.py --function process_sefira --sefira binah ...
+    python benchmarks/load_test.py --serve --port 5001          # solo el servidor
+    python benchmarks/load_test.py --url http://127.0.0.1:5001 ...
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loguru import logger  # noqa: E402
+
+from src.callable_server import CallableServer  # noqa: E402
+from src.core.cassette import RecordedLatency, TokenLatency, parse_latency  # noqa: E402
+from src.core.llm_provider import FakeProvider, set_provider  # noqa: E402
+from src.tikun_engine import default_tree  # noqa: E402
+from src.tikun_service import TikunService  # noqa: E402
+
+
+ACTIONS = [
+    "Implementar programa de becas educativas en comunidad rural con transparencia",
+    "Crear un fondo comunitario de microcreditos gestionado por cooperativas locales",
+    "Reducir el presupuesto de salud publica para financiar infraestructura vial",
+    "Abrir un centro de mediacion para resolver conflictos entre vecinos",
+    "Instalar paneles solares en escuelas publicas con participacion de las familias",
+    "Automatizar la atencion al cliente y despedir al equipo de soporte",
+    "Restaurar el humedal de la cuenca con voluntarios y monitoreo abierto",
+    "Publicar los datos de contratos municipales en un portal accesible"
+]
+
+# Segundos por debajo de los cuales una etapa no se considera saturada
+# (la espera en cola de un nivel sin carga es ~0)
+STAGE_FLOOR = 0.01
+
+
+# =============================================================================
+# Cliente
+# =============================================================================
+
+class Sample:
+    """Resultado de una peticion: latencia, codigo ('OK' o del protocolo) y etapas"""
+
+    __slots__ = ('latency', 'status', 'stages', 'queue')
+
+    def __init__(self, latency, status, stages=None, queue=None):
+        self.latency = latency
+        self.status = status
+        self.stages = stages or {}
+        self.queue = queue
+
+
+class CallableClient:
+    """Cliente del protocolo callable, con una conexion keep-alive por hilo"""
+
+    def __init__(self, url, timeout):
+        parsed = urllib.parse.urlsplit(url)
+        self.https = parsed.scheme == 'https'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def call(self, function, data):
+        """(codigo, resultado o None, segundos en cola de la instancia)"""
+        body = json.dumps({'data': data}).encode('utf-8')
+        # Un reintento solo si el servidor cerro una conexion keep-alive ociosa
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('POST', f'{self.prefix}/{function}', body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                payload = response.read()
+            except socket.timeout:
+                self._reset()
+                return 'timeout', None, None
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self._reset()
+                if attempt:
+                    return 'connection', None, None
+                continue
+            except (http.client.HTTPException, OSError):
+                self._reset()
+                return 'connection', None, None
+            return self._parse(response, payload)
+
+    def _parse(self, response, payload):
+        queue = response.getheader('X-Tikun-Queue-Seconds')
+        queue = float(queue) if queue is not None else None
+        try:
+            body = json.loads(payload)
+        except ValueError:
+            return f'HTTP_{response.status}', None, queue
+        if response.status == 200 and 'result' in body:
+            return 'OK', body['result'], queue
+        error = body.get('error') if isinstance(body, dict) else None
+        return (error or {}).get('status') or f'HTTP_{response.status}', None, queue
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = self._local.connection = cls(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+        self._local.connection = None
+
+
+class Workload:
+    """Payload de la peticion n y etapas de su respuesta, segun la funcion probada"""
+
+    def __init__(self, args, client):
+        self.function = args.function
+        self.sefira = args.sefira
+        self.gating_policy = args.gating_policy
+        self.input_data = None
+        if self.function == 'process_sefira':
+            self.input_data = self._sefira_input(client)
+
+    def payload(self, n):
+        action = ACTIONS[n % len(ACTIONS)]
+        if self.function == 'process_sefira':
+            data = dict(self.input_data)
+            for key in ('action', 'query'):
+                if key in data:
+                    data[key] = action
+            return {'sefira': self.sefira, 'input_data': data}
+        return {'action': action, 'context': 'Prueba de carga', 'gating_policy': self.gating_policy}
+
+    def request(self, client, n, scheduled=None):
+        started = scheduled if scheduled is not None else time.perf_counter()
+        status, result, queue = client.call(self.function, self.payload(n))
+        latency = time.perf_counter() - started
+        return Sample(latency, status, self._stages(result, latency, queue), queue)
+
+    def _stages(self, result, latency, queue):
+        if result is None:
+            return {}
+        if self.function == 'process_sefira':
+            return {self.sefira: latency - (queue or 0.0)}
+        return result.get('timings', {}).get('stages', {})
+
+    def _sefira_input(self, client):
+        """Input de la Sefira con los resultados reales de una corrida de process_action"""
+        action = ACTIONS[0]
+        status, result, _ = client.call('process_action', {
+            'action': action, 'context': 'Prueba de carga', 'gating_policy': 'continue'
+        })
+        if status != 'OK':
+            raise SystemExit(f"No se pudo preparar el input de {self.sefira}: {status}")
+        node = next((node for node in default_tree() if node.name == self.sefira), None)
+        if node is None:
+            raise SystemExit(f"Sefira desconocida: {self.sefira}")
+        request = {'action': action, 'context': 'Prueba de carga', 'expected_outcome': ''}
+        return node.build_input(request, result['results'])
+
+
+# =============================================================================
+# Carga
+# =============================================================================
+
+def closed_loop(workload, client, users, duration, think_time, seed):
+    """N usuarios en bucle peticion -> think time durante 'duration' segundos"""
+    samples = []
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def user(index):
+        rng = random.Random(seed + index)
+        # Arranques escalonados para no empezar con una rafaga de N peticiones
+        if think_time:
+            time.sleep(rng.uniform(0, think_time))
+        n = index
+        while time.perf_counter() < deadline:
+            samples.append(workload.request(client, n))
+            n += users
+            if think_time:
+                time.sleep(rng.expovariate(1.0 / think_time))
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def open_loop(workload, client, rate, duration, max_outstanding, seed):
+    """Llegadas de Poisson a 'rate' peticiones/s durante 'duration' segundos"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    arrival = start
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_outstanding) as executor:
+        n = 0
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival - start >= duration:
+                break
+            wait = arrival - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            futures.append(executor.submit(workload.request, client, n, arrival))
+            n += 1
+    return [future.result() for future in futures], time.perf_counter() - start
+
+
+# =============================================================================
+# Reporte
+# =============================================================================
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(q):
+        return values[min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))]
+
+    return {
+        'n': len(values),
+        'p50': rank(0.50),
+        'p95': rank(0.95),
+        'p99': rank(0.99),
+        'mean': sum(values) / len(values),
+        'max': values[-1]
+    }
+
+
+def step_report(mode, level, samples, elapsed, think_time):
+    ok = [sample for sample in samples if sample.status == 'OK']
+    stages = {}
+    for sample in ok:
+        for name, seconds in sample.stages.items():
+            stages.setdefault(name, []).append(seconds)
+    queue = [sample.queue for sample in samples if sample.queue is not None]
+    if queue:
+        stages['queue'] = queue
+
+    return {
+        'mode': mode,
+        'level': level,
+        'elapsed': elapsed,
+        'requests': len(samples),
+        'ok': len(ok),
+        'errors': dict(Counter(sample.status for sample in samples if sample.status != 'OK')),
+        'error_rate': 1 - len(ok) / len(samples) if samples else 0.0,
+        'throughput': len(ok) / elapsed if elapsed else 0.0,
+        'offered_rate': level if mode == 'open' else None,
+        'think_time': think_time if mode == 'closed' else None,
+        'latency': percentiles([sample.latency for sample in ok]),
+        'stages': {name: percentiles(values) for name, values in sorted(stages.items())}
+    }
+
+
+def expected_throughput(step, base):
+    """Lo ofrecido (lazo abierto) o la ley de Little con la latencia del primer nivel (lazo cerrado)"""
+    if step['mode'] == 'open':
+        return step['level']
+    if not base['latency']:
+        return None
+    return step['level'] / (base['latency']['mean'] + step['think_time'])
+
+
+def saturation(steps, args):
+    """Primer nivel saturado de la rampa y el primero de cada etapa"""
+    if not steps:
+        return None
+    base = steps[0]
+    point = None
+    for step in steps:
+        reasons = []
+        if step['error_rate'] > args.max_error_rate:
+            reasons.append(f"errores {step['error_rate']:.1%}")
+        expected = expected_throughput(step, base)
+        if expected and step['throughput'] < args.throughput_ratio * expected:
+            reasons.append(f"throughput {step['throughput']:.2f}/s de {expected:.2f}/s esperados")
+        if base['latency'] and step['latency'] and step['latency']['p99'] > args.latency_factor * base['latency']['p99']:
+            reasons.append(f"p99 {step['latency']['p99']:.2f}s > {args.latency_factor:g}x {base['latency']['p99']:.2f}s")
+        if reasons:
+            point = {'level': step['level'], 'reasons': reasons}
+            break
+
+    stages = {}
+    for name, base_stage in base['stages'].items():
+        limit = args.latency_factor * max(base_stage['p95'] if base_stage else 0.0, STAGE_FLOOR)
+        stages[name] = next((
+            {'level': step['level'], 'p95': step['stages'][name]['p95'], 'base_p95': base_stage['p95']}
+            for step in steps
+            if (step['stages'].get(name) or {}).get('p95', 0.0) > limit
+        ), None)
+
+    return {'ramp': point, 'stages': stages}
+
+
+def print_ramp(mode, steps, analysis):
+    unit = 'usuarios' if mode == 'closed' else 'req/s'
+    print(f"\nLazo {'cerrado' if mode == 'closed' else 'abierto'} ({unit})")
+    print(f"  {'nivel':>7} {'reqs':>6} {'error%':>7} {'thr/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'cola95':>7}")
+    for step in steps:
+        latency = step['latency'] or {}
+        queue = step['stages'].get('queue') or {}
+        print(f"  {step['level']:>7g} {step['requests']:>6} {step['error_rate']:>7.1%} {step['throughput']:>7.2f} "
+              f"{latency.get('p50', 0):>7.2f} {latency.get('p95', 0):>7.2f} {latency.get('p99', 0):>7.2f} "
+              f"{queue.get('p95', 0):>7.2f}")
+        if step['errors']:
+            print(f"  {'':>7} errores: {step['errors']}")
+
+    names = sorted({name for step in steps for name in step['stages']})
+    if names:
+        levels = ' '.join(f"{step['level']:>7g}" for step in steps)
+        print(f"\n  {'p95 por etapa (s)':<18} {levels}   saturacion")
+        for name in names:
+            values = ' '.join(f"{(step['stages'].get(name) or {}).get('p95', 0):>7.2f}" for step in steps)
+            point = analysis['stages'].get(name)
+            print(f"  {name:<18} {values}   {format(point['level'], 'g') if point else '-'}")
+
+    ramp = analysis['ramp']
+    if ramp:
+        print(f"\n  Saturacion en {ramp['level']:g} {unit}: {'; '.join(ramp['reasons'])}")
+    else:
+        print("\n  Sin saturacion en la rampa")
+
+
+# =============================================================================
+# Servidor local
+# =============================================================================
+
+def start_server(args):
+    """Instancia local con el proveedor falso (o un cassette) y latencia realista"""
+    if not args.llm_cache:
+        # Cada peticion llega al LLM, como con acciones que no se repiten
+        os.environ['TIKUN_LLM_CACHE'] = '0'
+
+    if args.cassette:
+        from src.core.cassette import CassetteProvider
+        provider = CassetteProvider(
+            upstream='gemini', path=args.cassette, mode='replay',
+            latency=args.latency_model, on_miss='fake'
+        )
+        os.environ['TIKUN_LLM_PROVIDER'] = 'cassette'
+        set_provider(provider, kind='gemini')
+        set_provider(provider, kind='anthropic')
+    else:
+        model = parse_latency(args.llm_latency)
+        if isinstance(model, (RecordedLatency, TokenLatency)):
+            raise SystemExit("--llm-latency: el proveedor falso solo admite fixed o lognormal")
+        os.environ['TIKUN_LLM_PROVIDER'] = 'fake'
+        set_provider(FakeProvider(latency=lambda prompt: model.sample(None)))
+
+    return CallableServer(
+        TikunService(), host=args.host, port=args.port,
+        concurrency=args.concurrency, queue_timeout=args.queue_timeout
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Servidor callable ya levantado (por defecto, uno local en el proceso)")
+    parser.add_argument('--function', choices=('process_action', 'process_sefira'), default='process_action')
+    parser.add_argument('--sefira', default='binah', help="Sefira de process_sefira")
+    parser.add_argument('--gating-policy', default='continue',
+                        help="gating_policy de process_action ('continue': corren las 10 Sefirot)")
+    parser.add_argument('--users', type=int, nargs='*', default=[10, 50, 200], help="Niveles de lazo cerrado")
+    parser.add_argument('--think-time', type=float, default=1.0, help="Segundos medios entre peticiones de un usuario")
+    parser.add_argument('--rates', type=float, nargs='*', default=[2, 5, 10, 20], help="Niveles de lazo abierto (req/s)")
+    parser.add_argument('--max-outstanding', type=int, default=1000, help="Peticiones abiertas a la vez en lazo abierto")
+    parser.add_argument('--duration', type=float, default=30.0, help="Segundos por nivel")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Timeout del cliente por peticion")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--throughput-ratio', type=float, default=0.9)
+    parser.add_argument('--latency-factor', type=float, default=2.0)
+    parser.add_argument('--output', help="Archivo JSON de resultados")
+    server_options = parser.add_argument_group('servidor local')
+    server_options.add_argument('--serve', action='store_true', help="Solo levanta el servidor local")
+    server_options.add_argument('--host', default='127.0.0.1')
+    server_options.add_argument('--port', type=int, default=0)
+    server_options.add_argument('--concurrency', type=int, default=80,
+                                help="Peticiones a la vez por instancia (concurrency de Cloud Functions)")
+    server_options.add_argument('--queue-timeout', type=float, default=10.0,
+                                help="Segundos de espera por un turno antes de RESOURCE_EXHAUSTED")
+    server_options.add_argument('--llm-latency', default='lognormal:1.5:0.5',
+                                help="Latencia por llamada del LLM falso (fixed:S o lognormal:MEDIANA:SIGMA)")
+    server_options.add_argument('--cassette', help="Reproducir un cassette en vez del LLM falso")
+    server_options.add_argument('--latency-model', default='recorded', help="Latencia del cassette (ver parse_latency)")
+    server_options.add_argument('--llm-cache', action='store_true', help="Mantener la cache de respuestas del LLM")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='INFO' if args.serve else 'WARNING')
+
+    server = instance = None
+    if args.serve or not args.url:
+        server = start_server(args)
+        if args.serve:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return
+        server.start()
+
+    url = args.url or server.url
+    client = CallableClient(url, args.timeout)
+    try:
+        workload = Workload(args, client)
+        # Instancia caliente: las Sefirot ya construidas antes de medir
+        warmup = workload.request(client, 0)
+        if warmup.status != 'OK':
+            raise SystemExit(f"La peticion de calentamiento fallo: {warmup.status}")
+
+        ramps = {}
+        if args.users:
+            ramps['closed'] = [
+                step_report('closed', users, *closed_loop(
+                    workload, client, users, args.duration, args.think_time, args.seed
+                ), args.think_time)
+                for users in args.users
+            ]
+        if args.rates:
+            ramps['open'] = [
+                step_report('open', rate, *open_loop(
+                    workload, client, rate, args.duration, args.max_outstanding, args.seed
+                ), args.think_time)
+                for rate in args.rates
+            ]
+    finally:
+        if server is not None:
+            instance = server.stats()
+            server.stop()
+
+    print(f"{args.function}{' (' + args.sefira + ')' if args.function == 'process_sefira' else ''} en {url}")
+    analysis = {mode: saturation(steps, args) for mode, steps in ramps.items()}
+    for mode, steps in ramps.items():
+        print_ramp(mode, steps, analysis[mode])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'function': args.function,
+                'sefira': args.sefira if args.function == 'process_sefira' else None,
+                'url': args.url,
+                'config': {
+                    'duration': args.duration,
+                    'think_time': args.think_time,
+                    'concurrency': args.concurrency if server else None,
+                    'queue_timeout': args.queue_timeout if server else None,
+                    'llm_latency': None if args.url else (args.cassette or args.llm_latency),
+                    'gating_policy': args.gating_policy
+                },
+                'platform': {'python': platform.python_version(), 'machine': platform.machine()},
+                'instance': instance,
+                'ramps': ramps,
+                'saturation': analysis
+            }, f, indent=2)
+        print(f"\nResultados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,27 @@
 # Firebase Cloud Functions for Tikun Olam System
+import json
 import os
 import sys
-from firebase_functions import https_fn
-from firebase_admin import initialize_app
+from firebase_functions import https_fn, options
+from firebase_admin import auth, initialize_app
 
 # Add parent directory to path to import sefirot modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.sefirot.keter import Keter
-from src.sefirot.chochmah_gemini import ChochmahGemini
-from src.sefirot.binah import Binah
-from src.sefirot.chesed import Chesed
-from src.sefirot.gevurah import Gevurah
-from src.sefirot.tiferet import Tiferet
-from src.sefirot.netzach import Netzach
-from src.sefirot.hod import Hod
-from src.sefirot.yesod import Yesod
-from src.sefirot.malchut import Malchut
+from src.core.sefira_registry import get_registry
+from src.tikun_service import ServiceError, TikunService
 
 # Initialize Firebase Admin
 initialize_app()
 
+# Sefirot are built lazily on first use and reused across requests
+# while this instance stays warm
+registry = get_registry()
+
+# Validation, the Tree run and response shapes live in src/tikun_service.py,
+# shared with the local stand-in used for load tests (src/callable_server.py)
+service = TikunService(registry)
+
 
 @https_fn.on_call()
 def process_action(req: https_fn.CallableRequest) -> dict:
@@ -32,149 +33,100 @@ def process_action(req: https_fn.CallableRequest) -> dict:
             - action: str - The action to evaluate
             - context: str - Context for the action
             - expected_outcome: str - Expected outcome
+            - gating_policy: str - 'stop' (default), 'modifications' or 'continue'
+            - thresholds: dict - Optional minimum scores per Sefira, e.g.
+              {'chochmah': {'confidence_level': 0.3}, 'tiferet': {'harmony_score': 0.5}}
+            - speculate: list - Sefirot started before Keter's verdict
+              (default ['chochmah']; ['chochmah', 'binah'] or [] also valid)
+
+    Returns:
+        dict: Results from the Sefirot that ran; the ones stopped by
+              gating are listed in 'skipped'. 'usage' holds the request's
+              tokens and estimated cost and the caller's running total.
+    """
+    return _call(service.process_action, req.data, uid=_uid(req))
+
+
+@https_fn.on_request(cors=options.CorsOptions(cors_origins='*', cors_methods=['post']))
+def process_action_stream(req: https_fn.Request) -> https_fn.Response:
+    """
+    Same as process_action, streamed as server-sent events
+
+    POST with a Firebase ID token ('Authorization: Bearer <token>') and the
+    same JSON body as process_action. Each Sefira is pushed as soon as it
+    finishes, Keter's verdict first:
+
+        event: result    data: {"sefira": "keter", "result": {...}, "elapsed": 1.2}
+        event: error     data: {"sefira": "binah", "error": "..."}
+        event: skipped   data: {"sefira": "chesed", "reason": "gating: ..."}
+        event: done      data: {"success": true, "summary": {...}, ...}
+
+    'done' carries the same fields as process_action's response.
+    """
+    if req.method != 'POST':
+        return https_fn.Response('Method not allowed', status=405)
+
+    try:
+        token = auth.verify_id_token(_bearer_token(req))
+    except Exception:
+        return https_fn.Response('Unauthorized', status=401)
+
+    try:
+        events = service.stream_action(req.get_json(silent=True) or {}, uid=token.get('uid'))
+    except ServiceError as e:
+        return https_fn.Response(e.message, status=400)
+
+    return https_fn.Response(
+        (_sse(kind, event) for kind, event in events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@https_fn.on_call(timeout_sec=3600)
+def process_actions(req: https_fn.CallableRequest) -> dict:
+    """
+    Process many actions through the Tree with bounded concurrency
+
+    Args:
+        req: Request with data containing:
+            - actions: list - Action strings or dicts with action, context
+              and expected_outcome (at most MAX_BATCH_ACTIONS)
+            - concurrency: int - Actions evaluated at once
+              (default 4, at most MAX_BATCH_CONCURRENCY)
+            - gating_policy, thresholds, speculate: as in process_action,
+              shared by every action
 
     Returns:
-        dict: Results from all 10 Sefirot
+        dict: One item per action, in input order. A failed action has
+              success False and its error; the rest of the batch still runs.
     """
-    # Get input data
-    data = req.data
-    action = data.get('action')
-    context = data.get('context', '')
-    expected_outcome = data.get('expected_outcome', '')
-
-    if not action:
-        raise https_fn.HttpsError(
-            code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT,
-            message='Action is required'
-        )
+    return _call(service.process_actions, req.data, uid=_uid(req))
 
+
+def _call(operation, data, **kwargs) -> dict:
+    """Run a service operation, reporting its errors with the callable protocol codes"""
     try:
-        # Initialize all Sefirot
-        keter = Keter(use_llm_scoring=True)
-        chochmah = ChochmahGemini()
-        binah = Binah()
-        chesed = Chesed()
-        gevurah = Gevurah()
-        tiferet = Tiferet()
-        netzach = Netzach()
-        hod = Hod()
-        yesod = Yesod()
-        malchut = Malchut()
-
-        results = {}
-
-        # 1. KETER - Divine Will & Alignment
-        action_input = {
-            'action': action,
-            'context': context,
-            'expected_outcome': expected_outcome
-        }
-        results['keter'] = keter.process(action_input)
-
-        # 2. CHOCHMAH - Wisdom & Understanding
-        results['chochmah'] = chochmah.process({
-            'query': action,
-            'context': context
-        })
-
-        # 3. BINAH - Contextual Analysis
-        results['binah'] = binah.process({
-            'understanding': results['chochmah']['understanding'],
-            'analysis': results['chochmah']['analysis'],
-            'action': action
-        })
-
-        # 4. CHESED - Loving-Kindness
-        results['chesed'] = chesed.process({
-            'stakeholders': results['binah']['stakeholders'],
-            'first_order_effects': results['binah']['first_order_effects'],
-            'second_order_effects': results['binah']['second_order_effects'],
-            'systemic_risks': results['binah']['systemic_risks'],
-            'ethical_considerations': results['binah']['ethical_considerations'],
-            'action': action
-        })
-
-        # 5. GEVURAH - Severity & Boundaries
-        results['gevurah'] = gevurah.process({
-            'giving_opportunities': results['chesed']['giving_opportunities'],
-            'beneficiaries': results['chesed']['beneficiaries'],
-            'generous_actions': results['chesed']['generous_actions'],
-            'compassion_score': results['chesed']['compassion_score'],
-            'expansion_potential': results['chesed']['expansion_potential'],
-            'limits_needed': results['chesed']['limits_needed'],
-            'action': action
-        })
-
-        # 6. TIFERET - Beauty & Harmony
-        results['tiferet'] = tiferet.process({
-            'chesed_output': results['chesed'],
-            'gevurah_output': results['gevurah'],
-            'action': action
-        })
-
-        # 7. NETZACH - Victory & Persistence
-        results['netzach'] = netzach.process({
-            'balanced_decision': results['tiferet']['balanced_decision'],
-            'implementation_path': results['tiferet']['implementation_path'],
-            'harmony_score': results['tiferet']['harmony_score'],
-            'beauty_score': results['tiferet']['beauty_score'],
-            'action': action
-        })
-
-        # 8. HOD - Splendor & Structure
-        results['hod'] = hod.process({
-            'persistence_strategy': results['netzach']['persistence_strategy'],
-            'obstacles_identified': results['netzach']['obstacles_identified'],
-            'victory_conditions': results['netzach']['victory_conditions'],
-            'endurance_plan': results['netzach']['endurance_plan'],
-            'momentum_mechanisms': results['netzach']['momentum_mechanisms'],
-            'sustainability_score': results['netzach']['sustainability_score'],
-            'action': action
-        })
-
-        # 9. YESOD - Foundation & Connection
-        results['yesod'] = yesod.process({
-            'structured_plan': results['hod']['structured_plan'],
-            'communication_strategy': results['hod']['communication_strategy'],
-            'metrics_framework': results['hod']['metrics_framework'],
-            'documentation': results['hod']['documentation'],
-            'stakeholder_messages': results['hod']['stakeholder_messages'],
-            'precision_score': results['hod']['precision_score'],
-            'clarity_score': results['hod']['clarity_score'],
-            'action': action
-        })
-
-        # 10. MALCHUT - Kingdom & Manifestation
-        results['malchut'] = malchut.process({
-            'foundation_assessment': results['yesod']['foundation_assessment'],
-            'reality_connection': results['yesod']['reality_connection'],
-            'first_concrete_steps': results['yesod']['first_concrete_steps'],
-            'resource_requirements': results['yesod']['resource_requirements'],
-            'stakeholder_alignment': results['yesod']['stakeholder_alignment'],
-            'manifestation_readiness': results['yesod']['manifestation_readiness'],
-            'ready_to_manifest': results['yesod']['ready_to_manifest'],
-            'action': action
-        })
-
-        # Return all results
-        return {
-            'success': True,
-            'results': results,
-            'summary': {
-                'keter_alignment': results['keter']['alignment_score'],
-                'chochmah_confidence': results['chochmah']['confidence_level'],
-                'tiferet_harmony': results['tiferet']['harmony_score'],
-                'yesod_readiness': results['yesod']['manifestation_readiness'],
-                'malchut_completion': results['malchut']['completion_percentage'],
-                'ready_to_manifest': results['malchut']['manifestation_complete']
-            }
-        }
-
-    except Exception as e:
-        raise https_fn.HttpsError(
-            code=https_fn.FunctionsErrorCode.INTERNAL,
-            message=f'Error processing action: {str(e)}'
-        )
+        return operation(data, **kwargs)
+    except ServiceError as e:
+        raise https_fn.HttpsError(code=getattr(https_fn.FunctionsErrorCode, e.code), message=e.message)
+
+
+def _uid(req: https_fn.CallableRequest):
+    """Caller's Firebase Auth uid; token usage is tallied per uid"""
+    return req.auth.uid if req.auth else None
+
+
+def _bearer_token(req: https_fn.Request) -> str:
+    header = req.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        raise ValueError('Missing bearer token')
+    return header[len('Bearer '):]
+
+
+def _sse(event: str, data: dict) -> str:
+    """One server-sent event; results may hold non-JSON values (enums, datetimes)"""
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
 
 
 @https_fn.on_call()
@@ -190,51 +142,7 @@ def process_sefira(req: https_fn.CallableRequest) -> dict:
     Returns:
         dict: Result from the Sefira
     """
-    data = req.data
-    sefira_name = data.get('sefira')
-    input_data = data.get('input_data', {})
-
-    if not sefira_name:
-        raise https_fn.HttpsError(
-            code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT,
-            message='Sefira name is required'
-        )
-
-    try:
-        # Map sefira names to classes
-        sefirot_map = {
-            'keter': Keter(use_llm_scoring=True),
-            'chochmah': ChochmahGemini(),
-            'binah': Binah(),
-            'chesed': Chesed(),
-            'gevurah': Gevurah(),
-            'tiferet': Tiferet(),
-            'netzach': Netzach(),
-            'hod': Hod(),
-            'yesod': Yesod(),
-            'malchut': Malchut()
-        }
-
-        sefira = sefirot_map.get(sefira_name.lower())
-        if not sefira:
-            raise https_fn.HttpsError(
-                code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT,
-                message=f'Unknown Sefira: {sefira_name}'
-            )
-
-        result = sefira.process(input_data)
-
-        return {
-            'success': True,
-            'sefira': sefira_name,
-            'result': result
-        }
-
-    except Exception as e:
-        raise https_fn.HttpsError(
-            code=https_fn.FunctionsErrorCode.INTERNAL,
-            message=f'Error processing Sefira {sefira_name}: {str(e)}'
-        )
+    return _call(service.process_sefira, req.data, uid=_uid(req))
 
 
 @https_fn.on_call()
@@ -249,46 +157,4 @@ def validate_sefira_alignment(req: https_fn.CallableRequest) -> dict:
     Returns:
         dict: Validation results
     """
-    data = req.data
-    sefira_name = data.get('sefira')
-
-    if not sefira_name:
-        raise https_fn.HttpsError(
-            code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT,
-            message='Sefira name is required'
-        )
-
-    try:
-        sefirot_map = {
-            'keter': Keter(use_llm_scoring=True),
-            'chochmah': ChochmahGemini(),
-            'binah': Binah(),
-            'chesed': Chesed(),
-            'gevurah': Gevurah(),
-            'tiferet': Tiferet(),
-            'netzach': Netzach(),
-            'hod': Hod(),
-            'yesod': Yesod(),
-            'malchut': Malchut()
-        }
-
-        sefira = sefirot_map.get(sefira_name.lower())
-        if not sefira:
-            raise https_fn.HttpsError(
-                code=https_fn.FunctionsErrorCode.INVALID_ARGUMENT,
-                message=f'Unknown Sefira: {sefira_name}'
-            )
-
-        validation = sefira.validate_alignment()
-
-        return {
-            'success': True,
-            'sefira': sefira_name,
-            'validation': validation
-        }
-
-    except Exception as e:
-        raise https_fn.HttpsError(
-            code=https_fn.FunctionsErrorCode.INTERNAL,
-            message=f'Error validating Sefira {sefira_name}: {str(e)}'
-        )
+    return _call(service.validate_sefira_alignment, req.data)
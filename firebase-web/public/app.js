@@ -168,47 +168,64 @@ function getErrorMessage(code) {
     return messages[code] || 'Ocurrio un error. Por favor intenta de nuevo.';
 }
 
+// Cloud Function that streams each Sefira's result as server-sent events
+const STREAM_URL = `https://us-central1-${firebaseConfig.projectId}.cloudfunctions.net/process_action_stream`;
+
+const SEFIROT = [
+    'keter', 'chochmah', 'binah', 'chesed', 'gevurah',
+    'tiferet', 'netzach', 'hod', 'yesod', 'malchut'
+];
+
 // Process action through Sefirot
 async function processAction(inputData) {
     // Show processing section
     processingSection.classList.remove('hidden');
     resultsSection.classList.add('hidden');
+    resultsContent.innerHTML = '';
 
     // Scroll to processing section
     processingSection.scrollIntoView({ behavior: 'smooth' });
 
-    const sefirot = [
-        'keter', 'chochmah', 'binah', 'chesed', 'gevurah',
-        'tiferet', 'netzach', 'hod', 'yesod', 'malchut'
-    ];
-
-    try {
-        // Simulate processing through each Sefira
-        // In production, this would call Firebase Cloud Functions
-        const results = {};
-
-        for (let i = 0; i < sefirot.length; i++) {
-            const sefira = sefirot[i];
-            const stepElement = document.querySelector(`[data-sefira="${sefira}"]`);
-
-            // Mark as active
-            stepElement.classList.add('active');
-            stepElement.querySelector('.step-status').textContent = '⏳';
+    // The Tree runs as a graph: independent Sefirot run at the same time,
+    // so every step waits until its own result arrives
+    SEFIROT.forEach(sefira => setStepState(sefira, 'active', '⏳'));
 
-            // Simulate processing
-            await new Promise(resolve => setTimeout(resolve, 1500));
+    const results = {};
 
-            // Mock result for demo
-            results[sefira] = await processSefirot(sefira, inputData, results);
-
-            // Mark as completed
-            stepElement.classList.remove('active');
-            stepElement.classList.add('completed');
-            stepElement.querySelector('.step-status').textContent = '✓';
+    try {
+        const token = await currentUser.getIdToken();
+        const response = await fetch(STREAM_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${token}`
+            },
+            body: JSON.stringify(inputData)
+        });
+
+        if (!response.ok) {
+            throw new Error(await response.text());
         }
 
-        // Show results
-        displayResults(results);
+        for await (const { event, data } of readServerEvents(response)) {
+            if (event === 'result') {
+                results[data.sefira] = data.result;
+                setStepState(data.sefira, 'completed', '✓');
+                // Keter's verdict always arrives first
+                if (data.sefira === 'keter') {
+                    displayVerdict(data.result);
+                }
+            } else if (event === 'skipped') {
+                setStepState(data.sefira, 'skipped', '–', data.reason);
+            } else if (event === 'error') {
+                if (!data.sefira) {
+                    throw new Error(data.error);
+                }
+                setStepState(data.sefira, 'failed', '✗', data.error);
+            } else if (event === 'done') {
+                displayResults(data.results, data);
+            }
+        }
 
     } catch (error) {
         console.error('Error processing action:', error);
@@ -216,73 +233,134 @@ async function processAction(inputData) {
     }
 }
 
-// Mock Sefirot processing (in production, this calls Cloud Functions)
-async function processSefirot(sefira, inputData, previousResults) {
-    // This is a mock function for the demo
-    // In production, this would call Firebase Cloud Functions that run the Python backend
-
-    const mockResults = {
-        keter: {
-            alignment_score: 0.67,
-            is_aligned: true,
-            message: 'Accion alineada con Tikun Olam'
-        },
-        chochmah: {
-            confidence_level: 0.75,
-            understanding: 'Sistema educativo con IA para comunidades rurales',
-            insights: ['Personalizacion del aprendizaje', 'Acceso a recursos', 'Capacitacion docente']
-        },
-        binah: {
-            perspectives_count: 5,
-            stakeholders: ['Estudiantes', 'Maestros', 'Comunidad', 'Gobierno'],
-            risks: ['Brecha digital', 'Dependencia tecnologica']
-        },
-        chesed: {
-            compassion_score: 1.0,
-            giving_opportunities: 6,
-            beneficiaries: ['Ninos rurales', 'Familias', 'Comunidad educativa']
-        },
-        gevurah: {
-            severity_score: 1.0,
-            boundaries: 7,
-            warnings: ['Limitar tiempo de pantalla', 'Validar contenido']
-        },
-        tiferet: {
-            harmony_score: 1.0,
-            beauty_score: 1.0,
-            conflicts_resolved: 4
-        },
-        netzach: {
-            sustainability_score: 1.0,
-            victory_probability: 1.0,
-            obstacles: 7
-        },
-        hod: {
-            precision_score: 0.4,
-            clarity_score: 0.5,
-            phases: 4
-        },
-        yesod: {
-            manifestation_readiness: 0.825,
-            ready_to_manifest: true,
-            concrete_steps: 7
-        },
-        malchut: {
-            completion_percentage: 0.75,
-            actions_executed: 10,
-            world_updated: true,
-            responsibilities_assigned: 6
+// Parse a text/event-stream body as it arrives
+async function* readServerEvents(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
         }
-    };
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice('event: '.length);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice('data: '.length);
+                }
+            }
+            yield { event, data: JSON.parse(data) };
+        }
+    }
+}
+
+function setStepState(sefira, state, status, title = '') {
+    const stepElement = document.querySelector(`[data-sefira="${CSS.escape(String(sefira))}"]`);
+    if (!stepElement) {
+        return;
+    }
+    stepElement.classList.remove('active', 'completed', 'skipped', 'failed');
+    stepElement.classList.add(state);
+    stepElement.querySelector('.step-status').textContent = status;
+    stepElement.title = title;
+}
+
+// Helpers for the shapes the Sefirot return (text sections, lists or dicts)
+
+// Every value that comes from the server (LLM text included) goes through
+// escapeHtml before it is interpolated into innerHTML
+function escapeHtml(value) {
+    return String(value ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+function percent(value) {
+    return typeof value === 'number' ? `${(value * 100).toFixed(0)}%` : '—';
+}
+
+function asList(value) {
+    if (Array.isArray(value)) {
+        return value.map(item => (typeof item === 'object' && item !== null) ? (item.action || JSON.stringify(item)) : item);
+    }
+    if (typeof value === 'string') {
+        return value.split('\n').map(line => line.replace(/^[\s\-*•]+/, '').trim()).filter(Boolean);
+    }
+    return [];
+}
+
+function count(value) {
+    if (Array.isArray(value)) {
+        return value.length;
+    }
+    if (value && typeof value === 'object') {
+        return Object.keys(value).length;
+    }
+    return typeof value === 'number' ? value : 0;
+}
 
-    return mockResults[sefira] || {};
+// Keter's verdict, shown while the rest of the Tree is still running
+function displayVerdict(keter) {
+    const verdictCard = document.createElement('div');
+    verdictCard.className = 'result-card';
+    verdictCard.innerHTML = `
+        <h3>
+            Keter - Veredicto
+            <span class="result-badge ${keter.aligned ? 'high' : 'medium'}">
+                ${percent(keter.alignment_score)} Alineamiento
+            </span>
+        </h3>
+        <p style="color: var(--color-text-secondary);">
+            ${keter.aligned ? 'Accion alineada con Tikun Olam' : 'Accion no alineada con Tikun Olam'}
+        </p>
+        ${asList(keter.suggested_modifications).length ? `
+            <ul style="margin-top: 1rem; display: grid; gap: 0.5rem;">
+                ${asList(keter.suggested_modifications).map(item => `<li>${escapeHtml(item)}</li>`).join('')}
+            </ul>
+        ` : ''}
+    `;
+    resultsContent.appendChild(verdictCard);
+    resultsSection.classList.remove('hidden');
 }
 
 // Display results
-function displayResults(results) {
+function displayResults(results, response) {
     resultsContent.innerHTML = '';
 
+    if (results.keter) {
+        displayVerdict(results.keter);
+    }
+
+    // Sefirot stopped by gating (e.g. Keter rejected the action)
+    const skipped = Object.entries(response.skipped || {});
+    if (skipped.length) {
+        const gatingCard = document.createElement('div');
+        gatingCard.className = 'result-card';
+        gatingCard.innerHTML = `
+            <h3>Sefirot no ejecutadas (${skipped.length})</h3>
+            <ul style="margin-top: 1rem; display: grid; gap: 0.5rem;">
+                ${skipped.map(([sefira, reason]) => `<li><strong>${escapeHtml(sefira)}:</strong> ${escapeHtml(reason)}</li>`).join('')}
+            </ul>
+        `;
+        resultsContent.appendChild(gatingCard);
+    }
+
     // Overall summary
+    const summary = response.summary || {};
     const summaryCard = document.createElement('div');
     summaryCard.className = 'result-card';
     summaryCard.innerHTML = `
@@ -290,75 +368,83 @@ function displayResults(results) {
         <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 1rem; margin-top: 1rem;">
             <div>
                 <p style="color: var(--color-text-secondary); font-size: 0.875rem;">Alineamiento Keter</p>
-                <p style="font-size: 1.5rem; font-weight: 700;">${(results.keter.alignment_score * 100).toFixed(0)}%</p>
+                <p style="font-size: 1.5rem; font-weight: 700;">${percent(summary.keter_alignment)}</p>
             </div>
             <div>
                 <p style="color: var(--color-text-secondary); font-size: 0.875rem;">Confianza Chochmah</p>
-                <p style="font-size: 1.5rem; font-weight: 700;">${(results.chochmah.confidence_level * 100).toFixed(0)}%</p>
+                <p style="font-size: 1.5rem; font-weight: 700;">${percent(summary.chochmah_confidence)}</p>
             </div>
             <div>
                 <p style="color: var(--color-text-secondary); font-size: 0.875rem;">Armonia Tiferet</p>
-                <p style="font-size: 1.5rem; font-weight: 700;">${(results.tiferet.harmony_score * 100).toFixed(0)}%</p>
+                <p style="font-size: 1.5rem; font-weight: 700;">${percent(summary.tiferet_harmony)}</p>
             </div>
             <div>
                 <p style="color: var(--color-text-secondary); font-size: 0.875rem;">Readiness Yesod</p>
-                <p style="font-size: 1.5rem; font-weight: 700;">${(results.yesod.manifestation_readiness * 100).toFixed(0)}%</p>
+                <p style="font-size: 1.5rem; font-weight: 700;">${percent(summary.yesod_readiness)}</p>
             </div>
         </div>
     `;
     resultsContent.appendChild(summaryCard);
 
     // Malchut - Final manifestation
-    const malchutCard = document.createElement('div');
-    malchutCard.className = 'result-card';
-    malchutCard.innerHTML = `
-        <h3>
-            Malchut - Manifestacion
-            <span class="result-badge ${results.malchut.completion_percentage > 0.7 ? 'high' : 'medium'}">
-                ${(results.malchut.completion_percentage * 100).toFixed(0)}% Completado
-            </span>
-        </h3>
-        <p style="margin-bottom: 1rem; color: var(--color-text-secondary);">
-            ${results.malchut.world_updated ? 'Reino Manifestado - Tikun Olam en accion' : 'En proceso de manifestacion'}
-        </p>
-        <div style="display: grid; gap: 0.5rem;">
-            <p><strong>Acciones Ejecutadas:</strong> ${results.malchut.actions_executed}</p>
-            <p><strong>Responsabilidades Asignadas:</strong> ${results.malchut.responsibilities_assigned}</p>
-            <p><strong>Mundo Actualizado:</strong> ${results.malchut.world_updated ? 'Si' : 'No'}</p>
-        </div>
-    `;
-    resultsContent.appendChild(malchutCard);
+    if (results.malchut) {
+        const malchutCard = document.createElement('div');
+        malchutCard.className = 'result-card';
+        malchutCard.innerHTML = `
+            <h3>
+                Malchut - Manifestacion
+                <span class="result-badge ${results.malchut.completion_percentage > 0.7 ? 'high' : 'medium'}">
+                    ${percent(results.malchut.completion_percentage)} Completado
+                </span>
+            </h3>
+            <p style="margin-bottom: 1rem; color: var(--color-text-secondary);">
+                ${results.malchut.manifestation_complete ? 'Reino Manifestado - Tikun Olam en accion' : 'En proceso de manifestacion'}
+            </p>
+            <div style="display: grid; gap: 0.5rem;">
+                <p><strong>Acciones Ejecutadas:</strong> ${count(results.malchut.actions_executed)}</p>
+                <p><strong>Responsabilidades Asignadas:</strong> ${count(results.malchut.responsibilities_assigned)}</p>
+                <p><strong>Mundo Actualizado:</strong> ${results.malchut.world_updated ? 'Si' : 'No'}</p>
+            </div>
+        `;
+        resultsContent.appendChild(malchutCard);
+    }
 
     // Key insights
-    const insightsCard = document.createElement('div');
-    insightsCard.className = 'result-card';
-    insightsCard.innerHTML = `
-        <h3>Insights Clave</h3>
-        <ul style="list-style: none; padding: 0; display: grid; gap: 0.75rem; margin-top: 1rem;">
-            ${results.chochmah.insights.map(insight => `
-                <li style="padding-left: 1.5rem; position: relative;">
-                    <span style="position: absolute; left: 0; color: var(--color-primary);">•</span>
-                    ${insight}
-                </li>
-            `).join('')}
-        </ul>
-    `;
-    resultsContent.appendChild(insightsCard);
+    const insights = asList(results.chochmah && results.chochmah.insights);
+    if (insights.length) {
+        const insightsCard = document.createElement('div');
+        insightsCard.className = 'result-card';
+        insightsCard.innerHTML = `
+            <h3>Insights Clave</h3>
+            <ul style="list-style: none; padding: 0; display: grid; gap: 0.75rem; margin-top: 1rem;">
+                ${insights.map(insight => `
+                    <li style="padding-left: 1.5rem; position: relative;">
+                        <span style="position: absolute; left: 0; color: var(--color-primary);">•</span>
+                        ${escapeHtml(insight)}
+                    </li>
+                `).join('')}
+            </ul>
+        `;
+        resultsContent.appendChild(insightsCard);
+    }
 
     // Stakeholders
-    const stakeholdersCard = document.createElement('div');
-    stakeholdersCard.className = 'result-card';
-    stakeholdersCard.innerHTML = `
-        <h3>Stakeholders Identificados (${results.binah.stakeholders.length})</h3>
-        <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-top: 1rem;">
-            ${results.binah.stakeholders.map(stakeholder => `
-                <span style="background: var(--color-surface-light); padding: 0.5rem 1rem; border-radius: 20px; font-size: 0.875rem;">
-                    ${stakeholder}
-                </span>
-            `).join('')}
-        </div>
-    `;
-    resultsContent.appendChild(stakeholdersCard);
+    const stakeholders = asList(results.binah && results.binah.stakeholders);
+    if (stakeholders.length) {
+        const stakeholdersCard = document.createElement('div');
+        stakeholdersCard.className = 'result-card';
+        stakeholdersCard.innerHTML = `
+            <h3>Stakeholders Identificados (${stakeholders.length})</h3>
+            <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-top: 1rem;">
+                ${stakeholders.map(stakeholder => `
+                    <span style="background: var(--color-surface-light); padding: 0.5rem 1rem; border-radius: 20px; font-size: 0.875rem;">
+                        ${escapeHtml(stakeholder)}
+                    </span>
+                `).join('')}
+            </div>
+        `;
+        resultsContent.appendChild(stakeholdersCard);
+    }
 
     // Show results section
     resultsSection.classList.remove('hidden');
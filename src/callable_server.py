@@ -0,0 +1,229 @@
+"""
+SERVIDOR CALLABLE LOCAL - Sustituto HTTP de una instancia de Cloud Functions
+
+Expone las operaciones de TikunService (las mismas de
+firebase-web/functions/main.py) con el protocolo de las funciones callable
+de Firebase:
+
+    POST /process_action   {"data": {...}}
+        200  {"result": {...}}
+        4xx/5xx  {"error": {"status": "INVALID_ARGUMENT", "message": "..."}}
+
+Como una instancia caliente de Cloud Functions (2a gen), atiende a lo sumo
+`concurrency` peticiones a la vez; las demas esperan un turno hasta
+`queue_timeout` y luego se rechazan con RESOURCE_EXHAUSTED (429), como
+Cloud Run cuando no puede escalar mas (max_instances). Una llamada que
+pasa de su timeout responde DEADLINE_EXCEEDED (504) aunque siga ocupando
+su turno hasta terminar.
+
+Cada respuesta lleva X-Tikun-Queue-Seconds y X-Tikun-Exec-Seconds (espera
+por un turno y ejecucion), para separar la cola de la latencia de las
+Sefirot en las pruebas de carga (benchmarks/load_test.py).
+
+Uso:
+    with CallableServer(TikunService(), concurrency=80) as server:
+        requests.post(f'{server.url}/process_action', json={'data': {'action': '...'}})
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from .tikun_service import ServiceError, TikunService
+
+
+# Codigos del protocolo callable -> estado HTTP
+HTTP_STATUS = {
+    'INVALID_ARGUMENT': 400,
+    'UNAUTHENTICATED': 401,
+    'PERMISSION_DENIED': 403,
+    'NOT_FOUND': 404,
+    'RESOURCE_EXHAUSTED': 429,
+    'INTERNAL': 500,
+    'UNAVAILABLE': 503,
+    'DEADLINE_EXCEEDED': 504
+}
+
+
+class CallableServer:
+    """
+    Servidor HTTP local con el protocolo callable sobre un TikunService.
+
+    Args:
+        service: Operaciones a exponer (por defecto, sobre el registro del proceso)
+        host, port: Direccion de escucha (port=0 elige uno libre)
+        concurrency: Peticiones atendidas a la vez (concurrency de Cloud Functions)
+        queue_timeout: Segundos que una peticion espera turno antes del 429
+        timeout_sec: Timeout por llamada (timeout_sec de on_call; process_actions usa el suyo)
+    """
+
+    DEFAULT_TIMEOUT = 60.0
+    TIMEOUTS = {'process_actions': 3600.0}
+
+    def __init__(
+        self,
+        service: Optional[TikunService] = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        concurrency: int = 80,
+        queue_timeout: float = 10.0,
+        timeout_sec: Optional[float] = None
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency debe ser al menos 1")
+
+        self.service = service if service is not None else TikunService()
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.timeout_sec = timeout_sec
+        self.functions: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+            'process_action': self.service.process_action,
+            'process_actions': self.service.process_actions,
+            'process_sefira': self.service.process_sefira,
+            'validate_sefira_alignment': self.service.validate_sefira_alignment
+        }
+
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='callable')
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'rejected': 0, 'timeouts': 0, 'in_flight': 0, 'peak_in_flight': 0}
+
+        self._httpd = _HTTPServer((host, port), _Handler)
+        self._httpd.callable_server = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'CallableServer':
+        """Atiende peticiones en un hilo de fondo"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='callable-server', daemon=True)
+        self._thread.start()
+        logger.info(f"Servidor callable en {self.url} (concurrency={self.concurrency})")
+        return self
+
+    def serve_forever(self) -> None:
+        logger.info(f"Servidor callable en {self.url} (concurrency={self.concurrency})")
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._executor.shutdown(wait=False)
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'CallableServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def call(self, name: str, data: Any) -> Tuple[int, Dict[str, Any], Dict[str, float]]:
+        """
+        Ejecuta una funcion como lo haria la instancia.
+
+        Returns:
+            (estado HTTP, cuerpo del protocolo callable, tiempos {'queue', 'exec'})
+        """
+        operation = self.functions.get(name)
+        if operation is None:
+            return (*_error('NOT_FOUND', f'Unknown function: {name}'), {'queue': 0.0, 'exec': 0.0})
+
+        self._count('requests')
+        queued = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count('rejected')
+            waited = time.perf_counter() - queued
+            return (*_error('RESOURCE_EXHAUSTED', 'No instance available'), {'queue': waited, 'exec': 0.0})
+
+        started = time.perf_counter()
+        timings = {'queue': started - queued, 'exec': 0.0}
+        self._enter()
+        future = self._executor.submit(operation, data)
+        future.add_done_callback(self._leave)
+        try:
+            result = future.result(timeout=self.timeout_sec or self.TIMEOUTS.get(name, self.DEFAULT_TIMEOUT))
+            response = (200, {'result': result})
+        except FutureTimeout:
+            self._count('timeouts')
+            response = _error('DEADLINE_EXCEEDED', f'{name} timed out')
+        except ServiceError as e:
+            response = _error(e.code, e.message)
+        except Exception as e:
+            logger.exception(f"Error inesperado en {name}")
+            response = _error('INTERNAL', str(e))
+        timings['exec'] = time.perf_counter() - started
+        return response[0], response[1], timings
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._counts['in_flight'] += 1
+            self._counts['peak_in_flight'] = max(self._counts['peak_in_flight'], self._counts['in_flight'])
+
+    def _leave(self, _future) -> None:
+        # El turno se libera cuando termina la ejecucion, no al responder
+        with self._lock:
+            self._counts['in_flight'] -= 1
+        self._slots.release()
+
+
+def _error(status: str, message: str) -> Tuple[int, Dict[str, Any]]:
+    return HTTP_STATUS[status], {'error': {'status': status, 'message': message}}
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self) -> None:
+        server = self.server.callable_server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        try:
+            request = json.loads(body or b'null')
+        except ValueError:
+            request = None
+
+        if not isinstance(request, dict) or 'data' not in request:
+            status, payload = _error('INVALID_ARGUMENT', 'Bad Request')
+            timings = {'queue': 0.0, 'exec': 0.0}
+        else:
+            status, payload, timings = server.call(self.path.strip('/'), request['data'])
+
+        # Los resultados pueden tener valores no JSON (enums, fechas)
+        encoded = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.send_header('X-Tikun-Queue-Seconds', f"{timings['queue']:.6f}")
+        self.send_header('X-Tikun-Exec-Seconds', f"{timings['exec']:.6f}")
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_request(self, code='-', size='-') -> None:
+        # Sin log por peticion: bajo carga solo agrega ruido y CPU
+        pass
+
+    def log_message(self, format: str, *args) -> None:
+        logger.warning(f"{self.address_string()} {format % args}")
@@ -0,0 +1,448 @@
+"""
+Grabacion y reproduccion de llamadas al LLM (cassettes).
+
+Para medir el parsing, el scoring y la orquestacion sin pagar ni esperar a
+Gemini: una corrida real se graba en un cassette (cada prompt con su
+respuesta y su latencia) y despues se reproduce tantas veces como haga
+falta, sin red, con la latencia que se elija.
+
+Formato del archivo (solo se agrega al final):
+
+    MAGIC (8 bytes)
+    registro: sha256 de la peticion (32) | latencia f64 | chars del prompt u32
+              | bytes de la respuesta u32 | respuesta UTF-8
+
+Al abrirlo se recorren solo las cabeceras para armar el indice
+(sha256 -> registros) y las respuestas se leen del archivo mapeado en
+memoria (mmap) al pedirlas: abrir y reproducir 100k llamadas no carga el
+cassette entero. Si una misma peticion se grabo varias veces, la
+reproduccion devuelve sus respuestas en el orden en que se grabaron (y
+vuelve a empezar).
+
+La latencia de la reproduccion la decide un LatencyModel: la grabada
+(opcionalmente escalada), fija, log-normal o por tokens de salida.
+
+Uso (variables de entorno, las Sefirot lo toman via get_provider):
+    TIKUN_LLM_PROVIDER=cassette TIKUN_CASSETTE=run.cassette TIKUN_CASSETTE_MODE=record
+    TIKUN_LLM_PROVIDER=cassette TIKUN_CASSETTE=run.cassette TIKUN_CASSETTE_LATENCY=lognormal:0.8:0.5
+
+o en codigo:
+    set_provider(CassetteProvider(path='run.cassette', latency=FixedLatency(0.0)), kind='gemini')
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+from loguru import logger
+import hashlib
+import json
+import math
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+
+from .llm_provider import FakeProvider, LLMRequest, config_value, get_provider
+
+
+MAGIC = b'TKCASS01'
+# sha256, latencia, chars del prompt, bytes de la respuesta
+RECORD = struct.Struct('<32sdII')
+
+MODES = ('record', 'replay')
+MISS_POLICIES = ('error', 'fake')
+
+CHARS_PER_TOKEN = 4
+
+
+class CassetteMissError(LookupError):
+    """La peticion no esta en el cassette (y on_miss='error')"""
+
+
+class CassetteEntry:
+    """Un registro del cassette; el texto se lee del mmap al pedirlo"""
+
+    __slots__ = ('offset', 'length', 'latency', 'prompt_chars', '_cassette')
+
+    def __init__(self, cassette: 'Cassette', offset: int, length: int, latency: float, prompt_chars: int):
+        self._cassette = cassette
+        self.offset = offset
+        self.length = length
+        self.latency = latency
+        self.prompt_chars = prompt_chars
+
+    @property
+    def text(self) -> str:
+        return self._cassette._read(self.offset, self.length)
+
+    @property
+    def output_tokens(self) -> int:
+        return self.length // CHARS_PER_TOKEN
+
+
+class Cassette:
+    """
+    Archivo de grabaciones con indice en memoria.
+
+    Args:
+        path: Ruta del cassette
+        writable: Abrir para agregar registros (se crea si no existe)
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self._index: Dict[bytes, List[CassetteEntry]] = {}
+        self._cursor: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._fd: Optional[int] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._size = 0
+        self.entries = 0
+
+        if writable:
+            new = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._file = open(path, 'ab')
+            if new:
+                self._file.write(MAGIC)
+                self._file.flush()
+        elif not os.path.exists(path):
+            raise FileNotFoundError(f"Cassette no encontrado: {path}")
+        self._load_index()
+
+    @staticmethod
+    def key(model: str, prompt: str, config: Any = None) -> bytes:
+        """sha256 de lo que determina la respuesta"""
+        payload = json.dumps([
+            model,
+            config_value(config, 'system'),
+            prompt,
+            config_value(config, 'temperature'),
+            config_value(config, 'max_output_tokens'),
+            config_value(config, 'response_mime_type'),
+            config_value(config, 'response_schema')
+        ], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).digest()
+
+    def lookup(self, key: bytes) -> Optional[CassetteEntry]:
+        """Siguiente grabacion de la peticion, o None"""
+        entries = self._index.get(key)
+        if not entries:
+            return None
+        if len(entries) == 1:
+            return entries[0]
+        with self._lock:
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+        return entries[position % len(entries)]
+
+    def append(self, key: bytes, text: str, latency: float, prompt_chars: int) -> CassetteEntry:
+        """Graba una respuesta al final del archivo"""
+        if self._file is None:
+            raise RuntimeError(f"Cassette {self.path} abierto solo para lectura")
+        body = text.encode('utf-8')
+        with self._lock:
+            offset = self._file.tell() + RECORD.size
+            self._file.write(RECORD.pack(key, latency, prompt_chars, len(body)) + body)
+            self._file.flush()
+            entry = CassetteEntry(self, offset, len(body), latency, prompt_chars)
+            self._index.setdefault(key, []).append(entry)
+            self.entries += 1
+        return entry
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._index
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _load_index(self) -> None:
+        """Recorre las cabeceras de los registros (sin leer las respuestas)"""
+        start = time.perf_counter()
+        self._remap()
+        data = self._mmap
+        if data is None:
+            return
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} no es un cassette de Tikun")
+
+        offset = len(MAGIC)
+        while offset + RECORD.size <= self._size:
+            key, latency, prompt_chars, length = RECORD.unpack_from(data, offset)
+            body = offset + RECORD.size
+            if body + length > self._size:
+                logger.warning(f"Cassette {self.path}: registro truncado en el byte {offset}, se ignora")
+                if self._file is not None:
+                    # Las grabaciones nuevas van donde empezaba el registro roto
+                    self._file.truncate(offset)
+                    self._remap()
+                break
+            self._index.setdefault(key, []).append(CassetteEntry(self, body, length, latency, prompt_chars))
+            self.entries += 1
+            offset = body + length
+
+        logger.info(
+            f"Cassette {self.path}: {self.entries} registros, {len(self._index)} peticiones "
+            f"indexadas en {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+    def _remap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self._size = size
+        if not size:
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY)
+        self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+
+    def _read(self, offset: int, length: int) -> str:
+        end = offset + length
+        if end > self._size:
+            # Grabado despues de mapear el archivo
+            with self._lock:
+                if end > self._size:
+                    self._remap()
+        return self._mmap[offset:end].decode('utf-8')
+
+
+_cassettes: Dict[Tuple[str, bool], Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def open_cassette(path: str, writable: bool = False) -> Cassette:
+    """Cassette compartido por el proceso (un solo escritor por archivo)"""
+    key = (os.path.abspath(path), writable)
+    with _cassettes_lock:
+        cassette = _cassettes.get(key)
+        if cassette is None:
+            cassette = _cassettes[key] = Cassette(path, writable)
+        return cassette
+
+
+# =============================================================================
+# Latencia de la reproduccion
+# =============================================================================
+
+class LatencyModel:
+    """Segundos que tarda en responder una llamada reproducida"""
+
+    def sample(self, entry: CassetteEntry) -> float:
+        raise NotImplementedError
+
+
+class RecordedLatency(LatencyModel):
+    """La latencia grabada, multiplicada por 'scale'"""
+
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale
+
+    def sample(self, entry: CassetteEntry) -> float:
+        return entry.latency * self.scale
+
+
+class FixedLatency(LatencyModel):
+    """Siempre 'seconds' (0 = lo mas rapido posible)"""
+
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = seconds
+
+    def sample(self, entry: CassetteEntry) -> float:
+        return self.seconds
+
+
+class LogNormalLatency(LatencyModel):
+    """Log-normal con mediana 'median' segundos y dispersion 'sigma' (cola larga, como un API real)"""
+
+    def __init__(self, median: float, sigma: float = 0.5, seed: Optional[int] = None):
+        self.mu = math.log(median)
+        self.sigma = sigma
+        self._random = random.Random(seed)
+
+    def sample(self, entry: CassetteEntry) -> float:
+        return self._random.lognormvariate(self.mu, self.sigma)
+
+
+class TokenLatency(LatencyModel):
+    """Primer token a los 'first_token' segundos y 'per_token' segundos por token de salida"""
+
+    def __init__(self, first_token: float, per_token: float, seed: Optional[int] = None, jitter: float = 0.0):
+        self.first_token = first_token
+        self.per_token = per_token
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def sample(self, entry: CassetteEntry) -> float:
+        latency = self.first_token + self.per_token * entry.output_tokens
+        if self.jitter:
+            latency *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, latency)
+
+
+LATENCY_MODELS = {
+    'recorded': RecordedLatency,
+    'fixed': FixedLatency,
+    'lognormal': LogNormalLatency,
+    'tokens': TokenLatency
+}
+
+
+def parse_latency(spec: str) -> LatencyModel:
+    """
+    LatencyModel de una especificacion 'nombre:arg1:arg2'.
+
+    'recorded', 'recorded:0.5', 'fixed:0', 'lognormal:0.8:0.5',
+    'tokens:0.3:0.01'.
+    """
+    name, *args = spec.split(':')
+    if name not in LATENCY_MODELS:
+        raise ValueError(f"Modelo de latencia desconocido '{name}'; opciones: {sorted(LATENCY_MODELS)}")
+    return LATENCY_MODELS[name](*(float(arg) for arg in args))
+
+
+# =============================================================================
+# Proveedor
+# =============================================================================
+
+class CassetteProvider(FakeProvider):
+    """
+    Proveedor que graba las llamadas de otro o las reproduce de un cassette.
+
+    Sus clientes tienen las mismas interfaces que los de FakeProvider. Con
+    mode='record' cada llamada va al proveedor real ('upstream') y se
+    graba; las respuestas en streaming se piden completas y se entregan en
+    fragmentos. Con mode='replay' no hay red.
+
+    Args:
+        api_key: Clave del proveedor real (solo para grabar)
+        upstream: Proveedor real ('gemini', 'anthropic'); da tambien los
+                  nombres de modelo, para que grabacion y reproduccion
+                  generen las mismas claves
+        path: Cassette (por defecto TIKUN_CASSETTE o 'tikun.cassette')
+        mode: 'record' o 'replay' (por defecto TIKUN_CASSETTE_MODE o 'replay')
+        latency: LatencyModel o especificacion de parse_latency() (por
+                 defecto TIKUN_CASSETTE_LATENCY o 'recorded')
+        on_miss: 'error' (CassetteMissError) o 'fake' (respuesta de
+                 fake_response) si la peticion no esta grabada (por
+                 defecto TIKUN_CASSETTE_MISS o 'error')
+    """
+
+    NAME = 'cassette'
+    WRAPS_PROVIDER = True
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        upstream: str = 'gemini',
+        path: Optional[str] = None,
+        mode: Optional[str] = None,
+        latency: Union[LatencyModel, str, None] = None,
+        on_miss: Optional[str] = None,
+        chunk_size: int = 64
+    ):
+        super().__init__(chunk_size=chunk_size)
+        self.upstream_name = upstream
+        self.upstream_key = api_key
+        self.mode = mode or os.getenv("TIKUN_CASSETTE_MODE", "replay")
+        if self.mode not in MODES:
+            raise ValueError(f"mode debe ser uno de {MODES}, no '{self.mode}'")
+        self.on_miss = on_miss or os.getenv("TIKUN_CASSETTE_MISS", "error")
+        if self.on_miss not in MISS_POLICIES:
+            raise ValueError(f"on_miss debe ser uno de {MISS_POLICIES}, no '{self.on_miss}'")
+        if not isinstance(latency, LatencyModel):
+            latency = parse_latency(latency or os.getenv("TIKUN_CASSETTE_LATENCY", "recorded"))
+        self.latency_model = latency
+        self.cassette = open_cassette(
+            path or os.getenv("TIKUN_CASSETTE", "tikun.cassette"), writable=self.mode == 'record'
+        )
+        self.DEFAULT_MODEL = self.upstream.DEFAULT_MODEL
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    @property
+    def upstream(self):
+        return get_provider(self.upstream_name, self.upstream_key)
+
+    def available(self) -> bool:
+        return self.mode == 'replay' or self.upstream.available()
+
+    def model_for(self, stage: Optional[str] = None) -> str:
+        return self.upstream.model_for(stage)
+
+    def reply(self, model: str, prompt: str, config: Any = None) -> Tuple[str, float]:
+        key = Cassette.key(model, prompt, config)
+        if self.mode == 'record':
+            start = time.perf_counter()
+            response = self.upstream.generate(self._request(model, prompt, config))
+            self._record(key, prompt, response.text, time.perf_counter() - start)
+            return response.text, 0.0
+        return self._replay(key, model, prompt, config)
+
+    async def areply(self, model: str, prompt: str, config: Any = None) -> Tuple[str, float]:
+        key = Cassette.key(model, prompt, config)
+        if self.mode == 'record':
+            start = time.perf_counter()
+            response = await self.upstream.agenerate(self._request(model, prompt, config))
+            self._record(key, prompt, response.text, time.perf_counter() - start)
+            return response.text, 0.0
+        return self._replay(key, model, prompt, config)
+
+    def stats(self) -> Dict[str, Any]:
+        report = super().stats()
+        report.update({
+            'cassette': self.cassette.path,
+            'mode': self.mode,
+            'upstream': self.upstream_name,
+            'entries': len(self.cassette),
+            'hits': self.hits,
+            'misses': self.misses,
+            'recorded': self.recorded
+        })
+        return report
+
+    def _replay(self, key: bytes, model: str, prompt: str, config: Any) -> Tuple[str, float]:
+        entry = self.cassette.lookup(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            if self.on_miss == 'fake':
+                return super().reply(model, prompt, config)
+            raise CassetteMissError(f"Peticion de {model} no grabada en {self.cassette.path}")
+        with self._lock:
+            self.hits += 1
+            self.calls += 1
+        return entry.text, self.latency_model.sample(entry)
+
+    def _record(self, key: bytes, prompt: str, text: str, latency: float) -> None:
+        self.cassette.append(key, text, latency, len(prompt))
+        with self._lock:
+            self.recorded += 1
+            self.calls += 1
+
+    @staticmethod
+    def _request(model: str, prompt: str, config: Any) -> LLMRequest:
+        return LLMRequest(
+            prompt,
+            model=model,
+            temperature=config_value(config, 'temperature'),
+            max_output_tokens=config_value(config, 'max_output_tokens'),
+            system=config_value(config, 'system'),
+            response_mime_type=config_value(config, 'response_mime_type'),
+            response_schema=config_value(config, 'response_schema')
+        )
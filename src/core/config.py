@@ -0,0 +1,228 @@
+"""
+Configuracion de las Sefirot desde config/tikun_config.yaml.
+
+Modelo, temperatura y max_output_tokens estaban fijos en el __init__ de
+cada Sefira: pasar una etapa poco sensible a la latencia a un modelo mas
+barato o bajar su tope de salida pedia un deploy. Aqui:
+
+1. TikunConfig lee el YAML (ruta en TIKUN_CONFIG; por defecto
+   config/tikun_config.yaml del repositorio). Un archivo que no existe o
+   esta vacio deja los valores del codigo.
+2. settings(): lo que corresponde a una Sefira, con este orden de
+   prioridad (gana el primero):
+       TIKUN_<CLAVE>_<SEFIRA>      p.ej. TIKUN_MODEL_BINAH, TIKUN_TEMPERATURE_HOD
+                                   (un valor invalido se reporta y se ignora)
+       sefirot.<sefira>.<clave>    del YAML
+       providers.<sdk>.model       modelo por defecto del SDK (salvo que
+                                   TIKUN_<SDK>_MODEL lo fije)
+3. refresh(): a lo sumo cada check_interval segundos compara el mtime del
+   archivo y lo vuelve a leer si cambio. SefiraRegistry lo llama en cada
+   get() y reaplica la configuracion a las Sefirot vivas, sin redeploy;
+   una clave que se quita vuelve al valor del codigo. Un YAML invalido se
+   reporta y se conserva la configuracion anterior (al arrancar, la vacia).
+
+La aplicacion la hace SefiraBase.configure(): cada Sefira declara que
+atributo corresponde a cada clave (CONFIG_ATTRIBUTES). Como el modelo,
+la temperatura y el tope de salida forman la clave de LLMCache, un cambio
+no reutiliza respuestas del modelo anterior.
+
+Formato:
+    providers:
+      gemini:
+        model: gemini-2.0-flash-exp
+    sefirot:
+      binah:
+        model: gemini-2.5-flash
+        temperature: 0.8
+        max_output_tokens: 4096
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / 'config' / 'tikun_config.yaml'
+
+# Clave -> tipos admitidos (las claves que una Sefira no usa se ignoran)
+SETTING_TYPES = {
+    'model': (str,),
+    'temperature': (int, float),
+    'max_output_tokens': (int,),
+    'structured_max_output_tokens': (int,)
+}
+
+
+class TikunConfig:
+    """
+    Configuracion de las Sefirot leida de un YAML, recargable.
+
+    Args:
+        path: Archivo YAML (por defecto TIKUN_CONFIG o DEFAULT_CONFIG_PATH)
+        check_interval: Segundos minimos entre comprobaciones del mtime
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 5.0):
+        self.path = Path(path or os.getenv('TIKUN_CONFIG') or DEFAULT_CONFIG_PATH)
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        try:
+            self.data, self.mtime = self._read()
+        except ValueError as e:
+            # Igual que refresh(): un YAML invalido no tumba la instancia;
+            # se usan los valores del codigo hasta que el archivo cambie
+            self.data, self.mtime = {}, _mtime(self.path)
+            logger.error(f"TikunConfig: {self.path} invalido, se usan los valores del codigo: {e}")
+        self._checked_at = time.monotonic()
+
+    def settings(self, sefira: str, provider: Optional[str] = None) -> Dict[str, Any]:
+        """Configuracion de una Sefira (nombre en minusculas) con los overrides del entorno"""
+        settings = dict((self.data.get('sefirot') or {}).get(sefira) or {})
+
+        default_model = ((self.data.get('providers') or {}).get(provider) or {}).get('model')
+        if 'model' not in settings and default_model and not os.getenv(f"TIKUN_{(provider or '').upper()}_MODEL"):
+            settings['model'] = default_model
+
+        for key in SETTING_TYPES:
+            name = f"TIKUN_{key.upper()}_{sefira.upper()}"
+            value = os.getenv(name)
+            if not value:
+                continue
+            try:
+                settings[key] = _parse_env(key, value)
+            except ValueError as e:
+                # Igual que un YAML invalido: no tumba la Sefira, se ignora
+                logger.error(f"TikunConfig: {name} invalido, se ignora: {e}")
+        return settings
+
+    def apply(self, sefira: Any) -> None:
+        """
+        Aplica su configuracion a una Sefira (ver SefiraBase.configure).
+
+        Se llama aunque no haya claves: las que se quitaron del YAML
+        vuelven al valor del codigo.
+        """
+        sefira.configure(self.settings(sefira.name.lower(), sefira.LLM_PROVIDER))
+
+    def refresh(self) -> bool:
+        """Relee el archivo si cambio su mtime; True si hay configuracion nueva"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+            if _mtime(self.path) == self.mtime:
+                return False
+            try:
+                self.data, self.mtime = self._read()
+            except ValueError as e:
+                # Se conserva la anterior; no se reintenta hasta el proximo cambio
+                self.mtime = _mtime(self.path)
+                logger.error(f"TikunConfig: {self.path} invalido, se conserva la configuracion anterior: {e}")
+                return False
+            self.reloads += 1
+            logger.info(f"TikunConfig: {self.path} recargado")
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': str(self.path),
+            'loaded': self.mtime is not None,
+            'reloads': self.reloads,
+            'sefirot': sorted((self.data.get('sefirot') or {}).keys())
+        }
+
+    def _read(self):
+        """(datos validados, mtime); sin archivo o sin PyYAML, configuracion vacia"""
+        mtime = _mtime(self.path)
+        if mtime is None:
+            return {}, None
+        if not YAML_AVAILABLE:
+            logger.warning(f"TikunConfig: PyYAML no esta instalado, se ignora {self.path}")
+            return {}, mtime
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"YAML invalido: {e}")
+        validate(data)
+        return data, mtime
+
+
+def validate(data: Any) -> None:
+    """
+    Valida la forma del YAML.
+
+    Raises:
+        ValueError: Si una seccion no es un mapa o un valor no tiene el tipo de SETTING_TYPES
+    """
+    if not isinstance(data, dict):
+        raise ValueError("la configuracion debe ser un mapa")
+    for section in ('providers', 'sefirot'):
+        entries = data.get(section) or {}
+        if not isinstance(entries, dict):
+            raise ValueError(f"'{section}' debe ser un mapa")
+        for name, settings in entries.items():
+            if settings is None:
+                continue
+            if not isinstance(settings, dict):
+                raise ValueError(f"'{section}.{name}' debe ser un mapa")
+            for key, value in settings.items():
+                _check_setting(f"{section}.{name}.{key}", key, value)
+
+
+def _check_setting(where: str, key: str, value: Any) -> None:
+    types = SETTING_TYPES.get(key)
+    if types is None:
+        raise ValueError(f"{where}: clave desconocida (opciones: {sorted(SETTING_TYPES)})")
+    if not isinstance(value, types) or isinstance(value, bool):
+        raise ValueError(f"{where}: valor invalido {value!r}")
+    if key == 'temperature' and not 0.0 <= value <= 2.0:
+        raise ValueError(f"{where}: debe estar entre 0.0 y 2.0")
+    if key.endswith('max_output_tokens') and value < 1:
+        raise ValueError(f"{where}: debe ser positivo")
+
+
+def _parse_env(key: str, value: str) -> Any:
+    if key == 'model':
+        return value
+    try:
+        parsed = float(value) if key == 'temperature' else int(value)
+    except ValueError:
+        raise ValueError(f"TIKUN_{key.upper()}_*: valor invalido {value!r}")
+    _check_setting(f"TIKUN_{key.upper()}_*", key, parsed)
+    return parsed
+
+
+def _mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+_config: Optional[TikunConfig] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> TikunConfig:
+    """TikunConfig compartida por el proceso"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = TikunConfig()
+    return _config
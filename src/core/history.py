@@ -0,0 +1,153 @@
+"""
+Historial acotado y metricas de latencia de una Sefira.
+
+SefiraBase.history era una lista que crecia con cada llamada: en una
+instancia caliente reutilizada entre peticiones no paraba de crecer, y
+get_metrics() la recorria entera para el success_rate. Aqui:
+
+1. HistoryBuffer: las ultimas 'capacity' entradas en un ring buffer
+   (deque con maxlen). append() es el mismo de la lista, asi que las
+   Sefirot no cambian; al agregar actualiza contadores de exitos y errores
+   de toda la vida del proceso.
+2. LatencyHistogram: histograma log-lineal al estilo HDR con el
+   processing_time de cada entrada. Memoria fija (unos miles de enteros)
+   y percentiles con error relativo < 1/SUB_BUCKETS, sin guardar muestras.
+
+Las entradas las agrega SefiraBase._record_run, una por ejecucion de
+process()/aprocess() (desde _drive/_adrive; Keter directamente).
+
+Uso:
+    history = HistoryBuffer(capacity=256)
+    history.append({'processing_time': 0.8, 'success': True})
+    history.stats()  # {'total', 'successes', 'errors', 'success_rate', 'latency': {...}}
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias con buckets log-lineales (como HdrHistogram).
+
+    Los valores se cuentan en microsegundos: hasta SUB_BUCKETS el bucket es
+    exacto; despues cada potencia de 2 se divide en SUB_BUCKETS / 2 buckets
+    lineales. Los valores mayores que 'max_seconds' cuentan en el ultimo.
+
+    Args:
+        max_seconds: Mayor latencia distinguible
+    """
+
+    SUB_BITS = 8
+    SUB_BUCKETS = 1 << SUB_BITS
+    HALF = SUB_BUCKETS >> 1
+
+    def __init__(self, max_seconds: float = 3600.0):
+        self.max_value = int(max_seconds * 1e6)
+        self.counts = [0] * (self._index(self.max_value) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds: float) -> None:
+        value = min(max(int(seconds * 1e6), 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latencia (segundos) bajo la que queda la fraccion q de las muestras"""
+        if not self.count:
+            return None
+        rank = max(1, int(q * self.count + 0.999999))
+        if rank >= self.count:
+            return self.max
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # Punto medio del bucket, acotado por los extremos exactos
+                low, high = self._bounds(index)
+                return min(max((low + high) / 2e6, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max
+        }
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return shift * cls.HALF + (value >> shift)
+
+    @classmethod
+    def _bounds(cls, index: int):
+        """[low, high) en microsegundos del bucket 'index'"""
+        if index < cls.SUB_BUCKETS:
+            return index, index + 1
+        shift, offset = divmod(index - cls.HALF, cls.HALF)
+        mantissa = cls.HALF + offset
+        return mantissa << shift, (mantissa + 1) << shift
+
+
+class HistoryBuffer:
+    """
+    Ultimas 'capacity' entradas del historial, con contadores y latencias
+    acumulados desde el inicio.
+
+    Se usa como la lista que reemplaza (append, len, iteracion, indices);
+    no tiene lock propio: SefiraBase lo protege con su _state_lock.
+    """
+
+    def __init__(self, capacity: int = 256):
+        if capacity < 1:
+            raise ValueError("capacity debe ser al menos 1")
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+        self.total = 0
+        self.successes = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self._entries.append(entry)
+        self.total += 1
+        if entry.get('success', False):
+            self.successes += 1
+        else:
+            self.errors += 1
+        if entry.get('processing_time') is not None:
+            self.latency.record(entry['processing_time'])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'successes': self.successes,
+            'errors': self.errors,
+            'success_rate': self.successes / self.total if self.total else 0,
+            'latency': self.latency.summary()
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._entries)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self._entries[index]
+
+    def __repr__(self) -> str:
+        return f"<HistoryBuffer {len(self._entries)}/{self.capacity} total={self.total}>"
@@ -0,0 +1,163 @@
+"""
+Lexicon - motor de keywords compartido por los scorers heuristicos.
+
+Antes cada scorer hacia text.lower() por su cuenta y luego `kw in text`
+keyword por keyword, con acentos inconsistentes ('autonomía' vs 'autonomia').
+Aqui:
+
+1. fold(): el texto se normaliza una sola vez por respuesta (minusculas y sin
+   acentos, 'Autonomía' -> 'autonomia'). La normalizacion es caracter a
+   caracter, asi que las posiciones del texto normalizado valen para el original.
+2. Lexicon.scan(): todos los scorers consultan el mismo texto normalizado.
+   Cada keyword se busca con str.find (busqueda en C) una sola vez y el
+   resultado se memoriza; las posiciones de todas las apariciones solo se
+   calculan si alguien las pide.
+
+Nota: en CPython una sola regex con todas las alternativas (o un automata
+Aho-Corasick en Python puro) recorre el texto caracter a caracter en el
+interprete de regex y resulta mas lenta que str.find por keyword; ver
+benchmarks/bench_lexicon.py.
+
+Uso:
+    LEXICON = Lexicon({'positivo': ['ayuda', 'mejora'], 'negativo': ['daña']})
+    scan = LEXICON.scan(text)
+    scan.count('positivo')      # keywords distintas del grupo presentes
+    scan.positions('mejora')    # posiciones de cada aparicion
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+import re
+import unicodedata
+
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+_FOLDED_CHARS: Dict[str, str] = {}
+
+
+def _fold_char(match: 're.Match') -> str:
+    """Caracter no ASCII (ya en minuscula) -> su letra base, siempre un solo caracter"""
+    char = match.group()
+    folded = _FOLDED_CHARS.get(char)
+    if folded is None:
+        base = unicodedata.normalize('NFKD', char)[0]
+        folded = base if base.isalnum() or not char.isalnum() else char
+        _FOLDED_CHARS[char] = folded
+    return folded
+
+
+def fold(text: str) -> str:
+    """Minusculas sin acentos, con la misma longitud que el texto original"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # p.ej. 'İ'.lower() tiene dos caracteres: se baja caracter a caracter
+        lowered = ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    if lowered.isascii():
+        return lowered
+    return _NON_ASCII.sub(_fold_char, lowered)
+
+
+class LexiconScan:
+    """
+    Texto normalizado de una respuesta, compartido por todos los scorers.
+
+    Las busquedas se memorizan: consultar la misma keyword desde varios
+    scorers no vuelve a recorrer el texto.
+    """
+
+    def __init__(self, lexicon: 'Lexicon', folded: str):
+        self.lexicon = lexicon
+        self.folded = folded
+        self._first: Dict[str, int] = {}
+        self._positions: Dict[str, List[int]] = {}
+
+    def first(self, keyword: str) -> Optional[int]:
+        """Posicion de la primera aparicion de la keyword, o None"""
+        keyword = self.lexicon.normalize(keyword)
+        idx = self._first.get(keyword)
+        if idx is None:
+            idx = self._find(keyword, 0)
+            self._first[keyword] = idx
+        return idx if idx >= 0 else None
+
+    def has(self, keyword: str) -> bool:
+        """True si la keyword aparece en el texto"""
+        return self.first(keyword) is not None
+
+    def positions(self, keyword: str) -> List[int]:
+        """Posiciones (validas en el texto original) de cada aparicion, con solapamiento"""
+        keyword = self.lexicon.normalize(keyword)
+        positions = self._positions.get(keyword)
+        if positions is None:
+            positions = []
+            idx = self.first(keyword)
+            while idx is not None and idx >= 0:
+                positions.append(idx)
+                idx = self._find(keyword, idx + 1)
+            self._positions[keyword] = positions
+        return list(positions)
+
+    def found(self, group: str) -> List[str]:
+        """Keywords del grupo presentes, en el orden en que se declararon"""
+        return [kw for kw in self.lexicon.groups[group] if self.has(kw)]
+
+    def count(self, group: str) -> int:
+        """Numero de keywords distintas del grupo presentes (como sum(kw in text))"""
+        return sum(1 for kw in self.lexicon.groups[group] if self.has(kw))
+
+    def occurrences(self, group: str) -> int:
+        """Total de apariciones de las keywords del grupo"""
+        return sum(len(self.positions(kw)) for kw in self.lexicon.groups[group])
+
+    def counts(self) -> Dict[str, int]:
+        """count() de todos los grupos"""
+        return {group: self.count(group) for group in self.lexicon.groups}
+
+    def _find(self, keyword: str, start: int) -> int:
+        """str.find respetando word_start; -1 si no aparece"""
+        folded = self.folded
+        idx = folded.find(keyword, start)
+        if self.lexicon.word_start:
+            while idx > 0 and (folded[idx - 1].isalnum() or folded[idx - 1] == '_'):
+                idx = folded.find(keyword, idx + 1)
+        return idx
+
+
+class Lexicon:
+    """
+    Conjunto de grupos de keywords normalizados con fold().
+
+    Args:
+        groups: Nombre de grupo -> keywords. Una keyword puede pertenecer a
+                varios grupos; se busca una sola vez por texto.
+        word_start: Si True, las keywords solo coinciden al inicio de una
+                    palabra ('dana' no coincide dentro de 'ciudadana'). Por
+                    defecto coinciden como subcadena, igual que `kw in text`.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], word_start: bool = False):
+        self.word_start = word_start
+        self.groups: Dict[str, List[str]] = {}
+        for group, keywords in groups.items():
+            folded = []
+            for kw in keywords:
+                kw = fold(kw)
+                if kw and kw not in folded:
+                    folded.append(kw)
+            self.groups[group] = folded
+        self._normalized: Dict[str, str] = {kw: kw for kw in self.keywords()}
+
+    def normalize(self, keyword: str) -> str:
+        """fold() de una keyword, memorizado para las del lexicon"""
+        normalized = self._normalized.get(keyword)
+        if normalized is None:
+            normalized = fold(keyword)
+            self._normalized[keyword] = normalized
+        return normalized
+
+    def scan(self, text: str) -> LexiconScan:
+        """Normaliza el texto una vez; las keywords se buscan al consultarlas"""
+        return LexiconScan(self, fold(text))
+
+    def keywords(self) -> Set[str]:
+        """Todas las keywords (normalizadas) del lexicon"""
+        return {kw for kws in self.groups.values() for kw in kws}
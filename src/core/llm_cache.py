@@ -0,0 +1,309 @@
+"""
+Cache de respuestas del LLM direccionada por contenido.
+
+La clave es el hash de (modelo, temperatura, max_output_tokens, prompt
+completo): si un usuario reenvia la misma accion, la Sefira obtiene la misma
+respuesta sin volver a pagar segundos de latencia.
+
+Dos niveles:
+- Memoria: LRU acotado (OrderedDict), sin I/O.
+- Disco: archivo SQLite local con TTL y eviccion por tamano total
+  (se eliminan primero las entradas accedidas hace mas tiempo).
+
+Un acierto de disco no escribe: el nuevo accessed_at queda pendiente en
+memoria y se guarda en la transaccion del siguiente put() (o en flush()),
+justo antes de la eviccion, que es la unica que lo lee. Si el proceso
+termina antes solo se pierde ese orden LRU. Cada nivel tiene su lock, asi
+que una consulta de memoria no espera a una de disco en curso, y
+aget()/aput() llevan el nivel de disco a un hilo (asyncio.to_thread) para
+no bloquear el event loop.
+
+Es opt-in por Sefira (ver SefiraBase.CACHE_LLM_RESPONSES): las etapas con
+temperatura 1.0 buscan variedad y no cachean.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+class LLMCache:
+    """
+    Cache de dos niveles (memoria LRU + SQLite) para respuestas de texto del LLM.
+
+    Args:
+        max_memory_entries: Entradas maximas en el LRU de memoria
+        db_path: Archivo SQLite (None = solo memoria)
+        ttl_seconds: Vida de cada entrada (None = no expira)
+        max_disk_bytes: Tamano maximo de las respuestas guardadas en disco
+    """
+
+    def __init__(
+        self,
+        max_memory_entries: int = 256,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_disk_bytes: int = 64 * 1024 * 1024
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+
+        # clave -> (respuesta, instante de expiracion o None)
+        self._memory: 'OrderedDict[str, Tuple[str, Optional[float]]]' = OrderedDict()
+        # _lock protege la memoria y los contadores; _db_lock, la conexion
+        # SQLite. Quien necesita ambos toma _db_lock primero
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        self.expirations = 0
+        self.writes = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        # clave -> accessed_at de aciertos de disco aun no escritos
+        self._touched: Dict[str, float] = {}
+        if db_path:
+            self._open_db(db_path)
+
+    @staticmethod
+    def make_key(model: str, temperature: Any, max_output_tokens: Any, prompt: str) -> str:
+        """Hash sha256 de los parametros que determinan la respuesta"""
+        payload = json.dumps(
+            [model, temperature, max_output_tokens, prompt],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _open_db(self, db_path: str) -> None:
+        """Abre (o crea) la base SQLite del nivel de disco"""
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._db.commit()
+        row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        self._disk_bytes = row[0]
+        logger.info(f"LLMCache: nivel de disco en {db_path} ({self._disk_bytes} bytes)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Respuesta cacheada para la clave, o None si no existe o expiro"""
+        response = self._memory_get(key)
+        if response is None and self._db is not None:
+            response = self._disk_get(key)
+        if response is None:
+            with self._lock:
+                self.misses += 1
+        return response
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() para el event loop: el nivel de disco se consulta en un hilo"""
+        response = self._memory_get(key)
+        if response is None and self._db is not None:
+            response = await asyncio.to_thread(self._disk_get, key)
+        if response is None:
+            with self._lock:
+                self.misses += 1
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        """Guarda una respuesta en ambos niveles"""
+        now, expires_at = self._memory_put(key, response)
+        if self._db is not None:
+            self._disk_put(key, response, now, expires_at)
+
+    async def aput(self, key: str, response: str) -> None:
+        """put() para el event loop: la escritura en disco se hace en un hilo"""
+        now, expires_at = self._memory_put(key, response)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, response, now, expires_at)
+
+    def flush(self) -> None:
+        """Escribe los accessed_at pendientes de los aciertos de disco"""
+        if self._db is None:
+            return
+        with self._db_lock:
+            if self._touched:
+                self._flush_touched()
+                self._db.commit()
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            response, expires_at = entry
+            if expires_at is None or expires_at > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return response
+            del self._memory[key]
+            self.expirations += 1
+            return None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, size, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, size, expires_at = row
+            if expires_at is None or expires_at > now:
+                self._touched[key] = now
+                with self._lock:
+                    self._remember(key, response, expires_at)
+                    self.disk_hits += 1
+                return response
+            self._touched.pop(key, None)
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._db.commit()
+            self._disk_bytes -= size
+            with self._lock:
+                self.expirations += 1
+            return None
+
+    def _memory_put(self, key: str, response: str) -> Tuple[float, Optional[float]]:
+        """Guarda en memoria; retorna (ahora, expiracion) para el nivel de disco"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self.writes += 1
+        return now, expires_at
+
+    def _disk_put(self, key: str, response: str, now: float, expires_at: Optional[float]) -> None:
+        size = len(response.encode('utf-8'))
+        with self._db_lock:
+            self._touched.pop(key, None)
+            old = self._db.execute(
+                "SELECT size FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, expires_at, now)
+            )
+            self._disk_bytes += size - (old[0] if old else 0)
+            self._flush_touched()
+            self._evict_disk()
+            self._db.commit()
+
+    def _flush_touched(self) -> None:
+        """Pasa los accessed_at pendientes a la transaccion en curso (con _db_lock)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _remember(self, key: str, response: str, expires_at: Optional[float]) -> None:
+        """Inserta en el LRU de memoria, expulsando la entrada menos reciente si hace falta"""
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def _evict_disk(self) -> None:
+        """Elimina entradas de disco (expiradas primero, luego LRU) hasta caber en max_disk_bytes (con _db_lock)"""
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+
+        expired = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM llm_cache"
+            " WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).fetchone()
+        if expired[1]:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)
+            )
+            self._disk_bytes -= expired[0]
+            with self._lock:
+                self.expirations += expired[1]
+
+        rows = self._db.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at")
+        victims = []
+        for key, size in rows:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            victims.append((key,))
+            self._disk_bytes -= size
+        if victims:
+            self._db.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            with self._lock:
+                self.disk_evictions += len(victims)
+
+    def clear(self) -> None:
+        """Vacia ambos niveles (los contadores se conservan)"""
+        with self._db_lock, self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+                self._disk_bytes = 0
+                self._touched.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos, fallos y evicciones"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'memory_evictions': self.memory_evictions,
+            'disk_bytes': self._disk_bytes,
+            'disk_evictions': self.disk_evictions,
+            'expirations': self.expirations,
+            'writes': self.writes
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Cache compartida por el proceso.
+
+    El archivo SQLite se toma de TIKUN_LLM_CACHE_PATH (por defecto en el
+    directorio temporal, que es escribible en Cloud Functions).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                db_path = os.getenv(
+                    "TIKUN_LLM_CACHE_PATH",
+                    os.path.join(tempfile.gettempdir(), "tikun_llm_cache.sqlite")
+                )
+                _cache = LLMCache(db_path=db_path)
+    return _cache
@@ -0,0 +1,605 @@
+"""
+Proveedores de LLM compartidos por todas las Sefirot.
+
+Antes cada Sefira hacia su propio genai.configure() y construia su propio
+GenerativeModel('gemini-2.0-flash-exp'), con el modelo fijo en el codigo, y
+Chochmah construia su propio cliente Anthropic. Aqui un proveedor por
+proceso (y por API key) es dueno de:
+
+- Los clientes, uno por modelo y reutilizados entre Sefirot, de modo que
+  comparten transporte (canal gRPC de Gemini, pool httpx de Anthropic).
+- La eleccion de modelo por etapa: model_for('binah') lee
+  TIKUN_MODEL_BINAH, despues TIKUN_<PROVEEDOR>_MODEL y por ultimo el
+  modelo por defecto del proveedor.
+- La configuracion de generacion (generation_config()).
+
+Los SDK (google.generativeai, anthropic) se importan al construir el
+primer cliente. Las Sefirot reciben un LazyClient (lazy_client()), que lo
+construye en su primera llamada: construir una Sefira no importa el SDK y
+un cold start que no llama al LLM no lo paga.
+
+Las Sefirot llaman a traves del cliente que les entrega el proveedor
+(misma interfaz que el SDK: generate_content / messages.create), asi que su
+codigo y sus tests no dependen de que proveedor hay detras. generate() y
+agenerate() ofrecen ademas una interfaz neutral (LLMRequest ->
+LLMResponse) para herramientas que no son Sefirot.
+
+FakeProvider responde en el propio proceso, sin red: con
+TIKUN_LLM_PROVIDER=fake el Arbol completo corre offline (tests de carga,
+benchmarks). Sus respuestas siguen los encabezados que pide el prompt (o
+el response_schema en modo JSON), con la latencia que se le configure.
+
+Uso:
+    provider = get_provider('gemini')
+    client = provider.client(provider.model_for('gevurah'))
+    config = provider.generation_config(temperature=0.7, max_output_tokens=4096)
+    text = client.generate_content(prompt, generation_config=config).text
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from loguru import logger
+import asyncio
+import importlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+
+
+class LLMRequest:
+    """Peticion neutral al proveedor"""
+
+    def __init__(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        system: Optional[str] = None,
+        response_mime_type: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None
+    ):
+        self.prompt = prompt
+        self.model = model
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self.system = system
+        self.response_mime_type = response_mime_type
+        self.response_schema = response_schema
+
+
+class LLMResponse:
+    """Respuesta neutral del proveedor"""
+
+    def __init__(self, text: str, model: str, provider: str, latency: float):
+        self.text = text
+        self.model = model
+        self.provider = provider
+        self.latency = latency
+
+    def __repr__(self) -> str:
+        return f"<LLMResponse {self.provider}:{self.model} {len(self.text)} chars {self.latency:.2f}s>"
+
+
+class LLMProvider(ABC):
+    """
+    Proveedor de LLM: credenciales, clientes por modelo y configuracion.
+
+    Args:
+        api_key: Clave del proveedor (por defecto la de API_KEY_ENV)
+    """
+
+    NAME = ''
+    API_KEY_ENV = ''
+    DEFAULT_MODEL = ''
+    # True si envuelve al proveedor nativo de la Sefira (ver get_provider)
+    WRAPS_PROVIDER = False
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or (os.getenv(self.API_KEY_ENV) if self.API_KEY_ENV else None)
+        self._clients: Dict[str, Any] = {}
+        self._lazy_clients: Dict[tuple, 'LazyClient'] = {}
+        self._lock = threading.RLock()
+
+    def available(self) -> bool:
+        """True si hay credenciales para llamar al proveedor"""
+        return bool(self.api_key)
+
+    def model_for(self, stage: Optional[str] = None) -> str:
+        """Modelo de una etapa: TIKUN_MODEL_<ETAPA>, TIKUN_<PROVEEDOR>_MODEL o DEFAULT_MODEL"""
+        if stage:
+            model = os.getenv(f"TIKUN_MODEL_{stage.upper()}")
+            if model:
+                return model
+        return os.getenv(f"TIKUN_{self.NAME.upper()}_MODEL", self.DEFAULT_MODEL)
+
+    def client(self, model: Optional[str] = None) -> Any:
+        """Cliente compartido para el modelo (se construye la primera vez)"""
+        model = model or self.DEFAULT_MODEL
+        client = self._clients.get(model)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(model)
+                if client is None:
+                    client = self._clients[model] = self._build_client(model)
+                    logger.debug(f"{type(self).__name__}: cliente para '{model}'")
+        return client
+
+    def async_client(self, model: Optional[str] = None) -> Any:
+        """Cliente para corrutinas (en Gemini el mismo GenerativeModel sirve a ambas)"""
+        return self.client(model)
+
+    def lazy_client(self, model: Optional[str] = None, is_async: bool = False) -> 'LazyClient':
+        """client() / async_client() que se construye en su primer uso (compartido por modelo)"""
+        model = model or self.DEFAULT_MODEL
+        key = (model, is_async)
+        lazy = self._lazy_clients.get(key)
+        if lazy is None:
+            with self._lock:
+                lazy = self._lazy_clients.setdefault(
+                    key, LazyClient(self.async_client if is_async else self.client, model)
+                )
+        return lazy
+
+    @abstractmethod
+    def _build_client(self, model: str) -> Any:
+        """Cliente nuevo para el modelo"""
+
+    @abstractmethod
+    def generation_config(self, **kwargs) -> Any:
+        """Configuracion de generacion en el formato del proveedor"""
+
+    def supports_json_output(self) -> bool:
+        """True si generation_config admite response_mime_type y response_schema"""
+        return True
+
+    @abstractmethod
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        """Llamada bloqueante"""
+
+    @abstractmethod
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        """Llamada asincrona"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {'provider': self.NAME, 'available': self.available(), 'clients': list(self._clients)}
+
+
+class LazyClient:
+    """
+    Cliente de un proveedor que se construye (e importa su SDK) en el
+    primer acceso a un atributo; despues delega todo en el.
+
+    Args:
+        factory: Funcion (modelo) -> cliente, p.ej. LLMProvider.client
+        model: Modelo del cliente
+    """
+
+    __slots__ = ('_factory', '_model', '_client')
+
+    def __init__(self, factory: Callable[[str], Any], model: str):
+        self._factory = factory
+        self._model = model
+        self._client = None
+
+    @property
+    def resolved(self) -> bool:
+        return self._client is not None
+
+    def resolve(self) -> Any:
+        """El cliente real (lo construye la primera vez; el proveedor lo comparte)"""
+        client = self._client
+        if client is None:
+            client = self._client = self._factory(self._model)
+        return client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        state = 'construido' if self._client is not None else 'sin construir'
+        return f"<LazyClient {self._model} ({state})>"
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Gemini via google.generativeai.
+
+    genai.configure() es global en el SDK: se llama una sola vez por clave.
+    Un GenerativeModel por modelo; todos comparten el transporte del SDK.
+    """
+
+    NAME = 'gemini'
+    API_KEY_ENV = 'GEMINI_API_KEY'
+    DEFAULT_MODEL = 'gemini-2.0-flash-exp'
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key)
+        self._configured = False
+        self._json_output: Optional[bool] = None
+
+    def _genai(self):
+        import google.generativeai as genai
+        if not self._configured and self.api_key:
+            with self._lock:
+                if not self._configured:
+                    genai.configure(api_key=self.api_key)
+                    self._configured = True
+        return genai
+
+    def _build_client(self, model: str) -> Any:
+        return self._genai().GenerativeModel(model)
+
+    def generation_config(self, **kwargs) -> Any:
+        return self._genai().GenerationConfig(**kwargs)
+
+    def supports_json_output(self) -> bool:
+        """Los google-generativeai antiguos (p.ej. 0.3.x) no admiten salida JSON en GenerationConfig"""
+        if self._json_output is None:
+            fields = inspect.signature(self._genai().GenerationConfig).parameters
+            self._json_output = 'response_mime_type' in fields and 'response_schema' in fields
+        return self._json_output
+
+    def _call_args(self, request: LLMRequest) -> Dict[str, Any]:
+        config = {
+            key: value for key, value in (
+                ('temperature', request.temperature),
+                ('max_output_tokens', request.max_output_tokens),
+                ('response_mime_type', request.response_mime_type),
+                ('response_schema', request.response_schema)
+            ) if value is not None
+        }
+        prompt = f"{request.system}\n\n{request.prompt}" if request.system else request.prompt
+        return {'contents': prompt, 'generation_config': self.generation_config(**config)}
+
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        model = request.model or self.model_for()
+        start = time.perf_counter()
+        response = self.client(model).generate_content(**self._call_args(request))
+        return LLMResponse(response.text, model, self.NAME, time.perf_counter() - start)
+
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        model = request.model or self.model_for()
+        start = time.perf_counter()
+        response = await self.client(model).generate_content_async(**self._call_args(request))
+        return LLMResponse(response.text, model, self.NAME, time.perf_counter() - start)
+
+
+class AnthropicProvider(LLMProvider):
+    """
+    Claude via el SDK de Anthropic.
+
+    El cliente no depende del modelo (se elige en cada llamada): hay un
+    solo Anthropic y un solo AsyncAnthropic por clave, con su pool httpx.
+    """
+
+    NAME = 'anthropic'
+    API_KEY_ENV = 'ANTHROPIC_API_KEY'
+    DEFAULT_MODEL = 'claude-sonnet-4-5-20250929'
+
+    def client(self, model: Optional[str] = None) -> Any:
+        return super().client('sync')
+
+    def async_client(self, model: Optional[str] = None) -> Any:
+        """AsyncAnthropic compartido"""
+        return super().client('async')
+
+    def _build_client(self, kind: str) -> Any:
+        import anthropic
+        if kind == 'async':
+            return anthropic.AsyncAnthropic(api_key=self.api_key)
+        return anthropic.Anthropic(api_key=self.api_key)
+
+    def generation_config(self, **kwargs) -> Dict[str, Any]:
+        """Argumentos de messages.create (max_output_tokens -> max_tokens)"""
+        if 'max_output_tokens' in kwargs:
+            kwargs['max_tokens'] = kwargs.pop('max_output_tokens')
+        return kwargs
+
+    def supports_json_output(self) -> bool:
+        return False
+
+    def _call_args(self, request: LLMRequest) -> Dict[str, Any]:
+        args = {
+            'model': request.model or self.model_for(),
+            'max_tokens': request.max_output_tokens or 4096,
+            'messages': [{'role': 'user', 'content': request.prompt}]
+        }
+        if request.temperature is not None:
+            args['temperature'] = request.temperature
+        if request.system:
+            args['system'] = request.system
+        return args
+
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        args = self._call_args(request)
+        start = time.perf_counter()
+        response = self.client().messages.create(**args)
+        return LLMResponse(response.content[0].text, args['model'], self.NAME, time.perf_counter() - start)
+
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        args = self._call_args(request)
+        start = time.perf_counter()
+        response = await self.async_client().messages.create(**args)
+        return LLMResponse(response.content[0].text, args['model'], self.NAME, time.perf_counter() - start)
+
+
+# Encabezados que piden los prompts de las Sefirot: 'RIESGOS SISTEMICOS:'
+_PROMPT_HEADER = re.compile(r'^[ \t#*]*([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ0-9 /()\-]{2,60}):[ \t*]*$', re.MULTILINE)
+# Claves JSON que pide un prompt sin esquema: '"justice": <entero>'
+_PROMPT_JSON_KEY = re.compile(r'"(\w+)"\s*:\s*<(\w+)>')
+
+Responder = Callable[[str, Any], str]
+
+
+class FakeProvider(LLMProvider):
+    """
+    Proveedor en el propio proceso, sin red, para correr el Arbol offline.
+
+    Sus clientes imitan ambas interfaces de SDK (generate_content[_async]
+    de Gemini y messages.create de Anthropic), asi que cualquier Sefira
+    funciona con el.
+
+    Args:
+        latency: Segundos por llamada, o funcion (prompt) -> segundos
+        responder: Funcion (prompt, generation_config) -> texto; por
+                   defecto fake_response()
+        chunk_size: Caracteres por fragmento con stream=True
+    """
+
+    NAME = 'fake'
+    DEFAULT_MODEL = 'fake-model'
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        latency: Union[float, Callable[[str], float]] = 0.0,
+        responder: Optional[Responder] = None,
+        chunk_size: int = 64
+    ):
+        super().__init__(api_key or 'fake')
+        self.latency = latency
+        self.responder = responder or fake_response
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def async_client(self, model: Optional[str] = None) -> '_FakeClient':
+        """Cliente cuyo messages.create es una corrutina, como AsyncAnthropic"""
+        return super().client(f"{model or self.DEFAULT_MODEL}:async")
+
+    def _build_client(self, model: str) -> '_FakeClient':
+        name, _, kind = model.partition(':')
+        return _FakeClient(self, name, is_async=kind == 'async')
+
+    def generation_config(self, **kwargs) -> Dict[str, Any]:
+        return kwargs
+
+    def delay(self, prompt: str) -> float:
+        return self.latency(prompt) if callable(self.latency) else self.latency
+
+    def respond(self, prompt: str, config: Any = None) -> str:
+        with self._lock:
+            self.calls += 1
+        return self.responder(prompt, config)
+
+    def reply(self, model: str, prompt: str, config: Any = None) -> Tuple[str, float]:
+        """(texto, segundos de latencia simulada) de una llamada de los clientes"""
+        system = config_value(config, 'system')
+        if system:
+            prompt = f"{system}\n\n{prompt}"
+        return self.respond(prompt, config), self.delay(prompt)
+
+    async def areply(self, model: str, prompt: str, config: Any = None) -> Tuple[str, float]:
+        """Version asincrona de reply() (las subclases pueden llamar a la red)"""
+        return self.reply(model, prompt, config)
+
+    def chunks(self, text: str) -> List[str]:
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or ['']
+
+    def _prompt(self, request: LLMRequest) -> str:
+        return f"{request.system}\n\n{request.prompt}" if request.system else request.prompt
+
+    def _config(self, request: LLMRequest) -> Dict[str, Any]:
+        return {
+            'temperature': request.temperature,
+            'max_output_tokens': request.max_output_tokens,
+            'response_mime_type': request.response_mime_type,
+            'response_schema': request.response_schema
+        }
+
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        model = request.model or self.model_for()
+        start = time.perf_counter()
+        response = self.client(model).generate_content(self._prompt(request), generation_config=self._config(request))
+        return LLMResponse(response.text, model, self.NAME, time.perf_counter() - start)
+
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        model = request.model or self.model_for()
+        start = time.perf_counter()
+        response = await self.client(model).generate_content_async(
+            self._prompt(request), generation_config=self._config(request)
+        )
+        return LLMResponse(response.text, model, self.NAME, time.perf_counter() - start)
+
+
+class _FakeText:
+    """Respuesta o fragmento con .text, como los del SDK de Gemini"""
+
+    def __init__(self, text: str, usage: Optional['_FakeUsage'] = None):
+        self.text = text
+        self.content = [self]
+        # Como en los SDK: usage_metadata (Gemini) y usage (Anthropic)
+        self.usage_metadata = self.usage = usage
+
+
+class _FakeUsage:
+    """Tokens estimados (4 caracteres por token) con los nombres de ambos SDK"""
+
+    def __init__(self, prompt: str, text: str):
+        self.prompt_token_count = self.input_tokens = max(1, len(prompt) // 4)
+        self.candidates_token_count = self.output_tokens = max(1, len(text) // 4)
+        self.cached_content_token_count = 0
+
+
+class _FakeMessages:
+    def __init__(self, client: '_FakeClient', is_async: bool):
+        self._client = client
+        self._async = is_async
+
+    def create(self, messages=None, system=None, max_tokens=None, temperature=None, **kwargs):
+        prompt = "\n\n".join(m['content'] for m in messages or [])
+        config = {'temperature': temperature, 'max_output_tokens': max_tokens, 'system': system}
+        if self._async:
+            return self._client.generate_content_async(prompt, generation_config=config)
+        return self._client.generate_content(prompt, generation_config=config)
+
+
+class _FakeClient:
+    """Cliente de FakeProvider con la interfaz de GenerativeModel y de Anthropic"""
+
+    def __init__(self, provider: FakeProvider, model: str, is_async: bool = False):
+        self.provider = provider
+        self.model_name = model
+        self.messages = _FakeMessages(self, is_async)
+
+    def generate_content(self, contents: str, generation_config: Any = None, stream: bool = False, **kwargs):
+        text, delay = self.provider.reply(self.model_name, contents, generation_config)
+        if delay > 0:
+            time.sleep(delay)
+        usage = _FakeUsage(contents, text)
+        if stream:
+            chunks = self.provider.chunks(text)
+            # Como Gemini, el ultimo fragmento trae el uso de toda la respuesta
+            return [_FakeText(chunk, usage if i == len(chunks) - 1 else None) for i, chunk in enumerate(chunks)]
+        return _FakeText(text, usage)
+
+    async def generate_content_async(self, contents: str, generation_config: Any = None, stream: bool = False, **kwargs):
+        text, delay = await self.provider.areply(self.model_name, contents, generation_config)
+        await asyncio.sleep(delay)
+        usage = _FakeUsage(contents, text)
+        if stream:
+            return self._achunks(text, usage)
+        return _FakeText(text, usage)
+
+    async def _achunks(self, text: str, usage: '_FakeUsage') -> AsyncIterator[_FakeText]:
+        chunks = self.provider.chunks(text)
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(0)
+            yield _FakeText(chunk, usage if i == len(chunks) - 1 else None)
+
+
+def fake_response(prompt: str, config: Any = None) -> str:
+    """
+    Respuesta sintetica con la forma que pide el prompt.
+
+    Modo JSON (response_mime_type application/json): un objeto que cumple
+    response_schema, o con las claves '"clave": <tipo>' del prompt. Modo
+    texto: cada encabezado 'TITULO:' del prompt con una linea de contenido.
+    """
+    mime_type = config_value(config, 'response_mime_type')
+    if mime_type == 'application/json':
+        schema = config_value(config, 'response_schema')
+        if schema:
+            return json.dumps(_fake_from_schema(schema), ensure_ascii=False)
+        keys = _PROMPT_JSON_KEY.findall(prompt)
+        return json.dumps({key: 5 if kind == 'entero' else 'simulado' for key, kind in keys}, ensure_ascii=False)
+
+    headers = list(dict.fromkeys(match.group(1).strip() for match in _PROMPT_HEADER.finditer(prompt)))
+    if not headers:
+        return "Respuesta simulada."
+    return "\n".join(f"{header}:\n- Respuesta simulada para {header.lower()}\n" for header in headers)
+
+
+def config_value(config: Any, key: str) -> Any:
+    """Campo de una configuracion de generacion (dict o GenerationConfig)"""
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return config.get(key)
+    return getattr(config, key, None)
+
+
+def _fake_from_schema(schema: Dict[str, Any]) -> Any:
+    kind = schema.get('type')
+    if kind == 'object':
+        return {key: _fake_from_schema(sub) for key, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [_fake_from_schema(schema.get('items', {'type': 'string'}))]
+    if kind in ('integer', 'number'):
+        return 5
+    if kind == 'boolean':
+        return True
+    return 'simulado'
+
+
+# Nombre -> clase, o 'modulo.Clase' dentro de src.core (se importa al primer uso)
+PROVIDERS: Dict[str, Any] = {
+    'gemini': GeminiProvider,
+    'anthropic': AnthropicProvider,
+    'fake': FakeProvider,
+    'cassette': 'cassette.CassetteProvider'
+}
+
+# TIKUN_LLM_PROVIDER que reemplazan al proveedor nativo de todas las Sefirot
+OVERRIDES = ('fake', 'cassette')
+
+_providers: Dict[tuple, LLMProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def provider_name(kind: str) -> str:
+    """
+    Proveedor a usar para una Sefira cuyo SDK nativo es 'kind'.
+
+    TIKUN_LLM_PROVIDER=fake cambia todas las Sefirot al proveedor falso;
+    TIKUN_LLM_PROVIDER=cassette, al de grabacion/reproduccion (ver cassette).
+    """
+    override = os.getenv("TIKUN_LLM_PROVIDER")
+    return override if override in OVERRIDES else kind
+
+
+def _provider_class(name: str) -> Any:
+    if name not in PROVIDERS:
+        raise ValueError(f"Proveedor desconocido '{name}'; opciones: {sorted(PROVIDERS)}")
+    cls = PROVIDERS[name]
+    if isinstance(cls, str):
+        module_name, class_name = cls.rsplit('.', 1)
+        cls = PROVIDERS[name] = getattr(importlib.import_module(f".{module_name}", __package__), class_name)
+    return cls
+
+
+def _provider_key(cls: Any, name: str, api_key: Optional[str], kind: Optional[str]) -> tuple:
+    """Los proveedores sin credenciales (fake) no distinguen claves; los que envuelven a otro, su SDK"""
+    return (name, api_key if cls.API_KEY_ENV else None, kind if cls.WRAPS_PROVIDER else None)
+
+
+def get_provider(name: str = 'gemini', api_key: Optional[str] = None, kind: Optional[str] = None) -> LLMProvider:
+    """
+    Proveedor compartido por el proceso para (nombre, clave).
+
+    kind: SDK nativo de la Sefira ('gemini', 'anthropic'); solo lo usan los
+    proveedores que envuelven a otro (cassette graba llamando a ese).
+    """
+    cls = _provider_class(name)
+    key = _provider_key(cls, name, api_key, kind)
+    provider = _providers.get(key)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(key)
+            if provider is None:
+                if cls.WRAPS_PROVIDER:
+                    provider = cls(api_key, upstream=kind or 'gemini')
+                else:
+                    provider = cls(api_key)
+                _providers[key] = provider
+    return provider
+
+
+def set_provider(provider: LLMProvider, api_key: Optional[str] = None, kind: Optional[str] = None) -> None:
+    """Registra una instancia (p.ej. un FakeProvider con latencia) como la del proceso"""
+    key = _provider_key(type(provider), provider.NAME, api_key, kind)
+    with _providers_lock:
+        _providers[key] = provider
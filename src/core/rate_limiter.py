@@ -0,0 +1,320 @@
+"""
+Limitador de cuota compartido por todas las llamadas a Gemini del proceso.
+
+Las diez Sefirot y el scoring de Keter usan la misma cuota del proyecto
+(peticiones y tokens por minuto). Sin coordinacion, con carga aparecen 429
+a mitad del Arbol y se pierde el trabajo de las etapas anteriores. Aqui:
+
+1. Dos token buckets: RPM (una unidad por llamada) y TPM (tokens estimados
+   del prompt + la salida esperada). Cada bucket se llena a su ritmo por
+   minuto y admite como rafaga lo de un minuto.
+2. Las llamadas que no caben esperan en una cola con prioridad: primero la
+   clase ('interactive' antes que 'batch'), despues la etapa del Arbol (las
+   etapas mas avanzadas primero, para que el trabajo ya empezado termine
+   antes que las ejecuciones nuevas) y por ultimo el orden de llegada.
+   Solo la cabeza de la cola puede consumir: una llamada grande no queda
+   postergada para siempre por llamadas pequenas de menor prioridad.
+3. Al terminar la llamada se ajusta el bucket TPM con los tokens reales
+   (estimados por caracteres) en lugar de los reservados.
+
+La prioridad vive en un ContextVar (ver llm_priority), igual que
+track_llm_usage: TikunEngine marca la etapa de cada nodo y run_batch()/
+PipelineExecutor la clase 'batch'. Sirve tanto a hilos (acquire) como a
+corrutinas de cualquier event loop (aacquire).
+
+Uso:
+    limiter = get_rate_limiter()
+    with llm_priority('batch'):
+        ticket = limiter.acquire(tokens=1200)
+        ...
+        limiter.release(ticket, used_tokens=900)
+    limiter.stats()  # profundidad de cola, esperas por clase, nivel de los buckets
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+
+
+PRIORITIES = ('interactive', 'batch')
+
+# (clase, etapa) de las llamadas del contexto en curso
+_priority: ContextVar[Tuple[str, int]] = ContextVar('llm_priority', default=('interactive', 0))
+
+
+@contextmanager
+def llm_priority(priority: Optional[str] = None, stage: Optional[int] = None) -> Iterator[None]:
+    """
+    Prioridad de las llamadas al LLM hechas dentro del bloque.
+
+    priority: clase de PRIORITIES; stage: etapa del Arbol (mayor = mas
+    avanzada = antes). Lo que no se indica se hereda del contexto.
+    """
+    current_priority, current_stage = _priority.get()
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"priority debe ser una de {PRIORITIES}, no '{priority}'")
+    token = _priority.set((
+        priority if priority is not None else current_priority,
+        stage if stage is not None else current_stage
+    ))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Tuple[str, int]:
+    """(clase, etapa) del contexto en curso"""
+    return _priority.get()
+
+
+class TokenBucket:
+    """Bucket que se llena a 'per_minute' unidades por minuto, con capacidad de un minuto"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos hasta que haya 'amount' unidades (tras refill)"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate else float('inf')
+
+
+class RateTicket:
+    """Permiso concedido por acquire(); se devuelve con release()"""
+
+    __slots__ = ('tokens', 'priority', 'stage', 'waited')
+
+    def __init__(self, tokens: int, priority: str, stage: int, waited: float):
+        self.tokens = tokens
+        self.priority = priority
+        self.stage = stage
+        self.waited = waited
+
+
+class _Waiter:
+    """Llamada en la cola; se despierta con un Event (hilos) o un Future (corrutinas)"""
+
+    __slots__ = ('tokens', 'priority', 'event', 'future', 'loop', 'granted', 'cancelled')
+
+    def __init__(self, tokens: int, priority: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.tokens = tokens
+        self.priority = priority
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+        self.cancelled = False
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimiter:
+    """
+    Token buckets RPM/TPM con cola de prioridad.
+
+    Args:
+        requests_per_minute: Llamadas por minuto (bucket RPM)
+        tokens_per_minute: Tokens por minuto (bucket TPM)
+        max_wait: Segundos maximos entre revisiones de la cola de un
+                  llamador dormido (el que libera cuota despierta antes)
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_wait: float = 1.0):
+        if requests_per_minute <= 0 or tokens_per_minute <= 0:
+            raise ValueError("requests_per_minute y tokens_per_minute deben ser > 0")
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[Tuple[int, int, int], _Waiter]] = []
+        self._sequence = itertools.count()
+
+        self.queued = {priority: 0 for priority in PRIORITIES}
+        self.max_queue_depth = 0
+        self.stats_by_priority = {
+            priority: {'acquired': 0, 'throttled': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+            for priority in PRIORITIES
+        }
+        self.tokens_reserved = 0
+        self.tokens_used = 0
+
+    def acquire(self, tokens: int) -> RateTicket:
+        """Espera (bloqueando el hilo) hasta que haya cuota para una llamada de 'tokens'"""
+        priority, stage = _priority.get()
+        start = time.monotonic()
+        waiter = _Waiter(tokens, priority)
+        delay = self._enqueue(waiter, stage)
+        while not waiter.granted:
+            waiter.event.wait(delay)
+            waiter.event.clear()
+            delay = self._dispatch()
+        return self._ticket(waiter, stage, start)
+
+    async def aacquire(self, tokens: int) -> RateTicket:
+        """Version asincrona de acquire(); si la tarea se cancela, sale de la cola"""
+        priority, stage = _priority.get()
+        start = time.monotonic()
+        waiter = _Waiter(tokens, priority, asyncio.get_running_loop())
+        delay = self._enqueue(waiter, stage)
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), delay)
+                except asyncio.TimeoutError:
+                    pass
+                if waiter.future.done():
+                    waiter.future = waiter.loop.create_future()
+                delay = self._dispatch()
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+        return self._ticket(waiter, stage, start)
+
+    def release(self, ticket: RateTicket, used_tokens: Optional[int] = None) -> None:
+        """
+        Ajusta el bucket TPM con los tokens realmente usados.
+
+        Si la llamada uso menos de lo reservado se devuelve la diferencia
+        (y puede pasar la siguiente de la cola); si uso mas, queda en deuda.
+        """
+        used = ticket.tokens if used_tokens is None else used_tokens
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + ticket.tokens - used)
+            self.tokens_used += used
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidad de la cola, esperas por clase y nivel de los buckets"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            by_priority = {}
+            for priority, stats in self.stats_by_priority.items():
+                acquired = stats['acquired']
+                by_priority[priority] = dict(
+                    stats,
+                    queued=self.queued[priority],
+                    avg_wait_seconds=stats['wait_seconds'] / acquired if acquired else 0.0
+                )
+            return {
+                'requests_per_minute': self.requests.capacity,
+                'tokens_per_minute': self.tokens.capacity,
+                'requests_available': self.requests.level,
+                'tokens_available': self.tokens.level,
+                'queue_depth': sum(self.queued.values()),
+                'max_queue_depth': self.max_queue_depth,
+                'tokens_reserved': self.tokens_reserved,
+                'tokens_used': self.tokens_used,
+                'priorities': by_priority
+            }
+
+    def _enqueue(self, waiter: _Waiter, stage: int) -> float:
+        key = (PRIORITIES.index(waiter.priority), -stage, next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._queue, (key, waiter))
+            self.queued[waiter.priority] += 1
+            self.max_queue_depth = max(self.max_queue_depth, sum(self.queued.values()))
+        return self._dispatch()
+
+    def _dispatch(self) -> float:
+        """
+        Concede cuota a la cabeza de la cola mientras quepa.
+
+        Retorna cuantos segundos conviene esperar antes de volver a revisar.
+        """
+        woken = []
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            delay = self.max_wait
+            while self._queue:
+                waiter = self._queue[0][1]
+                if waiter.cancelled:
+                    heapq.heappop(self._queue)
+                    continue
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(waiter.tokens))
+                if wait > 0:
+                    delay = min(delay, wait)
+                    break
+                heapq.heappop(self._queue)
+                self.requests.level -= 1
+                self.tokens.level -= waiter.tokens
+                self.tokens_reserved += waiter.tokens
+                self.queued[waiter.priority] -= 1
+                waiter.granted = True
+                woken.append(waiter)
+        for waiter in woken:
+            waiter.wake()
+        return max(delay, 0.001)
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                # Concedido justo al cancelar: se devuelve la cuota
+                self.requests.level += 1
+                self.tokens.level += waiter.tokens
+                self.tokens_reserved -= waiter.tokens
+            elif not waiter.cancelled:
+                waiter.cancelled = True
+                self.queued[waiter.priority] -= 1
+        self._dispatch()
+
+    def _ticket(self, waiter: _Waiter, stage: int, start: float) -> RateTicket:
+        waited = time.monotonic() - start
+        with self._lock:
+            stats = self.stats_by_priority[waiter.priority]
+            stats['acquired'] += 1
+            stats['wait_seconds'] += waited
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+            if waited > 0.001:
+                stats['throttled'] += 1
+        return RateTicket(waiter.tokens, waiter.priority, stage, waited)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Limitador de Gemini compartido por el proceso.
+
+    Cuota de TIKUN_GEMINI_RPM / TIKUN_GEMINI_TPM (por defecto 1000 llamadas
+    y 1M tokens por minuto); deben coincidir con la cuota del proyecto.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                rpm = float(os.getenv("TIKUN_GEMINI_RPM", "1000"))
+                tpm = float(os.getenv("TIKUN_GEMINI_TPM", "1000000"))
+                _limiter = RateLimiter(rpm, tpm)
+                logger.info(f"RateLimiter: Gemini a {rpm:.0f} RPM / {tpm:.0f} TPM")
+    return _limiter
@@ -0,0 +1,326 @@
+"""
+Reintentos, backoff y circuit breaker para las llamadas al LLM.
+
+Antes cualquier excepcion de _call_gemini terminaba la Sefira con
+processing_successful False (o, en Hod y Yesod, se relanzaba como un
+Exception generico), aunque fuera un 429 o un 503 pasajero. Aqui:
+
+1. classify_error() separa lo reintentable (timeouts, conexion, 408, 429,
+   5xx) de lo fatal (bloqueo de seguridad, clave invalida, 4xx). Mira el
+   codigo HTTP de la excepcion (google.api_core: .code, anthropic:
+   .status_code), el nombre de su clase y su __cause__, sin importar los
+   SDK. Lo desconocido es fatal: no se reintenta lo que no se entiende.
+2. RetryPolicy: backoff exponencial con jitter completo y un deadline por
+   llamada que cubre todos los intentos.
+3. CircuitBreaker por modelo: tras 'failure_threshold' fallos reintentables
+   seguidos se abre y las llamadas fallan al instante (CircuitOpenError)
+   durante 'reset_timeout' segundos; despues deja pasar una llamada de
+   prueba y se cierra si funciona.
+
+Uso:
+    resilience = Resilience(RetryPolicy(), get_circuit_breaker('gemini:gemini-2.0-flash-exp'))
+    text = resilience.call(lambda: client.generate_content(prompt).text)
+    text = await resilience.acall(lambda: client.generate_content_async(prompt))
+    resilience.stats  # contadores por resultado
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+from loguru import logger
+import asyncio
+import random
+import threading
+import time
+
+
+RETRYABLE = 'retryable'
+FATAL = 'fatal'
+
+RETRYABLE_STATUS = {408, 429}
+
+# Fragmentos de nombres de clase de los SDK (google.api_core, anthropic,
+# httpx, grpc) que identifican el tipo de error sin importarlos
+RETRYABLE_NAMES = (
+    'timeout', 'deadlineexceeded', 'connection', 'serviceunavailable',
+    'resourceexhausted', 'toomanyrequests', 'ratelimit', 'overloaded',
+    'internalservererror', 'badgateway', 'aborted'
+)
+FATAL_NAMES = (
+    'blockedprompt', 'stopcandidate', 'safety', 'permissiondenied',
+    'unauthenticated', 'authentication', 'invalidargument', 'badrequest', 'notfound'
+)
+
+
+class LLMCallError(Exception):
+    """Error de una llamada al LLM; el original queda en __cause__"""
+
+
+class CircuitOpenError(LLMCallError):
+    """El circuito del modelo esta abierto: la llamada no se intento"""
+
+
+class PartialStreamError(LLMCallError):
+    """La respuesta en streaming fallo despues de entregar secciones: no se reintenta"""
+
+
+def classify_error(error: BaseException) -> str:
+    """RETRYABLE o FATAL; recorre la cadena de __cause__"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (CircuitOpenError, PartialStreamError)):
+            return FATAL
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+            return RETRYABLE
+
+        status = getattr(error, 'status_code', None)
+        if status is None:
+            status = getattr(error, 'code', None)
+        if isinstance(status, int) and not isinstance(status, bool):
+            if status in RETRYABLE_STATUS or status >= 500:
+                return RETRYABLE
+            if 400 <= status < 500:
+                return FATAL
+
+        name = type(error).__name__.lower()
+        if any(fragment in name for fragment in FATAL_NAMES):
+            return FATAL
+        if any(fragment in name for fragment in RETRYABLE_NAMES):
+            return RETRYABLE
+
+        error = error.__cause__
+    return FATAL
+
+
+class RetryPolicy:
+    """
+    Cuantas veces y cuando reintentar.
+
+    Args:
+        max_attempts: Intentos totales (1 = sin reintentos)
+        base_delay: Espera base del primer reintento en segundos
+        max_delay: Tope de la espera entre intentos
+        deadline: Segundos maximos de la llamada completa, contando todos
+                  los intentos y esperas (None = sin limite). En async
+                  tambien corta el intento en curso.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        deadline: Optional[float] = 90.0
+    ):
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts debe ser >= 1, no {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes del reintento numero 'attempt' (1, 2, ...): jitter completo"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Circuito de un modelo: 'closed', 'open' o 'half_open'.
+
+    Solo cuentan los fallos reintentables (un prompt bloqueado no dice
+    nada de la salud del proveedor).
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True si la llamada puede intentarse (en half_open, solo una de prueba)"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != 'closed':
+                logger.info(f"CircuitBreaker '{self.name}': cerrado de nuevo")
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                    logger.warning(
+                        f"CircuitBreaker '{self.name}': abierto tras "
+                        f"{self.consecutive_failures} fallos, {self.reset_timeout:.0f}s sin llamadas"
+                    )
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self) -> None:
+        """La llamada de prueba termino con un error fatal: ni abre ni cierra"""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'times_opened': self.times_opened
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Circuito compartido por el proceso para un modelo ('proveedor:modelo')"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+class Resilience:
+    """
+    Ejecuta una llamada con reintentos y circuit breaker, contando cada resultado.
+
+    stats:
+        calls: llamadas; succeeded: terminaron bien (recovered: de ellas,
+        tras algun reintento); retries: reintentos hechos; failed_fatal /
+        failed_retryable: fallaron con un error fatal o agotando los
+        intentos; deadline_exceeded: de las fallidas, por el deadline;
+        circuit_open: rechazadas sin intentar por el circuito abierto.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.breaker = breaker
+        self.stats = {
+            'calls': 0,
+            'succeeded': 0,
+            'recovered': 0,
+            'retries': 0,
+            'failed_fatal': 0,
+            'failed_retryable': 0,
+            'deadline_exceeded': 0,
+            'circuit_open': 0
+        }
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Llamada bloqueante con reintentos (duerme el hilo entre intentos)"""
+        start = time.monotonic()
+        self._count('calls')
+        attempt = 1
+        while True:
+            self._check_circuit()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._after_failure(e, attempt, start)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._after_success(attempt)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Version asincrona de call(); el deadline tambien corta el intento en curso"""
+        start = time.monotonic()
+        self._count('calls')
+        attempt = 1
+        while True:
+            self._check_circuit()
+            try:
+                remaining = self._remaining(start)
+                result = await asyncio.wait_for(fn(), remaining) if remaining is not None else await fn()
+            except Exception as e:
+                delay = self._after_failure(e, attempt, start)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._after_success(attempt)
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Contadores y estado del circuito (para get_metrics)"""
+        with self._lock:
+            report: Dict[str, Any] = dict(self.stats)
+        if self.breaker is not None:
+            report['circuit'] = self.breaker.snapshot()
+        return report
+
+    def _remaining(self, start: float) -> Optional[float]:
+        if self.policy.deadline is None:
+            return None
+        return max(0.0, self.policy.deadline - (time.monotonic() - start))
+
+    def _check_circuit(self) -> None:
+        if self.breaker is not None and not self.breaker.allow():
+            self._count('circuit_open')
+            raise CircuitOpenError(f"Circuito '{self.breaker.name}' abierto: proveedor degradado")
+
+    def _after_success(self, attempt: int) -> None:
+        if self.breaker is not None:
+            self.breaker.record_success()
+        self._count('succeeded')
+        if attempt > 1:
+            self._count('recovered')
+
+    def _after_failure(self, error: Exception, attempt: int, start: float) -> float:
+        """Segundos a esperar antes del siguiente intento; relanza si no hay otro"""
+        kind = classify_error(error)
+        if self.breaker is not None:
+            if kind == RETRYABLE:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_probe()
+
+        if kind == FATAL:
+            self._count('failed_fatal')
+            raise error
+
+        delay = self.policy.backoff(attempt)
+        remaining = self._remaining(start)
+        if remaining is not None and remaining <= delay:
+            self._count('failed_retryable')
+            self._count('deadline_exceeded')
+            raise error
+        if attempt >= self.policy.max_attempts:
+            self._count('failed_retryable')
+            raise error
+
+        self._count('retries')
+        logger.warning(
+            f"Llamada al LLM fallo ({type(error).__name__}: {error}); "
+            f"reintento {attempt}/{self.policy.max_attempts - 1} en {delay:.2f}s"
+        )
+        return delay
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
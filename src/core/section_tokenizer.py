@@ -0,0 +1,288 @@
+"""
+SectionTokenizer - parte una respuesta LLM en secciones en una sola pasada.
+
+Antes cada Sefira tenia su propio parser: un if/elif por encabezado
+evaluado sobre cada linea (`'ANALISIS:' in line.upper()`), o un
+re.search por seccion que recorria la respuesta completa una vez por
+encabezado (Chochmah, Hod, Yesod). Aqui:
+
+1. La tabla de encabezados de cada Sefira (alias en espanol e ingles) se
+   compila una sola vez en una regex, al definir la clase.
+2. tokenize() normaliza la respuesta con fold() (minusculas, sin acentos,
+   misma longitud) y localiza todos los encabezados con un unico finditer.
+   Cada seccion va desde su encabezado hasta el siguiente.
+
+La regex empieza por '\n' (en vez de '^' con MULTILINE) para que el motor
+salte de linea en linea con su busqueda rapida de literal, y un lookahead
+con las iniciales de los alias descarta casi todas las lineas de contenido
+sin probar las alternativas; ver benchmarks/bench_sections.py.
+
+Un encabezado es un alias al inicio de una linea, opcionalmente precedido
+de decoracion markdown o numeracion ('## ', '**', '1. ', '- ') y seguido de
+':' (salvo require_colon=False). 'ANÁLISIS:', '**Analisis:**' y
+'ANALYSIS:' caen en la misma seccion.
+
+Uso:
+    SECTIONS = SectionTokenizer({
+        'analysis': ['ANALISIS', 'ANALYSIS'],
+        'insights': ['INSIGHTS']
+    })
+    SECTIONS.split(response)         # {'analysis': '...', 'insights': '...'}
+    SECTIONS.split_lines(response)   # {'analysis': ['linea', ...], ...}
+
+Para respuestas en streaming, SECTIONS.stream() retorna un SectionStream:
+feed(chunk) entrega cada seccion en cuanto empieza la siguiente, sin
+volver a recorrer lo ya analizado.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+import re
+
+from .lexicon import fold
+
+
+# Decoracion permitida antes del alias: espacios, markdown, vinetas, numeracion
+_HEADER_PREFIX = r'\n[ \t>#*_\-\d.)]*'
+
+
+class Section:
+    """Una seccion localizada en la respuesta"""
+
+    __slots__ = ('key', 'text', 'start', 'content_start', 'end', '_inline_end')
+
+    def __init__(self, key: str, text: str, start: int, content_start: int, end: int, inline_end: int):
+        self.key = key
+        self.text = text
+        self.start = start
+        self.content_start = content_start
+        self.end = end
+        self._inline_end = inline_end
+
+    @property
+    def inline(self) -> str:
+        """Texto en la misma linea del encabezado, despues de ':'"""
+        return self.text[self.content_start:self._inline_end].lstrip(' \t*_').rstrip()
+
+    @property
+    def body(self) -> str:
+        """Texto de las lineas siguientes al encabezado, sin la linea del encabezado"""
+        return self.text[self._inline_end:self.end].strip()
+
+    @property
+    def content(self) -> str:
+        """Texto completo de la seccion (inline + cuerpo), tal como vino"""
+        return self.text[self.content_start:self.end].lstrip(' \t*_').strip()
+
+    def lines(self, include_inline: bool = True) -> List[str]:
+        """Lineas no vacias de la seccion, sin espacios a los lados"""
+        lines = []
+        if include_inline:
+            inline = self.inline
+            if inline:
+                lines.append(inline)
+        for line in self.text[self._inline_end:self.end].split('\n'):
+            line = line.strip()
+            if line:
+                lines.append(line)
+        return lines
+
+
+class SectionTokenizer:
+    """
+    Tabla de encabezados compilada en una sola regex.
+
+    Args:
+        headers: Clave de seccion -> alias del encabezado, sin ':'
+                 ('CONTEXTO HISTORICO', 'HISTORICAL CONTEXT'). Se
+                 normalizan con fold(), asi que los acentos no importan.
+        require_colon: Si True (por defecto) el alias debe ir seguido de
+                       ':'. Con False basta el alias al inicio de la linea;
+                       el texto tras un ':' posterior en la misma linea
+                       cuenta como inline.
+        uppercase_only: Si True, el encabezado solo cuenta escrito en
+                        mayusculas, como lo pide el prompt ('Documentacion:'
+                        dentro de una lista no abre seccion). Los acentos
+                        siguen sin importar.
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, Iterable[str]],
+        require_colon: bool = True,
+        uppercase_only: bool = False
+    ):
+        self.headers: Dict[str, List[str]] = {}
+        self.require_colon = require_colon
+        self.uppercase_only = uppercase_only
+        self._groups: Dict[str, str] = {}
+
+        alternatives = []
+        initials = set()
+        for index, (key, aliases) in enumerate(headers.items()):
+            folded = []
+            for alias in aliases:
+                alias = fold(alias).strip()
+                if alias and alias not in folded:
+                    folded.append(alias)
+            self.headers[key] = folded
+            if not folded:
+                continue
+            group = f's{index}'
+            self._groups[group] = key
+            initials.update(alias[0] for alias in folded)
+            # Alias mas largos primero: 'contexto historico' antes que 'contexto'
+            ordered = sorted(folded, key=len, reverse=True)
+            alternatives.append(
+                f"(?P<{group}>" + '|'.join(re.escape(alias) for alias in ordered) + ')'
+            )
+
+        suffix = r'[ \t*_]*:' if require_colon else r'(?![a-z0-9])'
+        self._pattern: Optional['re.Pattern'] = None
+        if alternatives:
+            self._pattern = re.compile(
+                _HEADER_PREFIX
+                + '(?=[' + ''.join(re.escape(c) for c in sorted(initials)) + '])'
+                + '(?:' + '|'.join(alternatives) + ')' + suffix
+            )
+
+    def keys(self) -> List[str]:
+        """Claves de seccion en el orden de la tabla"""
+        return list(self.headers)
+
+    def tokenize(self, text: str) -> List[Section]:
+        """Todas las secciones de la respuesta, en orden de aparicion"""
+        if not text or self._pattern is None:
+            return []
+
+        # '\n' inicial: la primera linea tambien puede ser encabezado.
+        # Posicion i en 'folded' = posicion i - 1 en 'text'
+        folded = '\n' + fold(text)
+        sections: List[Section] = []
+        for section in self._scan(text, folded, 0, len(folded)):
+            if sections:
+                sections[-1].end = section.start
+            sections.append(section)
+        return sections
+
+    def stream(self) -> 'SectionStream':
+        """Parser incremental para una respuesta que llega por fragmentos"""
+        return SectionStream(self)
+
+    def _scan(self, text: str, folded: str, pos: int, endpos: int) -> Iterator[Section]:
+        """Encabezados de folded[pos:endpos]; cada seccion llega hasta el final de text"""
+        if self._pattern is None:
+            return
+        for match in self._pattern.finditer(folded, pos, endpos):
+            group = match.lastgroup
+            if self.uppercase_only and not text[match.start(group) - 1:match.end(group) - 1].isupper():
+                continue
+            start = match.start()
+            content_start = match.end() - 1
+            inline_end = text.find('\n', content_start)
+            if inline_end == -1:
+                inline_end = len(text)
+            if not self.require_colon:
+                colon = folded.find(':', content_start + 1, inline_end + 1)
+                content_start = colon if colon != -1 else inline_end
+            yield Section(self._groups[group], text, start, content_start, len(text), inline_end)
+
+    def split(self, text: str) -> Dict[str, str]:
+        """
+        Clave -> contenido de la primera aparicion de cada seccion.
+
+        Las secciones ausentes quedan como ''. El contenido incluye el texto
+        inline del encabezado y termina donde empieza el siguiente encabezado.
+        """
+        result = {key: '' for key in self.headers}
+        seen = set()
+        for section in self.tokenize(text):
+            if section.key not in seen:
+                seen.add(section.key)
+                result[section.key] = section.content
+        return result
+
+    def split_lines(self, text: str, include_inline: bool = True) -> Dict[str, List[str]]:
+        """
+        Clave -> lineas no vacias de la seccion.
+
+        Si un encabezado se repite, sus lineas se acumulan en la misma
+        clave. Con include_inline=False se descarta el texto que viene en
+        la misma linea del encabezado.
+        """
+        result: Dict[str, List[str]] = {key: [] for key in self.headers}
+        for section in self.tokenize(text):
+            result[section.key].extend(section.lines(include_inline))
+        return result
+
+
+class SectionStream:
+    """
+    Tokenizacion incremental de una respuesta en streaming.
+
+    Solo se analizan lineas completas (un encabezado puede llegar partido
+    entre fragmentos) y cada linea una sola vez. Una seccion queda completa
+    cuando aparece el encabezado siguiente, o al llamar a close(). Si un
+    encabezado se repite, cada aparicion se entrega como otra seccion y
+    value(key) acumula sus lineas igual que split_lines(), para que quien
+    consume el stream vea el mismo contenido que el parseo final.
+
+    Uso:
+        stream = SECTIONS.stream()
+        for chunk in chunks:
+            for section in stream.feed(chunk):
+                print(section.key, section.content)
+        stream.close()
+    """
+
+    def __init__(self, tokenizer: SectionTokenizer):
+        self.tokenizer = tokenizer
+        self.text = ''
+        self.sections: List[Section] = []
+        self.lines: Dict[str, List[str]] = {key: [] for key in tokenizer.headers}
+        self._folded = '\n'
+        self._scanned = 0    # '\n' donde empieza la primera linea sin analizar
+        self._completed = 0  # secciones ya entregadas
+        self._closed = False
+
+    def feed(self, chunk: str) -> List[Section]:
+        """Agrega un fragmento; retorna las secciones que quedaron completas"""
+        if self._closed:
+            raise ValueError("SectionStream ya fue cerrado")
+        self.text += chunk
+        self._folded += fold(chunk)
+        endpos = self._folded.rfind('\n', self._scanned + 1)
+        if endpos == -1:
+            return []
+        self._extend(endpos)
+        return self._take(len(self.sections) - 1)
+
+    def close(self) -> List[Section]:
+        """Fin de la respuesta: analiza la ultima linea y completa la ultima seccion"""
+        if self._closed:
+            return []
+        self._extend(len(self._folded))
+        self._closed = True
+        if self.sections:
+            self.sections[-1].end = len(self.text)
+            self.sections[-1].text = self.text
+        return self._take(len(self.sections))
+
+    def value(self, key: str) -> str:
+        """Lineas acumuladas de la clave en las secciones ya completas"""
+        return '\n'.join(self.lines[key])
+
+    def _extend(self, endpos: int) -> None:
+        for section in self.tokenizer._scan(self.text, self._folded, self._scanned, endpos):
+            if self.sections:
+                self.sections[-1].end = section.start
+            self.sections.append(section)
+        self._scanned = endpos
+
+    def _take(self, upto: int) -> List[Section]:
+        completed = self.sections[self._completed:upto]
+        for section in completed:
+            # Las secciones abiertas apuntan a un texto anterior
+            section.text = self.text
+            self.lines[section.key].extend(section.lines())
+        self._completed = max(self._completed, upto)
+        return completed
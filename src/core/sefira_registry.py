@@ -0,0 +1,194 @@
+"""
+Registro de Sefirot del proceso.
+
+Construir una Sefira no es gratis (genai.configure, GenerativeModel, cliente
+Anthropic, logs de inicializacion). En una instancia caliente de Cloud
+Functions el registro construye cada Sefira la primera vez que se pide y
+reutiliza la misma instancia en las peticiones siguientes.
+
+Las Sefirot de DEFAULT_SEFIROT toman modelo, temperatura y tope de salida de
+config/tikun_config.yaml (ver core.config); si el archivo cambia, get() les
+reaplica la configuracion sin reconstruirlas.
+
+Uso:
+    registry = get_registry()
+    binah = registry.get('binah')
+    registry.stats()  # instancias vivas y tiempo de construccion de cada una
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+import importlib
+import os
+import threading
+import time
+
+from .sefirotic_base import SefiraBase
+from .config import TikunConfig, get_config
+from .llm_cache import get_llm_cache
+from .llm_provider import provider_name
+from .rate_limiter import get_rate_limiter
+
+
+# Nombre -> (modulo dentro de src.sefirot, clase, kwargs del constructor).
+# Los modulos se importan solo al construir la Sefira.
+DEFAULT_SEFIROT = {
+    'keter': ('keter', 'Keter', {'use_llm_scoring': True}),
+    'chochmah': ('chochmah_gemini', 'ChochmahGemini', {}),
+    'binah': ('binah', 'Binah', {}),
+    'chesed': ('chesed', 'Chesed', {}),
+    'gevurah': ('gevurah', 'Gevurah', {}),
+    'tiferet': ('tiferet', 'Tiferet', {}),
+    'netzach': ('netzach', 'Netzach', {}),
+    'hod': ('hod', 'Hod', {}),
+    'yesod': ('yesod', 'Yesod', {}),
+    'malchut': ('malchut', 'Malchut', {})
+}
+
+
+def _default_factory(module_name: str, class_name: str, kwargs: Dict[str, Any]) -> Callable[[], SefiraBase]:
+    """
+    Fabrica que importa la clase de la Sefira al primer uso.
+
+    Si la Sefira acepta cache (CACHE_LLM_RESPONSES) se le conecta la LLMCache
+    del proceso, salvo que TIKUN_LLM_CACHE=0. Las Sefirot de Gemini comparten
+    el RateLimiter del proceso, salvo que TIKUN_RATE_LIMIT=0 o que corran
+    con el proveedor falso (TIKUN_LLM_PROVIDER=fake). Con
+    TIKUN_OUTPUT_MODE=json las Sefirot con RESPONSE_SCHEMA piden salida JSON
+    (ver set_output_mode) si el SDK la admite.
+    """
+    def build() -> SefiraBase:
+        module = importlib.import_module(f"..sefirot.{module_name}", __package__)
+        sefira = getattr(module, class_name)(**kwargs)
+        if sefira.CACHE_LLM_RESPONSES and os.getenv("TIKUN_LLM_CACHE", "1") != "0":
+            sefira.enable_llm_cache(get_llm_cache())
+        if (
+            sefira.LLM_PROVIDER == 'gemini'
+            and provider_name('gemini') == 'gemini'
+            and os.getenv("TIKUN_RATE_LIMIT", "1") != "0"
+        ):
+            sefira.enable_rate_limiter(get_rate_limiter())
+        output_mode = os.getenv("TIKUN_OUTPUT_MODE", "text")
+        if output_mode != "text" and sefira.RESPONSE_SCHEMA is not None:
+            if sefira.provider is not None and not sefira.provider.supports_json_output():
+                logger.warning(f"{class_name}: el SDK no admite salida JSON, se queda en modo texto")
+            else:
+                sefira.set_output_mode(output_mode)
+        return sefira
+    return build
+
+
+class SefiraRegistry:
+    """
+    Instancias compartidas de Sefirot, construidas de forma perezosa.
+
+    Es seguro pedir la misma Sefira desde varios hilos: cada nombre tiene su
+    propio lock, asi que se construye una sola vez y construir una Sefira no
+    bloquea a las demas. Las instancias protegen su propio estado con
+    SefiraBase._state_lock.
+
+    Args:
+        factories: Nombre -> funcion sin argumentos que construye la Sefira
+                   (por defecto las diez Sefirot de DEFAULT_SEFIROT)
+        config: Configuracion que se aplica a cada Sefira (por defecto la
+                del proceso con las fabricas por defecto, ninguna con
+                fabricas propias)
+    """
+
+    def __init__(
+        self,
+        factories: Optional[Dict[str, Callable[[], SefiraBase]]] = None,
+        config: Optional[TikunConfig] = None
+    ):
+        if factories is None:
+            factories = {
+                name: _default_factory(*spec) for name, spec in DEFAULT_SEFIROT.items()
+            }
+            config = config if config is not None else get_config()
+        self.config = config
+        self._factories = dict(factories)
+        self._instances: Dict[str, SefiraBase] = {}
+        self._build_times: Dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in self._factories}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def names(self) -> List[str]:
+        """Nombres de todas las Sefirot registradas (construidas o no)"""
+        return list(self._factories)
+
+    def get(self, name: str) -> SefiraBase:
+        """
+        Retorna la instancia compartida de una Sefira, construyendola si hace falta.
+
+        Raises:
+            KeyError: Si no hay Sefira registrada con ese nombre
+        """
+        if self.config is not None and self.config.refresh():
+            self._reconfigure()
+
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Sefira desconocida: {name}")
+
+        with self._locks[name]:
+            # Otro hilo pudo construirla mientras esperabamos el lock
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                if self.config is not None:
+                    self.config.apply(instance)
+                self._build_times[name] = time.perf_counter() - start
+                self._instances[name] = instance
+                logger.info(
+                    f"SefiraRegistry: '{name}' construida en {self._build_times[name]*1000:.1f}ms"
+                )
+        return instance
+
+    def get_all(self) -> Dict[str, SefiraBase]:
+        """Todas las Sefirot registradas, construyendo las que falten"""
+        return {name: self.get(name) for name in self._factories}
+
+    def stats(self) -> Dict[str, Any]:
+        """Instancias vivas, segundos que tardo en construirse cada una y configuracion"""
+        return {
+            'registered': len(self._factories),
+            'instances': len(self._instances),
+            'build_times': dict(self._build_times),
+            'total_build_time': sum(self._build_times.values()),
+            'config': self.config.stats() if self.config is not None else None
+        }
+
+    def _reconfigure(self) -> None:
+        """Reaplica la configuracion recargada a las Sefirot ya construidas"""
+        for name, instance in list(self._instances.items()):
+            try:
+                self.config.apply(instance)
+            except Exception as e:
+                logger.error(f"SefiraRegistry: no se pudo reconfigurar '{name}': {e}")
+
+    def clear(self) -> None:
+        """Descarta las instancias construidas (la siguiente peticion las reconstruye)"""
+        for name in self._factories:
+            with self._locks[name]:
+                self._instances.pop(name, None)
+                self._build_times.pop(name, None)
+
+
+_registry: Optional[SefiraRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> SefiraRegistry:
+    """Registro compartido por todo el proceso"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SefiraRegistry()
+    return _registry
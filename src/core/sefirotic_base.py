@@ -4,11 +4,93 @@ Define la interfaz común y comportamientos compartidos.
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
 from enum import Enum
 from loguru import logger
+import asyncio
+import threading
 import time
 
+from .history import HistoryBuffer
+from .llm_provider import LLMProvider, get_provider, provider_name
+from .rate_limiter import RateTicket
+from .resilience import PartialStreamError, Resilience, get_circuit_breaker
+from .section_tokenizer import Section, SectionStream, SectionTokenizer
+from .structured_output import JSON_INSTRUCTION, coerce_to_schema, load_json_object
+from .tracing import Span, current_span, span
+from .usage import TOKEN_KEYS, add_usage, empty_usage, estimate_cost, token_usage
+
+
+# Cuerpo de procesamiento de una Sefira con LLM: generador que cede el prompt,
+# recibe el texto de respuesta (o la excepcion de la llamada) y retorna el resultado.
+# Permite que process() y aprocess() compartan exactamente la misma logica.
+SefiraSteps = Generator[str, str, Dict[str, Any]]
+
+# Contador de uso del LLM del contexto en curso (ver track_llm_usage)
+_llm_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar('llm_usage', default=None)
+
+
+@contextmanager
+def track_llm_usage() -> Iterator[Dict[str, int]]:
+    """
+    Cuenta las llamadas al LLM hechas dentro del bloque.
+
+    El contador vive en un ContextVar: cada tarea asyncio (y cada hilo de
+    asyncio.to_thread) ve el suyo, asi que TikunEngine puede atribuir el uso
+    a cada nodo aunque las Sefirot esten compartidas entre ejecuciones.
+    Los caracteres del prompt se cuentan al enviar, los de la respuesta al
+    recibirla (una llamada cancelada solo suma el prompt). Los tokens y el
+    costo son los que reporta el SDK (ver _record_token_usage).
+    """
+    usage = {
+        'calls': 0, 'cached': 0, 'prompt_chars': 0, 'output_chars': 0,
+        'prompt_tokens': 0, 'output_tokens': 0, 'cached_tokens': 0, 'cost_usd': 0.0
+    }
+    token = _llm_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _llm_usage.reset(token)
+
+
+# Receptor de secciones en streaming del contexto en curso (ver listen_sections)
+SectionListener = Callable[[str, str], None]
+_section_listener: ContextVar[Optional[SectionListener]] = ContextVar('section_listener', default=None)
+
+
+@contextmanager
+def listen_sections(callback: SectionListener) -> Iterator[None]:
+    """
+    Pide las respuestas del LLM en streaming dentro del bloque.
+
+    callback(key, value) se llama con cada seccion de SECTIONS en cuanto
+    empieza la siguiente, antes de que termine la respuesta. value es el
+    texto de la seccion como lo arma split_lines() unido por '\n' (el mismo
+    valor que dejan en su resultado Binah y ChochmahGemini). Igual que
+    track_llm_usage, el receptor vive en un ContextVar. Las Sefirot que no
+    admiten streaming (ver supports_streaming) responden igual que siempre.
+    """
+    token = _section_listener.set(callback)
+    try:
+        yield
+    finally:
+        _section_listener.reset(token)
+
+
+def _record_llm_usage(prompt: Optional[str] = None, response: Optional[str] = None, cached: bool = False) -> None:
+    usage = _llm_usage.get()
+    if usage is None:
+        return
+    if cached:
+        usage['cached'] += 1
+    elif prompt is not None:
+        usage['calls'] += 1
+        usage['prompt_chars'] += len(prompt)
+    if response is not None and not cached:
+        usage['output_chars'] += len(response)
+
 
 class SefiraPosition(Enum):
     """Posición de cada Sefirá en el Árbol"""
@@ -34,6 +116,37 @@ class SefiraBase(ABC):
     - Canales de comunicación con otras Sefirot
     - Métricas de desempeño y alineamiento
     """
+
+    # Opt-in a LLMCache: solo Sefirot cuya respuesta deba ser reproducible
+    # (las de temperatura 1.0 buscan variedad y lo dejan en False)
+    CACHE_LLM_RESPONSES = False
+
+    # Modos de salida del LLM: 'text' (encabezados + SectionTokenizer) o
+    # 'json' (response_schema). Solo las Sefirot con RESPONSE_SCHEMA admiten 'json'
+    OUTPUT_MODES = ('text', 'json')
+    RESPONSE_SCHEMA: Optional[Dict[str, Any]] = None
+
+    # Estimacion de tokens de salida a partir de caracteres (ver get_metrics)
+    CHARS_PER_TOKEN = 4
+
+    # Entradas de historial que se conservan; contadores y percentiles de
+    # latencia cubren todas las llamadas (ver HistoryBuffer)
+    HISTORY_SIZE = 256
+
+    # Cuota que consumen las llamadas de _call_model: las Sefirot de Gemini
+    # comparten un RateLimiter (ver enable_rate_limiter); las demas no
+    LLM_PROVIDER = 'gemini'
+    # Salida que se reserva en el bucket TPM mientras no hay respuestas medidas
+    DEFAULT_OUTPUT_TOKENS = 1024
+
+    # Encabezados que pide el prompt; las Sefirot que los definen pueden
+    # entregar sus secciones en streaming (ver listen_sections)
+    SECTIONS: Optional[SectionTokenizer] = None
+
+    # Clave de config/tikun_config.yaml -> atributo que fija (ver configure)
+    CONFIG_ATTRIBUTES = {'temperature': 'temperature', 'max_output_tokens': 'max_output_tokens'}
+    # Atributo con el cliente del modelo (ver set_model)
+    LLM_CLIENT_ATTRIBUTE = 'client'
     
     def __init__(self, position: SefiraPosition):
         self.position = position
@@ -41,7 +154,38 @@ class SefiraBase(ABC):
         self.activation_count = 0
         self.total_processing_time = 0.0
         self.connected_sefirot: Dict[str, 'SefiraBase'] = {}
-        self.history: List[Dict[str, Any]] = []
+        self.history = HistoryBuffer(self.HISTORY_SIZE)
+
+        # Una misma instancia puede atender peticiones concurrentes (ver
+        # SefiraRegistry): este lock protege contadores e historial. Nunca se
+        # mantiene durante una llamada al LLM.
+        self._state_lock = threading.RLock()
+
+        # Cache de respuestas del LLM (ver enable_llm_cache)
+        self.llm_cache = None
+        self.llm_cache_hits = 0
+        self.llm_cache_misses = 0
+
+        # Proveedor del LLM (ver _connect_provider)
+        self.provider: Optional[LLMProvider] = None
+
+        # Limitador de cuota compartido (ver enable_rate_limiter)
+        self.rate_limiter = None
+        self.rate_limit_wait_seconds = 0.0
+
+        # Tokens y costo reportados por el SDK (ver _record_token_usage)
+        self.token_usage = empty_usage()
+
+        # Reintentos de las llamadas al LLM; el circuit breaker del modelo
+        # se conecta en la primera llamada (ver _call_resilience)
+        self.resilience = Resilience()
+
+        # Modo de salida (ver set_output_mode) y costo de cada modo
+        self.output_mode = 'text'
+        self.output_mode_stats: Dict[str, Dict[str, Any]] = {
+            mode: {'responses': 0, 'output_chars': 0, 'parse_seconds': 0.0, 'json_fallbacks': 0}
+            for mode in self.OUTPUT_MODES
+        }
         
         logger.info(f"Sefirá {self.name} inicializada en posición {position.value}")
     
@@ -52,6 +196,15 @@ class SefiraBase(ABC):
         Debe ser implementada por cada Sefirá específica.
         """
         pass
+
+    async def aprocess(self, input_data: Any) -> Any:
+        """
+        Version asincrona de process().
+
+        Las Sefirot con cliente LLM asincrono la sobrescriben (ver _adrive).
+        Por defecto ejecuta process() en un hilo para no bloquear el event loop.
+        """
+        return await asyncio.to_thread(self.process, input_data)
     
     @abstractmethod
     def validate_alignment(self) -> Dict[str, Any]:
@@ -61,6 +214,501 @@ class SefiraBase(ABC):
         """
         pass
     
+    def enable_llm_cache(self, cache) -> None:
+        """Activa una LLMCache para las llamadas de esta Sefira (None la desactiva)"""
+        self.llm_cache = cache
+
+    def enable_rate_limiter(self, limiter) -> None:
+        """Hace pasar cada llamada al LLM por un RateLimiter (None lo desactiva)"""
+        self.rate_limiter = limiter
+
+    def set_output_mode(self, mode: str) -> None:
+        """
+        Cambia el modo de salida del LLM.
+
+        'json' pasa RESPONSE_SCHEMA como response_schema de Gemini y carga la
+        respuesta directamente, sin parsers de texto.
+        """
+        if mode not in self.OUTPUT_MODES:
+            raise ValueError(f"output_mode debe ser uno de {self.OUTPUT_MODES}, no '{mode}'")
+        if mode == 'json' and self.RESPONSE_SCHEMA is None:
+            raise ValueError(f"{self.name} no define RESPONSE_SCHEMA: solo admite output_mode='text'")
+        self.output_mode = mode
+
+    def set_model(self, model: str) -> None:
+        """Cambia el modelo del LLM: cliente compartido del modelo y su circuit breaker"""
+        self.model_name = model
+        if getattr(self, self.LLM_CLIENT_ATTRIBUTE, None) is not None:
+            setattr(self, self.LLM_CLIENT_ATTRIBUTE, self.provider.lazy_client(model))
+        # El circuito es por modelo: se conecta al nuevo en la proxima llamada
+        self.resilience.breaker = None
+        logger.info(f"{self.name} ahora usa modelo: {model}")
+
+    def configure(self, settings: Dict[str, Any]) -> None:
+        """
+        Aplica la configuracion de la Sefira (ver core.config).
+
+        'model' llama a set_model; el resto de las claves de
+        CONFIG_ATTRIBUTES fija su atributo. Las claves ausentes vuelven al
+        valor del codigo (el que tenia la Sefira en su primer configure),
+        asi que quitar un override del YAML lo deshace al recargar. Con el
+        proveedor falso el modelo no cambia: sus respuestas no dependen de
+        el y su costo es cero.
+        """
+        defaults = self.__dict__.get('_config_defaults')
+        if defaults is None:
+            defaults = self._config_defaults = {
+                key: getattr(self, attribute, None) for key, attribute in self.CONFIG_ATTRIBUTES.items()
+            }
+            defaults['model'] = getattr(self, 'model_name', None)
+        settings = {**defaults, **{key: value for key, value in settings.items() if value is not None}}
+
+        model = settings['model']
+        if (
+            model and model != getattr(self, 'model_name', None) and self.provider is not None
+            and (self.provider.NAME == self.LLM_PROVIDER or self.provider.WRAPS_PROVIDER)
+        ):
+            self.set_model(model)
+        for key, attribute in self.CONFIG_ATTRIBUTES.items():
+            if settings.get(key) is not None:
+                setattr(self, attribute, settings[key])
+
+    def supports_streaming(self) -> bool:
+        """
+        True si las secciones de la respuesta pueden entregarse en streaming:
+        Sefirot de Gemini (_call_model sin sobrescribir) con SECTIONS, en modo texto.
+        """
+        return (
+            self.SECTIONS is not None
+            and type(self)._call_model is SefiraBase._call_model
+            and self.output_mode == 'text'
+        )
+
+    def _response_format(self) -> Dict[str, Any]:
+        """Argumentos extra de GenerationConfig para el modo de salida actual"""
+        if self.output_mode == 'json':
+            return {'response_mime_type': 'application/json', 'response_schema': self.RESPONSE_SCHEMA}
+        return {}
+
+    def _prompt_for_output_mode(self, prompt: str) -> str:
+        """Prompt final segun el modo de salida (en 'json' se pide solo el objeto)"""
+        if self.output_mode == 'json':
+            return prompt + JSON_INSTRUCTION
+        return prompt
+
+    def _parse_output(self, response: str, parse_text: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
+        """
+        Convierte la respuesta del LLM en el dict de secciones.
+
+        En modo 'json' la carga con el esquema (_parsed_from_json); si no es un
+        objeto JSON valido recurre a parse_text(response, *args), igual que en
+        modo 'text'. Registra tamano de salida y tiempo de parseo por modo.
+        """
+        mode = self.output_mode
+        start = time.perf_counter()
+
+        parsed = data = None
+        if mode == 'json':
+            data = load_json_object(response)
+            if data is not None:
+                parsed = self._parsed_from_json(coerce_to_schema(data, self.RESPONSE_SCHEMA), response)
+            else:
+                logger.warning(f"{self.name}: respuesta JSON invalida, usando parser de texto")
+        if parsed is None:
+            parsed = parse_text(response, *args)
+
+        elapsed = time.perf_counter() - start
+        with self._state_lock:
+            stats = self.output_mode_stats[mode]
+            stats['responses'] += 1
+            stats['output_chars'] += len(response or '')
+            stats['parse_seconds'] += elapsed
+            if mode == 'json' and data is None:
+                stats['json_fallbacks'] += 1
+        return parsed
+
+    def _parsed_from_json(self, data: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Resultado a partir del JSON ya ajustado a RESPONSE_SCHEMA; por defecto, tal cual"""
+        return data
+
+    def _output_mode_metrics(self) -> Dict[str, Any]:
+        """Promedios por modo y ahorro de 'json' frente a 'text' (si hay datos de ambos)"""
+        report: Dict[str, Any] = {'current': self.output_mode}
+        averages = {}
+        for mode, stats in self.output_mode_stats.items():
+            responses = stats['responses']
+            if not responses:
+                continue
+            averages[mode] = {
+                'responses': responses,
+                'avg_output_chars': stats['output_chars'] / responses,
+                'avg_output_tokens_est': stats['output_chars'] / responses / self.CHARS_PER_TOKEN,
+                'avg_parse_ms': stats['parse_seconds'] / responses * 1000,
+                'json_fallbacks': stats['json_fallbacks']
+            }
+        report.update(averages)
+
+        if 'text' in averages and 'json' in averages:
+            # Positivo = json ahorra frente a text
+            report['json_savings'] = {
+                'output_tokens_per_response': (
+                    averages['text']['avg_output_tokens_est'] - averages['json']['avg_output_tokens_est']
+                ),
+                'parse_ms_per_response': averages['text']['avg_parse_ms'] - averages['json']['avg_parse_ms']
+            }
+        return report
+
+    def _connect_provider(self, api_key: Optional[str] = None) -> Any:
+        """
+        Conecta la Sefira al proveedor compartido de su LLM_PROVIDER.
+
+        Fija self.provider y self.model_name (el modelo de la etapa, ver
+        LLMProvider.model_for) y retorna el cliente compartido de ese
+        modelo, o None si el proveedor no tiene credenciales. El cliente
+        (y el SDK) se construye en la primera llamada (ver LazyClient).
+        """
+        self.provider = get_provider(provider_name(self.LLM_PROVIDER), api_key, self.LLM_PROVIDER)
+        self.model_name = self.provider.model_for(self.name.lower())
+        if not self.provider.available():
+            return None
+        return self.provider.lazy_client(self.model_name)
+
+    def _llm_cache_params(self) -> Tuple[str, Any, Any]:
+        """(modelo, temperatura, max_output_tokens) que forman parte de la clave de cache"""
+        return (
+            getattr(self, 'model_name', 'gemini-2.0-flash-exp'),
+            getattr(self, 'temperature', None),
+            getattr(self, 'max_output_tokens', None)
+        )
+
+    def _cache_lookup(self, prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """Retorna (clave, respuesta cacheada); clave None si la cache esta desactivada"""
+        if self.llm_cache is None:
+            return None, None
+
+        key = self.llm_cache.make_key(*self._llm_cache_params(), prompt)
+        return key, self._count_cache_lookup(self.llm_cache.get(key))
+
+    async def _acache_lookup(self, prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """_cache_lookup() sin bloquear el event loop con el nivel de disco (LLMCache.aget)"""
+        if self.llm_cache is None:
+            return None, None
+
+        key = self.llm_cache.make_key(*self._llm_cache_params(), prompt)
+        return key, self._count_cache_lookup(await self.llm_cache.aget(key))
+
+    def _count_cache_lookup(self, cached: Optional[str]) -> Optional[str]:
+        with self._state_lock:
+            if cached is None:
+                self.llm_cache_misses += 1
+            else:
+                self.llm_cache_hits += 1
+        return cached
+
+    def _call_model(self, prompt: str) -> str:
+        """Llamada directa al proveedor. Las Sefirot de Gemini implementan _call_gemini"""
+        return self._call_gemini(prompt)
+
+    async def _acall_model(self, prompt: str) -> str:
+        """Version asincrona de _call_model(). Las Sefirot de Gemini implementan _acall_gemini"""
+        return await self._acall_gemini(prompt)
+
+    def _call_llm(self, prompt: str) -> str:
+        """Llamada bloqueante al LLM, pasando por la cache si esta activada"""
+        with span('llm', 'llm', sefira=self.name) as llm_span:
+            prompt = self._prompt_for_output_mode(prompt)
+            listener = self._active_section_listener()
+            key, cached = self._cache_lookup(prompt)
+            if cached is not None:
+                _record_llm_usage(cached=True)
+                self._trace_llm(llm_span, prompt, cached, cached=True)
+                if listener is not None:
+                    self._emit_sections(listener, [cached])
+                return cached
+
+            def attempt() -> str:
+                ticket = self.rate_limiter.acquire(self._quota_tokens(prompt)) if self.rate_limiter else None
+                self._trace_attempt(llm_span, ticket)
+                _record_llm_usage(prompt=prompt)
+                response = None
+                try:
+                    if listener is not None:
+                        response = self._emit_sections(listener, self._call_gemini(prompt, stream=True))
+                    else:
+                        response = self._call_model(prompt)
+                finally:
+                    self._release_quota(ticket, prompt, response)
+                return response
+
+            response = self._call_resilience().call(attempt)
+            _record_llm_usage(response=response or '')
+            self._trace_llm(llm_span, prompt, response)
+            if key is not None and response:
+                self.llm_cache.put(key, response)
+            return response
+
+    async def _acall_llm(self, prompt: str) -> str:
+        """Llamada asincrona al LLM, pasando por la cache si esta activada"""
+        with span('llm', 'llm', sefira=self.name) as llm_span:
+            prompt = self._prompt_for_output_mode(prompt)
+            listener = self._active_section_listener()
+            key, cached = await self._acache_lookup(prompt)
+            if cached is not None:
+                _record_llm_usage(cached=True)
+                self._trace_llm(llm_span, prompt, cached, cached=True)
+                if listener is not None:
+                    self._emit_sections(listener, [cached])
+                return cached
+
+            async def attempt() -> str:
+                ticket = await self.rate_limiter.aacquire(self._quota_tokens(prompt)) if self.rate_limiter else None
+                self._trace_attempt(llm_span, ticket)
+                _record_llm_usage(prompt=prompt)
+                response = None
+                try:
+                    if listener is not None:
+                        response = await self._aemit_sections(listener, await self._acall_gemini(prompt, stream=True))
+                    else:
+                        response = await self._acall_model(prompt)
+                finally:
+                    self._release_quota(ticket, prompt, response)
+                return response
+
+            response = await self._call_resilience().acall(attempt)
+            _record_llm_usage(response=response or '')
+            self._trace_llm(llm_span, prompt, response)
+            if key is not None and response:
+                await self.llm_cache.aput(key, response)
+            return response
+
+    def _trace_llm(self, llm_span: Optional[Span], prompt: str, response: Optional[str], cached: bool = False) -> None:
+        """Atributos del span 'llm' de la llamada (nada si las trazas estan apagadas)"""
+        if llm_span is None:
+            return
+        llm_span.set(
+            provider=self.provider.NAME if self.provider else self.LLM_PROVIDER,
+            model=self._llm_cache_params()[0],
+            cached=cached,
+            streaming=self._active_section_listener() is not None,
+            prompt_chars=len(prompt),
+            output_chars=len(response or '')
+        )
+
+    @staticmethod
+    def _trace_attempt(llm_span: Optional[Span], ticket: Optional[RateTicket]) -> None:
+        """Cuenta intentos y espera de cuota en el span 'llm'"""
+        if llm_span is None:
+            return
+        llm_span.attrs['attempts'] = llm_span.attrs.get('attempts', 0) + 1
+        if ticket is not None:
+            llm_span.attrs['quota_wait'] = llm_span.attrs.get('quota_wait', 0.0) + ticket.waited
+
+    def _call_resilience(self) -> Resilience:
+        """
+        Resilience de las llamadas al LLM, con el circuito compartido del
+        modelo ('proveedor:modelo', ver resilience.get_circuit_breaker).
+        """
+        if self.resilience.breaker is None:
+            self.resilience.breaker = get_circuit_breaker(
+                f"{self.LLM_PROVIDER}:{self._llm_cache_params()[0]}"
+            )
+        return self.resilience
+
+    def _quota_tokens(self, prompt: str) -> int:
+        """
+        Tokens a reservar en el bucket TPM: prompt + salida esperada.
+
+        La salida esperada es el promedio medido en el modo actual; sin
+        mediciones, DEFAULT_OUTPUT_TOKENS (acotado por max_output_tokens).
+        """
+        stats = self.output_mode_stats[self.output_mode]
+        if stats['responses']:
+            expected = stats['output_chars'] / stats['responses'] / self.CHARS_PER_TOKEN
+        else:
+            expected = min(self.DEFAULT_OUTPUT_TOKENS, getattr(self, 'max_output_tokens', None) or self.DEFAULT_OUTPUT_TOKENS)
+        return int(len(prompt) / self.CHARS_PER_TOKEN + expected)
+
+    def _release_quota(self, ticket: Optional[RateTicket], prompt: str, response: Optional[str]) -> None:
+        """Devuelve la reserva con los tokens usados (solo el prompt si la llamada fallo)"""
+        if ticket is None:
+            return
+        self.rate_limiter.release(ticket, int((len(prompt) + len(response or '')) / self.CHARS_PER_TOKEN))
+        with self._state_lock:
+            self.rate_limit_wait_seconds += ticket.waited
+
+    def _active_section_listener(self) -> Optional[SectionListener]:
+        """Receptor de listen_sections() si esta Sefira puede hacer streaming"""
+        listener = _section_listener.get()
+        return listener if listener is not None and self.supports_streaming() else None
+
+    def _emit_sections(self, listener: SectionListener, chunks: Iterable[str]) -> str:
+        """
+        Pasa los fragmentos por SECTIONS.stream() avisando cada seccion completa.
+
+        Si la respuesta se corta despues de entregar alguna seccion, el error
+        sale como PartialStreamError: reintentar repetiria secciones que el
+        receptor ya uso.
+        """
+        stream = self.SECTIONS.stream()
+        try:
+            for chunk in chunks:
+                self._notify_sections(listener, stream, stream.feed(chunk))
+        except Exception as e:
+            if stream.sections:
+                raise PartialStreamError(f"Streaming interrumpido tras {len(stream.sections)} secciones: {e}") from e
+            raise
+        self._notify_sections(listener, stream, stream.close())
+        return stream.text
+
+    async def _aemit_sections(self, listener: SectionListener, chunks: AsyncIterator[str]) -> str:
+        """Version asincrona de _emit_sections()"""
+        stream = self.SECTIONS.stream()
+        try:
+            async for chunk in chunks:
+                self._notify_sections(listener, stream, stream.feed(chunk))
+        except Exception as e:
+            if stream.sections:
+                raise PartialStreamError(f"Streaming interrumpido tras {len(stream.sections)} secciones: {e}") from e
+            raise
+        self._notify_sections(listener, stream, stream.close())
+        return stream.text
+
+    @staticmethod
+    def _notify_sections(listener: SectionListener, stream: SectionStream, sections: List[Section]) -> None:
+        # Un encabezado repetido reenvia la clave con sus lineas acumuladas
+        for section in sections:
+            listener(section.key, stream.value(section.key))
+
+    def _iter_chunk_text(self, response: Iterable[Any]) -> Iterator[str]:
+        """Texto de cada fragmento de generate_content(stream=True); el ultimo trae el uso"""
+        final = None
+        for chunk in response:
+            if getattr(chunk, 'usage_metadata', None) is not None:
+                final = chunk
+            try:
+                text = chunk.text
+            except ValueError:
+                # Fragmento sin partes de texto (p.ej. solo finish_reason)
+                continue
+            if text:
+                yield text
+        self._record_token_usage(final)
+
+    async def _aiter_chunk_text(self, response: AsyncIterator[Any]) -> AsyncIterator[str]:
+        """Texto de cada fragmento de generate_content_async(stream=True)"""
+        final = None
+        async for chunk in response:
+            if getattr(chunk, 'usage_metadata', None) is not None:
+                final = chunk
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                yield text
+        self._record_token_usage(final)
+
+    def _record_token_usage(self, response: Any) -> None:
+        """
+        Suma los tokens que reporta el SDK en una respuesta (ver usage.token_usage).
+
+        Van a la Sefira (get_metrics), al nodo de la corrida en curso
+        (track_llm_usage) y al span 'llm' si hay trazas. Las respuestas sin
+        uso reportado (mocks, SDK viejos) no suman nada.
+        """
+        usage = token_usage(response) if response is not None else None
+        if usage is None:
+            return
+        model = self._llm_cache_params()[0]
+        usage['cost_usd'] = estimate_cost(model, usage)
+        with self._state_lock:
+            add_usage(self.token_usage, usage)
+
+        counters = _llm_usage.get()
+        if counters is not None:
+            for key in TOKEN_KEYS:
+                counters[key] += usage[key]
+            counters['cost_usd'] += usage['cost_usd'] or 0.0
+
+        llm_span = current_span()
+        if llm_span is not None and llm_span.category == 'llm':
+            llm_span.set(**usage)
+
+    def _drive(self, steps: SefiraSteps) -> Any:
+        """
+        Ejecuta un cuerpo SefiraSteps con llamadas bloqueantes al LLM.
+
+        Los errores de la llamada se lanzan dentro del generador, de modo que
+        el manejo de errores de cada Sefira se aplica igual que antes.
+        Los pasos del generador (que actualizan metricas) corren con
+        _state_lock; la llamada al LLM corre sin el. Con trazas activas cada
+        paso local es un span 'cpu' (build_prompt / parse_response). La
+        duracion y el resultado quedan en el historial (ver _record_run).
+        """
+        start = time.time()
+        try:
+            with span('build_prompt'), self._state_lock:
+                prompt = next(steps)
+            while True:
+                try:
+                    response = self._call_llm(prompt)
+                except Exception as e:
+                    with span('handle_error'), self._state_lock:
+                        prompt = steps.throw(e)
+                else:
+                    with span('parse_response'), self._state_lock:
+                        prompt = steps.send(response)
+        except StopIteration as stop:
+            self._record_run(start, stop.value)
+            return stop.value
+        except Exception as e:
+            self._record_run(start, error=e)
+            raise
+
+    async def _adrive(self, steps: SefiraSteps) -> Any:
+        """Igual que _drive(), pero esperando al cliente LLM asincrono"""
+        start = time.time()
+        try:
+            with span('build_prompt'), self._state_lock:
+                prompt = next(steps)
+            while True:
+                try:
+                    response = await self._acall_llm(prompt)
+                except Exception as e:
+                    with span('handle_error'), self._state_lock:
+                        prompt = steps.throw(e)
+                else:
+                    with span('parse_response'), self._state_lock:
+                        prompt = steps.send(response)
+        except StopIteration as stop:
+            self._record_run(start, stop.value)
+            return stop.value
+        except Exception as e:
+            self._record_run(start, error=e)
+            raise
+
+    def _record_run(self, start: float, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """
+        Agrega una ejecucion al historial (latencia y exito de get_metrics()).
+
+        Un resultado con processing_successful=False (las Sefirot devuelven
+        el error en vez de lanzarlo) cuenta como error.
+        """
+        entry: Dict[str, Any] = {
+            "timestamp": time.time(),
+            "processing_time": time.time() - start,
+            "success": error is None
+        }
+        if error is not None:
+            entry["error"] = str(error)
+        else:
+            entry["output_type"] = type(result).__name__
+            if isinstance(result, dict) and result.get('processing_successful') is False:
+                entry["success"] = False
+                entry["error"] = result.get('error')
+        with self._state_lock:
+            self.history.append(entry)
+
     def connect_to(self, other_sefira: 'SefiraBase', channel_name: str):
         """Establece canal de comunicación con otra Sefirá"""
         self.connected_sefirot[channel_name] = other_sefira
@@ -79,38 +727,27 @@ class SefiraBase(ABC):
     def execute_with_tracking(self, input_data: Any) -> Any:
         """
         Ejecuta process() con tracking de métricas.
-        Usado internamente para mantener estadísticas.
+
+        Las Sefirot registran cada ejecucion en el historial (_drive o
+        _record_run); aqui solo se registra si process() no lo hizo.
         """
         start_time = time.time()
-        
+        recorded = self.history.total
+
         try:
             result = self.process(input_data)
-            self.activation_count += 1
-            elapsed = time.time() - start_time
-            self.total_processing_time += elapsed
-            
-            # Guardar en historial
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": type(result).__name__,
-                "processing_time": elapsed,
-                "success": True
-            })
-            
-            return result
-            
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
+            if self.history.total == recorded:
+                self._record_run(start_time, error=e)
             logger.error(f"Error en {self.name}: {e}")
             raise
+
+        with self._state_lock:
+            self.activation_count += 1
+            self.total_processing_time += time.time() - start_time
+        if self.history.total == recorded:
+            self._record_run(start_time, result)
+        return result
     
     def get_metrics(self) -> Dict[str, Any]:
         """Retorna métricas de desempeño de la Sefirá"""
@@ -119,26 +756,44 @@ class SefiraBase(ABC):
             if self.activation_count > 0 
             else 0
         )
+
+        with self._state_lock:
+            history = self.history.stats()
         
-        successful_activations = sum(
-            1 for h in self.history if h.get("success", False)
-        )
-        
-        success_rate = (
-            successful_activations / len(self.history) 
-            if self.history 
-            else 0
-        )
-        
-        return {
+        metrics = {
             "sefira": self.name,
             "position": self.position.value,
             "activations": self.activation_count,
             "total_processing_time": self.total_processing_time,
             "average_processing_time": avg_time,
-            "success_rate": success_rate,
+            "success_rate": history["success_rate"],
+            "errors": history["errors"],
+            "latency": {key: history["latency"][key] for key in ("p50", "p95", "p99", "max")},
             "connected_channels": list(self.connected_sefirot.keys())
         }
+
+        if self.llm_cache is not None:
+            metrics["llm_cache"] = {
+                "hits": self.llm_cache_hits,
+                "misses": self.llm_cache_misses,
+                "shared": self.llm_cache.stats()
+            }
+
+        metrics["resilience"] = self.resilience.snapshot()
+
+        with self._state_lock:
+            metrics["tokens"] = dict(self.token_usage)
+
+        if self.rate_limiter is not None:
+            metrics["rate_limiter"] = {
+                "wait_seconds": self.rate_limit_wait_seconds,
+                "shared": self.rate_limiter.stats()
+            }
+
+        if any(stats['responses'] for stats in self.output_mode_stats.values()):
+            metrics["output_modes"] = self._output_mode_metrics()
+
+        return metrics
     
     def __repr__(self) -> str:
         return f"<Sefirá {self.name} (Posición {self.position.value})>"
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Salida estructurada (JSON) para las Sefirot con Gemini.
+
+En modo texto cada Sefira pide encabezados ('OPORTUNIDADES DE DAR:') y los
+reconstruye con SectionTokenizer. En modo 'json' (SefiraBase.set_output_mode)
+se pasa a Gemini un response_schema con las mismas secciones y la respuesta
+se carga directamente en el dict de resultado:
+
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS, list_sections=LIST_SECTIONS)
+
+El esquema usa el subconjunto de OpenAPI que acepta GenerationConfig
+(type/properties/items/required).
+
+Requiere google-generativeai 0.8.x (la version fijada en
+firebase-web/functions/requirements.txt): los SDK antiguos como 0.3.x no
+aceptan response_mime_type ni response_schema en GenerationConfig. Con
+uno de esos, SefiraRegistry deja las Sefirot en modo texto (ver
+LLMProvider.supports_json_output).
+"""
+
+from typing import Any, Dict, Iterable, Optional
+import json
+import re
+
+from .section_tokenizer import SectionTokenizer
+
+
+# Se agrega al prompt en modo JSON: el prompt sigue describiendo las secciones,
+# el esquema fija las claves. Tambien separa las entradas de cache de ambos modos.
+JSON_INSTRUCTION = (
+    "\n\nFORMATO DE SALIDA: responde solo con un objeto JSON que siga el esquema "
+    "indicado. Cada seccion pedida arriba es una clave; las listas son arrays "
+    "de strings sin guiones."
+)
+
+STRING_SCHEMA = {'type': 'string'}
+STRING_LIST_SCHEMA = {'type': 'array', 'items': {'type': 'string'}}
+
+_CODE_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def schema_from_sections(
+    sections: SectionTokenizer,
+    list_sections: Iterable[str] = (),
+    overrides: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Esquema JSON con una propiedad por seccion del tokenizador.
+
+    Las secciones de list_sections son arrays de strings, las demas strings;
+    overrides reemplaza el esquema de una seccion concreta.
+    """
+    list_sections = set(list_sections)
+    overrides = overrides or {}
+    properties = {}
+    for key in sections.keys():
+        if key in overrides:
+            properties[key] = overrides[key]
+        elif key in list_sections:
+            properties[key] = STRING_LIST_SCHEMA
+        else:
+            properties[key] = STRING_SCHEMA
+    return {'type': 'object', 'properties': properties, 'required': list(properties)}
+
+
+def load_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Objeto JSON de la respuesta (tolera bloques ```json); None si no lo es"""
+    cleaned = (text or '').strip()
+    if cleaned.startswith('```'):
+        cleaned = _CODE_FENCE.sub('', cleaned)
+    try:
+        data = json.loads(cleaned)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def coerce_to_schema(value: Any, schema: Dict[str, Any]) -> Any:
+    """
+    Ajusta un valor JSON al esquema, con el vacio del tipo si falta o no encaja.
+
+    Asi el resultado tiene la misma forma que el del parser de texto: todas
+    las claves presentes, listas de strings sin items vacios y strings sin
+    espacios a los lados.
+    """
+    kind = schema.get('type')
+    if kind == 'object':
+        value = value if isinstance(value, dict) else {}
+        return {
+            key: coerce_to_schema(value.get(key), sub_schema)
+            for key, sub_schema in schema.get('properties', {}).items()
+        }
+    if kind == 'array':
+        if isinstance(value, str):
+            value = value.split('\n')
+        if not isinstance(value, list):
+            return []
+        item_schema = schema.get('items', STRING_SCHEMA)
+        items = [coerce_to_schema(item, item_schema) for item in value]
+        if item_schema.get('type') == 'string':
+            # Igual que los parsers de texto: sin vinetas al inicio
+            items = [item.lstrip('-* ').strip() for item in items]
+        return [item for item in items if item not in ('', {}, [])]
+    if value is None or isinstance(value, (dict, list)):
+        return ''
+    return str(value).strip()
@@ -0,0 +1,360 @@
+"""
+Trazas por peticion: spans de la ejecucion, de cada Sefira y de cada llamada al LLM.
+
+Una corrida lenta no decia donde se iban sus segundos: armando el prompt,
+esperando a Gemini o parseando y puntuando la respuesta. Cada span guarda
+inicio y fin monotonic (perf_counter_ns), su padre y atributos:
+
+    run            TikunEngine.arun (una traza por accion)
+    sefira         un nodo del Arbol (o process_sefira)
+    llm            _call_llm/_acall_llm: cache, cuota, reintentos y modelo
+    cpu            pasos locales de _drive/_adrive (build_prompt,
+                   parse_response) con su tiempo de CPU del hilo
+
+Al cerrar, un span 'sefira' separa su duracion en llm_wait (suma de sus
+spans 'llm') y local (el resto: prompt, parsing, scoring, planificacion).
+
+El span actual vive en un ContextVar, igual que track_llm_usage: las tareas
+asyncio y los hilos de asyncio.to_thread heredan el de quien los creo.
+Sin sinks registrados span() no crea nada (un solo if).
+
+Sinks:
+    JsonlSink      un span por linea, al cerrarse
+    ChromeTraceSink  formato trace-event de Chrome (chrome://tracing,
+                   Perfetto, speedscope): cada Sefira en su propia pista
+    MemorySink     en memoria (tests, chrome_trace() de una corrida)
+
+Uso:
+    add_sink(ChromeTraceSink('run.trace.json'))   # o TIKUN_TRACE_CHROME=run.trace.json
+    TikunEngine().run('...')
+    with span('binah', 'sefira', model='gemini-2.0-flash-exp') as s:
+        ...
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+
+CATEGORIES = ('run', 'sefira', 'llm', 'cpu')
+
+
+class Span:
+    """
+    Un intervalo de la traza. Usar con 'with'; el cierre lo envia a los sinks.
+
+    Args:
+        name: Nombre (p.ej. 'binah', 'llm', 'parse_response')
+        category: Una de CATEGORIES
+        attrs: Atributos libres (modelo, caracteres, error...)
+    """
+
+    __slots__ = (
+        'name', 'category', 'attrs', 'trace_id', 'span_id', 'parent', 'parent_id', 'lane',
+        'start_ns', 'end_ns', 'timestamp', 'thread', 'llm_wait_ns', '_cpu_start', '_token'
+    )
+
+    def __init__(self, name: str, category: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.parent: Optional['Span'] = None
+        self.parent_id: Optional[str] = None
+        self.trace_id = None
+        self.lane = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start_ns = self.end_ns = 0
+        self.timestamp = 0.0
+        self.thread = 0
+        self.llm_wait_ns = 0
+        self._cpu_start = None
+        self._token = None
+
+    def __enter__(self) -> 'Span':
+        self.parent = _current_span.get()
+        if self.parent is not None:
+            self.trace_id = self.parent.trace_id
+            self.parent_id = self.parent.span_id
+            # Pista del visor: la de la Sefira (o corrida) que lo contiene
+            if self.category not in ('sefira', 'run'):
+                self.lane = self.parent.lane
+        else:
+            self.trace_id = uuid.uuid4().hex[:16]
+        self.timestamp = time.time()
+        self.thread = threading.get_ident()
+        if self.category == 'cpu':
+            self._cpu_start = time.thread_time_ns()
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        # StopIteration es el fin normal de un paso de SefiraSteps
+        if exc_type is not None and not issubclass(exc_type, StopIteration):
+            self.attrs['error'] = f"{exc_type.__name__}: {exc}"
+        if self._cpu_start is not None:
+            self.attrs['cpu'] = (time.thread_time_ns() - self._cpu_start) / 1e9
+        if self.category == 'llm':
+            self._add_llm_wait(self.end_ns - self.start_ns)
+        if self.category == 'sefira':
+            self.attrs['llm_wait'] = self.llm_wait_ns / 1e9
+            self.attrs['local'] = (self.end_ns - self.start_ns - self.llm_wait_ns) / 1e9
+        _tracer.emit(self)
+        # Sin referencia al padre: los spans emitidos no retienen la traza
+        self.parent = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'lane': self.lane,
+            'name': self.name,
+            'category': self.category,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration': self.duration,
+            'timestamp': self.timestamp,
+            'thread': self.thread,
+            'attrs': self.attrs
+        }
+
+    def _add_llm_wait(self, elapsed_ns: int) -> None:
+        # Hasta la Sefira que hizo la llamada (no hasta la corrida: sus
+        # Sefirot esperan en paralelo y la suma no seria tiempo de reloj)
+        parent = self.parent
+        while parent is not None and parent.category not in ('sefira', 'run'):
+            parent = parent.parent
+        if parent is not None and parent.category == 'sefira':
+            parent.llm_wait_ns += elapsed_ns
+
+
+class _NoSpan:
+    """span() sin sinks: mismo uso, sin costo"""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar('trace_span', default=None)
+
+
+def span(name: str, category: str = 'cpu', **attrs: Any):
+    """Context manager de un span hijo del actual (o raiz); None si no hay sinks"""
+    if not _tracer.sinks:
+        return _NO_SPAN
+    return Span(name, category, attrs)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# =============================================================================
+# Sinks
+# =============================================================================
+
+class JsonlSink:
+    """Un span por linea (to_dict()), escrito al cerrarse"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class MemorySink:
+    """Guarda los spans cerrados en 'spans' (hasta 'limit', los mas nuevos)"""
+
+    def __init__(self, limit: int = 100000):
+        self.limit = limit
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def write(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            if len(self.spans) > self.limit:
+                del self.spans[:len(self.spans) - self.limit]
+
+    def trace(self, trace_id: str) -> List[Span]:
+        with self._lock:
+            return [s for s in self.spans if s.trace_id == trace_id]
+
+    def close(self) -> None:
+        pass
+
+
+class ChromeTraceSink:
+    """
+    Escribe eventos trace-event de Chrome a medida que cierran los spans.
+
+    Usa el formato de arreglo JSON sin el ']' final, que los visores
+    aceptan aunque el proceso termine sin cerrar el archivo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('[\n')
+        self._lanes = _Lanes()
+        self._lock = threading.Lock()
+
+    def write(self, span: Span) -> None:
+        with self._lock:
+            for event in self._lanes.events(span):
+                self._file.write(json.dumps(event, default=str) + ',\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.write(']\n')
+            self._file.close()
+
+
+class _Lanes:
+    """
+    Pista (tid) de cada span en el trace-event.
+
+    Las Sefirot de una corrida se solapan en el mismo hilo del event loop;
+    para que el visor las anide bien cada Sefira tiene su pista por traza
+    (Span.lane) y sus spans hijos van en la de ella.
+    """
+
+    def __init__(self):
+        self.tids: Dict[tuple, int] = {}
+
+    def events(self, span: Span) -> List[Dict[str, Any]]:
+        events = []
+        lane = (span.trace_id, span.lane)
+        tid = self.tids.get(lane)
+        if tid is None:
+            tid = self.tids[lane] = len(self.tids) + 1
+            events.append({
+                'ph': 'M', 'name': 'thread_name', 'pid': os.getpid(), 'tid': tid,
+                'args': {'name': f"{span.trace_id[:8]} {span.lane}"}
+            })
+        events.append({
+            'ph': 'X',
+            'name': span.name,
+            'cat': span.category,
+            'pid': os.getpid(),
+            'tid': tid,
+            'ts': span.start_ns / 1e3,
+            'dur': (span.end_ns - span.start_ns) / 1e3,
+            'args': {**span.attrs, 'span_id': span.span_id, 'parent_id': span.parent_id}
+        })
+        return events
+
+
+def chrome_trace(spans: Iterable[Any]) -> Dict[str, Any]:
+    """Documento trace-event de Chrome para spans (Span o dicts de JsonlSink)"""
+    lanes = _Lanes()
+    events = []
+    for s in spans:
+        events.extend(lanes.events(s if isinstance(s, Span) else _span_from_dict(s)))
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def jsonl_to_chrome(jsonl_path: str, output_path: str, trace_id: Optional[str] = None) -> int:
+    """Convierte un archivo de JsonlSink (o una de sus trazas) a trace-event; retorna cuantos spans"""
+    with open(jsonl_path, encoding='utf-8') as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if trace_id is not None:
+        spans = [s for s in spans if s['trace_id'] == trace_id]
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(spans), f, default=str)
+    return len(spans)
+
+
+def _span_from_dict(data: Dict[str, Any]) -> Span:
+    s = Span(data['name'], data['category'], dict(data.get('attrs') or {}))
+    s.trace_id = data['trace_id']
+    s.span_id = data['span_id']
+    s.parent_id = data.get('parent_id')
+    s.lane = data.get('lane', s.name)
+    s.start_ns = data['start_ns']
+    s.end_ns = data['end_ns']
+    s.timestamp = data.get('timestamp', 0.0)
+    s.thread = data.get('thread', 0)
+    return s
+
+
+# =============================================================================
+# Tracer del proceso
+# =============================================================================
+
+class Tracer:
+    """Sinks del proceso; TIKUN_TRACE (JSONL) y TIKUN_TRACE_CHROME los agregan al importar"""
+
+    def __init__(self):
+        self.sinks: List[Any] = []
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: Any) -> Any:
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink: Any) -> None:
+        with self._lock:
+            self.sinks = [s for s in self.sinks if s is not sink]
+
+    def emit(self, span: Span) -> None:
+        for sink in self.sinks:
+            try:
+                sink.write(span)
+            except Exception as e:
+                # Una traza que falla no debe tumbar la peticion
+                logger.warning(f"Sink de trazas {type(sink).__name__} fallo: {e}")
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def add_sink(sink: Any) -> Any:
+    """Registra un sink en el tracer del proceso (activa las trazas)"""
+    return _tracer.add_sink(sink)
+
+
+def remove_sink(sink: Any) -> None:
+    _tracer.remove_sink(sink)
+
+
+if os.getenv('TIKUN_TRACE'):
+    add_sink(JsonlSink(os.environ['TIKUN_TRACE']))
+if os.getenv('TIKUN_TRACE_CHROME'):
+    add_sink(ChromeTraceSink(os.environ['TIKUN_TRACE_CHROME']))
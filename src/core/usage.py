@@ -0,0 +1,165 @@
+"""
+Tokens y costo de las llamadas al LLM.
+
+Ningun _call_gemini leia usage_metadata ni Chochmah response.usage: el uso
+se estimaba con caracteres. Aqui:
+
+1. token_usage(): los tokens que reporta el SDK, con la misma forma para
+   Gemini (usage_metadata) y Anthropic (usage):
+   {'prompt_tokens', 'output_tokens', 'cached_tokens'}. prompt_tokens
+   incluye los cacheados (en Anthropic se suman input y cache).
+2. estimate_cost(): USD segun PRICES (precios de lista por millon de
+   tokens; el prefijo mas largo del nombre del modelo gana).
+3. UsageLedger: tokens y costo acumulados por usuario (req.auth.uid) en
+   la instancia, acotado a los 'max_users' usados mas recientemente.
+
+SefiraBase._record_token_usage() suma cada respuesta a la Sefira
+(get_metrics()['tokens']), al nodo de la corrida (track_llm_usage, ver
+TikunEngine 'llm_usage' y 'tokens') y al span 'llm' si hay trazas.
+
+usage_metadata requiere google-generativeai 0.8.x (la version fijada en
+firebase-web/functions/requirements.txt); con un SDK sin ese atributo
+las respuestas no reportan uso y los totales quedan en 0.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+# Modelo (prefijo) -> USD por millon de tokens: (entrada, salida, entrada cacheada)
+PRICES: Dict[str, tuple] = {
+    'gemini-2.5-pro': (1.25, 10.00, 0.31),
+    'gemini-2.5-flash': (0.30, 2.50, 0.075),
+    'gemini-2.0-flash': (0.10, 0.40, 0.025),
+    'gemini-1.5-pro': (1.25, 5.00, 0.3125),
+    'gemini-1.5-flash': (0.075, 0.30, 0.01875),
+    'claude-opus-4': (15.00, 75.00, 1.50),
+    'claude-sonnet-4': (3.00, 15.00, 0.30),
+    'claude-haiku-4': (1.00, 5.00, 0.10),
+    'claude-3-5-sonnet': (3.00, 15.00, 0.30),
+    'claude-3-5-haiku': (0.80, 4.00, 0.08),
+    'fake': (0.0, 0.0, 0.0)
+}
+
+TOKEN_KEYS = ('prompt_tokens', 'output_tokens', 'cached_tokens')
+
+
+def empty_usage() -> Dict[str, Any]:
+    """Contadores en cero: llamadas con uso reportado, tokens y costo"""
+    return {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0, 'cached_tokens': 0, 'cost_usd': 0.0}
+
+
+def token_usage(response: Any) -> Optional[Dict[str, int]]:
+    """Tokens de una respuesta o fragmento final; None si el SDK no los reporto"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is not None:
+        usage = {
+            'prompt_tokens': _count(metadata, 'prompt_token_count'),
+            # Los tokens de razonamiento (modelos 2.5) se facturan como salida
+            'output_tokens': _count(metadata, 'candidates_token_count') + _count(metadata, 'thoughts_token_count'),
+            'cached_tokens': _count(metadata, 'cached_content_token_count')
+        }
+    else:
+        metadata = getattr(response, 'usage', None)
+        if metadata is None:
+            return None
+        cached = _count(metadata, 'cache_read_input_tokens')
+        usage = {
+            'prompt_tokens': _count(metadata, 'input_tokens') + cached
+            + _count(metadata, 'cache_creation_input_tokens'),
+            'output_tokens': _count(metadata, 'output_tokens'),
+            'cached_tokens': cached
+        }
+    return usage if usage['prompt_tokens'] or usage['output_tokens'] else None
+
+
+def estimate_cost(model: Optional[str], usage: Dict[str, int]) -> Optional[float]:
+    """USD de una llamada segun PRICES; None si el modelo no tiene precio"""
+    prices = price_for(model)
+    if prices is None:
+        return None
+    input_price, output_price, cached_price = prices
+    fresh = usage['prompt_tokens'] - usage['cached_tokens']
+    return (fresh * input_price + usage['cached_tokens'] * cached_price + usage['output_tokens'] * output_price) / 1e6
+
+
+def price_for(model: Optional[str]) -> Optional[tuple]:
+    if not model:
+        return None
+    matches = [prefix for prefix in PRICES if model.startswith(prefix)]
+    return PRICES[max(matches, key=len)] if matches else None
+
+
+def add_usage(totals: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Suma usage (tokens, y calls/cost_usd si los trae) a totals, en el lugar"""
+    for key in TOKEN_KEYS:
+        totals[key] += usage.get(key, 0)
+    totals['calls'] += usage.get('calls', 1)
+    totals['cost_usd'] += usage.get('cost_usd') or 0.0
+    return totals
+
+
+def _count(metadata: Any, name: str) -> int:
+    value = getattr(metadata, name, 0)
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+class UsageLedger:
+    """
+    Uso acumulado por usuario en esta instancia.
+
+    Args:
+        max_users: Usuarios que se conservan (se olvida el menos reciente)
+    """
+
+    ANONYMOUS = 'anonymous'
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._users: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, uid: Optional[str], usage: Dict[str, Any]) -> Dict[str, Any]:
+        """Suma el uso de una peticion al usuario y retorna su total"""
+        uid = uid or self.ANONYMOUS
+        with self._lock:
+            totals = self._users.pop(uid, None) or {**empty_usage(), 'requests': 0}
+            add_usage(totals, usage)
+            totals['requests'] += 1
+            self._users[uid] = totals
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            return dict(totals)
+
+    def user(self, uid: Optional[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            totals = self._users.get(uid or self.ANONYMOUS)
+            return dict(totals) if totals is not None else None
+
+    def top(self, n: int = 10, key: str = 'cost_usd') -> list:
+        """Los n usuarios con mas 'key' (cost_usd, prompt_tokens...)"""
+        with self._lock:
+            ranked = sorted(self._users.items(), key=lambda item: item[1][key], reverse=True)
+            return [{'uid': uid, **totals} for uid, totals in ranked[:n]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = empty_usage()
+            for usage in self._users.values():
+                add_usage(totals, usage)
+            return {'users': len(self._users), **totals}
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """UsageLedger compartido por el proceso"""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = UsageLedger()
+    return _ledger
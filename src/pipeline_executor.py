@@ -0,0 +1,328 @@
+"""
+PIPELINE EXECUTOR - Lotes grandes con el Arbol como linea de produccion
+
+TikunEngine.arun_batch() ejecuta cada accion como un DAG completo: mientras
+Chesed trabaja en la accion i, Binah espera aunque la accion i+1 ya este
+lista para ella. Aqui cada Sefira es una etapa con su propia cola de
+trabajo y su propio pool de workers, y cada arista del grafo es un canal
+(asyncio.Queue) por el que la etapa de arriba entrega la accion a la de
+abajo, el mismo modelo que SefiraBase.connect_to/send_to pero sin bloquear:
+
+    entrada → [keter] ─┐
+    entrada → [chochmah] → [binah] → [chesed] → ... → [malchut] → salida
+
+La etapa k procesa la accion i mientras la k+1 procesa la i-1. Un nodo con
+varias dependencias (Gevurah, Tiferet...) recibe la accion cuando llego por
+todos sus canales.
+
+Los workers de cada etapa se reparten segun la latencia observada (media
+movil por Sefira): una etapa que tarda el doble recibe el doble de workers,
+de modo que todas avanzan al mismo ritmo y el rendimiento se acerca a
+1 / (etapa mas lenta por worker) en lugar de 1 / (suma de etapas).
+
+Gating, umbrales y timeouts son los de TikunEngine; la especulacion y el
+streaming de secciones no aplican (el solapamiento viene del pipeline).
+
+Uso:
+    executor = PipelineExecutor(TikunEngine(gating_policy='stop'), max_workers=16)
+    batch = executor.run(actions)
+    batch[i]['run']['results'], executor.get_metrics()['bottleneck']
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from loguru import logger
+import asyncio
+import time
+
+from .core.rate_limiter import llm_priority
+from .tikun_engine import SefiraNode, TikunEngine, _shared_loop
+
+
+class _PipelineItem:
+    """Estado de una accion mientras recorre el pipeline"""
+
+    def __init__(self, index: int, request: Dict[str, Any], policy: str, future: asyncio.Future):
+        self.index = index
+        self.request = request
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.skipped: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.gated: Dict[str, str] = {}
+        self.gating: Dict[str, Any] = {
+            'policy': policy,
+            'stopped_by': None,
+            'reason': None,
+            'modification_rounds': []
+        }
+        self.llm_usage: Dict[str, List[Dict[str, int]]] = {}
+        self.arrivals: Dict[str, int] = {}
+        self.settled = 0
+        self.start = time.perf_counter()
+        self.total_time = 0.0
+        self.future = future
+
+
+class PipelineExecutor:
+    """
+    Ejecuta un lote de acciones con una cola y un pool de workers por Sefira.
+
+    Args:
+        engine: Motor cuyo grafo, Sefirot, timeouts, gating y umbrales se
+                usan (por defecto TikunEngine())
+        max_workers: Workers repartidos entre todas las etapas, es decir,
+                     llamadas al LLM en vuelo como maximo (cada etapa
+                     tiene al menos uno)
+    """
+
+    DEFAULT_MAX_WORKERS = 16
+    # Peso de la ultima medicion en la latencia media de cada etapa
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(self, engine: Optional[TikunEngine] = None, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.engine = engine if engine is not None else TikunEngine()
+        if max_workers < len(self.engine.nodes):
+            raise ValueError(
+                f"max_workers debe ser >= {len(self.engine.nodes)} (un worker por etapa), no {max_workers}"
+            )
+        self.max_workers = max_workers
+        self.nodes: Dict[str, SefiraNode] = {node.name: node for node in self.engine.nodes}
+        # Latencia media observada por etapa; persiste entre lotes
+        self.latency: Dict[str, float] = {}
+        self.processed: Dict[str, int] = {name: 0 for name in self.nodes}
+        self.last_batch: Dict[str, Any] = {}
+
+        # Canales del grafo, como SefiraBase.connect_to: la Sefira de cada
+        # dependencia queda conectada a la del nodo por un canal con su nombre
+        for node in self.engine.nodes:
+            for dep in node.depends_on:
+                self.engine.sefirot[dep].connect_to(self.engine.sefirot[node.name], node.name)
+
+    def pool_sizes(self) -> Dict[str, int]:
+        """
+        Workers por etapa, proporcionales a la latencia observada.
+
+        Las etapas aun sin medir cuentan con la latencia media de las
+        medidas (o todas iguales si no hay ninguna).
+        """
+        known = [self.latency[name] for name in self.nodes if name in self.latency]
+        default = sum(known) / len(known) if known else 1.0
+        latency = {name: self.latency.get(name, default) for name in self.nodes}
+        total = sum(latency.values()) or 1.0
+        spare = self.max_workers - len(self.nodes)
+        return {name: 1 + int(spare * value / total) for name, value in latency.items()}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Latencia y workers por etapa, cuello de botella y rendimiento del ultimo lote"""
+        sizes = self.pool_sizes()
+        stages = {
+            name: {
+                'latency': self.latency.get(name),
+                'workers': sizes[name],
+                'processed': self.processed[name]
+            }
+            for name in self.nodes
+        }
+        # Tiempo por accion de cada etapa con su pool completo
+        per_item = {
+            name: stage['latency'] / stage['workers']
+            for name, stage in stages.items() if stage['latency'] is not None
+        }
+        bottleneck = max(per_item, key=per_item.get) if per_item else None
+        return {
+            'stages': stages,
+            'bottleneck': bottleneck,
+            'expected_throughput': 1.0 / per_item[bottleneck] if bottleneck and per_item[bottleneck] else None,
+            'last_batch': dict(self.last_batch)
+        }
+
+    def run(
+        self,
+        actions: Iterable[Any],
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Version sincrona de arun() (corre en el loop compartido del motor)"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.arun(actions, gating_policy, thresholds), _shared_loop()
+        )
+        return future.result()
+
+    async def arun(
+        self,
+        actions: Iterable[Any],
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ejecuta el lote por el pipeline.
+
+        Returns:
+            Lo mismo que TikunEngine.arun_batch(): una entrada por accion, en
+            el orden de entrada, con 'run' (results, errors, skipped,
+            timings, total_time, sequential_time, critical_path, gating,
+            effective_action, speculation, llm_usage, tokens,
+            early_starts) o 'error'. total_time incluye el tiempo que la
+            accion espero en las colas.
+        """
+        engine = self.engine
+        policy = engine._check_policy(gating_policy or engine.gating_policy)
+        thresholds = engine.thresholds if thresholds is None else thresholds
+        deps = engine._effective_deps(policy)
+        downstream: Dict[str, List[str]] = {name: [] for name in self.nodes}
+        for name, node_deps in deps.items():
+            for dep in node_deps:
+                downstream[dep].append(name)
+
+        loop = asyncio.get_running_loop()
+        work: Dict[str, asyncio.Queue] = {name: asyncio.Queue() for name in self.nodes}
+        channels: Dict[tuple, asyncio.Queue] = {
+            (dep, name): asyncio.Queue() for name, node_deps in deps.items() for dep in node_deps
+        }
+        workers: Dict[str, List[asyncio.Task]] = {name: [] for name in self.nodes}
+        tasks: List[asyncio.Task] = []
+
+        def settle(name: str, item: _PipelineItem) -> None:
+            """El nodo termino (o se omitio) para la accion: se entrega por sus canales"""
+            item.settled += 1
+            for child in downstream[name]:
+                channels[(name, child)].put_nowait(item)
+            if item.settled == len(self.nodes) and not item.future.done():
+                item.total_time = time.perf_counter() - item.start
+                item.future.set_result(item)
+
+        def arrive(name: str, item: _PipelineItem) -> None:
+            """La accion llego por uno de los canales de entrada del nodo"""
+            item.arrivals[name] = item.arrivals.get(name, 0) + 1
+            if item.arrivals[name] < len(deps[name]):
+                return
+            failed = [
+                dep for dep in deps[name]
+                if dep in item.errors or dep in item.skipped or dep in item.gated
+            ]
+            if failed:
+                item.skipped[name] = engine._skip_reason(failed, item.skipped, item.gated)
+                settle(name, item)
+            else:
+                work[name].put_nowait(item)
+
+        async def read_channel(dep: str, name: str) -> None:
+            channel = channels[(dep, name)]
+            while True:
+                arrive(name, await channel.get())
+
+        async def worker(name: str) -> None:
+            with llm_priority('batch'):
+                await work_loop(name)
+
+        async def work_loop(name: str) -> None:
+            node = self.nodes[name]
+            queue = work[name]
+            me = asyncio.current_task()
+            while True:
+                item = await queue.get()
+                result, error, elapsed = await engine._run_node(
+                    node, item.request, item.results, item.llm_usage
+                )
+                item.timings[name] = elapsed
+                self._observe(name, elapsed)
+                if error is None:
+                    item.results[name] = result
+                    reason = await engine._check_gates(
+                        node, item.request, item.results, item.timings,
+                        policy, thresholds, item.gating, item.llm_usage
+                    )
+                    if reason is not None:
+                        item.gated[name] = reason
+                        if item.gating['stopped_by'] is None:
+                            item.gating['stopped_by'] = name
+                            item.gating['reason'] = reason
+                else:
+                    item.errors[name] = error
+                settle(name, item)
+                resize()
+                # Sobran workers en esta etapa: este se retira
+                if len(workers[name]) > self.pool_sizes()[name]:
+                    workers[name].remove(me)
+                    return
+
+        def resize() -> None:
+            for name, size in self.pool_sizes().items():
+                while len(workers[name]) < size:
+                    task = loop.create_task(worker(name))
+                    workers[name].append(task)
+                    tasks.append(task)
+
+        entries: List[Dict[str, Any]] = []
+        items: List[_PipelineItem] = []
+        start = time.perf_counter()
+        try:
+            for dep, name in channels:
+                tasks.append(loop.create_task(read_channel(dep, name)))
+            resize()
+
+            for index, action in enumerate(actions):
+                entry: Dict[str, Any] = {'index': index, 'action': None, 'run': None, 'error': None}
+                entries.append(entry)
+                try:
+                    request = engine._batch_request(action)
+                except ValueError as e:
+                    entry['error'] = f"{type(e).__name__}: {e}"
+                    continue
+                entry['action'] = request['action']
+                item = _PipelineItem(index, request, policy, loop.create_future())
+                items.append(item)
+                for name in self.nodes:
+                    if not deps[name]:
+                        work[name].put_nowait(item)
+
+            for item in items:
+                await item.future
+                entries[item.index]['run'] = self._run_result(item, deps)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        elapsed = time.perf_counter() - start
+        self.last_batch = {
+            'items': len(items),
+            'elapsed': elapsed,
+            'throughput': len(items) / elapsed if elapsed else 0.0,
+            'sequential_time': sum(entry['run']['sequential_time'] for entry in entries if entry['run'])
+        }
+        logger.info(
+            f"PipelineExecutor: {len(items)} acciones en {elapsed:.2f}s "
+            f"({self.last_batch['throughput']:.2f}/s, workers: {self.pool_sizes()})"
+        )
+        return entries
+
+    def _observe(self, name: str, elapsed: float) -> None:
+        """Actualiza la latencia media de la etapa"""
+        self.processed[name] += 1
+        previous = self.latency.get(name)
+        if previous is None:
+            self.latency[name] = elapsed
+        else:
+            self.latency[name] = previous + self.LATENCY_SMOOTHING * (elapsed - previous)
+
+    def _run_result(self, item: _PipelineItem, deps: Dict[str, tuple]) -> Dict[str, Any]:
+        """Dict de TikunEngine.arun() para una accion del lote"""
+        critical_path, _ = self.engine._critical_path(item.timings, deps)
+        node_usage, tokens = self.engine._usage_totals(item.llm_usage)
+        return {
+            'results': item.results,
+            'errors': item.errors,
+            'skipped': item.skipped,
+            'timings': item.timings,
+            'total_time': item.total_time,
+            'sequential_time': sum(item.timings.values()),
+            'critical_path': critical_path,
+            'gating': item.gating,
+            'effective_action': item.request['action'],
+            # Sin especulacion ni arranques anticipados (ver el docstring del modulo)
+            'speculation': self.engine._speculation_record(),
+            'llm_usage': node_usage,
+            'tokens': tokens,
+            'early_starts': {}
+        }
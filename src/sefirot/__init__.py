@@ -2,69 +2,45 @@
 Modulo de Sefirot - Las emanaciones del sistema Tikun
 
 Cada Sefira representa un aspecto funcional del sistema de IA alineada.
-"""
-
-# Importar solo las Sefirot que no tienen dependencias rotas
-try:
-    from .keter import Keter
-except ImportError:
-    Keter = None
-
-try:
-    from .chochmah_gemini import ChochmahGemini
-except ImportError:
-    ChochmahGemini = None
-
-try:
-    from .binah import Binah
-except ImportError:
-    Binah = None
-
-# Otras Sefirot - intentar importar pero no fallar si hay problemas
-try:
-    from .chesed import Chesed
-except ImportError:
-    Chesed = None
-
-try:
-    from .gevurah import Gevurah
-except ImportError:
-    Gevurah = None
 
-try:
-    from .tiferet import Tiferet
-except ImportError:
-    Tiferet = None
-
-try:
-    from .netzach import Netzach
-except ImportError:
-    Netzach = None
-
-try:
-    from .hod import Hod
-except ImportError:
-    Hod = None
-
-try:
-    from .yesod import Yesod
-except ImportError:
-    Yesod = None
-
-try:
-    from .malchut import Malchut
-except ImportError:
-    Malchut = None
+Las clases se importan al primer acceso (__getattr__ del modulo): importar
+el paquete no carga las diez Sefirot ni los SDK de los proveedores, y
+'from src.sefirot import Binah' solo carga binah.py. Una Sefira cuyo
+modulo no se puede importar sigue siendo None, como antes.
+"""
 
-__all__ = [
-    'Keter',
-    'ChochmahGemini',
-    'Binah',
-    'Chesed',
-    'Gevurah',
-    'Tiferet',
-    'Netzach',
-    'Hod',
-    'Yesod',
-    'Malchut'
-]
+import importlib
+from typing import Any
+
+# Clase -> modulo dentro del paquete
+_MODULES = {
+    'Keter': 'keter',
+    'ChochmahGemini': 'chochmah_gemini',
+    'Binah': 'binah',
+    'Chesed': 'chesed',
+    'Gevurah': 'gevurah',
+    'Tiferet': 'tiferet',
+    'Netzach': 'netzach',
+    'Hod': 'hod',
+    'Yesod': 'yesod',
+    'Malchut': 'malchut'
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    except ImportError:
+        value = None
+    # Los accesos siguientes ya no pasan por __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
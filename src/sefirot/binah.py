@@ -7,11 +7,13 @@ Binah recibe insights de Chochmah y los expande con analisis contextual,
 identificando stakeholders, efectos de segundo/tercer orden, y riesgos sistemicos.
 """
 
-from typing import Any, Dict, List, Optional
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Union
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.lexicon import Lexicon
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 import os
-import google.generativeai as genai
 import time
 
 
@@ -35,24 +37,49 @@ class Binah(SefiraBase):
     - Consecuencias no obvias
     """
 
+    CACHE_LLM_RESPONSES = True
+
+    # Perspectiva -> keywords que indican que fue considerada (_count_perspectives)
+    PERSPECTIVE_LEXICON = Lexicon({
+        'temporal': ['historico', 'pasado', 'futuro', 'largo plazo', 'corto plazo'],
+        'social': ['social', 'comunidad', 'grupo', 'sociedad', 'personas'],
+        'economica': ['economico', 'financiero', 'recursos', 'costo', 'incentivos'],
+        'cultural': ['cultural', 'valores', 'normas', 'creencias', 'tradiciones'],
+        'ambiental': ['ambiental', 'ecologico', 'sostenibilidad', 'medio ambiente'],
+        'politica': ['politico', 'poder', 'gobierno', 'institucional', 'governance']
+    })
+
+    # Encabezados que pide el prompt (espanol e ingles); el ':' es opcional
+    SECTIONS = SectionTokenizer({
+        'historical_context': ['CONTEXTO HISTORICO', 'HISTORICAL CONTEXT'],
+        'current_context': ['CONTEXTO ACTUAL', 'CURRENT CONTEXT'],
+        'stakeholders': ['STAKEHOLDERS', 'PARTES INTERESADAS'],
+        'first_order_effects': ['EFECTOS DE PRIMER ORDEN', 'FIRST ORDER EFFECTS'],
+        'second_order_effects': ['EFECTOS DE SEGUNDO ORDEN', 'SECOND ORDER EFFECTS'],
+        'third_order_effects': ['EFECTOS DE TERCER ORDEN', 'THIRD ORDER EFFECTS'],
+        'systemic_risks': ['RIESGOS SISTEMICOS', 'SYSTEMIC RISKS'],
+        'ethical_considerations': ['CONSIDERACIONES ETICAS', 'ETHICAL CONSIDERATIONS'],
+        'contextual_synthesis': ['SINTESIS CONTEXTUAL', 'CONTEXTUAL SYNTHESIS']
+    }, require_colon=False)
+
+    # Modo output_mode='json': mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.BINAH)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "Binah inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("Binah initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 0.8  # Menos creativa que Chochmah
         self.max_output_tokens = 4096
 
@@ -133,6 +160,14 @@ IMPORTANTE: Tu analisis debe ser MULTIDIMENSIONAL:
         - 'raw_response': Respuesta completa de Gemini
         - 'perspectives_count': Numero de perspectivas consideradas
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         start_time = time.time()
 
         try:
@@ -174,7 +209,7 @@ IMPORTANTE: Tu analisis debe ser MULTIDIMENSIONAL:
             logger.debug(f"Binah calling Gemini API with model {self.model_name}")
 
             # Llamar a Gemini API
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # DEBUG: Logging de respuesta completa
             logger.debug(f"Binah raw response length: {len(response)} chars")
@@ -182,7 +217,7 @@ IMPORTANTE: Tu analisis debe ser MULTIDIMENSIONAL:
             logger.debug(f"Binah raw response preview (last 300 chars):\n{response[-300:]}")
 
             # Parsear respuesta
-            parsed = self._parse_response(response)
+            parsed = self._parse_output(response, self._parse_response)
 
             # DEBUG: Ver que se parseo
             for key, value in parsed.items():
@@ -220,14 +255,6 @@ IMPORTANTE: Tu analisis debe ser MULTIDIMENSIONAL:
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": "dict",
-                "processing_time": elapsed,
-                "success": True
-            })
-
             logger.info(
                 f"Binah proceso analisis contextual con {perspectives_count} perspectivas"
             )
@@ -235,14 +262,6 @@ IMPORTANTE: Tu analisis debe ser MULTIDIMENSIONAL:
             return result
 
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
             logger.error(f"Binah error: {e}")
             return {
                 'processing_successful': False,
@@ -309,94 +328,62 @@ Considera multiples dimensiones: temporal, social, economica, cultural, ambienta
 
         return prompt
 
-    def _call_gemini(self, user_prompt: str) -> str:
-        """Llama a Gemini API y retorna respuesta"""
+    def _call_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Llama a Gemini API y retorna respuesta (con stream=True, sus fragmentos)"""
 
         try:
-            generation_config = genai.GenerationConfig(
+            generation_config = self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
             )
 
             response = self.client.generate_content(
                 user_prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                stream=stream
             )
 
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
 
         except Exception as e:
             logger.error(f"Error en _call_gemini: {e}")
             raise
 
-    def _parse_response(self, response: str) -> Dict[str, str]:
-        """Parsea la respuesta estructurada de Gemini"""
+    async def _acall_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Version asincrona de _call_gemini (generate_content_async)"""
 
-        sections = {
-            'historical_context': '',
-            'current_context': '',
-            'stakeholders': '',
-            'first_order_effects': '',
-            'second_order_effects': '',
-            'third_order_effects': '',
-            'systemic_risks': '',
-            'ethical_considerations': '',
-            'contextual_synthesis': ''
-        }
+        try:
+            generation_config = self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            )
 
-        # Mapeo de palabras clave a secciones
-        section_keywords = {
-            'historical_context': ['CONTEXTO HISTORICO', 'HISTORICAL CONTEXT'],
-            'current_context': ['CONTEXTO ACTUAL', 'CURRENT CONTEXT'],
-            'stakeholders': ['STAKEHOLDERS', 'PARTES INTERESADAS'],
-            'first_order_effects': ['EFECTOS DE PRIMER ORDEN', 'FIRST ORDER EFFECTS'],
-            'second_order_effects': ['EFECTOS DE SEGUNDO ORDEN', 'SECOND ORDER EFFECTS'],
-            'third_order_effects': ['EFECTOS DE TERCER ORDEN', 'THIRD ORDER EFFECTS'],
-            'systemic_risks': ['RIESGOS SISTEMICOS', 'SYSTEMIC RISKS'],
-            'ethical_considerations': ['CONSIDERACIONES ETICAS', 'ETHICAL CONSIDERATIONS'],
-            'contextual_synthesis': ['SINTESIS CONTEXTUAL', 'CONTEXTUAL SYNTHESIS']
-        }
+            response = await self.client.generate_content_async(
+                user_prompt,
+                generation_config=generation_config,
+                stream=stream
+            )
 
-        # Buscar cada seccion
-        lines = response.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            line_upper = line.strip().upper()
-
-            # Detectar inicio de seccion
-            section_found = None
-            for section_key, keywords in section_keywords.items():
-                for keyword in keywords:
-                    if keyword in line_upper:
-                        section_found = section_key
-                        break
-                if section_found:
-                    break
-
-            if section_found:
-                # Guardar seccion anterior
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-
-                current_section = section_found
-                current_content = []
-
-                # Si hay contenido despues del marcador, agregarlo
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1]
-                    if after_colon.strip():
-                        current_content.append(after_colon.strip())
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
 
-            else:
-                # Linea de contenido
-                if current_section and line.strip():
-                    current_content.append(line.strip())
+        except Exception as e:
+            logger.error(f"Error en _acall_gemini: {e}")
+            raise
 
-        # Guardar ultima seccion
-        if current_section:
-            sections[current_section] = '\n'.join(current_content).strip()
+    def _parse_response(self, response: str) -> Dict[str, str]:
+        """Parsea la respuesta estructurada de Gemini"""
+        sections = {
+            key: '\n'.join(lines)
+            for key, lines in self.SECTIONS.split_lines(response).items()
+        }
 
         # Si no se detectaron secciones, poner toda la respuesta en 'contextual_synthesis'
         if not any(sections.values()):
@@ -431,21 +418,12 @@ Considera multiples dimensiones: temporal, social, economica, cultural, ambienta
         basandose en keywords en las secciones
         """
 
-        all_text = ' '.join(parsed.values()).lower()
+        scan = self.PERSPECTIVE_LEXICON.scan(' '.join(parsed.values()))
 
-        perspective_keywords = {
-            'temporal': ['historico', 'pasado', 'futuro', 'largo plazo', 'corto plazo'],
-            'social': ['social', 'comunidad', 'grupo', 'sociedad', 'personas'],
-            'economica': ['economico', 'financiero', 'recursos', 'costo', 'incentivos'],
-            'cultural': ['cultural', 'valores', 'normas', 'creencias', 'tradiciones'],
-            'ambiental': ['ambiental', 'ecologico', 'sostenibilidad', 'medio ambiente'],
-            'politica': ['politico', 'poder', 'gobierno', 'institucional', 'governance']
-        }
-
-        perspectives_found = 0
-        for perspective, keywords in perspective_keywords.items():
-            if any(keyword in all_text for keyword in keywords):
-                perspectives_found += 1
+        perspectives_found = sum(
+            1 for perspective in self.PERSPECTIVE_LEXICON.groups
+            if scan.count(perspective)
+        )
 
         return perspectives_found
 
@@ -511,12 +489,6 @@ Considera multiples dimensiones: temporal, social, economica, cultural, ambienta
             "status": status
         }
 
-    def set_model(self, model: str):
-        """Permite cambiar el modelo de Gemini"""
-        self.model_name = model
-        self.client = genai.GenerativeModel(model)
-        logger.info(f"Binah ahora usa modelo: {model}")
-
     def set_temperature(self, temperature: float):
         """Ajusta temperature (0.0 = determinista, 2.0 = muy creativo)"""
         if not 0.0 <= temperature <= 2.0:
@@ -9,11 +9,12 @@ Pero debe reconocer sus propios limites - bondad sin limites puede ser destructi
 Por eso trabaja en balance con Gevurah (Severidad).
 """
 
-from typing import Any, Dict, List, Optional
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Union
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import STRING_LIST_SCHEMA, schema_from_sections
 from loguru import logger
 import os
-import google.generativeai as genai
 import time
 
 
@@ -37,24 +38,50 @@ class Chesed(SefiraBase):
     - Requiere balance con Gevurah
     """
 
+    CACHE_LLM_RESPONSES = True
+
+    # Encabezados que pide el prompt (espanol e ingles)
+    SECTIONS = SectionTokenizer({
+        'giving_opportunities': ['OPORTUNIDADES DE DAR', 'GIVING OPPORTUNITIES'],
+        'beneficiaries': ['BENEFICIARIOS', 'BENEFICIARIES'],
+        'generous_actions': ['ACCIONES GENEROSAS', 'GENEROUS ACTIONS'],
+        'compassion_impact': ['IMPACTO DE BONDAD', 'COMPASSION IMPACT'],
+        'expansion_analysis': ['EXPANSION DEL BIEN', 'EXPANSION ANALYSIS'],
+        'limits_needed': ['LIMITES NECESARIOS', 'NECESSARY LIMITS']
+    })
+
+    # Subsecciones dentro de BENEFICIARIOS ('- Primarios: ...')
+    BENEFICIARY_SECTIONS = SectionTokenizer({
+        'primary': ['PRIMARIOS', 'PRIMARY'],
+        'secondary': ['SECUNDARIOS', 'SECONDARY'],
+        'tertiary': ['LARGO PLAZO', 'LONG TERM', 'TERTIARY']
+    })
+
+    LIST_SECTIONS = ('giving_opportunities', 'generous_actions', 'limits_needed')
+
+    # Modo output_mode='json': mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS, list_sections=LIST_SECTIONS, overrides={
+        'beneficiaries': {
+            'type': 'object',
+            'properties': {key: STRING_LIST_SCHEMA for key in BENEFICIARY_SECTIONS.keys()}
+        }
+    })
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.CHESED)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "Chesed inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("Chesed initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 0.9  # Ligeramente creativa para identificar oportunidades
         self.max_output_tokens = 4096
 
@@ -117,6 +144,14 @@ Estructura tu respuesta como:
         - 'limits_needed': Limites que Chesed debe respetar
         - 'raw_response': Respuesta completa de Gemini
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         start_time = time.time()
 
         try:
@@ -148,7 +183,7 @@ Estructura tu respuesta como:
             logger.debug(f"Chesed calling Gemini API with model {self.model_name}")
 
             # Llamar a Gemini API
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # DEBUG: Logging de respuesta raw
             logger.debug(f"Chesed raw response length: {len(response)} chars")
@@ -156,7 +191,7 @@ Estructura tu respuesta como:
             logger.debug(f"Chesed raw response preview (last 300 chars):\n{response[-300:]}")
 
             # Parsear respuesta
-            parsed = self._parse_response(response)
+            parsed = self._parse_output(response, self._parse_response)
 
             # DEBUG: Logging de parsing
             for key, value in parsed.items():
@@ -205,14 +240,6 @@ Estructura tu respuesta como:
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": "dict",
-                "processing_time": elapsed,
-                "success": True
-            })
-
             logger.info(
                 f"Chesed proceso analisis: {opportunities_count} oportunidades, "
                 f"compasion={compassion_score:.2f}, expansion={expansion_potential:.2f}, "
@@ -222,14 +249,6 @@ Estructura tu respuesta como:
             return result
 
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
             logger.error(f"Chesed error: {e}")
             return {
                 'processing_successful': False,
@@ -283,144 +302,85 @@ LIMITES NECESARIOS:
 
         return prompt
 
-    def _call_gemini(self, user_prompt: str) -> str:
-        """Llama a Gemini API y retorna respuesta"""
+    def _call_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Llama a Gemini API y retorna respuesta (con stream=True, sus fragmentos)"""
 
         try:
-            generation_config = genai.GenerationConfig(
+            generation_config = self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
             )
 
             response = self.client.generate_content(
                 user_prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                stream=stream
             )
 
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
 
         except Exception as e:
             logger.error(f"Error en _call_gemini: {e}")
             raise
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        """Parsea la respuesta estructurada de Gemini"""
+    async def _acall_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Version asincrona de _call_gemini (generate_content_async)"""
 
-        sections = {
-            'giving_opportunities': [],
-            'beneficiaries': {},
-            'generous_actions': [],
-            'compassion_impact': '',
-            'expansion_analysis': '',
-            'limits_needed': []
-        }
+        try:
+            generation_config = self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            )
 
-        lines = response.split('\n')
-        current_section = None
-        current_content = []
-        beneficiary_subsection = None
-
-        for line in lines:
-            line_upper = line.strip().upper()
-
-            # Detectar inicio de seccion
-            if 'OPORTUNIDADES DE DAR:' in line_upper or 'GIVING OPPORTUNITIES:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content, beneficiary_subsection)
-                current_section = 'giving_opportunities'
-                current_content = []
-                beneficiary_subsection = None
-
-            elif 'BENEFICIARIOS:' in line_upper or 'BENEFICIARIES:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content, beneficiary_subsection)
-                current_section = 'beneficiaries'
-                current_content = []
-                beneficiary_subsection = None
-
-            elif 'ACCIONES GENEROSAS:' in line_upper or 'GENEROUS ACTIONS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content, beneficiary_subsection)
-                current_section = 'generous_actions'
-                current_content = []
-                beneficiary_subsection = None
-
-            elif 'IMPACTO DE BONDAD:' in line_upper or 'COMPASSION IMPACT:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content, beneficiary_subsection)
-                current_section = 'compassion_impact'
-                current_content = []
-                beneficiary_subsection = None
-
-            elif 'EXPANSION DEL BIEN:' in line_upper or 'EXPANSION ANALYSIS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content, beneficiary_subsection)
-                current_section = 'expansion_analysis'
-                current_content = []
-                beneficiary_subsection = None
-
-            elif 'LIMITES NECESARIOS:' in line_upper or 'NECESSARY LIMITS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content, beneficiary_subsection)
-                current_section = 'limits_needed'
-                current_content = []
-                beneficiary_subsection = None
+            response = await self.client.generate_content_async(
+                user_prompt,
+                generation_config=generation_config,
+                stream=stream
+            )
 
-            else:
-                # Detectar subsecciones de beneficiarios
-                if current_section == 'beneficiaries':
-                    if 'PRIMARIOS:' in line_upper or 'PRIMARY:' in line_upper:
-                        beneficiary_subsection = 'primary'
-                        after_colon = line.split(':', 1)[1] if ':' in line else ''
-                        if after_colon.strip():
-                            current_content.append(('primary', after_colon.strip()))
-                        continue
-                    elif 'SECUNDARIOS:' in line_upper or 'SECONDARY:' in line_upper:
-                        beneficiary_subsection = 'secondary'
-                        after_colon = line.split(':', 1)[1] if ':' in line else ''
-                        if after_colon.strip():
-                            current_content.append(('secondary', after_colon.strip()))
-                        continue
-                    elif 'LARGO PLAZO:' in line_upper or 'LONG TERM:' in line_upper or 'TERTIARY:' in line_upper:
-                        beneficiary_subsection = 'tertiary'
-                        after_colon = line.split(':', 1)[1] if ':' in line else ''
-                        if after_colon.strip():
-                            current_content.append(('tertiary', after_colon.strip()))
-                        continue
-
-                # Linea de contenido
-                if current_section and line.strip():
-                    if current_section == 'beneficiaries' and beneficiary_subsection:
-                        current_content.append((beneficiary_subsection, line.strip()))
-                    else:
-                        current_content.append(line.strip())
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
 
-        # Guardar ultima seccion
-        if current_section:
-            self._save_section(sections, current_section, current_content, beneficiary_subsection)
+        except Exception as e:
+            logger.error(f"Error en _acall_gemini: {e}")
+            raise
+
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Parsea la respuesta estructurada de Gemini"""
+        sections: Dict[str, Any] = {}
+
+        for key, lines in self.SECTIONS.split_lines(response, include_inline=False).items():
+            if key == 'beneficiaries':
+                # Agrupar por subseccion (primarios, secundarios, largo plazo)
+                sections[key] = {}
+                subsections = self.BENEFICIARY_SECTIONS.split_lines('\n'.join(lines))
+                for subsec, items in subsections.items():
+                    cleaned = self._clean_items(items)
+                    if cleaned:
+                        sections[key][subsec] = cleaned
+            elif key in self.LIST_SECTIONS:
+                sections[key] = self._clean_items(lines)
+            else:
+                # Texto continuo
+                sections[key] = '\n'.join(lines)
 
         return sections
 
-    def _save_section(self, sections: dict, section_name: str, content: list, beneficiary_subsection: str):
-        """Guarda contenido parseado en la seccion correspondiente"""
-        if section_name == 'beneficiaries':
-            # Agrupar por subseccion
-            for subsec, text in content:
-                if subsec not in sections['beneficiaries']:
-                    sections['beneficiaries'][subsec] = []
-                # Limpiar guiones al inicio
-                text_clean = text.lstrip('- ').strip()
-                if text_clean:
-                    sections['beneficiaries'][subsec].append(text_clean)
-        elif section_name in ['giving_opportunities', 'generous_actions', 'limits_needed']:
-            # Listas - limpiar guiones
-            for item in content:
-                item_clean = item.lstrip('- ').strip()
-                if item_clean:
-                    sections[section_name].append(item_clean)
-        else:
-            # Texto continuo
-            sections[section_name] = '\n'.join(content).strip()
+    def _parsed_from_json(self, data: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Como el parser de texto: solo las subsecciones de beneficiarios con items"""
+        data['beneficiaries'] = {key: items for key, items in data['beneficiaries'].items() if items}
+        return data
+
+    def _clean_items(self, lines: List[str]) -> List[str]:
+        """Items de una lista, sin guiones al inicio"""
+        return [item for item in (line.lstrip('- ').strip() for line in lines) if item]
 
     def _calculate_compassion_score(self, parsed: Dict[str, Any]) -> float:
         """
@@ -11,19 +11,38 @@ insight generation, and contextual analysis.
 """
 
 from typing import Any, Dict, Optional
+import importlib.util
 import os
 import time
-import re
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from ..core.llm_provider import AnthropicProvider
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
 from loguru import logger
 
-try:
-    from anthropic import Anthropic, APIError
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+# Only check that the SDK is installed: importing anthropic costs most of a
+# cold start, so it is loaded on the first call (see LLMProvider.lazy_client)
+ANTHROPIC_AVAILABLE = importlib.util.find_spec('anthropic') is not None
+if not ANTHROPIC_AVAILABLE:
     logger.warning("Anthropic library not available. Install with: pip install anthropic")
 
+_SDK_NAMES = ('Anthropic', 'AsyncAnthropic', 'APIError')
+
+
+def __getattr__(name: str) -> Any:
+    """Anthropic SDK classes, imported on first access"""
+    if name in _SDK_NAMES and ANTHROPIC_AVAILABLE:
+        import anthropic
+        return getattr(anthropic, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _api_errors() -> tuple:
+    """Exception types of Anthropic API errors (none if the SDK is missing)"""
+    if not ANTHROPIC_AVAILABLE:
+        return ()
+    import anthropic
+    return (anthropic.APIError,)
+
 
 class Chochmah(SefiraBase):
     """
@@ -37,6 +56,9 @@ class Chochmah(SefiraBase):
     5. Provide transparent reasoning chain
     """
 
+    # Claude: Gemini's shared quota doesn't apply
+    LLM_PROVIDER = 'anthropic'
+
     # System prompt for Claude
     SYSTEM_PROMPT = """
 You are Chochmah (Wisdom), the second Sefira in the Tikun Olam system.
@@ -71,11 +93,23 @@ IMPORTANT: Always include the UNCERTAINTIES section. If you're highly confident,
 say so explicitly, but identify what additional information would increase confidence.
 """
 
+    # Section headers of OUTPUT STRUCTURE (English and Spanish; accents are folded)
+    SECTIONS = SectionTokenizer({
+        'understanding': ['UNDERSTANDING', 'COMPRENSION'],
+        'analysis': ['ANALYSIS', 'ANALISIS'],
+        'insights': ['INSIGHTS'],
+        'uncertainties': ['UNCERTAINTIES', 'INCERTIDUMBRES'],
+        'recommendation': ['RECOMMENDATION', 'RECOMENDACION']
+    })
+
+    # Keys of config/tikun_config.yaml (see SefiraBase.configure)
+    CONFIG_ATTRIBUTES = {'temperature': 'temperature', 'max_output_tokens': 'max_tokens'}
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.CHOCHMAH)
 
-        # Configuration
-        self.model = "claude-sonnet-4-5-20250929"
+        # Configuration (the provider may pick another model for this stage)
+        self.model = AnthropicProvider.DEFAULT_MODEL
         self.max_tokens = 4096
         self.temperature = 1.0
 
@@ -90,12 +124,17 @@ say so explicitly, but identify what additional information would increase confi
         if not ANTHROPIC_AVAILABLE:
             logger.warning("Chochmah initialized without Anthropic library")
             self.client = None
-        elif self.api_key:
-            self.client = Anthropic(api_key=self.api_key)
-            logger.info("Chochmah initialized with Claude API client")
+            self.async_client = None
         else:
-            logger.warning("Chochmah initialized without API key")
-            self.client = None
+            # Shared Anthropic/AsyncAnthropic pair (one connection pool per process)
+            self.client = self._connect_provider(self.api_key)
+            self.model = self.model_name
+            if self.client is not None:
+                self.async_client = self.provider.lazy_client(self.model, is_async=True)
+                logger.info("Chochmah initialized with Claude API client")
+            else:
+                self.async_client = None
+                logger.warning("Chochmah initialized without API key")
 
     def process(self, input_data: Any) -> Dict[str, Any]:
         """
@@ -116,6 +155,14 @@ say so explicitly, but identify what additional information would increase confi
             - 'raw_response': Full Claude response
             - 'processing_successful': bool
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Async version of process() on top of the AsyncAnthropic client."""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Body of process(): yields the user message, receives Claude's reply."""
 
         # Track processing time
         start_time = time.time()
@@ -150,18 +197,7 @@ say so explicitly, but identify what additional information would increase confi
             # Call Claude API
             logger.debug(f"Chochmah calling Claude API with model {self.model}")
 
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                system=self.SYSTEM_PROMPT,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ]
-            )
-
-            # Extract response text
-            raw_response = response.content[0].text
+            raw_response = yield user_message
 
             # Parse structured response
             parsed = self._parse_response(raw_response)
@@ -181,16 +217,6 @@ say so explicitly, but identify what additional information would increase confi
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            # Add to history
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": "query",
-                "output_type": "structured_analysis",
-                "processing_time": elapsed,
-                "confidence_level": confidence,
-                "success": True
-            })
-
             # Return result
             result = {
                 'understanding': parsed.get('understanding', ''),
@@ -211,18 +237,10 @@ say so explicitly, but identify what additional information would increase confi
 
             return result
 
-        except APIError as e:
+        except _api_errors() as e:
             # Handle Anthropic API errors
             elapsed = time.time() - start_time
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": "query",
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
-
             logger.error(f"Chochmah API error: {e}")
 
             return {
@@ -234,19 +252,44 @@ say so explicitly, but identify what additional information would increase confi
 
         except Exception as e:
             # Handle other errors
-            elapsed = time.time() - start_time
-
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
-
             logger.error(f"Chochmah error: {e}")
             raise
 
+    def _llm_cache_params(self):
+        """Claude model parameters used in the LLM cache key"""
+        return (self.model, self.temperature, self.max_tokens)
+
+    def _call_model(self, user_message: str) -> str:
+        """Call Claude API (blocking) and return the response text."""
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            system=self.SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": user_message}
+            ]
+        )
+        self._record_token_usage(response)
+        return response.content[0].text
+
+    async def _acall_model(self, user_message: str) -> str:
+        """Call Claude API through AsyncAnthropic and return the response text."""
+        if self.async_client is None:
+            raise RuntimeError("Chochmah no tiene cliente async de Anthropic configurado")
+
+        response = await self.async_client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            system=self.SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": user_message}
+            ]
+        )
+        self._record_token_usage(response)
+        return response.content[0].text
+
     def _build_user_message(
         self,
         query: str,
@@ -274,36 +317,11 @@ say so explicitly, but identify what additional information would increase confi
         - INSIGHTS
         - UNCERTAINTIES / INCERTIDUMBRES
         - RECOMMENDATION / RECOMENDACION
-        """
 
-        sections = {
-            'understanding': '',
-            'analysis': '',
-            'insights': '',
-            'uncertainties': '',
-            'recommendation': ''
-        }
-
-        # Patterns for section headers (English and Spanish)
-        # Note: Using escape sequences to avoid non-ASCII in source
-        patterns = {
-            'understanding': r'(?:UNDERSTANDING|COMPRENSION|COMPRENSI\u00D3N):\s*',
-            'analysis': r'(?:ANALYSIS|ANALISIS|AN\u00C1LISIS):\s*',
-            'insights': r'(?:INSIGHTS):\s*',
-            'uncertainties': r'(?:UNCERTAINTIES|INCERTIDUMBRES):\s*',
-            'recommendation': r'(?:RECOMMENDATION|RECOMENDACION|RECOMENDACI\u00D3N):\s*'
-        }
-
-        # Try to extract each section
-        for key, pattern in patterns.items():
-            match = re.search(
-                pattern + r'(.*?)(?=' + '|'.join(patterns.values()) + r'|\Z)',
-                response,
-                re.DOTALL | re.IGNORECASE
-            )
-
-            if match:
-                sections[key] = match.group(1).strip()
+        Headers are matched at the start of a line, case- and
+        accent-insensitively; each section runs until the next header.
+        """
+        sections = self.SECTIONS.split(response)
 
         # If no sections found, put everything in analysis
         if not any(sections.values()):
@@ -453,7 +471,9 @@ say so explicitly, but identify what additional information would increase confi
         - claude-opus-4-5-20250929 (most capable)
         - claude-haiku-3-5-20250919 (fastest, cheapest)
         """
-        self.model = model
+        self.model = self.model_name = model
+        # One circuit per model: the next call connects to the new one
+        self.resilience.breaker = None
         logger.info(f"Chochmah model changed to {model}")
 
     def set_temperature(self, temperature: float):
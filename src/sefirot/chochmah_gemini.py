@@ -6,11 +6,13 @@ Funcion: Razonamiento Profundo y Pattern Recognition
 Version usando Google Gemini API como alternativa a Claude.
 """
 
-from typing import Any, Dict, List, Optional
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Union
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.lexicon import Lexicon
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 import os
-import google.generativeai as genai
 import time
 
 
@@ -32,24 +34,55 @@ class ChochmahGemini(SefiraBase):
     - Solicitar mas informacion cuando sea necesario
     """
 
+    # Temperatura 1.0: cada llamada debe poder generar insights distintos
+    CACHE_LLM_RESPONSES = False
+
+    # Keywords de _evaluate_confidence (sin acentos, como subcadena)
+    CONFIDENCE_LEXICON = Lexicon({
+        # Marcadores directos de incertidumbre (expandido)
+        'uncertainty_markers': [
+            'no estoy seguro', 'incertidumbre', 'ambiguo', 'posiblemente',
+            'quizas', 'tal vez', 'necesito mas informacion', 'no esta claro',
+            'podria ser', 'dificil determinar', 'unclear', 'uncertain',
+            'possibly', 'maybe', 'might be', 'desconozco', 'no se',
+            'es dificil', 'depende de', 'varia segun', 'puede que',
+            'not certain', 'hard to say', 'difficult to predict'
+        ],
+        # Calificadores epistemicos
+        'epistemic_qualifiers': [
+            'probablemente', 'posiblemente', 'quizas', 'tal vez',
+            'puede que', 'potencialmente', 'aparentemente', 'presumiblemente',
+            'likely', 'probably', 'perhaps', 'potentially', 'seemingly'
+        ]
+    })
+
+    # Encabezados que pide el prompt (espanol e ingles)
+    SECTIONS = SectionTokenizer({
+        'understanding': ['COMPRENSION', 'UNDERSTANDING'],
+        'analysis': ['ANALISIS', 'ANALYSIS'],
+        'insights': ['INSIGHTS'],
+        'uncertainties': ['INCERTIDUMBRES', 'UNCERTAINTIES'],
+        'recommendation': ['RECOMENDACION', 'RECOMMENDATION']
+    })
+
+    # Modo output_mode='json': mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.CHOCHMAH)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "ChochmahGemini inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("ChochmahGemini initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 1.0
         self.max_output_tokens = 4096
 
@@ -106,6 +139,14 @@ Cuando respondas, estructura tu salida como:
         - 'raw_response': Respuesta completa de Gemini
         - 'confidence_level': Nivel de confianza (0-1)
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         start_time = time.time()
 
         try:
@@ -133,10 +174,10 @@ Cuando respondas, estructura tu salida como:
             logger.debug(f"ChochmahGemini calling Gemini API with model {self.model_name}")
 
             # Llamar a Gemini API
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # Parsear respuesta
-            parsed = self._parse_response(response)
+            parsed = self._parse_output(response, self._parse_response)
 
             # Evaluar nivel de confianza y humildad epistemica
             confidence = self._evaluate_confidence(parsed)
@@ -166,14 +207,6 @@ Cuando respondas, estructura tu salida como:
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": "dict",
-                "processing_time": elapsed,
-                "success": True
-            })
-
             logger.info(
                 f"ChochmahGemini proceso query con confianza {confidence:.2f}: "
                 f"{query[:50]}..."
@@ -182,14 +215,6 @@ Cuando respondas, estructura tu salida como:
             return result
 
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
             logger.error(f"ChochmahGemini error: {e}")
             return {
                 'processing_successful': False,
@@ -228,99 +253,62 @@ RECOMENDACION:
 
         return prompt
 
-    def _call_gemini(self, user_prompt: str) -> str:
-        """Llama a Gemini API y retorna respuesta"""
+    def _call_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Llama a Gemini API y retorna respuesta (con stream=True, sus fragmentos)"""
 
         try:
-            generation_config = genai.GenerationConfig(
+            generation_config = self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
             )
 
             response = self.client.generate_content(
                 user_prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                stream=stream
             )
 
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
 
         except Exception as e:
             logger.error(f"Error en _call_gemini: {e}")
             raise
 
-    def _parse_response(self, response: str) -> Dict[str, str]:
-        """Parsea la respuesta estructurada de Gemini"""
+    async def _acall_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Version asincrona de _call_gemini (generate_content_async)"""
 
-        sections = {
-            'understanding': '',
-            'analysis': '',
-            'insights': '',
-            'uncertainties': '',
-            'recommendation': ''
-        }
+        try:
+            generation_config = self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            )
 
-        # Buscar cada seccion
-        lines = response.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            line_upper = line.strip().upper()
-
-            # Detectar inicio de seccion
-            if 'COMPRENSION:' in line_upper or 'UNDERSTANDING:' in line_upper:
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'understanding'
-                current_content = []
-                after_colon = line.split(':', 1)[1] if ':' in line else ''
-                if after_colon.strip():
-                    current_content.append(after_colon.strip())
-
-            elif 'ANALISIS:' in line_upper or 'ANALYSIS:' in line_upper:
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'analysis'
-                current_content = []
-                after_colon = line.split(':', 1)[1] if ':' in line else ''
-                if after_colon.strip():
-                    current_content.append(after_colon.strip())
-
-            elif 'INSIGHTS:' in line_upper:
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'insights'
-                current_content = []
-                after_colon = line.split(':', 1)[1] if ':' in line else ''
-                if after_colon.strip():
-                    current_content.append(after_colon.strip())
-
-            elif 'INCERTIDUMBRES:' in line_upper or 'UNCERTAINTIES:' in line_upper:
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'uncertainties'
-                current_content = []
-                after_colon = line.split(':', 1)[1] if ':' in line else ''
-                if after_colon.strip():
-                    current_content.append(after_colon.strip())
-
-            elif 'RECOMENDACION:' in line_upper or 'RECOMMENDATION:' in line_upper:
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'recommendation'
-                current_content = []
-                after_colon = line.split(':', 1)[1] if ':' in line else ''
-                if after_colon.strip():
-                    current_content.append(after_colon.strip())
+            response = await self.client.generate_content_async(
+                user_prompt,
+                generation_config=generation_config,
+                stream=stream
+            )
 
-            else:
-                # Linea de contenido
-                if current_section and line.strip():
-                    current_content.append(line.strip())
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
 
-        # Guardar ultima seccion
-        if current_section:
-            sections[current_section] = '\n'.join(current_content).strip()
+        except Exception as e:
+            logger.error(f"Error en _acall_gemini: {e}")
+            raise
+
+    def _parse_response(self, response: str) -> Dict[str, str]:
+        """Parsea la respuesta estructurada de Gemini"""
+        sections = {
+            key: '\n'.join(lines)
+            for key, lines in self.SECTIONS.split_lines(response).items()
+        }
 
         # Si no se detectaron secciones, poner toda la respuesta en 'analysis'
         if not any(sections.values()):
@@ -338,41 +326,20 @@ RECOMENDACION:
         """
 
         uncertainties = parsed.get('uncertainties', '').lower()
-        analysis = parsed.get('analysis', '').lower()
-        insights = parsed.get('insights', '').lower()
-        understanding = parsed.get('understanding', '').lower()
+        insights = parsed.get('insights', '')
 
-        # Marcadores directos de incertidumbre (expandido)
-        uncertainty_markers = [
-            'no estoy seguro', 'incertidumbre', 'ambiguo', 'posiblemente',
-            'quizas', 'tal vez', 'necesito mas informacion', 'no esta claro',
-            'podria ser', 'dificil determinar', 'unclear', 'uncertain',
-            'possibly', 'maybe', 'might be', 'desconozco', 'no se',
-            'es dificil', 'depende de', 'varia segun', 'puede que',
-            'not certain', 'hard to say', 'difficult to predict'
-        ]
-
-        # Calificadores epistemicos
-        epistemic_qualifiers = [
-            'probablemente', 'posiblemente', 'quizas', 'tal vez',
-            'puede que', 'potencialmente', 'aparentemente', 'presumiblemente',
-            'likely', 'probably', 'perhaps', 'potentially', 'seemingly'
-        ]
-
-        # Contar en TODO el texto (no solo analisis)
-        full_text = f"{understanding} {analysis} {uncertainties} {insights}"
-
-        # Contar marcadores directos
-        uncertainty_count = sum(
-            1 for word in uncertainty_markers
-            if word in full_text
+        # Contar en TODO el texto (no solo analisis), en una pasada del lexicon
+        full_text = (
+            f"{parsed.get('understanding', '')} {parsed.get('analysis', '')} "
+            f"{parsed.get('uncertainties', '')} {insights}"
         )
+        scan = self.CONFIDENCE_LEXICON.scan(full_text)
 
-        # Contar calificadores epistemicos
-        qualifier_count = sum(
-            1 for q in epistemic_qualifiers
-            if q in full_text
-        )
+        # Marcadores directos de incertidumbre
+        uncertainty_count = scan.count('uncertainty_markers')
+
+        # Calificadores epistemicos
+        qualifier_count = scan.count('epistemic_qualifiers')
 
         # Detectar seccion de incertidumbres
         has_uncertainty_section = (
@@ -466,12 +433,6 @@ RECOMENDACION:
             "status": "Alineada" if is_aligned else "Advertencia: Posible exceso de confianza"
         }
 
-    def set_model(self, model: str):
-        """Permite cambiar el modelo de Gemini"""
-        self.model_name = model
-        self.client = genai.GenerativeModel(model)
-        logger.info(f"ChochmahGemini ahora usa modelo: {model}")
-
     def set_temperature(self, temperature: float):
         """Ajusta temperature (0.0 = determinista, 2.0 = muy creativo)"""
         if not 0.0 <= temperature <= 2.0:
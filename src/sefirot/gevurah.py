@@ -10,11 +10,12 @@ Pero debe reconocer que severidad sin misericordia es crueldad.
 Por eso trabaja en balance con Chesed (Misericordia).
 """
 
-from typing import Any, Dict, List, Optional
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Union
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 import os
-import google.generativeai as genai
 import time
 
 
@@ -37,24 +38,38 @@ class Gevurah(SefiraBase):
     - Requiere balance con Chesed
     """
 
+    CACHE_LLM_RESPONSES = True
+
+    # Encabezados que pide el prompt (espanol e ingles)
+    SECTIONS = SectionTokenizer({
+        'chesed_excesses': ['EXCESOS DE CHESED', 'CHESED EXCESSES'],
+        'necessary_boundaries': ['LIMITES NECESARIOS', 'NECESSARY BOUNDARIES', 'NECESSARY LIMITS'],
+        'justice_criteria': ['CRITERIOS DE JUSTICIA', 'JUSTICE CRITERIA'],
+        'restrictions': ['RESTRICCIONES', 'RESTRICTIONS'],
+        'warnings': ['ADVERTENCIAS', 'WARNINGS'],
+        'balance_analysis': ['BALANCE REQUERIDO', 'REQUIRED BALANCE', 'BALANCE ANALYSIS']
+    })
+
+    LIST_SECTIONS = ('chesed_excesses', 'necessary_boundaries', 'justice_criteria', 'restrictions', 'warnings')
+
+    # Modo output_mode='json': mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS, list_sections=LIST_SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.GEVURAH)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "Gevurah inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("Gevurah initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 0.7  # Mas determinista para juicio riguroso
         self.max_output_tokens = 4096
 
@@ -119,6 +134,14 @@ Estructura tu respuesta como:
         - 'balance_with_chesed': Balance entre ambas (0-1)
         - 'raw_response': Respuesta completa de Gemini
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         start_time = time.time()
 
         try:
@@ -152,7 +175,7 @@ Estructura tu respuesta como:
             logger.debug(f"Gevurah calling Gemini API with model {self.model_name}")
 
             # Llamar a Gemini API
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # DEBUG: Logging de respuesta raw
             logger.debug(f"Gevurah raw response length: {len(response)} chars")
@@ -160,7 +183,7 @@ Estructura tu respuesta como:
             logger.debug(f"Gevurah raw response preview (last 300 chars):\n{response[-300:]}")
 
             # Parsear respuesta
-            parsed = self._parse_response(response)
+            parsed = self._parse_output(response, self._parse_response)
 
             # DEBUG: Logging de parsing
             for key, value in parsed.items():
@@ -212,14 +235,6 @@ Estructura tu respuesta como:
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": "dict",
-                "processing_time": elapsed,
-                "success": True
-            })
-
             logger.info(
                 f"Gevurah proceso analisis: {boundaries_count} limites, "
                 f"severidad={severity_score:.2f}, balance={balance_score:.2f}, "
@@ -229,14 +244,6 @@ Estructura tu respuesta como:
             return result
 
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
             logger.error(f"Gevurah error: {e}")
             return {
                 'processing_successful': False,
@@ -312,104 +319,69 @@ BALANCE REQUERIDO:
 
         return prompt
 
-    def _call_gemini(self, user_prompt: str) -> str:
-        """Llama a Gemini API y retorna respuesta"""
+    def _call_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Llama a Gemini API y retorna respuesta (con stream=True, sus fragmentos)"""
 
         try:
-            generation_config = genai.GenerationConfig(
+            generation_config = self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
             )
 
             response = self.client.generate_content(
                 user_prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                stream=stream
             )
 
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
 
         except Exception as e:
             logger.error(f"Error en _call_gemini: {e}")
             raise
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        """Parsea la respuesta estructurada de Gemini"""
+    async def _acall_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Version asincrona de _call_gemini (generate_content_async)"""
 
-        sections = {
-            'chesed_excesses': [],
-            'necessary_boundaries': [],
-            'justice_criteria': [],
-            'restrictions': [],
-            'warnings': [],
-            'balance_analysis': ''
-        }
+        try:
+            generation_config = self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            )
 
-        lines = response.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            line_upper = line.strip().upper()
-
-            # Detectar inicio de seccion
-            if 'EXCESOS DE CHESED:' in line_upper or 'CHESED EXCESSES:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'chesed_excesses'
-                current_content = []
-
-            elif 'LIMITES NECESARIOS:' in line_upper or 'NECESSARY BOUNDARIES:' in line_upper or 'NECESSARY LIMITS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'necessary_boundaries'
-                current_content = []
-
-            elif 'CRITERIOS DE JUSTICIA:' in line_upper or 'JUSTICE CRITERIA:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'justice_criteria'
-                current_content = []
-
-            elif 'RESTRICCIONES:' in line_upper or 'RESTRICTIONS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'restrictions'
-                current_content = []
-
-            elif 'ADVERTENCIAS:' in line_upper or 'WARNINGS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'warnings'
-                current_content = []
-
-            elif 'BALANCE REQUERIDO:' in line_upper or 'REQUIRED BALANCE:' in line_upper or 'BALANCE ANALYSIS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'balance_analysis'
-                current_content = []
+            response = await self.client.generate_content_async(
+                user_prompt,
+                generation_config=generation_config,
+                stream=stream
+            )
 
-            else:
-                # Linea de contenido
-                if current_section and line.strip():
-                    current_content.append(line.strip())
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
+
+        except Exception as e:
+            logger.error(f"Error en _acall_gemini: {e}")
+            raise
 
-        # Guardar ultima seccion
-        if current_section:
-            self._save_section(sections, current_section, current_content)
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Parsea la respuesta estructurada de Gemini"""
+        sections: Dict[str, Any] = {}
 
-        return sections
+        for key, lines in self.SECTIONS.split_lines(response, include_inline=False).items():
+            if key in self.LIST_SECTIONS:
+                # Listas - limpiar guiones
+                sections[key] = [item for item in (line.lstrip('- *').strip() for line in lines) if item]
+            else:
+                # Texto continuo
+                sections[key] = '\n'.join(lines)
 
-    def _save_section(self, sections: dict, section_name: str, content: list):
-        """Guarda contenido parseado en la seccion correspondiente"""
-        if section_name in ['chesed_excesses', 'necessary_boundaries', 'justice_criteria', 'restrictions', 'warnings']:
-            # Listas - limpiar guiones
-            for item in content:
-                item_clean = item.lstrip('- *').strip()
-                if item_clean:
-                    sections[section_name].append(item_clean)
-        else:
-            # Texto continuo
-            sections[section_name] = '\n'.join(content).strip()
+        return sections
 
     def _calculate_severity_score(self, parsed: Dict[str, Any]) -> float:
         """
@@ -16,10 +16,12 @@ Hod recibe la estrategia de persistencia de Netzach y la ESTRUCTURA:
 Es como MERCURIO - mensajero veloz, preciso, organizador.
 """
 
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, AsyncIterator, Iterator, Union
 import os
-import google.generativeai as genai
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from ..core.resilience import LLMCallError
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 
 
@@ -42,6 +44,22 @@ class Hod(SefiraBase):
     - Requiere balance con Netzach (impulso)
     """
 
+    CACHE_LLM_RESPONSES = True
+
+    # Encabezados que pide el prompt (espanol e ingles, en mayusculas) -> clave del texto crudo
+    SECTIONS = SectionTokenizer({
+        'structured_plan_text': ['PLAN ESTRUCTURADO', 'STRUCTURED PLAN'],
+        'communication_strategy_text': ['ESTRATEGIA DE COMUNICACION', 'COMMUNICATION STRATEGY'],
+        'metrics_framework_text': ['FRAMEWORK DE METRICAS', 'METRICS FRAMEWORK'],
+        'documentation_text': ['DOCUMENTACION', 'DOCUMENTATION'],
+        'stakeholder_messages_text': ['MENSAJES CLAVE', 'KEY MESSAGES'],
+        'precision_evaluation': ['EVALUACION DE PRECISION', 'PRECISION EVALUATION']
+    }, uppercase_only=True)
+
+    # Modo output_mode='json': el texto de cada seccion como clave; los
+    # parsers de cada seccion (_parse_sections) se aplican igual
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         """
         Inicializa Hod con conexion a Gemini
@@ -51,18 +69,17 @@ class Hod(SefiraBase):
         """
         super().__init__(SefiraPosition.HOD)
 
-        # Configurar Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         if api_key is None:
             api_key = os.getenv('GEMINI_API_KEY')
 
-        if not api_key:
+        self.client = self._connect_provider(api_key)
+        if self.client is None:
             raise ValueError("GEMINI_API_KEY no encontrada en variables de entorno")
 
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
-
         # Temperatura moderada-baja para precision y estructura
         self.temperature = 0.6
+        self.max_output_tokens = 8192
 
         # Metricas especificas de Hod
         self.plans_structured = 0
@@ -97,6 +114,14 @@ class Hod(SefiraBase):
                 - clarity_score: Nivel de claridad (0-1)
                 - processing_successful: bool
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         logger.debug("\n" + "="*60)
         logger.debug("HOD (Esplendor) - Estructurando y Comunicando")
         logger.debug("="*60)
@@ -109,10 +134,10 @@ class Hod(SefiraBase):
 
             # 2. Llamar a Gemini
             logger.debug("\n[Hod] Llamando a Gemini para estructurar...")
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # 3. Parsear respuesta
-            result = self._parse_response(response, input_data)
+            result = self._parse_output(response, self._parse_response, input_data)
 
             # 4. Calcular metricas
             result['precision_score'] = self._calculate_precision_score(result)
@@ -243,26 +268,60 @@ Usa precision mercurial, estructura clara, comunicacion efectiva.
             return "- Ninguno"
         return "\n".join([f"- {item}" for item in items[:10]])  # Max 10 items
 
-    def _call_gemini(self, prompt: str) -> str:
+    def _call_gemini(self, prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
         """
-        Llama a la API de Gemini
+        Llama a la API de Gemini (con stream=True retorna sus fragmentos)
         """
         try:
             response = self.client.generate_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
+                generation_config=self.provider.generation_config(
                     temperature=self.temperature,
-                    max_output_tokens=8192,
-                )
+                    max_output_tokens=self.max_output_tokens,
+                    **self._response_format(),
+                ),
+                stream=stream
             )
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
         except Exception as e:
-            raise Exception(f"Error llamando a Gemini: {str(e)}")
+            raise LLMCallError(f"Error llamando a Gemini: {str(e)}") from e
+
+    async def _acall_gemini(self, prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """
+        Version asincrona de _call_gemini (generate_content_async)
+        """
+        try:
+            response = await self.client.generate_content_async(
+                prompt,
+                generation_config=self.provider.generation_config(
+                    temperature=self.temperature,
+                    max_output_tokens=self.max_output_tokens,
+                    **self._response_format(),
+                ),
+                stream=stream
+            )
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
+        except Exception as e:
+            raise LLMCallError(f"Error llamando a Gemini: {str(e)}") from e
 
     def _parse_response(self, response: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parsea la respuesta de Gemini para extraer estructura
         """
+        return self._parse_sections(response, self.SECTIONS.split(response))
+
+    def _parsed_from_json(self, data: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Modo JSON: las secciones ya vienen separadas"""
+        return self._parse_sections(response, data)
+
+    def _parse_sections(self, response: str, sections: Dict[str, str]) -> Dict[str, Any]:
+        """Resultado a partir del texto crudo de cada seccion"""
         result = {
             'structured_plan': {},
             'communication_strategy': {},
@@ -272,18 +331,8 @@ Usa precision mercurial, estructura clara, comunicacion efectiva.
             'raw_response': response
         }
 
-        # Extraer secciones
-        sections = {
-            'PLAN ESTRUCTURADO:': 'structured_plan_text',
-            'ESTRATEGIA DE COMUNICACION:': 'communication_strategy_text',
-            'FRAMEWORK DE METRICAS:': 'metrics_framework_text',
-            'DOCUMENTACION:': 'documentation_text',
-            'MENSAJES CLAVE:': 'stakeholder_messages_text',
-            'EVALUACION DE PRECISION:': 'precision_evaluation'
-        }
-
-        for section_marker, key in sections.items():
-            result[key] = self._extract_section(response, section_marker)
+        # Texto crudo de cada seccion, lo parsean los metodos de abajo
+        result.update(sections)
 
         # Parsear plan estructurado en fases
         result['structured_plan'] = self._parse_structured_plan(
@@ -312,32 +361,6 @@ Usa precision mercurial, estructura clara, comunicacion efectiva.
 
         return result
 
-    def _extract_section(self, text: str, marker: str) -> str:
-        """Extrae seccion del texto"""
-        if marker not in text:
-            return ""
-
-        start = text.find(marker) + len(marker)
-
-        # Encontrar siguiente seccion
-        next_markers = [
-            'PLAN ESTRUCTURADO:',
-            'ESTRATEGIA DE COMUNICACION:',
-            'FRAMEWORK DE METRICAS:',
-            'DOCUMENTACION:',
-            'MENSAJES CLAVE:',
-            'EVALUACION DE PRECISION:'
-        ]
-
-        end = len(text)
-        for next_marker in next_markers:
-            if next_marker != marker and next_marker in text[start:]:
-                pos = text.find(next_marker, start)
-                if pos < end:
-                    end = pos
-
-        return text[start:end].strip()
-
     def _parse_structured_plan(self, text: str) -> Dict[str, Any]:
         """
         Parsea el plan estructurado en fases
@@ -10,19 +10,27 @@ En este sistema: Maximizar Tikún Olam
 (Reparación, elevación, florecimiento de toda la creación)
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from ..core.sefirotic_base import SefiraBase, SefiraPosition
 from ..core.divine_name import DIVINE_VALUE
+from ..core.lexicon import Lexicon, LexiconScan
 from loguru import logger
+import asyncio
+import importlib.util
+import json
 import os
 import re
+import time
 
-# Importar Gemini para evaluacion semantica
+# Gemini para evaluacion semantica (el cliente lo da el proveedor, ver _connect_provider)
+# Solo se comprueba que el SDK este instalado: se importa en la primera
+# llamada al LLM (ver LLMProvider.lazy_client)
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
+    GEMINI_AVAILABLE = importlib.util.find_spec('google.generativeai') is not None
 except ImportError:
     GEMINI_AVAILABLE = False
+if not GEMINI_AVAILABLE:
     logger.warning("google-generativeai no disponible. Keter usara evaluacion heuristica.")
 
 
@@ -44,9 +52,80 @@ class Keter(SefiraBase):
     operando dentro de las leyes de causa y efecto,
     promoviendo armonía, justicia, misericordia y verdad.
     """
+
+    # Criterios evaluados semanticamente con LLM: clave de score -> (criterio, descripcion)
+    LLM_CRITERIA = {
+        'justice_mercy_balance': (
+            'justicia_misericordia',
+            'BALANCE DE JUSTICIA Y MISERICORDIA: Equidad, imparcialidad combinada con compasion, clemencia (vs. crueldad, venganza)'
+        ),
+        'aligned_with_truth': (
+            'verdad',
+            'VERDAD vs. ENGANO: Transparencia, honestidad, autenticidad (vs. manipulacion, ocultamiento, falsedad)'
+        )
+    }
     
-    def __init__(self, use_llm_scoring: bool = True, api_key: Optional[str] = None):
+    # Modo 'structured': los cinco criterios en una sola llamada con respuesta JSON
+    STRUCTURED_CRITERIA = {
+        'reduces_suffering': 'REDUCCION DE SUFRIMIENTO: Alivia dolor, aumenta florecimiento (vs. dano, perjuicio)',
+        'respects_free_will': 'LIBRE ALBEDRIO Y DIGNIDAD: Respeta autonomia y eleccion (vs. coaccion, manipulacion)',
+        'promotes_harmony': 'ARMONIA: Promueve paz, colaboracion, reconciliacion (vs. conflicto, division)',
+        'justice_mercy_balance': LLM_CRITERIA['justice_mercy_balance'][1],
+        'aligned_with_truth': LLM_CRITERIA['aligned_with_truth'][1]
+    }
+
+    LLM_SCORING_MODES = ('structured', 'per_criterion')
+
+    # Keywords de los heuristicos (fallback sin LLM). Se comparan sin acentos y
+    # al inicio de palabra: 'dana' (daña) no debe coincidir dentro de 'ciudadana'
+    HEURISTIC_LEXICON = Lexicon({
+        'suffering_positive': ['ayuda', 'cura', 'alivia', 'mejora', 'beneficia', 'florece', 'eleva'],
+        'suffering_negative': ['daña', 'hiere', 'perjudica', 'destruye', 'sufre', 'dolor'],
+        'free_will_coercion': ['forzar', 'obligar', 'coaccionar', 'manipular', 'engañar'],
+        'free_will_respect': ['elegir', 'decidir', 'consenso', 'voluntario', 'autonomía'],
+        'harmony': ['paz', 'unión', 'colabora', 'armonía', 'coopera', 'reconcilia'],
+        'discord': ['conflicto', 'división', 'guerra', 'enfrentamiento', 'hostilidad'],
+        'justice': ['justo', 'equitativo', 'fair', 'imparcial', 'correcto'],
+        'mercy': ['misericordia', 'compasion', 'perdon', 'clemencia', 'bondad'],
+        'cruelty': ['cruel', 'venganza', 'castigo excesivo', 'implacable'],
+        'truth': ['verdad', 'honesto', 'transparente', 'autentico', 'sincero'],
+        'deception': ['mentira', 'engano', 'falso', 'ocultar', 'manipular']
+    }, word_start=True)
+
+    # Scoring semantico: baja temperatura para consistencia, respuesta corta
+    SCORING_TEMPERATURE = 0.3
+    SCORING_MAX_OUTPUT_TOKENS = 150
+    STRUCTURED_MAX_OUTPUT_TOKENS = 300
+
+    # config/tikun_config.yaml ajusta el scoring (ver SefiraBase.configure)
+    CONFIG_ATTRIBUTES = {
+        'temperature': 'SCORING_TEMPERATURE',
+        'max_output_tokens': 'SCORING_MAX_OUTPUT_TOKENS',
+        'structured_max_output_tokens': 'STRUCTURED_MAX_OUTPUT_TOKENS'
+    }
+    LLM_CLIENT_ATTRIBUTE = 'gemini_client'
+
+    # Mismo prompt y temperatura baja -> misma evaluacion: se puede cachear
+    CACHE_LLM_RESPONSES = True
+
+    def __init__(
+        self,
+        use_llm_scoring: bool = True,
+        api_key: Optional[str] = None,
+        llm_scoring_mode: str = 'structured'
+    ):
+        """
+        Args:
+            use_llm_scoring: Usar Gemini para scoring semantico
+            api_key: GEMINI_API_KEY (por defecto del env)
+            llm_scoring_mode: 'structured' = una llamada JSON para los cinco
+                criterios; 'per_criterion' = una llamada por criterio de LLM_CRITERIA
+        """
         super().__init__(SefiraPosition.KETER)
+        if llm_scoring_mode not in self.LLM_SCORING_MODES:
+            raise ValueError(f"llm_scoring_mode invalido: {llm_scoring_mode}")
+        self.llm_scoring_mode = llm_scoring_mode
+        self._json_fallback_logged = False
         self.objective_violations = 0
         self.objective_confirmations = 0
         self.use_llm_scoring = use_llm_scoring and GEMINI_AVAILABLE
@@ -54,12 +133,10 @@ class Keter(SefiraBase):
         # Inicializar cliente Gemini para evaluacion semantica
         if self.use_llm_scoring:
             self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-            if self.api_key:
-                genai.configure(api_key=self.api_key)
-                self.gemini_client = genai.GenerativeModel('gemini-2.0-flash-exp')
+            self.gemini_client = self._connect_provider(self.api_key)
+            if self.gemini_client is not None:
                 logger.info("Keter inicializada con evaluacion semantica LLM activada")
             else:
-                self.gemini_client = None
                 self.use_llm_scoring = False
                 logger.warning("Keter sin API key - usando evaluacion heuristica")
         else:
@@ -75,31 +152,67 @@ class Keter(SefiraBase):
         Input: Acción/decisión propuesta (dict con keys: 'action', 'context', 'expected_outcome')
         Output: Evaluación de alineamiento (dict con keys: 'aligned', 'reasoning', 'modifications')
         """
-        
+        start = time.time()
+        try:
+            action, context, expected_outcome = self._unpack_input(input_data)
+
+            # Evaluar alineamiento con Tikún Olam
+            evaluation = self._evaluate_alignment(action, context, expected_outcome)
+        except Exception as e:
+            self._record_run(start, error=e)
+            raise
+
+        self._record_evaluation(evaluation)
+        self._record_run(start, evaluation)
+        return evaluation
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """
+        Version async de process(): los criterios LLM se evaluan con asyncio.gather
+        sobre el cliente async de Gemini, sin ocupar hilos.
+        """
+        start = time.time()
+        try:
+            action, context, expected_outcome = self._unpack_input(input_data)
+
+            llm_scores = await self._allm_scores(action, context, expected_outcome)
+            evaluation = self._evaluate_alignment(action, context, expected_outcome, llm_scores)
+        except Exception as e:
+            self._record_run(start, error=e)
+            raise
+
+        self._record_evaluation(evaluation)
+        self._record_run(start, evaluation)
+        return evaluation
+
+    def _unpack_input(self, input_data: Any) -> Tuple[str, str, str]:
+        """Valida input_data y extrae (action, context, expected_outcome)"""
         if not isinstance(input_data, dict):
             raise TypeError("Keter requiere input_data como dict con keys: action, context, expected_outcome")
-        
-        action = input_data.get('action', '')
-        context = input_data.get('context', '')
-        expected_outcome = input_data.get('expected_outcome', '')
-        
-        # Evaluar alineamiento con Tikún Olam
-        evaluation = self._evaluate_alignment(action, context, expected_outcome)
-        
+
+        return (
+            input_data.get('action', ''),
+            input_data.get('context', ''),
+            input_data.get('expected_outcome', '')
+        )
+
+    def _record_evaluation(self, evaluation: Dict[str, Any]) -> None:
+        """Actualiza contadores de confirmaciones/violaciones y registra el resultado"""
         if evaluation['aligned']:
-            self.objective_confirmations += 1
+            with self._state_lock:
+                self.objective_confirmations += 1
             logger.info(f"Keter: Acción alineada con Tikún Olam - {evaluation['reasoning'][:100]}")
         else:
-            self.objective_violations += 1
+            with self._state_lock:
+                self.objective_violations += 1
             logger.warning(f"Keter: Acción NO alineada - {evaluation['reasoning'][:100]}")
-        
-        return evaluation
-    
+
     def _evaluate_alignment(
         self, 
         action: str, 
         context: str, 
-        expected_outcome: str
+        expected_outcome: str,
+        llm_scores: Optional[Dict[str, Optional[int]]] = None
     ) -> Dict[str, Any]:
         """
         Evalúa si una acción se alinea con Tikún Olam.
@@ -110,15 +223,34 @@ class Keter(SefiraBase):
         3. ¿Promueve armonía vs. discordia?
         4. ¿Es justa y misericordiosa?
         5. ¿Está alineada con verdad vs. engaño?
+
+        llm_scores: Scores semanticos ya calculados (ver _llm_scores).
+        Si es None se calculan aqui.
         """
+        if llm_scores is None:
+            llm_scores = self._llm_scores(action, context, expected_outcome)
         
+        # Una pasada del lexicon por cada texto que usan los heuristicos
+        outcome_scan = self.HEURISTIC_LEXICON.scan(action + ' ' + expected_outcome)
+        context_scan = self.HEURISTIC_LEXICON.scan(action + ' ' + context)
+
         # Sistema de puntuación (cada criterio: -10 a +10)
         scores = {
-            'reduces_suffering': self._score_suffering_reduction(action, expected_outcome),
-            'respects_free_will': self._score_free_will_respect(action, context),
-            'promotes_harmony': self._score_harmony_promotion(action, expected_outcome),
-            'justice_mercy_balance': self._score_justice_mercy(action, context),
-            'aligned_with_truth': self._score_truth_alignment(action, context)
+            'reduces_suffering': self._score_suffering_reduction(
+                outcome_scan, llm_scores.get('reduces_suffering')
+            ),
+            'respects_free_will': self._score_free_will_respect(
+                context_scan, llm_scores.get('respects_free_will')
+            ),
+            'promotes_harmony': self._score_harmony_promotion(
+                outcome_scan, llm_scores.get('promotes_harmony')
+            ),
+            'justice_mercy_balance': self._score_justice_mercy(
+                context_scan, llm_scores.get('justice_mercy_balance')
+            ),
+            'aligned_with_truth': self._score_truth_alignment(
+                context_scan, llm_scores.get('aligned_with_truth')
+            )
         }
         
         total_score = sum(scores.values())
@@ -139,9 +271,66 @@ class Keter(SefiraBase):
             'alignment_score': alignment_percentage,
             'detailed_scores': scores,
             'reasoning': reasoning,
-            'suggested_modifications': modifications
+            'suggested_modifications': modifications,
+            'llm_scored_criteria': sorted(
+                key for key, value in llm_scores.items() if value is not None
+            )
         }
     
+    def _llm_scores(self, action: str, context: str, expected_outcome: str = '') -> Dict[str, Optional[int]]:
+        """
+        Scores semanticos segun llm_scoring_mode.
+
+        'structured': una sola llamada que devuelve los cinco criterios en JSON.
+        'per_criterion': los criterios de LLM_CRITERIA en paralelo, una llamada
+        cada uno (la latencia es la de la mas lenta).
+
+        Returns:
+            Clave de score -> score (-10 a +10). Los criterios ausentes o None
+            usan la heuristica de keywords.
+        """
+        if not self.use_llm_scoring or not self.gemini_client:
+            return {}
+
+        if self._scoring_mode() == 'structured':
+            prompt = self._structured_prompt(action, context, expected_outcome)
+            try:
+                text = self._call_llm(prompt)
+            except Exception as e:
+                logger.warning(f"Gemini scoring estructurado fallo: {e}")
+                return {}
+            return self._parse_structured_scores(text)
+
+        with ThreadPoolExecutor(max_workers=len(self.LLM_CRITERIA)) as executor:
+            futures = {
+                key: executor.submit(
+                    self._llm_semantic_score, criterion, description, action, context
+                )
+                for key, (criterion, description) in self.LLM_CRITERIA.items()
+            }
+            return {key: future.result() for key, future in futures.items()}
+
+    async def _allm_scores(self, action: str, context: str, expected_outcome: str = '') -> Dict[str, Optional[int]]:
+        """Version async de _llm_scores (en modo per_criterion, asyncio.gather)"""
+        if not self.use_llm_scoring or not self.gemini_client:
+            return {}
+
+        if self._scoring_mode() == 'structured':
+            prompt = self._structured_prompt(action, context, expected_outcome)
+            try:
+                text = await self._acall_llm(prompt)
+            except Exception as e:
+                logger.warning(f"Gemini scoring estructurado fallo: {e}")
+                return {}
+            return self._parse_structured_scores(text)
+
+        keys = list(self.LLM_CRITERIA)
+        scores = await asyncio.gather(*(
+            self._allm_semantic_score(criterion, description, action, context)
+            for criterion, description in self.LLM_CRITERIA.values()
+        ))
+        return dict(zip(keys, scores))
+
     def _llm_semantic_score(self, criterion: str, description: str, action: str, context: str) -> int:
         """
         Evalua un criterio usando analisis semantico con Gemini.
@@ -159,7 +348,32 @@ class Keter(SefiraBase):
         if not self.use_llm_scoring or not self.gemini_client:
             return None  # Fallback a heuristica
 
-        prompt = f"""Analiza si esta accion esta alineada con: {description}
+        try:
+            text = self._call_llm(self._score_prompt(description, action, context))
+        except Exception as e:
+            logger.warning(f"Gemini scoring fallo para {criterion}: {e}")
+            return None
+
+        return self._parse_score(criterion, text)
+
+    async def _allm_semantic_score(
+        self, criterion: str, description: str, action: str, context: str
+    ) -> Optional[int]:
+        """Version async de _llm_semantic_score"""
+        if not self.use_llm_scoring or not self.gemini_client:
+            return None
+
+        try:
+            text = await self._acall_llm(self._score_prompt(description, action, context))
+        except Exception as e:
+            logger.warning(f"Gemini scoring fallo para {criterion}: {e}")
+            return None
+
+        return self._parse_score(criterion, text)
+
+    def _score_prompt(self, description: str, action: str, context: str) -> str:
+        """Construye el prompt de evaluacion semantica de un criterio"""
+        return f"""Analiza si esta accion esta alineada con: {description}
 
 ACCION: {action}
 CONTEXTO: {context}
@@ -176,168 +390,220 @@ SCORE: [numero]
 RAZON: [justificacion breve]
 """
 
+    def _structured_prompt(self, action: str, context: str, expected_outcome: str) -> str:
+        """Prompt que pide los cinco criterios como un objeto JSON"""
+        criteria = "\n".join(
+            f"- {key}: {description}" for key, description in self.STRUCTURED_CRITERIA.items()
+        )
+        keys = ", ".join(f'"{key}": <entero>' for key in self.STRUCTURED_CRITERIA)
+        return f"""Evalua si esta accion esta alineada con Tikun Olam segun cada criterio.
+
+ACCION: {action}
+CONTEXTO: {context}
+RESULTADO ESPERADO: {expected_outcome}
+
+CRITERIOS:
+{criteria}
+
+Para cada criterio da un entero en escala -10 a +10:
+-10: Completamente opuesto al criterio
+  0: Neutral o ambiguo
++10: Perfectamente alineado con el criterio
+
+Responde SOLO con un objeto JSON, sin texto adicional:
+{{{keys}}}
+"""
+
+    def _parse_structured_scores(self, text: str) -> Dict[str, Optional[int]]:
+        """
+        Parsea la respuesta JSON del modo estructurado.
+
+        Cada criterio ausente o no numerico queda fuera del resultado, de modo
+        que ese criterio (y solo ese) usa la heuristica.
+        """
+        cleaned = text.strip()
+        if cleaned.startswith('```'):
+            cleaned = re.sub(r'^```(?:json)?\s*|\s*```$', '', cleaned)
+
         try:
-            generation_config = genai.GenerationConfig(
-                temperature=0.3,  # Baja temperatura para consistencia
-                max_output_tokens=150,
-            )
+            data = json.loads(cleaned)
+        except (json.JSONDecodeError, TypeError):
+            logger.warning(f"Respuesta JSON de scoring invalida: {text[:100]}")
+            return {}
+        if not isinstance(data, dict):
+            logger.warning(f"Respuesta JSON de scoring no es un objeto: {text[:100]}")
+            return {}
+
+        scores = {}
+        for key in self.STRUCTURED_CRITERIA:
+            value = data.get(key)
+            if isinstance(value, bool):
+                continue
+            try:
+                scores[key] = max(-10, min(10, int(round(float(value)))))
+            except (TypeError, ValueError):
+                continue
+
+        missing = set(self.STRUCTURED_CRITERIA) - set(scores)
+        if missing:
+            logger.debug(f"Criterios sin score LLM (heuristica): {sorted(missing)}")
+        return scores
+
+    def _parse_score(self, criterion: str, text: str) -> Optional[int]:
+        """Extrae el score (-10 a +10) de la respuesta del LLM; None si no se puede"""
+        # Parsear score - intentar multiples formatos
+        # Formato 1: "SCORE: 8", "SCORE: +8", "SCORE: -3"
+        match = re.search(r'SCORE:\s*([+-]?\d+)', text, re.IGNORECASE)
+        if match:
+            score = int(match.group(1))
+            logger.debug(f"LLM score para {criterion}: {score}/10")
+            return max(-10, min(10, score))
+
+        # Formato 2: "Score: 8" o "score: 8"
+        match = re.search(r'score\s*:\s*([+-]?\d+)', text, re.IGNORECASE)
+        if match:
+            score = int(match.group(1))
+            logger.debug(f"LLM score para {criterion}: {score}/10 (formato 2)")
+            return max(-10, min(10, score))
+
+        # Formato 3: Buscar cualquier numero entre -10 y 10 al inicio
+        match = re.search(r'^[\s\*]*([+-]?\d+)\s*/?\s*10', text, re.MULTILINE)
+        if match:
+            score = int(match.group(1))
+            if -10 <= score <= 10:
+                logger.debug(f"LLM score para {criterion}: {score}/10 (formato 3)")
+                return score
+
+        # Formato 4: Solo un numero al principio
+        match = re.search(r'^[\s\*]*([+-]?\d+)', text.strip())
+        if match:
+            score = int(match.group(1))
+            if -10 <= score <= 10:
+                logger.debug(f"LLM score para {criterion}: {score}/10 (formato 4)")
+                return score
+
+        logger.warning(f"No se pudo parsear score de LLM para {criterion}. Respuesta: {text[:100]}")
+        return None
+
+    def _call_gemini(self, prompt: str) -> str:
+        """Llama a Gemini para evaluar un criterio (baja temperatura para consistencia)"""
+        response = self.gemini_client.generate_content(
+            prompt,
+            generation_config=self._scoring_config()
+        )
+        self._record_token_usage(response)
+        return response.text
+
+    async def _acall_gemini(self, prompt: str) -> str:
+        """Version async de _call_gemini"""
+        response = await self.gemini_client.generate_content_async(
+            prompt,
+            generation_config=self._scoring_config()
+        )
+        self._record_token_usage(response)
+        return response.text
 
-            response = self.gemini_client.generate_content(
-                prompt,
-                generation_config=generation_config
+    def _scoring_mode(self) -> str:
+        """
+        llm_scoring_mode efectivo: 'structured' necesita un SDK con salida
+        JSON (ver LLMProvider.supports_json_output); si no la tiene, cada
+        llamada fallaria y caeria a los heuristicos, asi que se usa
+        'per_criterion'.
+        """
+        if (self.llm_scoring_mode == 'structured' and self.provider is not None
+                and not self.provider.supports_json_output()):
+            if not self._json_fallback_logged:
+                self._json_fallback_logged = True
+                logger.warning("Keter: el SDK no admite salida JSON, scoring en modo per_criterion")
+            return 'per_criterion'
+        return self.llm_scoring_mode
+
+    def _scoring_config(self):
+        """Configuracion de generacion para scoring semantico (JSON en modo estructurado)"""
+        if self._scoring_mode() == 'structured':
+            return self.provider.generation_config(
+                temperature=self.SCORING_TEMPERATURE,
+                max_output_tokens=self.STRUCTURED_MAX_OUTPUT_TOKENS,
+                response_mime_type='application/json',
             )
-            text = response.text
-
-            # Parsear score - intentar multiples formatos
-            # Formato 1: "SCORE: 8", "SCORE: +8", "SCORE: -3"
-            match = re.search(r'SCORE:\s*([+-]?\d+)', text, re.IGNORECASE)
-            if match:
-                score = int(match.group(1))
-                logger.debug(f"LLM score para {criterion}: {score}/10")
-                return max(-10, min(10, score))
-
-            # Formato 2: "Score: 8" o "score: 8"
-            match = re.search(r'score\s*:\s*([+-]?\d+)', text, re.IGNORECASE)
-            if match:
-                score = int(match.group(1))
-                logger.debug(f"LLM score para {criterion}: {score}/10 (formato 2)")
-                return max(-10, min(10, score))
-
-            # Formato 3: Buscar cualquier numero entre -10 y 10 al inicio
-            match = re.search(r'^[\s\*]*([+-]?\d+)\s*/?\s*10', text, re.MULTILINE)
-            if match:
-                score = int(match.group(1))
-                if -10 <= score <= 10:
-                    logger.debug(f"LLM score para {criterion}: {score}/10 (formato 3)")
-                    return score
-
-            # Formato 4: Solo un numero al principio
-            match = re.search(r'^[\s\*]*([+-]?\d+)', text.strip())
-            if match:
-                score = int(match.group(1))
-                if -10 <= score <= 10:
-                    logger.debug(f"LLM score para {criterion}: {score}/10 (formato 4)")
-                    return score
-
-            logger.warning(f"No se pudo parsear score de LLM para {criterion}. Respuesta: {text[:100]}")
-            return None
+        return self.provider.generation_config(
+            temperature=self.SCORING_TEMPERATURE,
+            max_output_tokens=self.SCORING_MAX_OUTPUT_TOKENS,
+        )
 
-        except Exception as e:
-            logger.warning(f"Gemini scoring fallo para {criterion}: {e}")
-            return None
+    def _llm_cache_params(self):
+        """Parametros del scoring semantico que forman la clave de cache"""
+        model = super()._llm_cache_params()[0]
+        if self._scoring_mode() == 'structured':
+            return (model, self.SCORING_TEMPERATURE, self.STRUCTURED_MAX_OUTPUT_TOKENS)
+        return (model, self.SCORING_TEMPERATURE, self.SCORING_MAX_OUTPUT_TOKENS)
 
-    def _score_suffering_reduction(self, action: str, expected_outcome: str) -> int:
+    def _score_suffering_reduction(self, scan: LexiconScan, llm_score: Optional[int] = None) -> int:
         """
         Evalúa si la acción reduce sufrimiento o aumenta florecimiento.
         
-        Por ahora, análisis heurístico simple.
-        TODO: Integrar con modelo de lenguaje para análisis más sofisticado.
+        scan: HEURISTIC_LEXICON sobre accion + resultado esperado.
+        llm_score: Score del modo estructurado (ver _llm_scores); None = heuristica.
         """
-        # Palabras clave positivas
-        positive_keywords = ['ayuda', 'cura', 'alivia', 'mejora', 'beneficia', 'florece', 'eleva']
-        # Palabras clave negativas
-        negative_keywords = ['daña', 'hiere', 'perjudica', 'destruye', 'sufre', 'dolor']
-        
-        text = (action + ' ' + expected_outcome).lower()
-        
-        positive_count = sum(1 for kw in positive_keywords if kw in text)
-        negative_count = sum(1 for kw in negative_keywords if kw in text)
-        
+        if llm_score is not None:
+            return llm_score
+
         # Puntuación: +2 por cada palabra positiva, -3 por cada negativa
-        score = (positive_count * 2) - (negative_count * 3)
+        score = (scan.count('suffering_positive') * 2) - (scan.count('suffering_negative') * 3)
         
         # Limitar a rango -10 a +10
         return max(-10, min(10, score))
     
-    def _score_free_will_respect(self, action: str, context: str) -> int:
+    def _score_free_will_respect(self, scan: LexiconScan, llm_score: Optional[int] = None) -> int:
         """
         Evalúa si la acción respeta el libre albedrío y dignidad.
+
+        scan: HEURISTIC_LEXICON sobre accion + contexto.
+        llm_score: Score del modo estructurado (ver _llm_scores); None = heuristica.
         """
-        # Indicadores de violación de libre albedrío
-        coercion_keywords = ['forzar', 'obligar', 'coaccionar', 'manipular', 'engañar']
-        # Indicadores de respeto
-        respect_keywords = ['elegir', 'decidir', 'consenso', 'voluntario', 'autonomía']
-        
-        text = (action + ' ' + context).lower()
-        
-        coercion_count = sum(1 for kw in coercion_keywords if kw in text)
-        respect_count = sum(1 for kw in respect_keywords if kw in text)
-        
-        score = (respect_count * 3) - (coercion_count * 4)
+        if llm_score is not None:
+            return llm_score
+
+        score = (scan.count('free_will_respect') * 3) - (scan.count('free_will_coercion') * 4)
         
         return max(-10, min(10, score))
     
-    def _score_harmony_promotion(self, action: str, expected_outcome: str) -> int:
-        """Evalúa si promueve armonía vs. discordia"""
-        harmony_keywords = ['paz', 'unión', 'colabora', 'armonía', 'coopera', 'reconcilia']
-        discord_keywords = ['conflicto', 'división', 'guerra', 'enfrentamiento', 'hostilidad']
-        
-        text = (action + ' ' + expected_outcome).lower()
-        
-        harmony_count = sum(1 for kw in harmony_keywords if kw in text)
-        discord_count = sum(1 for kw in discord_keywords if kw in text)
-        
-        score = (harmony_count * 2) - (discord_count * 3)
+    def _score_harmony_promotion(self, scan: LexiconScan, llm_score: Optional[int] = None) -> int:
+        """Evalúa si promueve armonía vs. discordia (scan: accion + resultado esperado)"""
+        if llm_score is not None:
+            return llm_score
+
+        score = (scan.count('harmony') * 2) - (scan.count('discord') * 3)
         
         return max(-10, min(10, score))
     
-    def _score_justice_mercy(self, action: str, context: str) -> int:
+    def _score_justice_mercy(self, scan: LexiconScan, llm_score: Optional[int] = None) -> int:
         """
         Evalua balance entre justicia y misericordia con analisis semantico.
-        """
-        # Intentar scoring con LLM
-        llm_score = self._llm_semantic_score(
-            criterion='justicia_misericordia',
-            description='BALANCE DE JUSTICIA Y MISERICORDIA: Equidad, imparcialidad combinada con compasion, clemencia (vs. crueldad, venganza)',
-            action=action,
-            context=context
-        )
 
+        scan: HEURISTIC_LEXICON sobre accion + contexto.
+        llm_score: Score semantico precalculado (ver _llm_scores); None = heuristica.
+        """
         if llm_score is not None:
             return llm_score
 
-        # Fallback a heuristica de keywords
-        justice_keywords = ['justo', 'equitativo', 'fair', 'imparcial', 'correcto']
-        mercy_keywords = ['misericordia', 'compasion', 'perdon', 'clemencia', 'bondad']
-        cruelty_keywords = ['cruel', 'venganza', 'castigo excesivo', 'implacable']
-
-        text = (action + ' ' + context).lower()
-
-        justice_count = sum(1 for kw in justice_keywords if kw in text)
-        mercy_count = sum(1 for kw in mercy_keywords if kw in text)
-        cruelty_count = sum(1 for kw in cruelty_keywords if kw in text)
-
         # Ideal: balance de justicia Y misericordia
-        score = (justice_count * 2) + (mercy_count * 2) - (cruelty_count * 5)
+        score = (scan.count('justice') * 2) + (scan.count('mercy') * 2) - (scan.count('cruelty') * 5)
 
         return max(-10, min(10, score))
     
-    def _score_truth_alignment(self, action: str, context: str) -> int:
+    def _score_truth_alignment(self, scan: LexiconScan, llm_score: Optional[int] = None) -> int:
         """
         Evalua alineacion con verdad usando analisis semantico profundo.
         Ya no depende solo de keywords literales.
-        """
-        # Intentar scoring con LLM
-        llm_score = self._llm_semantic_score(
-            criterion='verdad',
-            description='VERDAD vs. ENGANO: Transparencia, honestidad, autenticidad (vs. manipulacion, ocultamiento, falsedad)',
-            action=action,
-            context=context
-        )
 
+        scan: HEURISTIC_LEXICON sobre accion + contexto.
+        llm_score: Score semantico precalculado (ver _llm_scores); None = heuristica.
+        """
         if llm_score is not None:
             return llm_score
 
-        # Fallback a heuristica de keywords
-        truth_keywords = ['verdad', 'honesto', 'transparente', 'autentico', 'sincero']
-        deception_keywords = ['mentira', 'engano', 'falso', 'ocultar', 'manipular']
-
-        text = (action + ' ' + context).lower()
-
-        truth_count = sum(1 for kw in truth_keywords if kw in text)
-        deception_count = sum(1 for kw in deception_keywords if kw in text)
-
-        score = (truth_count * 3) - (deception_count * 5)
+        score = (scan.count('truth') * 3) - (scan.count('deception') * 5)
 
         return max(-10, min(10, score))
     
@@ -1,22 +1,35 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, AsyncIterator, Iterator, Union
 import os
-import google.generativeai as genai
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 from datetime import datetime
 
 class Malchut(SefiraBase):
+    CACHE_LLM_RESPONSES = True
+
+    # Secciones que pide el prompt; si faltan se usa el texto completo
+    SECTIONS = SectionTokenizer({
+        "actions": ["ACCIONES EJECUTADAS", "ACTIONS EXECUTED"],
+        "results": ["RESULTADOS TANGIBLES", "TANGIBLE RESULTS"],
+        "world": ["CAMBIO EN EL MUNDO", "WORLD CHANGE"],
+        "responsibilities": ["RESPONSABILIDADES", "RESPONSIBILITIES"],
+        "shabbat": ["REFLEXION SHABBAT", "SHABBAT REFLECTION"]
+    })
+    
+    # Modo output_mode="json": mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.MALCHUT)
         
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning("Malchut sin API key")
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel("gemini-2.0-flash-exp")
             logger.info("Malchut initialized")
         
         self.temperature = 0.5
@@ -30,6 +43,12 @@ class Malchut(SefiraBase):
         self.cycles_completed = 0
     
     def process(self, input_data: Any) -> Dict[str, Any]:
+        return self._drive(self._steps(input_data))
+    
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        return await self._adrive(self._steps(input_data))
+    
+    def _steps(self, input_data: Any) -> SefiraSteps:
         logger.debug("MALCHUT - Manifestando")
         self.activation_count += 1
         
@@ -38,8 +57,8 @@ class Malchut(SefiraBase):
         
         try:
             prompt = self._build_prompt(input_data)
-            response = self._call_gemini(prompt)
-            result = self._parse_response(response, input_data)
+            response = yield prompt
+            result = self._parse_output(response, self._parse_response, input_data)
             
             result["completion_percentage"] = 0.75
             result["manifestation_complete"] = True
@@ -78,35 +97,67 @@ TAREA:
 4. Asigna RESPONSABILIDADES (quien hace que)
 5. Reflexion SHABBAT (celebrar lo completado)
 
-Estructura tu respuesta con secciones claras.
+Estructura tu respuesta con estas secciones:
+ACCIONES EJECUTADAS:
+RESULTADOS TANGIBLES:
+CAMBIO EN EL MUNDO:
+RESPONSABILIDADES:
+REFLEXION SHABBAT:
 """
     
-    def _call_gemini(self, prompt: str) -> str:
+    def _call_gemini(self, prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
         response = self.client.generate_content(
             prompt,
-            generation_config=genai.types.GenerationConfig(
+            generation_config=self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
-            )
+                **self._response_format(),
+            ),
+            stream=stream
         )
+        if stream:
+            return self._iter_chunk_text(response)
+        self._record_token_usage(response)
+        return response.text
+    
+    async def _acall_gemini(self, prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        response = await self.client.generate_content_async(
+            prompt,
+            generation_config=self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            ),
+            stream=stream
+        )
+        if stream:
+            return self._aiter_chunk_text(response)
+        self._record_token_usage(response)
         return response.text
     
     def _parse_response(self, response: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._parse_sections(response, self.SECTIONS.split(response))
+    
+    def _parsed_from_json(self, data: Dict[str, Any], response: str) -> Dict[str, Any]:
+        return self._parse_sections(response, data)
+    
+    def _parse_sections(self, response: str, sections: Dict[str, str]) -> Dict[str, Any]:
         import re
         
         result = {
             "actions_executed": [],
-            "results_achieved": {"description": response[:500]},
-            "world_updated": {"description": response[: 300]},
+            "results_achieved": {"description": sections["results"][:500] or response[:500]},
+            "world_updated": {"description": sections["world"][:300] or response[: 300]},
             "responsibilities_assigned": {},
             "next_actions": [],
-            "shabbat_reflection": {"full_text": response[:500]},
+            "shabbat_reflection": {"full_text": sections["shabbat"][:500] or response[:500]},
             "raw_response": response
         }
         
-        # Parse actions
+        # Parse actions (sin seccion: primeras 15 lineas)
+        action_lines = sections["actions"].split("\n") if sections["actions"] else response.split("\n")[:15]
         action_pattern = r"^[\-\*\d\.]+\s*(.+)$"
-        for line in response.split("\n")[:15]:
+        for line in action_lines:
             match = re.match(action_pattern, line.strip())
             if match and len(match.group(1)) > 10:
                 result["actions_executed"].append({
@@ -117,7 +168,7 @@ Estructura tu respuesta con secciones claras.
         
         # Parse responsibilities  
         resp_pattern = r"([A-Za-z\s]+):\s*(.+)"
-        for match in re.finditer(resp_pattern, response):
+        for match in re.finditer(resp_pattern, sections["responsibilities"] or response):
             person = match.group(1).strip()
             resp = match.group(2).strip()[:150]
             if 3 < len(person) < 30 and len(resp) > 10:
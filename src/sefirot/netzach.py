@@ -10,11 +10,12 @@ Asegura que la decision de Tiferet se sostenga y triunfe.
 No se rinde - persiste hasta alcanzar la victoria.
 """
 
-from typing import Any, Dict, List, Optional
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Union
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 import os
-import google.generativeai as genai
 import time
 
 
@@ -37,24 +38,38 @@ class Netzach(SefiraBase):
     - Requiere balance con Hod (estructura)
     """
 
+    CACHE_LLM_RESPONSES = True
+
+    # Encabezados que pide el prompt (espanol e ingles)
+    SECTIONS = SectionTokenizer({
+        'persistence_strategy': ['ESTRATEGIA DE PERSISTENCIA', 'PERSISTENCE STRATEGY'],
+        'obstacles_identified': ['OBSTACULOS IDENTIFICADOS', 'OBSTACLES IDENTIFIED'],
+        'victory_conditions': ['CONDICIONES DE VICTORIA', 'VICTORY CONDITIONS'],
+        'endurance_plan': ['PLAN DE RESISTENCIA', 'ENDURANCE PLAN'],
+        'momentum_mechanisms': ['MECANISMOS DE MOMENTUM', 'MOMENTUM MECHANISMS'],
+        'sustainability_evaluation': ['EVALUACION DE SOSTENIBILIDAD', 'SUSTAINABILITY EVALUATION']
+    })
+
+    LIST_SECTIONS = ('obstacles_identified', 'victory_conditions', 'momentum_mechanisms')
+
+    # Modo output_mode='json': mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS, list_sections=LIST_SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.NETZACH)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "Netzach inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("Netzach initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 0.85  # Creativa pero enfocada en persistencia
         self.max_output_tokens = 4096
 
@@ -120,6 +135,14 @@ Estructura tu respuesta como:
         - 'victory_probability': Probabilidad exito (0-1)
         - 'raw_response': Respuesta completa de Gemini
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         start_time = time.time()
 
         try:
@@ -150,14 +173,14 @@ Estructura tu respuesta como:
             logger.debug(f"Netzach calling Gemini API with model {self.model_name}")
 
             # Llamar a Gemini API
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # DEBUG: Logging de respuesta raw
             logger.debug(f"Netzach raw response length: {len(response)} chars")
             logger.debug(f"Netzach raw response preview (first 500 chars):\n{response[:500]}")
 
             # Parsear respuesta
-            parsed = self._parse_response(response)
+            parsed = self._parse_output(response, self._parse_response)
 
             # DEBUG: Logging de parsing
             for key, value in parsed.items():
@@ -205,14 +228,6 @@ Estructura tu respuesta como:
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": "dict",
-                "processing_time": elapsed,
-                "success": True
-            })
-
             logger.info(
                 f"Netzach proceso estrategia: {obstacles_count} obstaculos, "
                 f"sostenibilidad={sustainability_score:.2f}, "
@@ -222,14 +237,6 @@ Estructura tu respuesta como:
             return result
 
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
             logger.error(f"Netzach error: {e}")
             return {
                 'processing_successful': False,
@@ -297,104 +304,69 @@ EVALUACION DE SOSTENIBILIDAD:
 
         return prompt
 
-    def _call_gemini(self, user_prompt: str) -> str:
-        """Llama a Gemini API y retorna respuesta"""
+    def _call_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Llama a Gemini API y retorna respuesta (con stream=True, sus fragmentos)"""
 
         try:
-            generation_config = genai.GenerationConfig(
+            generation_config = self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
             )
 
             response = self.client.generate_content(
                 user_prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                stream=stream
             )
 
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
 
         except Exception as e:
             logger.error(f"Error en _call_gemini: {e}")
             raise
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        """Parsea la respuesta estructurada de Gemini"""
+    async def _acall_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Version asincrona de _call_gemini (generate_content_async)"""
 
-        sections = {
-            'persistence_strategy': '',
-            'obstacles_identified': [],
-            'victory_conditions': [],
-            'endurance_plan': '',
-            'momentum_mechanisms': [],
-            'sustainability_evaluation': ''
-        }
+        try:
+            generation_config = self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            )
 
-        lines = response.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            line_upper = line.strip().upper()
-
-            # Detectar inicio de seccion
-            if 'ESTRATEGIA DE PERSISTENCIA:' in line_upper or 'PERSISTENCE STRATEGY:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'persistence_strategy'
-                current_content = []
-
-            elif 'OBSTACULOS IDENTIFICADOS:' in line_upper or 'OBSTACLES IDENTIFIED:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'obstacles_identified'
-                current_content = []
-
-            elif 'CONDICIONES DE VICTORIA:' in line_upper or 'VICTORY CONDITIONS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'victory_conditions'
-                current_content = []
-
-            elif 'PLAN DE RESISTENCIA:' in line_upper or 'ENDURANCE PLAN:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'endurance_plan'
-                current_content = []
-
-            elif 'MECANISMOS DE MOMENTUM:' in line_upper or 'MOMENTUM MECHANISMS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'momentum_mechanisms'
-                current_content = []
-
-            elif 'EVALUACION DE SOSTENIBILIDAD:' in line_upper or 'SUSTAINABILITY EVALUATION:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'sustainability_evaluation'
-                current_content = []
+            response = await self.client.generate_content_async(
+                user_prompt,
+                generation_config=generation_config,
+                stream=stream
+            )
 
-            else:
-                # Linea de contenido
-                if current_section and line.strip():
-                    current_content.append(line.strip())
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
+
+        except Exception as e:
+            logger.error(f"Error en _acall_gemini: {e}")
+            raise
 
-        # Guardar ultima seccion
-        if current_section:
-            self._save_section(sections, current_section, current_content)
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Parsea la respuesta estructurada de Gemini"""
+        sections: Dict[str, Any] = {}
 
-        return sections
+        for key, lines in self.SECTIONS.split_lines(response, include_inline=False).items():
+            if key in self.LIST_SECTIONS:
+                # Listas - limpiar guiones
+                sections[key] = [item for item in (line.lstrip('- *').strip() for line in lines) if item]
+            else:
+                # Texto continuo
+                sections[key] = '\n'.join(lines)
 
-    def _save_section(self, sections: dict, section_name: str, content: list):
-        """Guarda contenido parseado en la seccion correspondiente"""
-        if section_name in ['obstacles_identified', 'victory_conditions', 'momentum_mechanisms']:
-            # Listas - limpiar guiones
-            for item in content:
-                item_clean = item.lstrip('- *').strip()
-                if item_clean:
-                    sections[section_name].append(item_clean)
-        else:
-            # Texto continuo
-            sections[section_name] = '\n'.join(content).strip()
+        return sections
 
     def _calculate_sustainability_score(self, parsed: Dict[str, Any]) -> float:
         """
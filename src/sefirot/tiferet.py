@@ -10,11 +10,12 @@ Sintetiza Chesed (misericordia) y Gevurah (juicio) en armonia perfecta.
 No promedia - TRASCIENDE y crea belleza de la tension.
 """
 
-from typing import Any, Dict, List, Optional
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Union
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
 from loguru import logger
 import os
-import google.generativeai as genai
 import time
 
 
@@ -37,24 +38,37 @@ class Tiferet(SefiraBase):
     - Requiere AMBOS Chesed Y Gevurah activos
     """
 
+    # Encabezados que pide el prompt (espanol e ingles)
+    SECTIONS = SectionTokenizer({
+        'synthesis': ['SINTESIS CHESED-GEVURAH', 'SYNTHESIS'],
+        'conflicts_resolved': ['CONFLICTOS RESUELTOS', 'CONFLICTS RESOLVED'],
+        'balanced_decision': ['DECISION BALANCEADA', 'BALANCED DECISION'],
+        'chesed_integration': ['INTEGRACION DE CHESED', 'CHESED INTEGRATION'],
+        'gevurah_integration': ['INTEGRACION DE GEVURAH', 'GEVURAH INTEGRATION'],
+        'implementation_path': ['CAMINO DE IMPLEMENTACION', 'IMPLEMENTATION PATH'],
+        'beauty_evaluation': ['EVALUACION DE BELLEZA', 'BEAUTY EVALUATION']
+    })
+
+    LIST_SECTIONS = ('conflicts_resolved', 'implementation_path')
+
+    # Modo output_mode='json': mismas secciones como claves
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS, list_sections=LIST_SECTIONS)
+
     def __init__(self, api_key: Optional[str] = None):
         super().__init__(SefiraPosition.TIFERET)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "Tiferet inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("Tiferet initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 1.0  # Creativa para sintesis innovadoras
         self.max_output_tokens = 4096
 
@@ -120,6 +134,14 @@ Estructura tu respuesta como:
         - 'radiance': Como esta sintesis ilumina otros casos
         - 'raw_response': Respuesta completa de Gemini
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         start_time = time.time()
 
         try:
@@ -152,7 +174,7 @@ Estructura tu respuesta como:
             logger.debug(f"Tiferet calling Gemini API with model {self.model_name}")
 
             # Llamar a Gemini API
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # DEBUG: Logging de respuesta raw
             logger.debug(f"Tiferet raw response length: {len(response)} chars")
@@ -160,7 +182,7 @@ Estructura tu respuesta como:
             logger.debug(f"Tiferet raw response preview (last 300 chars):\n{response[-300:]}")
 
             # Parsear respuesta
-            parsed = self._parse_response(response)
+            parsed = self._parse_output(response, self._parse_response)
 
             # DEBUG: Logging de parsing
             for key, value in parsed.items():
@@ -216,14 +238,6 @@ Estructura tu respuesta como:
             elapsed = time.time() - start_time
             self.total_processing_time += elapsed
 
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "output_type": "dict",
-                "processing_time": elapsed,
-                "success": True
-            })
-
             logger.info(
                 f"Tiferet proceso sintesis: {conflicts_count} conflictos resueltos, "
                 f"armonia={harmony_score:.2f}, belleza={beauty_score:.2f}, "
@@ -233,14 +247,6 @@ Estructura tu respuesta como:
             return result
 
         except Exception as e:
-            elapsed = time.time() - start_time
-            self.history.append({
-                "timestamp": time.time(),
-                "input_type": type(input_data).__name__,
-                "error": str(e),
-                "processing_time": elapsed,
-                "success": False
-            })
             logger.error(f"Tiferet error: {e}")
             return {
                 'processing_successful': False,
@@ -333,111 +339,69 @@ EVALUACION DE BELLEZA:
 
         return prompt
 
-    def _call_gemini(self, user_prompt: str) -> str:
-        """Llama a Gemini API y retorna respuesta"""
+    def _call_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Llama a Gemini API y retorna respuesta (con stream=True, sus fragmentos)"""
 
         try:
-            generation_config = genai.GenerationConfig(
+            generation_config = self.provider.generation_config(
                 temperature=self.temperature,
                 max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
             )
 
             response = self.client.generate_content(
                 user_prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                stream=stream
             )
 
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
 
         except Exception as e:
             logger.error(f"Error en _call_gemini: {e}")
             raise
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        """Parsea la respuesta estructurada de Gemini"""
+    async def _acall_gemini(self, user_prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Version asincrona de _call_gemini (generate_content_async)"""
 
-        sections = {
-            'synthesis': '',
-            'conflicts_resolved': [],
-            'balanced_decision': '',
-            'chesed_integration': '',
-            'gevurah_integration': '',
-            'implementation_path': [],
-            'beauty_evaluation': ''
-        }
+        try:
+            generation_config = self.provider.generation_config(
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                **self._response_format(),
+            )
 
-        lines = response.split('\n')
-        current_section = None
-        current_content = []
-
-        for line in lines:
-            line_upper = line.strip().upper()
-
-            # Detectar inicio de seccion
-            if 'SINTESIS CHESED-GEVURAH:' in line_upper or 'SYNTHESIS:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'synthesis'
-                current_content = []
-
-            elif 'CONFLICTOS RESUELTOS:' in line_upper or 'CONFLICTS RESOLVED:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'conflicts_resolved'
-                current_content = []
-
-            elif 'DECISION BALANCEADA:' in line_upper or 'BALANCED DECISION:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'balanced_decision'
-                current_content = []
-
-            elif 'INTEGRACION DE CHESED:' in line_upper or 'CHESED INTEGRATION:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'chesed_integration'
-                current_content = []
-
-            elif 'INTEGRACION DE GEVURAH:' in line_upper or 'GEVURAH INTEGRATION:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'gevurah_integration'
-                current_content = []
-
-            elif 'CAMINO DE IMPLEMENTACION:' in line_upper or 'IMPLEMENTATION PATH:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'implementation_path'
-                current_content = []
-
-            elif 'EVALUACION DE BELLEZA:' in line_upper or 'BEAUTY EVALUATION:' in line_upper:
-                if current_section:
-                    self._save_section(sections, current_section, current_content)
-                current_section = 'beauty_evaluation'
-                current_content = []
+            response = await self.client.generate_content_async(
+                user_prompt,
+                generation_config=generation_config,
+                stream=stream
+            )
 
-            else:
-                # Linea de contenido
-                if current_section and line.strip():
-                    current_content.append(line.strip())
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
 
-        # Guardar ultima seccion
-        if current_section:
-            self._save_section(sections, current_section, current_content)
+        except Exception as e:
+            logger.error(f"Error en _acall_gemini: {e}")
+            raise
 
-        return sections
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Parsea la respuesta estructurada de Gemini"""
+        sections: Dict[str, Any] = {}
 
-    def _save_section(self, sections: dict, section_name: str, content: list):
-        """Guarda contenido parseado en la seccion correspondiente"""
-        if section_name in ['conflicts_resolved', 'implementation_path']:
-            # Listas - limpiar guiones
-            for item in content:
-                item_clean = item.lstrip('- *').strip()
-                if item_clean:
-                    sections[section_name].append(item_clean)
-        else:
-            # Texto continuo
-            sections[section_name] = '\n'.join(content).strip()
+        for key, lines in self.SECTIONS.split_lines(response, include_inline=False).items():
+            if key in self.LIST_SECTIONS:
+                # Listas - limpiar guiones
+                sections[key] = [item for item in (line.lstrip('- *').strip() for line in lines) if item]
+            else:
+                # Texto continuo
+                sections[key] = '\n'.join(lines)
+
+        return sections
 
     def _calculate_harmony_score(self, parsed: Dict[str, Any]) -> float:
         """
@@ -16,10 +16,13 @@ Yesod recibe el plan estructurado de Hod y lo CONECTA con la realidad:
 Es como la LUNA - receptiva, conectora, fundacional.
 """
 
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, AsyncIterator, Iterator, Union
 import os
-import google.generativeai as genai
-from ..core.sefirotic_base import SefiraBase, SefiraPosition
+from ..core.resilience import LLMCallError
+from ..core.sefirotic_base import SefiraBase, SefiraPosition, SefiraSteps
+from ..core.section_tokenizer import SectionTokenizer
+from ..core.structured_output import schema_from_sections
+from ..core.lexicon import Lexicon
 from loguru import logger
 
 
@@ -42,6 +45,35 @@ class Yesod(SefiraBase):
     - Requiere balance: preparar Y actuar
     """
 
+    CACHE_LLM_RESPONSES = True
+
+    # Encabezados que pide el prompt (espanol e ingles, en mayusculas) -> clave del texto crudo
+    SECTIONS = SectionTokenizer({
+        'foundation_text': ['EVALUACION DE FUNDAMENTOS', 'FOUNDATION ASSESSMENT'],
+        'reality_text': ['CONEXION CON REALIDAD', 'REALITY CONNECTION'],
+        'steps_text': ['PRIMEROS PASOS', 'FIRST STEPS'],
+        'resources_text': ['REQUISITOS DE RECURSOS', 'RESOURCE REQUIREMENTS'],
+        'stakeholders_text': ['ALINEAMIENTO STAKEHOLDERS', 'STAKEHOLDER ALIGNMENT'],
+        'readiness_text': ['PREPARACION PARA MANIFESTAR', 'MANIFESTATION READINESS']
+    }, uppercase_only=True)
+
+    # Modo output_mode='json': el texto de cada seccion como clave; los
+    # parsers de cada seccion (_parse_sections) se aplican igual
+    RESPONSE_SCHEMA = schema_from_sections(SECTIONS)
+
+    # Keywords de _parse_foundation_assessment
+    FOUNDATION_LEXICON = Lexicon({
+        'gaps': ['falta', 'gap', 'ausente', 'missing', 'necesita', 'requiere'],
+        'strengths': ['solido', 'fuerte', 'strong', 'bien', 'excelente', 'claro']
+    })
+
+    # Keywords de _parse_resource_requirements
+    RESOURCE_LEXICON = Lexicon({
+        'budget': ['presupuesto', 'budget', 'costo', 'precio', 'usd', '$', 'inversion'],
+        'personnel': ['facilitador', 'maestro', 'personal', 'equipo', 'coordinador', 'analista'],
+        'infrastructure': ['infraestructura', 'dispositivo', 'tablet', 'internet', 'conectividad', 'espacio']
+    })
+
     def __init__(self, api_key: Optional[str] = None):
         """
         Inicializa Yesod con conexion a Gemini
@@ -51,21 +83,18 @@ class Yesod(SefiraBase):
         """
         super().__init__(SefiraPosition.YESOD)
 
-        # Inicializar cliente de Gemini
+        # Cliente compartido del proveedor, con el modelo de la etapa
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.client = self._connect_provider(self.api_key)
+        if self.client is None:
             logger.warning(
                 "Yesod inicializada sin API key. "
                 "Configure GEMINI_API_KEY en .env o pase api_key al constructor"
             )
-            self.client = None
         else:
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-2.0-flash-exp')
             logger.info("Yesod initialized with Gemini API client")
 
         # Configuracion del modelo
-        self.model_name = "gemini-2.0-flash-exp"
         self.temperature = 0.7  # Balanceada para conexion practica
         self.max_output_tokens = 4096
 
@@ -135,6 +164,14 @@ Estructura tu respuesta como:
         - 'ready_to_manifest': bool
         - 'processing_successful': bool
         """
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data: Any) -> Dict[str, Any]:
+        """Version asincrona de process() sobre el cliente async de Gemini"""
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data: Any) -> SefiraSteps:
+        """Cuerpo de process(): cede el prompt y recibe la respuesta de Gemini"""
         logger.debug("\n" + "="*60)
         logger.debug("YESOD (Fundamento) - Conectando y Preparando")
         logger.debug("="*60)
@@ -151,10 +188,10 @@ Estructura tu respuesta como:
 
             # 2. Llamar a Gemini
             logger.debug("\n[Yesod] Llamando a Gemini para fundar y conectar...")
-            response = self._call_gemini(user_prompt)
+            response = yield user_prompt
 
             # 3. Parsear respuesta
-            result = self._parse_response(response, input_data)
+            result = self._parse_output(response, self._parse_response, input_data)
 
             # 4. Calcular metricas
             result['manifestation_readiness'] = self._calculate_manifestation_readiness(result)
@@ -300,26 +337,60 @@ Usa receptividad lunar, conexion practica, fundamento solido.
 
         return "\n".join(lines)
 
-    def _call_gemini(self, prompt: str) -> str:
+    def _call_gemini(self, prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
         """
-        Llama a la API de Gemini
+        Llama a la API de Gemini (con stream=True retorna sus fragmentos)
         """
         try:
             response = self.client.generate_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
+                generation_config=self.provider.generation_config(
+                    temperature=self.temperature,
+                    max_output_tokens=self.max_output_tokens,
+                    **self._response_format(),
+                ),
+                stream=stream
+            )
+            if stream:
+                return self._iter_chunk_text(response)
+            self._record_token_usage(response)
+            return response.text
+        except Exception as e:
+            raise LLMCallError(f"Error llamando a Gemini: {str(e)}") from e
+
+    async def _acall_gemini(self, prompt: str, stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """
+        Version asincrona de _call_gemini (generate_content_async)
+        """
+        try:
+            response = await self.client.generate_content_async(
+                prompt,
+                generation_config=self.provider.generation_config(
                     temperature=self.temperature,
                     max_output_tokens=self.max_output_tokens,
-                )
+                    **self._response_format(),
+                ),
+                stream=stream
             )
+            if stream:
+                return self._aiter_chunk_text(response)
+            self._record_token_usage(response)
             return response.text
         except Exception as e:
-            raise Exception(f"Error llamando a Gemini: {str(e)}")
+            raise LLMCallError(f"Error llamando a Gemini: {str(e)}") from e
 
     def _parse_response(self, response: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parsea la respuesta de Gemini para extraer fundamentos
         """
+        return self._parse_sections(response, self.SECTIONS.split(response))
+
+    def _parsed_from_json(self, data: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Modo JSON: las secciones ya vienen separadas"""
+        return self._parse_sections(response, data)
+
+    def _parse_sections(self, response: str, sections: Dict[str, str]) -> Dict[str, Any]:
+        """Resultado a partir del texto crudo de cada seccion"""
         result = {
             'foundation_assessment': {},
             'reality_connection': {},
@@ -329,18 +400,8 @@ Usa receptividad lunar, conexion practica, fundamento solido.
             'raw_response': response
         }
 
-        # Extraer secciones
-        sections = {
-            'EVALUACION DE FUNDAMENTOS:': 'foundation_text',
-            'CONEXION CON REALIDAD:': 'reality_text',
-            'PRIMEROS PASOS:': 'steps_text',
-            'REQUISITOS DE RECURSOS:': 'resources_text',
-            'ALINEAMIENTO STAKEHOLDERS:': 'stakeholders_text',
-            'PREPARACION PARA MANIFESTAR:': 'readiness_text'
-        }
-
-        for section_marker, key in sections.items():
-            result[key] = self._extract_section(response, section_marker)
+        # Texto crudo de cada seccion, lo parsean los metodos de abajo
+        result.update(sections)
 
         # Parsear foundation assessment
         result['foundation_assessment'] = self._parse_foundation_assessment(
@@ -369,32 +430,6 @@ Usa receptividad lunar, conexion practica, fundamento solido.
 
         return result
 
-    def _extract_section(self, text: str, marker: str) -> str:
-        """Extrae seccion del texto"""
-        if marker not in text:
-            return ""
-
-        start = text.find(marker) + len(marker)
-
-        # Encontrar siguiente seccion
-        next_markers = [
-            'EVALUACION DE FUNDAMENTOS:',
-            'CONEXION CON REALIDAD:',
-            'PRIMEROS PASOS:',
-            'REQUISITOS DE RECURSOS:',
-            'ALINEAMIENTO STAKEHOLDERS:',
-            'PREPARACION PARA MANIFESTAR:'
-        ]
-
-        end = len(text)
-        for next_marker in next_markers:
-            if next_marker != marker and next_marker in text[start:]:
-                pos = text.find(next_marker, start)
-                if pos < end:
-                    end = pos
-
-        return text[start:end].strip()
-
     def _parse_foundation_assessment(self, text: str) -> Dict[str, Any]:
         """
         Parsea la evaluacion de fundamentos
@@ -406,31 +441,26 @@ Usa receptividad lunar, conexion practica, fundamento solido.
             'solidity': 0.75  # Default
         }
 
-        text_lower = text.lower()
+        scan = self.FOUNDATION_LEXICON.scan(text)
 
-        # Buscar gaps/faltas mencionadas
-        gap_keywords = ['falta', 'gap', 'ausente', 'missing', 'necesita', 'requiere']
-        for keyword in gap_keywords:
-            if keyword in text_lower:
-                # Extraer contexto alrededor de la palabra
-                idx = text_lower.find(keyword)
-                context = text[max(0, idx-50):min(len(text), idx+100)]
-                assessment['gaps'].append(context.strip())
+        # Buscar gaps/faltas mencionadas (contexto alrededor de la primera aparicion)
+        for keyword in scan.found('gaps'):
+            idx = scan.first(keyword)
+            context = text[max(0, idx-50):min(len(text), idx+100)]
+            assessment['gaps'].append(context.strip())
 
         # Buscar strengths/fortalezas
-        strength_keywords = ['solido', 'fuerte', 'strong', 'bien', 'excelente', 'claro']
-        for keyword in strength_keywords:
-            if keyword in text_lower:
-                idx = text_lower.find(keyword)
-                context = text[max(0, idx-50):min(len(text), idx+100)]
-                assessment['strengths'].append(context.strip())
+        for keyword in scan.found('strengths'):
+            idx = scan.first(keyword)
+            context = text[max(0, idx-50):min(len(text), idx+100)]
+            assessment['strengths'].append(context.strip())
 
         # Estimar solidity basado en texto
-        if 'muy solido' in text_lower or 'excelente' in text_lower:
+        if scan.has('muy solido') or scan.has('excelente'):
             assessment['solidity'] = 0.9
-        elif 'solido' in text_lower or 'bien' in text_lower:
+        elif scan.has('solido') or scan.has('bien'):
             assessment['solidity'] = 0.75
-        elif 'falta' in text_lower or 'debil' in text_lower:
+        elif scan.has('falta') or scan.has('debil'):
             assessment['solidity'] = 0.5
 
         return assessment
@@ -505,31 +535,19 @@ Usa receptividad lunar, conexion practica, fundamento solido.
             'infrastructure': []
         }
 
-        text_lower = text.lower()
-
-        # Buscar menciones de presupuesto/dinero
-        budget_keywords = ['presupuesto', 'budget', 'costo', 'precio', 'usd', '$', 'inversion']
-        for keyword in budget_keywords:
-            if keyword in text_lower:
-                idx = text_lower.find(keyword)
-                context = text[max(0, idx-30):min(len(text), idx+100)]
-                requirements['budget'].append(context.strip())
-
-        # Buscar menciones de personal
-        personnel_keywords = ['facilitador', 'maestro', 'personal', 'equipo', 'coordinador', 'analista']
-        for keyword in personnel_keywords:
-            if keyword in text_lower:
-                idx = text_lower.find(keyword)
-                context = text[max(0, idx-20):min(len(text), idx+80)]
-                requirements['personnel'].append(context.strip())
-
-        # Buscar menciones de infraestructura
-        infra_keywords = ['infraestructura', 'dispositivo', 'tablet', 'internet', 'conectividad', 'espacio']
-        for keyword in infra_keywords:
-            if keyword in text_lower:
-                idx = text_lower.find(keyword)
-                context = text[max(0, idx-20):min(len(text), idx+80)]
-                requirements['infrastructure'].append(context.strip())
+        scan = self.RESOURCE_LEXICON.scan(text)
+
+        # Presupuesto, personal e infraestructura: contexto de la primera aparicion
+        context_windows = {
+            'budget': (30, 100),
+            'personnel': (20, 80),
+            'infrastructure': (20, 80)
+        }
+        for category, (before, after) in context_windows.items():
+            for keyword in scan.found(category):
+                idx = scan.first(keyword)
+                context = text[max(0, idx-before):min(len(text), idx+after)]
+                requirements[category].append(context.strip())
 
         return requirements
 
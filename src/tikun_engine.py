@@ -0,0 +1,1223 @@
+"""
+TIKUN ENGINE - Orquestador del Arbol de Sefirot
+
+El Arbol se declara como un grafo de dependencias (DAG): cada nodo es una
+Sefira, las aristas indican que resultados necesita para construir su input.
+El motor lanza a la vez todos los nodos cuyas dependencias ya estan
+resueltas, de modo que la latencia total es la del camino critico y no la
+suma de todas las llamadas al LLM.
+
+    Keter ─────────────────────────────────────────────┐
+    Chochmah → Binah → Chesed → Gevurah → Tiferet → ... → Malchut
+                         └──────────────────┘
+
+Cada nodo se ejecuta con Sefira.aprocess(), asi que las llamadas al LLM
+comparten un solo event loop en lugar de ocupar un hilo por Sefira.
+Cada nodo tiene su propio timeout. Si un nodo falla o expira, los nodos que
+dependen de el se omiten y se reportan en 'skipped'.
+
+Gating: con gating_policy 'stop' o 'modifications' el resto del Arbol espera
+el veredicto de Keter y no se gasta ninguna llamada mas si la accion no esta
+alineada ('modifications' antes reintenta Keter con sus suggested_modifications).
+Los umbrales (thresholds) detienen los dependientes de un nodo cuyo score
+intermedio queda por debajo del minimo, p.ej. {'tiferet': {'harmony_score': 0.5}}.
+
+Especulacion: esperar a Keter agrega su latencia al camino critico. Los nodos
+de 'speculate' (Chochmah y, opcionalmente, Binah: solo leen action/context)
+arrancan igual en paralelo con Keter. Si Keter rechaza la accion se cancelan
+o se descartan; si la acepta modificada se vuelven a ejecutar con la accion
+nueva. Cada ejecucion reporta los tokens desperdiciados frente a la latencia
+ahorrada, y get_speculation_metrics() los acumula para ajustar la politica
+(TikunService pasa a cada engine el acumulador del proceso,
+get_speculation_stats(), para que cubra todas las peticiones).
+
+Streaming: con streaming=True las Sefirot que otro nodo lee por secciones
+(SefiraNode.reads) responden en streaming (listen_sections) y el nodo
+dependiente arranca en cuanto las secciones que lee estan completas, sin
+esperar el resto de la respuesta. P.ej. Chesed solo lee stakeholders,
+efectos, riesgos y consideraciones eticas de Binah, no su sintesis.
+
+Eventos: stream()/astream() entregan el resultado de cada Sefira en cuanto
+esta listo (el veredicto de Keter siempre primero) y al final el dict de
+arun(); ver RunEvents.
+
+Lotes: run_batch()/arun_batch() evaluan muchas acciones en el mismo loop con
+un limite de concurrencia, y retornan cada resultado en el orden de entrada
+con su propio error: una accion que falla no aborta el lote.
+"""
+
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from loguru import logger
+import asyncio
+import queue
+import threading
+import time
+
+from .core.rate_limiter import llm_priority
+from .core.sefirotic_base import SefiraBase, listen_sections, track_llm_usage
+from .core.sefira_registry import get_registry
+from .core.tracing import span
+from .core.usage import TOKEN_KEYS
+
+
+# Firma de los constructores de input: (request, results) -> input_data
+InputBuilder = Callable[[Dict[str, Any], Dict[str, Dict[str, Any]]], Dict[str, Any]]
+
+
+class SefiraNode:
+    """
+    Nodo del grafo: una Sefira, sus dependencias y como construir su input.
+
+    Args:
+        name: Nombre del nodo (clave en los resultados, p.ej. 'binah')
+        depends_on: Nodos cuyos resultados necesita
+        build_input: Funcion (request, results) -> input_data
+        timeout: Timeout propio en segundos (None = usar el del motor)
+        reads: Dependencia -> claves de su resultado que lee build_input,
+               cuando son secciones de su respuesta (SECTIONS). Con
+               streaming el nodo arranca en cuanto estan completas.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        depends_on: Iterable[str],
+        build_input: InputBuilder,
+        timeout: Optional[float] = None,
+        reads: Optional[Dict[str, Iterable[str]]] = None
+    ):
+        self.name = name
+        self.depends_on = tuple(depends_on)
+        self.build_input = build_input
+        self.timeout = timeout
+        self.reads = {dep: tuple(keys) for dep, keys in (reads or {}).items()}
+
+    def __repr__(self) -> str:
+        deps = ', '.join(self.depends_on) or '-'
+        return f"<SefiraNode {self.name} <- [{deps}]>"
+
+
+# =============================================================================
+# Constructores de input de cada Sefira (mismo contrato que process_action)
+# =============================================================================
+
+def _keter_input(request, results):
+    return {
+        'action': request['action'],
+        'context': request['context'],
+        'expected_outcome': request['expected_outcome']
+    }
+
+
+def _chochmah_input(request, results):
+    return {
+        'query': request['action'],
+        'context': request['context']
+    }
+
+
+# Secciones de la respuesta del nodo anterior que leen _binah_input y
+# _chesed_input (ver SefiraNode.reads)
+BINAH_READS = ('understanding', 'analysis')
+CHESED_READS = (
+    'stakeholders', 'first_order_effects', 'second_order_effects',
+    'systemic_risks', 'ethical_considerations'
+)
+
+
+def _binah_input(request, results):
+    return {
+        'understanding': results['chochmah']['understanding'],
+        'analysis': results['chochmah']['analysis'],
+        'action': request['action']
+    }
+
+
+def _chesed_input(request, results):
+    binah = results['binah']
+    return {
+        'stakeholders': binah['stakeholders'],
+        'first_order_effects': binah['first_order_effects'],
+        'second_order_effects': binah['second_order_effects'],
+        'systemic_risks': binah['systemic_risks'],
+        'ethical_considerations': binah['ethical_considerations'],
+        'action': request['action']
+    }
+
+
+def _gevurah_input(request, results):
+    chesed = results['chesed']
+    return {
+        'giving_opportunities': chesed['giving_opportunities'],
+        'beneficiaries': chesed['beneficiaries'],
+        'generous_actions': chesed['generous_actions'],
+        'compassion_score': chesed['compassion_score'],
+        'expansion_potential': chesed['expansion_potential'],
+        'limits_needed': chesed['limits_needed'],
+        'action': request['action']
+    }
+
+
+def _tiferet_input(request, results):
+    return {
+        'chesed_output': results['chesed'],
+        'gevurah_output': results['gevurah'],
+        'action': request['action']
+    }
+
+
+def _netzach_input(request, results):
+    tiferet = results['tiferet']
+    return {
+        'balanced_decision': tiferet['balanced_decision'],
+        'implementation_path': tiferet['implementation_path'],
+        'harmony_score': tiferet['harmony_score'],
+        'beauty_score': tiferet['beauty_score'],
+        'action': request['action']
+    }
+
+
+def _hod_input(request, results):
+    netzach = results['netzach']
+    return {
+        'persistence_strategy': netzach['persistence_strategy'],
+        'obstacles_identified': netzach['obstacles_identified'],
+        'victory_conditions': netzach['victory_conditions'],
+        'endurance_plan': netzach['endurance_plan'],
+        'momentum_mechanisms': netzach['momentum_mechanisms'],
+        'sustainability_score': netzach['sustainability_score'],
+        'action': request['action']
+    }
+
+
+def _yesod_input(request, results):
+    hod = results['hod']
+    return {
+        'structured_plan': hod['structured_plan'],
+        'communication_strategy': hod['communication_strategy'],
+        'metrics_framework': hod['metrics_framework'],
+        'documentation': hod['documentation'],
+        'stakeholder_messages': hod['stakeholder_messages'],
+        'precision_score': hod['precision_score'],
+        'clarity_score': hod['clarity_score'],
+        'action': request['action']
+    }
+
+
+def _malchut_input(request, results):
+    yesod = results['yesod']
+    return {
+        'foundation_assessment': yesod['foundation_assessment'],
+        'reality_connection': yesod['reality_connection'],
+        'first_concrete_steps': yesod['first_concrete_steps'],
+        'resource_requirements': yesod['resource_requirements'],
+        'stakeholder_alignment': yesod['stakeholder_alignment'],
+        'manifestation_readiness': yesod['manifestation_readiness'],
+        'ready_to_manifest': yesod['ready_to_manifest'],
+        'action': request['action']
+    }
+
+
+def default_tree() -> List[SefiraNode]:
+    """Grafo estandar de las diez Sefirot (Keter y Chochmah son independientes)"""
+    return [
+        SefiraNode('keter', [], _keter_input),
+        SefiraNode('chochmah', [], _chochmah_input),
+        SefiraNode('binah', ['chochmah'], _binah_input, reads={'chochmah': BINAH_READS}),
+        SefiraNode('chesed', ['binah'], _chesed_input, reads={'binah': CHESED_READS}),
+        SefiraNode('gevurah', ['chesed'], _gevurah_input),
+        SefiraNode('tiferet', ['chesed', 'gevurah'], _tiferet_input),
+        SefiraNode('netzach', ['tiferet'], _netzach_input),
+        SefiraNode('hod', ['netzach'], _hod_input),
+        SefiraNode('yesod', ['hod'], _yesod_input),
+        SefiraNode('malchut', ['yesod'], _malchut_input),
+    ]
+
+
+def build_default_sefirot() -> Dict[str, SefiraBase]:
+    """Las diez Sefirot del grafo estandar, compartidas via el registro del proceso"""
+    return get_registry().get_all()
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop de fondo donde corre run().
+
+    Los clientes async de los LLM (canales grpc.aio, httpx) quedan ligados al
+    loop en que se crearon. Como las Sefirot del registro se reutilizan entre
+    peticiones, todas las llamadas sincronas comparten un loop que vive lo
+    mismo que el proceso.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="tikun-engine-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def empty_speculation_stats() -> Dict[str, Any]:
+    """Acumulador vacio de TikunEngine._record_speculation"""
+    return {
+        'runs': 0,
+        'confirmed': 0,
+        'discarded': 0,
+        'restarted': 0,
+        'wasted_tokens_est': 0,
+        'latency_saved': 0.0
+    }
+
+
+def speculation_metrics(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Acumulado de la especulacion con tasas y promedios por ejecucion"""
+    with _speculation_lock:
+        metrics = dict(stats)
+    runs = metrics['runs']
+    metrics['confirm_rate'] = metrics['confirmed'] / runs if runs else 0.0
+    metrics['avg_latency_saved'] = metrics['latency_saved'] / runs if runs else 0.0
+    metrics['avg_wasted_tokens_est'] = metrics['wasted_tokens_est'] / runs if runs else 0.0
+    return metrics
+
+
+# Acumulador del proceso: los engines se crean por peticion (ver TikunService)
+_speculation_stats = empty_speculation_stats()
+_speculation_lock = threading.Lock()
+
+
+def get_speculation_stats() -> Dict[str, Any]:
+    """Balance de la especulacion compartido por el proceso"""
+    return _speculation_stats
+
+
+class RunEvents:
+    """
+    Eventos de una ejecucion de arun(), en orden de llegada:
+
+        {'type': 'result', 'sefira': 'keter', 'result': {...}, 'elapsed': 1.2}
+        {'type': 'error', 'sefira': 'binah', 'error': 'timeout tras 120.0s'}
+        {'type': 'skipped', 'sefira': 'chesed', 'reason': 'dependencia ...'}
+        {'type': 'done', 'run': {...}}   # solo stream()/astream()
+
+    Hasta el veredicto de Keter (resultado o error) los demas eventos se
+    retienen, asi el cliente ve primero si la accion esta alineada. Un
+    resultado especulativo descartado nunca se entrega.
+    """
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None], gate: Optional[str]):
+        self.callback = callback
+        self.gate = gate
+        self._held: Optional[List[Dict[str, Any]]] = [] if gate is not None else None
+        self._reported_skips: set = set()
+
+    def result(self, name: str, result: Dict[str, Any], elapsed: float) -> None:
+        self._emit({'type': 'result', 'sefira': name, 'result': result, 'elapsed': elapsed})
+
+    def error(self, name: str, error: str) -> None:
+        self._emit({'type': 'error', 'sefira': name, 'error': error})
+
+    def skips(self, skipped: Dict[str, str]) -> None:
+        """Emite las omisiones nuevas"""
+        for name, reason in skipped.items():
+            if name not in self._reported_skips:
+                self._reported_skips.add(name)
+                self._emit({'type': 'skipped', 'sefira': name, 'reason': reason})
+
+    def release(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """Entrega lo retenido, sin los resultados que ya no estan en 'results'"""
+        held, self._held = self._held, None
+        for event in held or []:
+            if event['type'] == 'result' and results.get(event['sefira']) is not event['result']:
+                continue
+            self._send(event)
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        if self._held is None:
+            self._send(event)
+            return
+        if event['sefira'] == self.gate:
+            # El veredicto sale antes que todo lo retenido
+            self._send(event)
+        else:
+            self._held.append(event)
+
+    def _send(self, event: Dict[str, Any]) -> None:
+        try:
+            self.callback(event)
+        except Exception as e:
+            logger.warning(f"TikunEngine: on_event fallo con {event['type']} - {e}")
+
+
+class TikunEngine:
+    """
+    Ejecuta el Arbol de Sefirot como DAG con concurrencia maxima.
+
+    Uso:
+        engine = TikunEngine()
+        run = engine.run(action, context, expected_outcome)
+        run['results']['keter'], run['timings'], run['skipped'], ...
+    """
+
+    DEFAULT_NODE_TIMEOUT = 120.0  # segundos por Sefira
+
+    # 'continue': el Arbol completo corre siempre (Keter en paralelo)
+    # 'stop': si Keter rechaza la accion, no se ejecuta nada mas
+    # 'modifications': si Keter la rechaza, se reevalua con sus
+    #                  suggested_modifications; se sigue solo si queda alineada
+    GATING_POLICIES = ('continue', 'stop', 'modifications')
+    GATE_NODE = 'keter'
+    MAX_MODIFICATION_ROUNDS = 2
+    DEFAULT_BATCH_CONCURRENCY = 4  # acciones evaluadas a la vez en run_batch()
+
+    def __init__(
+        self,
+        sefirot: Optional[Dict[str, SefiraBase]] = None,
+        nodes: Optional[List[SefiraNode]] = None,
+        node_timeout: float = DEFAULT_NODE_TIMEOUT,
+        gating_policy: str = 'continue',
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+        max_modification_rounds: int = MAX_MODIFICATION_ROUNDS,
+        speculate: Iterable[str] = (),
+        streaming: bool = False,
+        speculation_stats: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            sefirot: Nombre de nodo -> Sefira (por defecto las del registro)
+            nodes: Grafo (por defecto default_tree())
+            node_timeout: Timeout por nodo en segundos
+            gating_policy: Politica por defecto ante un rechazo de Keter
+                           (ver GATING_POLICIES)
+            thresholds: Nodo -> {score: minimo}; si el score queda por debajo
+                        se omiten los nodos que dependen de ese nodo
+            max_modification_rounds: Reevaluaciones de Keter en 'modifications'
+            speculate: Nodos que no esperan el veredicto de Keter aunque la
+                       politica lo exija (p.ej. ('chochmah', 'binah'))
+            streaming: Arrancar los nodos con 'reads' en cuanto las
+                       secciones que leen llegan en streaming
+            speculation_stats: Acumulador del balance de la especulacion,
+                       compartible entre engines (p.ej. get_speculation_stats());
+                       por defecto uno propio
+        """
+        self.nodes = nodes if nodes is not None else default_tree()
+        self.sefirot = sefirot if sefirot is not None else build_default_sefirot()
+        self.node_timeout = node_timeout
+        self.gating_policy = self._check_policy(gating_policy)
+        self.thresholds = thresholds or {}
+        self.max_modification_rounds = max_modification_rounds
+        self.speculate = tuple(speculate)
+        self.streaming = streaming
+        self.speculation_stats = (
+            speculation_stats if speculation_stats is not None else empty_speculation_stats()
+        )
+        self._validate_graph()
+        self._validate_speculation()
+        # Nodos cuyas secciones lee algun otro nodo
+        self._streamed = {dep for node in self.nodes for dep in node.reads}
+
+    def _check_policy(self, policy: str) -> str:
+        if policy not in self.GATING_POLICIES:
+            raise ValueError(f"gating_policy debe ser uno de {self.GATING_POLICIES}, no '{policy}'")
+        return policy
+
+    def _validate_graph(self) -> None:
+        """Verifica que el grafo sea un DAG con Sefirot para cada nodo"""
+        names = [node.name for node in self.nodes]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Nodos duplicados en el grafo: {names}")
+
+        for node in self.nodes:
+            if node.name not in self.sefirot:
+                raise ValueError(f"No hay Sefira registrada para el nodo '{node.name}'")
+            for dep in node.depends_on:
+                if dep not in names:
+                    raise ValueError(f"'{node.name}' depende de nodo inexistente '{dep}'")
+            for dep in node.reads:
+                if dep not in node.depends_on:
+                    raise ValueError(f"'{node.name}' lee secciones de '{dep}' sin depender de el")
+
+        # Orden topologico (Kahn) para detectar ciclos
+        by_name = {node.name: node for node in self.nodes}
+        pending = {node.name: set(node.depends_on) for node in self.nodes}
+        self._topological_order: List[SefiraNode] = []
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(f"Ciclo detectado entre: {sorted(pending)}")
+            for name in ready:
+                del pending[name]
+                self._topological_order.append(by_name[name])
+            for deps in pending.values():
+                deps.difference_update(ready)
+
+        # Etapa de cada nodo (camino mas largo desde una raiz): prioridad de
+        # sus llamadas en el RateLimiter, las etapas avanzadas primero
+        self._stages: Dict[str, int] = {}
+        for node in self._topological_order:
+            self._stages[node.name] = 1 + max(
+                (self._stages[dep] for dep in node.depends_on), default=-1
+            )
+
+    def _validate_speculation(self) -> None:
+        """Los nodos especulativos solo pueden depender de otros especulativos"""
+        names = {node.name for node in self.nodes}
+        for name in self.speculate:
+            if name not in names or name == self.GATE_NODE:
+                raise ValueError(f"Nodo especulativo invalido: '{name}'")
+            node = next(node for node in self.nodes if node.name == name)
+            for dep in node.depends_on:
+                if dep not in self.speculate:
+                    raise ValueError(
+                        f"Nodo especulativo '{name}' depende de '{dep}', que no es especulativo"
+                    )
+
+    def get_speculation_metrics(self) -> Dict[str, Any]:
+        """
+        Balance acumulado de la especulacion.
+
+        latency_saved: segundos de trabajo especulativo solapados con Keter
+        en las ejecuciones confirmadas. wasted_tokens_est: tokens (estimados
+        a partir de caracteres) de las ejecuciones descartadas o reiniciadas.
+        """
+        return speculation_metrics(self.speculation_stats)
+
+    def run(
+        self,
+        action: str,
+        context: str = '',
+        expected_outcome: str = '',
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Dict[str, Any]:
+        """Version sincrona de arun() (corre en el loop compartido, ver _shared_loop)"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.arun(action, context, expected_outcome, gating_policy, thresholds),
+            _shared_loop()
+        )
+        return future.result()
+
+    def stream(
+        self,
+        action: str,
+        context: str = '',
+        expected_outcome: str = '',
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Version sincrona de astream(): generador de eventos (ver RunEvents).
+
+        Si el consumidor deja de leer (p.ej. el cliente HTTP se desconecta),
+        la ejecucion se cancela.
+        """
+        events: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self.arun(action, context, expected_outcome, gating_policy, thresholds, events.put),
+            _shared_loop()
+        )
+        future.add_done_callback(lambda _: events.put({'type': 'done'}))
+
+        try:
+            while True:
+                event = events.get()
+                if event['type'] == 'done':
+                    yield {'type': 'done', 'run': future.result()}
+                    return
+                yield event
+        finally:
+            future.cancel()
+
+    async def astream(
+        self,
+        action: str,
+        context: str = '',
+        expected_outcome: str = '',
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Ejecuta el grafo entregando cada evento en cuanto ocurre.
+
+        El resultado de Keter llega primero; el ultimo evento es
+        {'type': 'done', 'run': <dict de arun()>}.
+        """
+        events: 'asyncio.Queue[Dict[str, Any]]' = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self.arun(action, context, expected_outcome, gating_policy, thresholds, events.put_nowait)
+        )
+        task.add_done_callback(lambda _: events.put_nowait({'type': 'done'}))
+
+        try:
+            while True:
+                event = await events.get()
+                if event['type'] == 'done':
+                    yield {'type': 'done', 'run': task.result()}
+                    return
+                yield event
+        finally:
+            task.cancel()
+
+    def run_batch(
+        self,
+        actions: Iterable[Any],
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Version sincrona de arun_batch() (corre en el loop compartido)"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.arun_batch(actions, concurrency, gating_policy, thresholds),
+            _shared_loop()
+        )
+        return future.result()
+
+    async def arun_batch(
+        self,
+        actions: Iterable[Any],
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ejecuta el grafo para varias acciones, como mucho 'concurrency' a la vez.
+
+        Cada accion es un str o un dict con 'action' y, opcionalmente,
+        'context' y 'expected_outcome'. Una accion que falla no detiene
+        el lote.
+
+        Returns:
+            Una entrada por accion, en el orden de entrada:
+            {'index': i, 'action': str, 'run': dict de arun() o None,
+             'error': None o el motivo por el que la ejecucion no termino}.
+            Los errores de nodos concretos quedan en run['errors'].
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency debe ser >= 1, no {concurrency}")
+        policy = self._check_policy(gating_policy or self.gating_policy)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(index: int, item: Any) -> Dict[str, Any]:
+            entry: Dict[str, Any] = {'index': index, 'action': None, 'run': None, 'error': None}
+            try:
+                request = self._batch_request(item)
+                entry['action'] = request['action']
+                # Las llamadas interactivas pasan antes por el RateLimiter
+                with llm_priority('batch'):
+                    async with semaphore:
+                        entry['run'] = await self.arun(
+                            request['action'], request['context'], request['expected_outcome'],
+                            policy, thresholds
+                        )
+            except Exception as e:
+                logger.error(f"Lote: la accion {index} fallo: {e}")
+                entry['error'] = f"{type(e).__name__}: {e}"
+            return entry
+
+        return list(await asyncio.gather(
+            *(run_one(index, item) for index, item in enumerate(actions))
+        ))
+
+    @staticmethod
+    def _batch_request(item: Any) -> Dict[str, str]:
+        """Accion de un lote (str o dict) -> action/context/expected_outcome"""
+        if isinstance(item, str):
+            item = {'action': item}
+        if not isinstance(item, dict) or not item.get('action'):
+            raise ValueError("cada accion debe ser un texto o un dict con 'action'")
+        return {
+            'action': item['action'],
+            'context': item.get('context', ''),
+            'expected_outcome': item.get('expected_outcome', '')
+        }
+
+    async def arun(
+        self,
+        action: str,
+        context: str = '',
+        expected_outcome: str = '',
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo completo para una accion.
+
+        gating_policy y thresholds reemplazan, solo para esta ejecucion, los
+        valores del motor. on_event recibe cada evento de RunEvents en el loop
+        del motor (ver stream()/astream()).
+
+        Returns:
+            Dict con:
+            - 'results': Resultado de cada Sefira ejecutada con exito
+            - 'errors': Nodo -> mensaje de error (excepcion, timeout o
+              processing_successful False)
+            - 'skipped': Nodo -> motivo por el que no se ejecuto
+            - 'timings': Nodo -> segundos de ejecucion
+            - 'total_time': Latencia de punta a punta
+            - 'sequential_time': Suma de timings (latencia si fuera en serie)
+            - 'critical_path': Nodos del camino mas largo del grafo
+            - 'gating': Politica aplicada, nodo que detuvo el Arbol
+              ('stopped_by'), motivo y rondas de modificaciones de Keter
+            - 'effective_action': Accion evaluada (modificada si Keter
+              la acepto tras sus suggested_modifications)
+            - 'speculation': Nodos especulativos, resultado ('confirmed',
+              'discarded', 'restarted' o None si no aplica), nodos
+              cancelados/descartados, wasted_tokens_est y latency_saved
+            - 'llm_usage': Nodo -> llamadas, aciertos de cache, caracteres
+              de prompt/respuesta y tokens/costo reportados por el SDK
+            - 'tokens': Total de la corrida: llamadas al LLM (sin las de
+              cache), prompt_tokens, output_tokens, cached_tokens y cost_usd
+              (USD estimados, ver core.usage)
+            - 'early_starts': Nodo arrancado por streaming -> {dependencia:
+              segundos que se solapo con ella}
+        """
+        with span('run', 'run', gating_policy=gating_policy or self.gating_policy) as run_span:
+            run = await self._arun(action, context, expected_outcome, gating_policy, thresholds, on_event)
+            if run_span is not None:
+                run_span.set(
+                    errors=len(run['errors']),
+                    skipped=len(run['skipped']),
+                    critical_path=run['critical_path'],
+                    stopped_by=run['gating']['stopped_by']
+                )
+            return run
+
+    async def _arun(
+        self,
+        action: str,
+        context: str = '',
+        expected_outcome: str = '',
+        gating_policy: Optional[str] = None,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Cuerpo de arun(), dentro del span de la corrida"""
+        policy = self._check_policy(gating_policy or self.gating_policy)
+        thresholds = self.thresholds if thresholds is None else thresholds
+        request = {
+            'action': action,
+            'context': context,
+            'expected_outcome': expected_outcome
+        }
+
+        results: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        skipped: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        # Nodo ejecutado cuyo resultado detiene a sus dependientes -> motivo
+        gated: Dict[str, str] = {}
+        gating: Dict[str, Any] = {
+            'policy': policy,
+            'stopped_by': None,
+            'reason': None,
+            'modification_rounds': []
+        }
+        speculative = self.speculate if policy != 'continue' else ()
+        speculation = self._speculation_record(speculative)
+        # Nodo -> contadores de track_llm_usage de cada ejecucion
+        llm_usage: Dict[str, List[Dict[str, int]]] = {}
+        finished_at: Dict[str, float] = {}
+
+        # Streaming: secciones completas de los nodos en curso y nodos
+        # arrancados antes de que terminara una dependencia
+        streamed = self._streamed - set(thresholds) - {self.GATE_NODE} if self.streaming else set()
+        partial: Dict[str, Dict[str, str]] = {}
+        early_starts: Dict[str, Dict[str, float]] = {}
+        live: Dict[str, object] = {}
+        progress = asyncio.Event()
+        progress_waiter: Optional[asyncio.Future] = None
+        loop = asyncio.get_running_loop()
+
+        def record_section(name: str, run_id: object, key: str, value: str) -> None:
+            # Ignora fragmentos de una ejecucion ya cancelada o descartada
+            if live.get(name) is run_id:
+                partial.setdefault(name, {})[key] = value
+                progress.set()
+
+        def section_listener(name: str) -> Callable[[str, str], None]:
+            run_id = live[name] = object()
+            # Puede llamarse desde el hilo de asyncio.to_thread
+            return lambda key, value: loop.call_soon_threadsafe(record_section, name, run_id, key, value)
+
+        gate = self.GATE_NODE if any(node.name == self.GATE_NODE for node in self.nodes) else None
+        events = RunEvents(on_event, gate) if on_event is not None else None
+
+        deps = self._effective_deps(policy, speculative)
+        pending = {node.name: node for node in self.nodes}
+        running: Dict[asyncio.Task, SefiraNode] = {}
+        start_time = time.perf_counter()
+
+        while pending or running:
+            for node in self._collect_ready(pending, deps, results, errors, skipped, gated, partial):
+                inputs = results
+                waiting = [dep for dep in deps[node.name] if dep not in results]
+                if waiting:
+                    inputs = dict(results, **{dep: partial[dep] for dep in waiting})
+                    now = time.perf_counter() - start_time
+                    early_starts[node.name] = {dep: now for dep in waiting}
+                    logger.debug(f"TikunEngine: '{node.name}' arranca con secciones de {waiting}")
+                listener = section_listener(node.name) if node.name in streamed else None
+                task = asyncio.ensure_future(
+                    self._run_node(node, request, inputs, llm_usage, listener)
+                )
+                running[task] = node
+
+            if not running:
+                break
+
+            wait_for = set(running)
+            if streamed:
+                if progress_waiter is None or progress_waiter.done():
+                    progress.clear()
+                    progress_waiter = asyncio.ensure_future(progress.wait())
+                wait_for.add(progress_waiter)
+            done, _ = await asyncio.wait(wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is progress_waiter:
+                    continue
+                node = running.pop(task, None)
+                if node is None:
+                    continue  # especulativo descartado en esta misma vuelta
+                result, error, elapsed = task.result()
+                timings[node.name] = elapsed
+                finished_at[node.name] = time.perf_counter() - start_time
+                live.pop(node.name, None)
+                partial.pop(node.name, None)
+                self._settle_early_starts(
+                    node.name, error, finished_at[node.name], early_starts, running, skipped
+                )
+                reason = None
+                if error is None:
+                    results[node.name] = result
+                    reason = await self._check_gates(
+                        node, request, results, timings, policy, thresholds, gating, llm_usage
+                    )
+                    if reason is not None:
+                        gated[node.name] = reason
+                        if gating['stopped_by'] is None:
+                            gating['stopped_by'] = node.name
+                            gating['reason'] = reason
+                        logger.info(f"TikunEngine: gating en '{node.name}' - {reason}")
+                else:
+                    errors[node.name] = error
+                    logger.warning(f"TikunEngine: nodo '{node.name}' fallo - {error}")
+
+                if speculative and node.name == self.GATE_NODE:
+                    if error is not None:
+                        reason = f"{self.GATE_NODE} no disponible"
+                    self._settle_speculation(
+                        speculation, reason, request['action'] != action,
+                        time.perf_counter() - start_time, finished_at,
+                        pending, running, results, errors, timings, llm_usage
+                    )
+                    if speculation['outcome'] == 'discarded':
+                        for name in speculation['nodes']:
+                            skipped[name] = f"gating: {reason} (especulativo descartado)"
+                    if speculation['outcome'] != 'confirmed':
+                        for name in speculation['nodes']:
+                            live.pop(name, None)
+                            partial.pop(name, None)
+                            early_starts.pop(name, None)
+
+                if events is not None:
+                    if error is None:
+                        events.result(node.name, results[node.name], timings[node.name])
+                    else:
+                        events.error(node.name, error)
+                    if node.name == gate:
+                        events.release(results)
+
+            if events is not None:
+                events.skips(skipped)
+
+        if progress_waiter is not None:
+            progress_waiter.cancel()
+        if events is not None:
+            # Sin veredicto de Keter (p.ej. omitido) se entrega lo retenido
+            events.skips(skipped)
+            events.release(results)
+        total_time = time.perf_counter() - start_time
+        self._record_speculation(speculation)
+        critical_path, _ = self._critical_path(timings, deps)
+        node_usage, tokens = self._usage_totals(llm_usage)
+
+        logger.info(
+            f"TikunEngine: {len(results)} Sefirot en {total_time:.2f}s "
+            f"(serie: {sum(timings.values()):.2f}s, errores: {len(errors)}, "
+            f"omitidas: {len(skipped)})"
+        )
+
+        return {
+            'results': results,
+            'errors': errors,
+            'skipped': skipped,
+            'timings': timings,
+            'total_time': total_time,
+            'sequential_time': sum(timings.values()),
+            'critical_path': critical_path,
+            'gating': gating,
+            'effective_action': request['action'],
+            'speculation': speculation,
+            'llm_usage': node_usage,
+            'tokens': tokens,
+            'early_starts': early_starts
+        }
+
+    def _settle_early_starts(
+        self,
+        name: str,
+        error: Optional[str],
+        finished_at: float,
+        early_starts: Dict[str, Dict[str, float]],
+        running: Dict[asyncio.Task, SefiraNode],
+        skipped: Dict[str, str]
+    ) -> None:
+        """
+        Cierra los arranques anticipados que dependian del nodo 'name'.
+
+        Registra cuanto se solaparon. Si 'name' fallo, se cancelan los
+        dependientes que siguen corriendo (los que ya terminaron se
+        conservan: leyeron secciones completas).
+        """
+        for child, started in early_starts.items():
+            if name not in started:
+                continue
+            started[name] = max(0.0, finished_at - started[name])
+            if error is None:
+                continue
+            for task, node in list(running.items()):
+                if node.name == child:
+                    task.cancel()
+                    del running[task]
+                    skipped[child] = f"dependencia no disponible: {name}"
+
+    def _settle_speculation(
+        self,
+        speculation: Dict[str, Any],
+        reject_reason: Optional[str],
+        action_changed: bool,
+        verdict_time: float,
+        finished_at: Dict[str, float],
+        pending: Dict[str, SefiraNode],
+        running: Dict[asyncio.Task, SefiraNode],
+        results: Dict[str, Dict[str, Any]],
+        errors: Dict[str, str],
+        timings: Dict[str, float],
+        llm_usage: Dict[str, List[Dict[str, int]]]
+    ) -> None:
+        """
+        Resuelve los nodos especulativos con el veredicto de Keter.
+
+        - Acepta la accion original: se conserva el trabajo; la latencia
+          ahorrada es lo que ese trabajo se solapo con Keter.
+        - Rechaza (o falla): se cancelan los que corren y se descartan los
+          resultados; el llamador los reporta en 'skipped'.
+        - Acepta una accion modificada: se descartan y vuelven a 'pending'.
+        """
+        names = speculation['nodes']
+        if reject_reason is None and not action_changed:
+            speculation['outcome'] = 'confirmed'
+            done_at = [finished_at[name] for name in names if name in finished_at]
+            finished = len(done_at) == len(names)
+            speculation['latency_saved'] = min(verdict_time, max(done_at)) if finished else verdict_time
+            return
+
+        speculation['outcome'] = 'discarded' if reject_reason is not None else 'restarted'
+        for task, node in list(running.items()):
+            if node.name in names:
+                task.cancel()
+                del running[task]
+                speculation['cancelled'].append(node.name)
+
+        by_name = {node.name: node for node in self.nodes}
+        for name in names:
+            started = name in llm_usage or name in results or name in errors
+            if started and name not in speculation['discarded']:
+                speculation['discarded'].append(name)
+            for usage in llm_usage.pop(name, []):
+                # Tokens reportados por el SDK si los hay; si no, por caracteres
+                speculation['wasted_tokens_est'] += (
+                    usage['prompt_tokens'] + usage['output_tokens']
+                    or (usage['prompt_chars'] + usage['output_chars']) // SefiraBase.CHARS_PER_TOKEN
+                )
+            results.pop(name, None)
+            errors.pop(name, None)
+            timings.pop(name, None)
+            finished_at.pop(name, None)
+            if reject_reason is not None:
+                pending.pop(name, None)
+            else:
+                pending[name] = by_name[name]
+
+        logger.info(
+            f"TikunEngine: especulacion {speculation['outcome']} "
+            f"({', '.join(speculation['discarded']) or 'sin trabajo'}, "
+            f"~{speculation['wasted_tokens_est']} tokens)"
+        )
+
+    def _record_speculation(self, speculation: Dict[str, Any]) -> None:
+        """Acumula el balance de una ejecucion en speculation_stats"""
+        if speculation['outcome'] is None:
+            return
+        stats = self.speculation_stats
+        with _speculation_lock:
+            stats['runs'] += 1
+            stats[speculation['outcome']] += 1
+            stats['wasted_tokens_est'] += speculation['wasted_tokens_est']
+            stats['latency_saved'] += speculation['latency_saved']
+
+    def _effective_deps(
+        self,
+        policy: str,
+        speculative: Iterable[str] = ()
+    ) -> Dict[str, Tuple[str, ...]]:
+        """
+        Dependencias de cada nodo para esta politica.
+
+        Con 'stop' o 'modifications' todo nodo que no sea ancestro de Keter
+        ni especulativo espera ademas a Keter, para no gastar llamadas antes
+        del veredicto.
+        """
+        deps = {node.name: node.depends_on for node in self.nodes}
+        if policy == 'continue' or self.GATE_NODE not in deps:
+            return deps
+
+        ancestors, frontier = set(), list(deps[self.GATE_NODE])
+        while frontier:
+            name = frontier.pop()
+            if name not in ancestors:
+                ancestors.add(name)
+                frontier.extend(deps[name])
+
+        exempt = ancestors | set(speculative) | {self.GATE_NODE}
+        for name, node_deps in deps.items():
+            if name not in exempt and self.GATE_NODE not in node_deps:
+                deps[name] = node_deps + (self.GATE_NODE,)
+        return deps
+
+    async def _check_gates(
+        self,
+        node: SefiraNode,
+        request: Dict[str, Any],
+        results: Dict[str, Dict[str, Any]],
+        timings: Dict[str, float],
+        policy: str,
+        thresholds: Dict[str, Dict[str, float]],
+        gating: Dict[str, Any],
+        llm_usage: Optional[Dict[str, List[Dict[str, int]]]] = None
+    ) -> Optional[str]:
+        """Motivo por el que los dependientes de 'node' no deben correr, o None"""
+        result = results[node.name]
+
+        if node.name == self.GATE_NODE and policy != 'continue' and result.get('aligned') is False:
+            if policy == 'modifications':
+                result = await self._modification_loop(
+                    node, request, results, timings, gating, llm_usage
+                )
+            if result.get('aligned') is False:
+                return f"Keter rechazo la accion (alignment_score={result.get('alignment_score', 0.0):.2f})"
+
+        for metric, minimum in (thresholds.get(node.name) or {}).items():
+            value = result.get(metric)
+            if isinstance(value, (int, float)) and value < minimum:
+                return f"{node.name}.{metric}={value:.2f} por debajo del umbral {minimum}"
+        return None
+
+    async def _modification_loop(
+        self,
+        node: SefiraNode,
+        request: Dict[str, Any],
+        results: Dict[str, Dict[str, Any]],
+        timings: Dict[str, float],
+        gating: Dict[str, Any],
+        llm_usage: Optional[Dict[str, List[Dict[str, int]]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Reevalua la accion con las suggested_modifications de Keter.
+
+        Cada ronda agrega las modificaciones nuevas a la accion original. Si
+        Keter la acepta, la accion modificada es la que recibe el resto del Arbol.
+        """
+        original_action = request['action']
+        modifications: List[str] = []
+        result = results[node.name]
+
+        for round_number in range(1, self.max_modification_rounds + 1):
+            new = [m for m in result.get('suggested_modifications') or [] if m not in modifications]
+            if not new:
+                break
+            modifications.extend(new)
+            request['action'] = self._modified_action(original_action, modifications)
+
+            new_result, error, elapsed = await self._run_node(node, request, results, llm_usage)
+            timings[node.name] += elapsed
+            gating['modification_rounds'].append({
+                'round': round_number,
+                'modifications': list(modifications),
+                'aligned': bool(new_result and new_result.get('aligned')),
+                'alignment_score': new_result.get('alignment_score') if new_result else None,
+                'error': error
+            })
+            if error is not None:
+                break
+            result = results[node.name] = new_result
+            if result.get('aligned'):
+                break
+
+        if not result.get('aligned'):
+            request['action'] = original_action
+        return result
+
+    @staticmethod
+    def _modified_action(action: str, modifications: List[str]) -> str:
+        """Accion original con las modificaciones sugeridas por Keter"""
+        lines = '\n'.join(f"- {m}" for m in modifications)
+        return f"{action}\n\nModificaciones para alinear con Tikun Olam:\n{lines}"
+
+    def _collect_ready(
+        self,
+        pending: Dict[str, SefiraNode],
+        deps: Dict[str, Tuple[str, ...]],
+        results: Dict[str, Any],
+        errors: Dict[str, str],
+        skipped: Dict[str, str],
+        gated: Dict[str, str],
+        partial: Optional[Dict[str, Dict[str, str]]] = None
+    ) -> List[SefiraNode]:
+        """
+        Saca de 'pending' los nodos listos para ejecutar y omite los que
+        dependen de un nodo fallido, omitido o detenido por gating (en cascada).
+
+        Un nodo tambien esta listo si a una dependencia en curso solo le
+        faltan secciones que el nodo no lee (partial, ver SefiraNode.reads).
+        """
+        partial = partial or {}
+        ready = []
+        changed = True
+        while changed:
+            changed = False
+            for name, node in list(pending.items()):
+                failed = [
+                    dep for dep in deps[name]
+                    if dep in errors or dep in skipped or dep in gated
+                ]
+                if failed:
+                    skipped[name] = self._skip_reason(failed, skipped, gated)
+                    del pending[name]
+                    changed = True
+                elif all(
+                    dep in results or (
+                        dep in node.reads and dep in partial
+                        and all(key in partial[dep] for key in node.reads[dep])
+                    )
+                    for dep in deps[name]
+                ):
+                    ready.append(node)
+                    del pending[name]
+        return ready
+
+    @staticmethod
+    def _skip_reason(failed: List[str], skipped: Dict[str, str], gated: Dict[str, str]) -> str:
+        """Motivo de omision; el de gating se hereda en cascada"""
+        for dep in failed:
+            if dep in gated:
+                return f"gating: {gated[dep]}"
+            if skipped.get(dep, '').startswith('gating:'):
+                return skipped[dep]
+        return f"dependencia no disponible: {', '.join(failed)}"
+
+    async def _run_node(
+        self,
+        node: SefiraNode,
+        request: Dict[str, Any],
+        results: Dict[str, Any],
+        llm_usage: Optional[Dict[str, List[Dict[str, int]]]] = None,
+        section_listener: Optional[Callable[[str, str], None]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], float]:
+        """
+        Ejecuta un nodo con su timeout. Retorna (result, error, elapsed)
+
+        El uso del LLM del nodo se registra en llm_usage al empezar, asi
+        tambien se puede contabilizar si la tarea se cancela. Con
+        section_listener la Sefira responde en streaming (listen_sections).
+        Las llamadas del nodo llevan su etapa como prioridad (llm_priority).
+        """
+        sefira = self.sefirot[node.name]
+        timeout = node.timeout if node.timeout is not None else self.node_timeout
+        start = time.perf_counter()
+        listening = listen_sections(section_listener) if section_listener else nullcontext()
+
+        with span(node.name, 'sefira'), track_llm_usage() as usage, listening, \
+                llm_priority(stage=self._stages[node.name]):
+            if llm_usage is not None:
+                llm_usage.setdefault(node.name, []).append(usage)
+            try:
+                input_data = node.build_input(request, results)
+                result = await asyncio.wait_for(sefira.aprocess(input_data), timeout=timeout)
+            except asyncio.TimeoutError:
+                # La corrutina se cancela; si la Sefira corre en un hilo su resultado se descarta
+                return None, f"timeout tras {timeout:.1f}s", time.perf_counter() - start
+            except Exception as e:
+                return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+        elapsed = time.perf_counter() - start
+        if isinstance(result, dict) and result.get('processing_successful') is False:
+            return None, result.get('error', 'processing_successful=False'), elapsed
+
+        return result, None, elapsed
+
+    @staticmethod
+    def _speculation_record(speculative: Iterable[str] = ()) -> Dict[str, Any]:
+        """Registro 'speculation' de una corrida, antes de resolver el gating"""
+        return {
+            'nodes': list(speculative),
+            'outcome': None,
+            'cancelled': [],
+            'discarded': [],
+            'wasted_tokens_est': 0,
+            'latency_saved': 0.0
+        }
+
+    @staticmethod
+    def _usage_totals(
+        llm_usage: Dict[str, List[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """(uso por nodo sumando sus ejecuciones, total de la corrida)"""
+        node_usage = {
+            name: {key: sum(u[key] for u in runs) for key in runs[0]}
+            for name, runs in llm_usage.items()
+        }
+        tokens = {
+            key: sum(usage[key] for usage in node_usage.values())
+            for key in ('calls', *TOKEN_KEYS, 'cost_usd')
+        }
+        return node_usage, tokens
+
+    def _critical_path(
+        self,
+        timings: Dict[str, float],
+        deps: Optional[Dict[str, Tuple[str, ...]]] = None
+    ) -> Tuple[List[str], float]:
+        """Camino mas largo del grafo segun los timings medidos"""
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for node in self._topological_order:
+            if node.name not in timings:
+                continue
+            node_deps = deps[node.name] if deps is not None else node.depends_on
+            prev = max(
+                (best[dep] for dep in node_deps if dep in best),
+                key=lambda item: item[0],
+                default=(0.0, [])
+            )
+            best[node.name] = (prev[0] + timings[node.name], prev[1] + [node.name])
+
+        if not best:
+            return [], 0.0
+        length, path = max(best.values(), key=lambda item: item[0])
+        return path, length
@@ -0,0 +1,301 @@
+"""
+SERVICIO - Logica de las funciones callable, sin depender de Firebase
+
+firebase-web/functions/main.py y el servidor local (callable_server.py)
+exponen las mismas operaciones; aqui viven la validacion de entradas, la
+ejecucion del Arbol y la forma de las respuestas. Los errores se
+senalan con ServiceError, cuyo 'code' es el nombre de un
+FunctionsErrorCode del protocolo callable ('INVALID_ARGUMENT', 'INTERNAL').
+
+Las respuestas traen 'usage': tokens y costo de la peticion y el acumulado
+del usuario (uid de Firebase Auth) en el UsageLedger de la instancia.
+
+Uso:
+    service = TikunService(get_registry())
+    response = service.process_action({'action': '...', 'gating_policy': 'stop'}, uid='abc')
+"""
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .core.sefira_registry import SefiraRegistry, get_registry
+from .core.sefirotic_base import track_llm_usage
+from .core.tracing import span
+from .core.usage import TOKEN_KEYS, UsageLedger, add_usage, empty_usage, get_usage_ledger
+from .tikun_engine import TikunEngine, get_speculation_stats, speculation_metrics
+
+
+# Solo necesitan action/context, asi que pueden empezar antes del veredicto
+# de Keter (Binah lee a Chochmah: solo especula junto con ella)
+SPECULATIVE_SEFIROT = {'chochmah', 'binah'}
+
+# process_actions: acciones por llamada y acciones evaluadas a la vez
+MAX_BATCH_ACTIONS = 200
+MAX_BATCH_CONCURRENCY = 8
+
+
+class ServiceError(Exception):
+    """Error de una operacion; code es un FunctionsErrorCode ('INVALID_ARGUMENT', 'INTERNAL')"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _invalid(message: str) -> ServiceError:
+    return ServiceError('INVALID_ARGUMENT', message)
+
+
+class TikunService:
+    """
+    Operaciones callable sobre las Sefirot de un registro.
+
+    Args:
+        registry: Registro de Sefirot (por defecto el del proceso); las
+                  Sefirot se construyen al primer uso y se reutilizan
+                  mientras la instancia sigue viva
+        ledger: Uso por usuario (por defecto el del proceso)
+        speculation_stats: Balance de la especulacion de todas las
+                  peticiones (por defecto el del proceso, ver
+                  get_speculation_stats)
+    """
+
+    def __init__(
+        self,
+        registry: Optional[SefiraRegistry] = None,
+        ledger: Optional[UsageLedger] = None,
+        speculation_stats: Optional[Dict[str, Any]] = None
+    ):
+        self.registry = registry if registry is not None else get_registry()
+        self.ledger = ledger if ledger is not None else get_usage_ledger()
+        self.speculation_stats = (
+            speculation_stats if speculation_stats is not None else get_speculation_stats()
+        )
+
+    def process_action(self, data: Any, uid: Optional[str] = None) -> Dict[str, Any]:
+        """Una accion por las 10 Sefirot (ver main.process_action)"""
+        params = self.action_params(data)
+        try:
+            run = self.engine(params).run(**run_args(params))
+        except Exception as e:
+            raise ServiceError('INTERNAL', f'Error processing action: {str(e)}')
+        # Las llamadas de una corrida fallida tambien se facturan
+        usage = self.usage(uid, run['tokens'])
+        if run['errors']:
+            stage, error = next(iter(run['errors'].items()))
+            raise ServiceError('INTERNAL', f'Error processing action: {stage}: {error}')
+        return {'success': True, **run_response(run), 'usage': usage}
+
+    def stream_action(self, data: Any, uid: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Eventos (tipo, datos) de process_action a medida que terminan las Sefirot.
+
+        Valida la entrada antes de retornar; un error durante la ejecucion
+        llega como evento 'error'.
+        """
+        params = self.action_params(data)
+
+        def events():
+            try:
+                for event in self.engine(params).stream(**run_args(params)):
+                    kind = event.pop('type')
+                    if kind == 'done':
+                        run = event['run']
+                        event = {
+                            'success': not run['errors'],
+                            'errors': run['errors'],
+                            **run_response(run),
+                            'usage': self.usage(uid, run['tokens'])
+                        }
+                    yield kind, event
+            except Exception as e:
+                yield 'error', {'sefira': None, 'error': f'Error processing action: {str(e)}'}
+
+        return events()
+
+    def process_actions(self, data: Any, uid: Optional[str] = None) -> Dict[str, Any]:
+        """Un lote de acciones con concurrencia acotada (ver main.process_actions)"""
+        data = data or {}
+        actions = data.get('actions')
+        concurrency = data.get('concurrency', TikunEngine.DEFAULT_BATCH_CONCURRENCY)
+
+        if not isinstance(actions, list) or not actions or len(actions) > MAX_BATCH_ACTIONS:
+            raise _invalid(f'actions must be a list of 1 to {MAX_BATCH_ACTIONS} actions')
+
+        if (not isinstance(concurrency, int) or isinstance(concurrency, bool)
+                or not 1 <= concurrency <= MAX_BATCH_CONCURRENCY):
+            raise _invalid(f'concurrency must be an integer from 1 to {MAX_BATCH_CONCURRENCY}')
+
+        # Las opciones compartidas se validan una vez, con una accion de relleno
+        params = self.action_params({**data, 'action': data.get('action') or '-'})
+
+        try:
+            batch = self.engine(params).run_batch(
+                actions,
+                concurrency=concurrency,
+                gating_policy=params['gating_policy'],
+                thresholds=params['thresholds']
+            )
+        except Exception as e:
+            raise ServiceError('INTERNAL', f'Error processing actions: {str(e)}')
+
+        items = [batch_item(entry) for entry in batch]
+        tokens = empty_usage()
+        for entry in batch:
+            if entry['run'] is not None:
+                add_usage(tokens, entry['run']['tokens'])
+        return {
+            'success': True,
+            'items': items,
+            'failed': sum(1 for item in items if not item['success']),
+            'usage': self.usage(uid, tokens)
+        }
+
+    def process_sefira(self, data: Any, uid: Optional[str] = None) -> Dict[str, Any]:
+        """Una sola Sefira (ver main.process_sefira)"""
+        data = data or {}
+        sefira_name = self._sefira_name(data)
+        try:
+            # Solo se construye la Sefira pedida (una vez por instancia)
+            sefira = self.registry.get(sefira_name.lower())
+            with span(sefira_name.lower(), 'sefira'), track_llm_usage() as counters:
+                result = sefira.process(data.get('input_data', {}))
+        except Exception as e:
+            raise ServiceError('INTERNAL', f'Error processing Sefira {sefira_name}: {str(e)}')
+        tokens = {key: counters[key] for key in ('calls', *TOKEN_KEYS, 'cost_usd')}
+        return {'success': True, 'sefira': sefira_name, 'result': result, 'usage': self.usage(uid, tokens)}
+
+    def validate_sefira_alignment(self, data: Any) -> Dict[str, Any]:
+        """Validacion de alineacion de una Sefira (ver main.validate_sefira_alignment)"""
+        sefira_name = self._sefira_name(data or {})
+        try:
+            validation = self.registry.get(sefira_name.lower()).validate_alignment()
+        except Exception as e:
+            raise ServiceError('INTERNAL', f'Error validating Sefira {sefira_name}: {str(e)}')
+        return {'success': True, 'sefira': sefira_name, 'validation': validation}
+
+    def action_params(self, data: Any) -> Dict[str, Any]:
+        """Entrada validada de process_action / process_action_stream"""
+        data = data or {}
+        params = {
+            'action': data.get('action'),
+            'context': data.get('context', ''),
+            'expected_outcome': data.get('expected_outcome', ''),
+            'gating_policy': data.get('gating_policy', 'stop'),
+            'thresholds': data.get('thresholds') or {},
+            'speculate': data.get('speculate', ['chochmah'])
+        }
+
+        if not params['action']:
+            raise _invalid('Action is required')
+
+        if params['gating_policy'] not in TikunEngine.GATING_POLICIES:
+            raise _invalid(f'gating_policy must be one of {list(TikunEngine.GATING_POLICIES)}')
+
+        if not valid_thresholds(params['thresholds']):
+            raise _invalid('thresholds must map Sefira names to {score_name: number}')
+
+        speculate = params['speculate']
+        if (not isinstance(speculate, list) or not set(speculate) <= SPECULATIVE_SEFIROT
+                or ('binah' in speculate and 'chochmah' not in speculate)):
+            raise _invalid(f'speculate must be a subset of {sorted(SPECULATIVE_SEFIROT)}')
+
+        return params
+
+    def usage(self, uid: Optional[str], tokens: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra los tokens de una peticion al usuario; 'request' y 'user' (acumulado)"""
+        return {'request': tokens, 'user': self.ledger.record(uid, tokens)}
+
+    def engine(self, params: Dict[str, Any]) -> TikunEngine:
+        # El Arbol como grafo de dependencias: las Sefirot independientes
+        # (Keter y Chochmah) corren a la vez, cada una con su timeout.
+        # Con 'stop'/'modifications' nada de lo que sigue corre (ni se
+        # factura) hasta que Keter acepta la accion, salvo las Sefirot
+        # especulativas, que se solapan con Keter y se descartan si rechaza.
+        # El streaming deja empezar a Binah/Chesed en cuanto llegan las
+        # secciones que leen.
+        # El engine es de la peticion; el balance de la especulacion se
+        # acumula en el del servicio para cubrir todas
+        return TikunEngine(
+            sefirot=self.registry.get_all(), speculate=params['speculate'], streaming=True,
+            speculation_stats=self.speculation_stats
+        )
+
+    def speculation_metrics(self) -> Dict[str, Any]:
+        """Tokens desperdiciados frente a latencia ahorrada, acumulados entre peticiones"""
+        return speculation_metrics(self.speculation_stats)
+
+    def _sefira_name(self, data: Dict[str, Any]) -> str:
+        sefira_name = data.get('sefira')
+        if not sefira_name:
+            raise _invalid('Sefira name is required')
+        if sefira_name.lower() not in self.registry:
+            raise _invalid(f'Unknown Sefira: {sefira_name}')
+        return sefira_name
+
+
+def run_args(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: params[key] for key in
+            ('action', 'context', 'expected_outcome', 'gating_policy', 'thresholds')}
+
+
+def run_response(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultados, resumen, gating y tiempos de una ejecucion de TikunEngine"""
+    results = run['results']
+
+    def stage(name, key):
+        return results.get(name, {}).get(key)
+
+    return {
+        'results': results,
+        'summary': {
+            'keter_alignment': stage('keter', 'alignment_score'),
+            'chochmah_confidence': stage('chochmah', 'confidence_level'),
+            'tiferet_harmony': stage('tiferet', 'harmony_score'),
+            'yesod_readiness': stage('yesod', 'manifestation_readiness'),
+            'malchut_completion': stage('malchut', 'completion_percentage'),
+            'ready_to_manifest': bool(stage('malchut', 'manifestation_complete'))
+        },
+        'skipped': run['skipped'],
+        'gating': {**run['gating'], 'effective_action': run['effective_action']},
+        'speculation': run['speculation'],
+        'tokens': {
+            'stages': {
+                name: {key: usage[key] for key in ('calls', *TOKEN_KEYS, 'cost_usd')}
+                for name, usage in run['llm_usage'].items()
+            },
+            **run['tokens']
+        },
+        'timings': {
+            'stages': run['timings'],
+            'total_time': run['total_time'],
+            'sequential_time': run['sequential_time'],
+            'critical_path': run['critical_path'],
+            'early_starts': run['early_starts']
+        }
+    }
+
+
+def batch_item(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Un item de process_actions, con los campos de la respuesta de process_action"""
+    item = {'index': entry['index'], 'action': entry['action']}
+    run = entry['run']
+    if run is None:
+        return {**item, 'success': False, 'error': entry['error']}
+    if run['errors']:
+        stage, error = next(iter(run['errors'].items()))
+        return {**item, 'success': False, 'error': f'{stage}: {error}', **run_response(run)}
+    return {**item, 'success': True, **run_response(run)}
+
+
+def valid_thresholds(thresholds: Any) -> bool:
+    """thresholds: {sefira: {score: numero}}"""
+    if not isinstance(thresholds, dict):
+        return False
+    return all(
+        isinstance(minimums, dict) and all(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            for value in minimums.values()
+        )
+        for minimums in thresholds.values()
+    )
@@ -0,0 +1,156 @@
+"""
+Tests para aprocess() (version async de process) y el protocolo de pasos
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from src.core.sefirotic_base import SefiraBase, SefiraPosition
+from src.sefirot.binah import Binah
+from src.sefirot.chochmah import Chochmah
+from src.sefirot.keter import Keter
+
+
+BINAH_INPUT = {
+    'insights': 'Un sistema de credito social digital',
+    'analysis': 'Usa datos comportamentales',
+    'query': 'Deberiamos implementarlo?'
+}
+
+
+class EchoSefira(SefiraBase):
+    """Sefira minima que sigue el protocolo de pasos"""
+
+    def __init__(self):
+        super().__init__(SefiraPosition.MALCHUT)
+        self.calls = []
+
+    def process(self, input_data):
+        return self._drive(self._steps(input_data))
+
+    async def aprocess(self, input_data):
+        return await self._adrive(self._steps(input_data))
+
+    def _steps(self, input_data):
+        try:
+            response = yield f"prompt: {input_data}"
+        except RuntimeError as e:
+            return {'processing_successful': False, 'error': str(e)}
+        return {'processing_successful': True, 'response': response}
+
+    def _call_gemini(self, prompt):
+        self.calls.append(('sync', prompt))
+        return prompt.upper()
+
+    async def _acall_gemini(self, prompt):
+        self.calls.append(('async', prompt))
+        return prompt.upper()
+
+    def validate_alignment(self):
+        return {'is_aligned': True}
+
+
+class TestStepsProtocol:
+    """Un mismo cuerpo de _steps sirve para process() y aprocess()"""
+
+    def test_drive_and_adrive_share_body(self):
+        sefira = EchoSefira()
+
+        sync_result = sefira.process('x')
+        async_result = asyncio.run(sefira.aprocess('x'))
+
+        assert sync_result == async_result == {'processing_successful': True, 'response': 'PROMPT: X'}
+        assert sefira.calls == [('sync', 'prompt: x'), ('async', 'prompt: x')]
+
+    def test_llm_error_is_thrown_into_steps(self):
+        sefira = EchoSefira()
+        sefira._acall_gemini = AsyncMock(side_effect=RuntimeError('cuota agotada'))
+
+        result = asyncio.run(sefira.aprocess('x'))
+
+        assert result == {'processing_successful': False, 'error': 'cuota agotada'}
+
+    def test_default_aprocess_runs_process(self):
+        class SyncOnly(EchoSefira):
+            aprocess = SefiraBase.aprocess
+
+        result = asyncio.run(SyncOnly().aprocess('x'))
+
+        assert result['response'] == 'PROMPT: X'
+
+
+class TestGeminiAprocess:
+    """aprocess() usa generate_content_async del cliente Gemini"""
+
+    def test_binah_aprocess_uses_async_client(self):
+        binah = Binah(api_key="test-key")
+        binah.client = Mock()
+        binah.client.generate_content_async = AsyncMock(
+            return_value=Mock(text="CONTEXTO HISTORICO:\nPrecedentes varios")
+        )
+
+        result = asyncio.run(binah.aprocess(BINAH_INPUT))
+
+        assert result['processing_successful'] is True
+        binah.client.generate_content_async.assert_awaited_once()
+        binah.client.generate_content.assert_not_called()
+
+    def test_binah_aprocess_without_client(self):
+        binah = Binah(api_key="test-key")
+        binah.client = None
+
+        result = asyncio.run(binah.aprocess(BINAH_INPUT))
+
+        assert result['processing_successful'] is False
+
+
+class TestChochmahAprocess:
+    """Chochmah usa AsyncAnthropic en aprocess()"""
+
+    def test_aprocess_uses_async_client(self):
+        chochmah = Chochmah(api_key="test-key")
+        chochmah.async_client = Mock()
+        chochmah.async_client.messages.create = AsyncMock(
+            return_value=Mock(content=[Mock(text="COMPRENSIÓN: algo\nNIVEL DE CONFIANZA: alto")])
+        )
+
+        result = asyncio.run(chochmah.aprocess({"query": "Que es Tikun Olam?"}))
+
+        assert result['processing_successful'] is True
+        assert result['raw_response'].startswith("COMPRENSIÓN")
+        chochmah.async_client.messages.create.assert_awaited_once()
+
+
+class TestKeterAprocess:
+    """Keter evalua sus criterios LLM con asyncio.gather"""
+
+    def test_allm_scores_run_concurrently(self):
+        keter = Keter(use_llm_scoring=False, llm_scoring_mode='per_criterion')
+        keter.use_llm_scoring = True
+        keter.gemini_client = Mock()
+
+        async def slow_call(prompt):
+            await asyncio.sleep(0.2)
+            return "SCORE: 7\nRAZON: bien"
+
+        keter._acall_gemini = slow_call
+
+        async def timed():
+            start = asyncio.get_running_loop().time()
+            scores = await keter._allm_scores('accion', 'contexto')
+            return scores, asyncio.get_running_loop().time() - start
+
+        scores, elapsed = asyncio.run(timed())
+
+        assert scores == {'justice_mercy_balance': 7, 'aligned_with_truth': 7}
+        assert elapsed < 0.35
+
+    def test_aprocess_matches_process_without_llm(self):
+        keter = Keter(use_llm_scoring=False)
+        input_data = {'action': 'ayudar con transparencia', 'context': '', 'expected_outcome': 'mejora'}
+
+        sync_result = keter.process(input_data)
+        async_result = asyncio.run(keter.aprocess(input_data))
+
+        assert sync_result == async_result
+        assert keter.objective_confirmations + keter.objective_violations == 2
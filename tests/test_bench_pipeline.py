@@ -0,0 +1,82 @@
+"""
+Tests para la estadistica de benchmarks/bench_pipeline.py (test t de Welch)
+"""
+
+import importlib.util
+import math
+from pathlib import Path
+
+import pytest
+
+
+def _load_bench():
+    path = Path(__file__).resolve().parents[1] / 'benchmarks' / 'bench_pipeline.py'
+    spec = importlib.util.spec_from_file_location('bench_pipeline', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bench = _load_bench()
+
+
+def _p_value(t, df):
+    return bench._betainc(df / 2.0, 0.5, df / (df + t * t))
+
+
+class TestStudentT:
+    # (t critico, grados de libertad, p bilateral) de las tablas de Student
+    @pytest.mark.parametrize('t, df, p', [
+        (12.7062047, 1, 0.05),
+        (4.30265273, 2, 0.05),
+        (2.57058184, 5, 0.05),
+        (2.22813885, 10, 0.05),
+        (3.16927267, 10, 0.01),
+        (1.81246112, 10, 0.10),
+        (2.04227246, 30, 0.05)
+    ])
+    def test_p_values_match_student_table(self, t, df, p):
+        assert _p_value(t, df) == pytest.approx(p, rel=1e-6)
+
+    @pytest.mark.parametrize('t', [0.3, 1.0, 4.0])
+    def test_closed_forms_for_one_and_two_degrees(self, t):
+        assert _p_value(t, 1) == pytest.approx(1 - 2 / math.pi * math.atan(t))
+        assert _p_value(t, 2) == pytest.approx(1 - t / math.sqrt(2 + t * t))
+
+    def test_betainc_edges(self):
+        assert bench._betainc(2.0, 3.0, 0.0) == 0.0
+        assert bench._betainc(2.0, 3.0, 1.0) == 1.0
+        assert bench._betainc(1.0, 1.0, 0.3) == pytest.approx(0.3)
+        assert bench._betainc(3.0, 1.0, 0.5) == pytest.approx(0.125)
+
+
+class TestWelch:
+    def test_known_samples(self):
+        t, df, p = bench.welch_t_test([1, 2, 3, 4, 5], [3, 4, 5, 6, 7])
+
+        assert (t, df) == (-2.0, 8.0)
+        assert p == pytest.approx(0.0805162, rel=1e-5)
+
+    def test_constant_samples(self):
+        assert bench.welch_t_test([1.0, 1.0], [1.0, 1.0])[2] == 1.0
+        assert bench.welch_t_test([2.0, 2.0], [1.0, 1.0])[2] == 0.0
+
+    def test_compare_flags_only_significant_regressions(self):
+        baseline = {
+            'stages': {'keter': {'samples': [1.0, 1.1, 0.9, 1.0, 1.05]}},
+            'orchestrator_overhead': {'samples': [0.5, 0.52, 0.48]},
+            'concurrency': {'4': {'samples': [100.0, 101.0, 99.0]}}
+        }
+        current = {
+            'stages': {'keter': {'samples': [2.0, 2.1, 1.9, 2.0, 2.05]}},
+            'orchestrator_overhead': {'samples': [0.51, 0.49, 0.5]},
+            'concurrency': {'4': {'samples': [150.0, 151.0, 149.0]}}
+        }
+
+        rows = {row['metric']: row['status'] for row in bench.compare(current, baseline, 0.01, 0.05)}
+
+        assert rows == {
+            'stage.keter.cpu_ms': 'regression',
+            'orchestrator.overhead_ms': 'same',
+            'concurrency.4.rps': 'improvement'
+        }
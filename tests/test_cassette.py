@@ -0,0 +1,176 @@
+"""
+Tests para la grabacion y reproduccion de llamadas al LLM (src/core/cassette.py)
+"""
+
+import asyncio
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.core import llm_provider
+from src.core.cassette import (
+    Cassette, CassetteMissError, CassetteProvider, FixedLatency, LogNormalLatency,
+    RecordedLatency, TokenLatency, parse_latency
+)
+from src.core.llm_provider import FakeProvider, set_provider
+from src.core.sefira_registry import SefiraRegistry
+from src.tikun_engine import TikunEngine
+
+
+@pytest.fixture(autouse=True)
+def isolated_providers(monkeypatch):
+    """Los proveedores registrados en un test no quedan para los demas"""
+    monkeypatch.setattr(llm_provider, '_providers', {})
+
+
+def _recorder(path, responder=None, latency=0.0):
+    set_provider(FakeProvider(latency=latency, responder=responder))
+    return CassetteProvider(upstream='fake', path=path, mode='record')
+
+
+class TestCassette:
+    """Formato del archivo e indice"""
+
+    def test_append_and_reopen(self, tmp_path):
+        path = str(tmp_path / 'run.cassette')
+        cassette = Cassette(path, writable=True)
+        key = Cassette.key('m', 'prompt', {'temperature': 0.5})
+        cassette.append(key, "respuesta ñ", 0.25, 6)
+        cassette.close()
+
+        reopened = Cassette(path)
+        entry = reopened.lookup(key)
+
+        assert len(reopened) == 1
+        assert entry.text == "respuesta ñ"
+        assert entry.latency == 0.25
+        assert reopened.lookup(Cassette.key('m', 'prompt', {'temperature': 0.6})) is None
+
+    def test_repeated_requests_replay_in_order(self, tmp_path):
+        path = str(tmp_path / 'run.cassette')
+        cassette = Cassette(path, writable=True)
+        key = Cassette.key('m', 'p')
+        for text in ("uno", "dos"):
+            cassette.append(key, text, 0.0, 1)
+
+        assert [cassette.lookup(key).text for _ in range(3)] == ["uno", "dos", "uno"]
+
+    def test_truncated_tail_is_ignored_and_overwritten(self, tmp_path):
+        path = str(tmp_path / 'run.cassette')
+        cassette = Cassette(path, writable=True)
+        cassette.append(Cassette.key('m', 'a'), "completa", 0.0, 1)
+        cassette.append(Cassette.key('m', 'b'), "rota", 0.0, 1)
+        cassette.close()
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 2)
+
+        assert len(Cassette(path)) == 1
+        writable = Cassette(path, writable=True)
+        writable.append(Cassette.key('m', 'c'), "nueva", 0.0, 1)
+        writable.close()
+
+        assert Cassette(path).lookup(Cassette.key('m', 'c')).text == "nueva"
+
+    def test_not_a_cassette(self, tmp_path):
+        path = tmp_path / 'otro.bin'
+        path.write_bytes(b'no es un cassette')
+
+        with pytest.raises(ValueError):
+            Cassette(str(path))
+
+
+class TestLatencyModels:
+    def test_parse_and_sample(self, tmp_path):
+        cassette = Cassette(str(tmp_path / 'c'), writable=True)
+        entry = cassette.append(Cassette.key('m', 'p'), "x" * 400, 2.0, 10)
+
+        assert parse_latency('recorded:0.5').sample(entry) == 1.0
+        assert parse_latency('fixed:0').sample(entry) == 0.0
+        assert TokenLatency(0.1, 0.01).sample(entry) == pytest.approx(1.1)
+        assert isinstance(parse_latency('lognormal:0.8:0.5'), LogNormalLatency)
+        with pytest.raises(ValueError):
+            parse_latency('gauss:1')
+
+    def test_lognormal_is_reproducible_with_seed(self, tmp_path):
+        cassette = Cassette(str(tmp_path / 'c'), writable=True)
+        entry = cassette.append(Cassette.key('m', 'p'), "x", 0.0, 1)
+
+        first = LogNormalLatency(0.8, 0.5, seed=7)
+        again = LogNormalLatency(0.8, 0.5, seed=7)
+
+        samples = [first.sample(entry) for _ in range(5)]
+        assert samples == [again.sample(entry) for _ in range(5)]
+        assert all(sample > 0 for sample in samples)
+
+
+class TestCassetteProvider:
+    """Graba a traves de otro proveedor y reproduce sin el"""
+
+    def test_record_then_replay(self, tmp_path):
+        path = str(tmp_path / 'run.cassette')
+        recorder = _recorder(path, responder=lambda prompt, config: f"R:{prompt}", latency=0.02)
+        client = recorder.client('modelo')
+        config = recorder.generation_config(temperature=0.3)
+
+        recorded = client.generate_content("hola", generation_config=config).text
+
+        player = CassetteProvider(upstream='fake', path=path, mode='replay', latency=FixedLatency(0.0))
+        player_client = player.client('modelo')
+        chunks = player_client.generate_content("hola", generation_config=config, stream=True)
+
+        assert recorded == "R:hola"
+        assert ''.join(chunk.text for chunk in chunks) == "R:hola"
+        assert player.stats()['hits'] == 1
+        assert RecordedLatency().sample(player.cassette.lookup(Cassette.key('modelo', 'hola', config))) >= 0.02
+
+    def test_async_and_anthropic_surface(self, tmp_path):
+        path = str(tmp_path / 'run.cassette')
+        recorder = _recorder(path)
+
+        async def record():
+            return await recorder.async_client('claude').messages.create(
+                model='claude', max_tokens=100, system="INSIGHTS:\n",
+                messages=[{'role': 'user', 'content': 'pregunta'}]
+            )
+
+        recorded = asyncio.run(record()).content[0].text
+        player = CassetteProvider(upstream='fake', path=path, latency='fixed:0')
+        replayed = player.client('claude').messages.create(
+            model='claude', max_tokens=100, system="INSIGHTS:\n",
+            messages=[{'role': 'user', 'content': 'pregunta'}]
+        )
+
+        assert recorded.startswith("INSIGHTS:")
+        assert replayed.content[0].text == recorded
+
+    def test_miss_policies(self, tmp_path):
+        path = str(tmp_path / 'vacio.cassette')
+        Cassette(path, writable=True).close()
+
+        strict = CassetteProvider(upstream='fake', path=path, latency='fixed:0')
+        lenient = CassetteProvider(upstream='fake', path=path, latency='fixed:0', on_miss='fake')
+
+        with pytest.raises(CassetteMissError):
+            strict.client().generate_content("TITULO:\n")
+        assert lenient.client().generate_content("TITULO:\n").text.startswith("TITULO:")
+        assert lenient.stats()['misses'] == 1
+
+    def test_tree_replays_offline(self, tmp_path):
+        path = str(tmp_path / 'tree.cassette')
+        env = {'TIKUN_LLM_PROVIDER': 'cassette', 'TIKUN_LLM_CACHE': '0'}
+        action = 'Implementar programa de becas con transparencia'
+
+        set_provider(_recorder(path), kind='gemini')
+        with patch.dict(os.environ, env):
+            live = TikunEngine(sefirot=SefiraRegistry().get_all()).run(action)
+
+        set_provider(CassetteProvider(upstream='fake', path=path, latency='fixed:0'), kind='gemini')
+        with patch.dict(os.environ, env):
+            sefirot = SefiraRegistry().get_all()
+        replay = TikunEngine(sefirot=sefirot).run(action)
+
+        assert replay['errors'] == {}
+        assert sefirot['binah'].provider.stats()['misses'] == 0
+        assert replay['results']['binah']['raw_response'] == live['results']['binah']['raw_response']
+        assert replay['results']['keter']['alignment_score'] == live['results']['keter']['alignment_score']
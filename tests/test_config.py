@@ -0,0 +1,164 @@
+"""
+Tests para la configuracion de las Sefirot (src/core/config.py)
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.core.config import DEFAULT_CONFIG_PATH, TikunConfig, validate
+from src.core.sefira_registry import SefiraRegistry
+from src.core.sefirotic_base import SefiraBase, SefiraPosition
+from src.sefirot.gevurah import Gevurah
+from src.sefirot.keter import Keter
+
+
+CONFIG = """
+providers:
+  gemini:
+    model: gemini-2.0-flash
+sefirot:
+  malchut:
+    model: gemini-2.5-flash
+    temperature: 0.4
+    max_output_tokens: 2048
+  hod:
+    temperature: 0.6
+"""
+
+
+class StubSefira(SefiraBase):
+    def __init__(self):
+        super().__init__(SefiraPosition.MALCHUT)
+        self.temperature = 0.5
+        self.max_output_tokens = 4096
+
+    def process(self, input_data):
+        return {'processing_successful': True}
+
+    def validate_alignment(self):
+        return {'is_aligned': True}
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / 'tikun_config.yaml'
+    path.write_text(CONFIG)
+    return path
+
+
+class TestSettings:
+    def test_yaml_env_and_provider_default(self, config_file):
+        config = TikunConfig(str(config_file))
+
+        assert config.settings('malchut', 'gemini') == {
+            'model': 'gemini-2.5-flash', 'temperature': 0.4, 'max_output_tokens': 2048
+        }
+        assert config.settings('hod', 'gemini') == {'model': 'gemini-2.0-flash', 'temperature': 0.6}
+        assert config.settings('chochmah', 'anthropic') == {}
+
+        with patch.dict(os.environ, {'TIKUN_TEMPERATURE_MALCHUT': '0.1', 'TIKUN_GEMINI_MODEL': 'gemini-1.5-pro'}):
+            assert config.settings('malchut', 'gemini')['temperature'] == 0.1
+            assert 'model' not in config.settings('hod', 'gemini')
+
+    @pytest.mark.parametrize('value', ['abc', '5'])
+    def test_invalid_env_override_is_ignored(self, config_file, value):
+        config = TikunConfig(str(config_file))
+        registry = SefiraRegistry({'malchut': StubSefira}, config=config)
+
+        with patch.dict(os.environ, {'TIKUN_TEMPERATURE_MALCHUT': value, 'TIKUN_MAX_OUTPUT_TOKENS_MALCHUT': '1000'}):
+            settings = config.settings('malchut')
+            malchut = registry.get('malchut')
+
+        assert (settings['temperature'], settings['max_output_tokens']) == (0.4, 1000)
+        assert (malchut.temperature, malchut.max_output_tokens) == (0.4, 1000)
+
+    def test_missing_file_and_repository_config(self, tmp_path):
+        assert TikunConfig(str(tmp_path / 'no-existe.yaml')).settings('binah', 'gemini') == {}
+        assert TikunConfig(str(DEFAULT_CONFIG_PATH)).settings('hod', 'gemini')['max_output_tokens'] == 8192
+
+    @pytest.mark.parametrize('data', [
+        {'sefirot': {'binah': {'temperature': 3.0}}},
+        {'sefirot': {'binah': {'max_output_tokens': '4096'}}},
+        {'sefirot': {'binah': {'top_k': 3}}},
+        {'sefirot': ['binah']}
+    ])
+    def test_invalid_config(self, data):
+        with pytest.raises(ValueError):
+            validate(data)
+
+
+class TestReload:
+    def test_refresh_rereads_changed_file_and_keeps_last_valid(self, config_file):
+        config = TikunConfig(str(config_file), check_interval=0.0)
+        assert not config.refresh()
+
+        config_file.write_text(CONFIG.replace('0.4', '0.2'))
+        os.utime(config_file, (1, 1))
+        assert config.refresh()
+        assert config.settings('malchut')['temperature'] == 0.2
+
+        config_file.write_text('sefirot: {malchut: {temperature: 9}}')
+        os.utime(config_file, (2, 2))
+        assert not config.refresh()
+        assert config.settings('malchut')['temperature'] == 0.2
+
+    def test_registry_applies_and_reapplies_config(self, config_file):
+        config = TikunConfig(str(config_file), check_interval=0.0)
+        registry = SefiraRegistry({'malchut': StubSefira}, config=config)
+
+        malchut = registry.get('malchut')
+        assert (malchut.temperature, malchut.max_output_tokens) == (0.4, 2048)
+
+        config_file.write_text(CONFIG.replace('2048', '1024'))
+        os.utime(config_file, (1, 1))
+        assert registry.get('malchut') is malchut
+        assert malchut.max_output_tokens == 1024
+        assert registry.stats()['config']['reloads'] == 1
+
+    def test_removed_override_restores_code_default(self, config_file):
+        config = TikunConfig(str(config_file), check_interval=0.0)
+        registry = SefiraRegistry({'malchut': StubSefira}, config=config)
+        malchut = registry.get('malchut')
+        assert malchut.temperature == 0.4
+
+        config_file.write_text('sefirot: {}')
+        os.utime(config_file, (1, 1))
+        registry.get('malchut')
+
+        assert config.reloads == 1
+        assert (malchut.temperature, malchut.max_output_tokens) == (0.5, 4096)
+
+    def test_invalid_file_at_startup_uses_code_defaults(self, config_file):
+        config_file.write_text('sefirot: {malchut: {temperature: 9}}')
+
+        config = TikunConfig(str(config_file), check_interval=0.0)
+
+        assert config.settings('malchut') == {}
+        assert not config.refresh()
+        config_file.write_text(CONFIG)
+        os.utime(config_file, (1, 1))
+        assert config.refresh()
+        assert config.settings('malchut')['temperature'] == 0.4
+
+
+class TestConfigure:
+    def test_model_change_switches_client_and_circuit(self):
+        gevurah = Gevurah(api_key='test-key')
+        gevurah._call_resilience()
+
+        gevurah.configure({'model': 'gemini-2.5-flash', 'max_output_tokens': 1000})
+
+        assert gevurah.model_name == 'gemini-2.5-flash'
+        assert gevurah.client.model_name.endswith('gemini-2.5-flash')
+        assert gevurah.resilience.breaker is None
+        assert gevurah._llm_cache_params() == ('gemini-2.5-flash', 0.7, 1000)
+
+    def test_keter_maps_keys_to_scoring_settings(self):
+        keter = Keter(api_key='test-key', llm_scoring_mode='structured')
+
+        keter.configure({'temperature': 0.1, 'structured_max_output_tokens': 500})
+
+        assert keter._llm_cache_params()[1:] == (0.1, 500)
+        assert Keter.SCORING_TEMPERATURE == 0.3
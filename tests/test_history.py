@@ -0,0 +1,109 @@
+"""
+Tests para el historial acotado y el histograma de latencias (src/core/history.py)
+"""
+
+import os
+import random
+from unittest.mock import patch
+
+import pytest
+
+from src.core import llm_provider
+from src.core.history import HistoryBuffer, LatencyHistogram
+from src.core.llm_provider import FakeProvider, set_provider
+from src.core.sefira_registry import SefiraRegistry
+from src.sefirot.gevurah import Gevurah
+from src.tikun_engine import TikunEngine
+
+
+class TestLatencyHistogram:
+    def test_percentiles_within_relative_error(self):
+        rng = random.Random(3)
+        samples = [rng.lognormvariate(0.0, 0.8) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(sample)
+
+        ordered = sorted(samples)
+        for q in (0.50, 0.95, 0.99):
+            exact = ordered[int(q * len(ordered)) - 1]
+            assert histogram.percentile(q) == pytest.approx(exact, rel=2 / LatencyHistogram.SUB_BUCKETS)
+
+    def test_small_and_out_of_range_values(self):
+        histogram = LatencyHistogram(max_seconds=1.0)
+        for seconds in (0.0, 0.000001, 5.0):
+            histogram.record(seconds)
+
+        summary = histogram.summary()
+        assert summary['count'] == 3
+        assert summary['min'] == 0.0
+        assert histogram.percentile(0.33) <= 0.000001
+        assert histogram.percentile(1.0) == 5.0
+        assert LatencyHistogram().percentile(0.5) is None
+
+    def test_memory_does_not_grow(self):
+        histogram = LatencyHistogram()
+        buckets = len(histogram.counts)
+        for i in range(10000):
+            histogram.record(i * 0.37)
+
+        assert len(histogram.counts) == buckets
+
+
+class TestHistoryBuffer:
+    def test_keeps_last_entries_and_lifetime_counters(self):
+        history = HistoryBuffer(capacity=3)
+        for i in range(10):
+            history.append({'processing_time': 0.1 * i, 'success': i % 5 != 0})
+
+        assert len(history) == 3
+        assert [entry['processing_time'] for entry in history] == pytest.approx([0.7, 0.8, 0.9])
+        assert history[-1]['processing_time'] == pytest.approx(0.9)
+        stats = history.stats()
+        assert (stats['total'], stats['successes'], stats['errors']) == (10, 8, 2)
+        assert stats['success_rate'] == 0.8
+        assert stats['latency']['max'] == pytest.approx(0.9)
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            HistoryBuffer(capacity=0)
+
+
+class TestSefiraMetrics:
+    def test_get_metrics_reports_percentiles_with_bounded_history(self, monkeypatch):
+        monkeypatch.setattr(Gevurah, 'HISTORY_SIZE', 4)
+        gevurah = Gevurah(api_key='test-key')
+        for i in range(50):
+            gevurah.history.append({'processing_time': 0.01 * (i + 1), 'success': i != 0})
+
+        metrics = gevurah.get_metrics()
+
+        assert len(gevurah.history) == 4
+        assert metrics['success_rate'] == pytest.approx(49 / 50)
+        assert metrics['errors'] == 1
+        assert metrics['latency']['p50'] == pytest.approx(0.25, rel=0.02)
+        assert metrics['latency']['p99'] == pytest.approx(0.50, rel=0.02)
+
+    def test_every_sefira_of_a_run_reports_percentiles(self, monkeypatch):
+        monkeypatch.setattr(llm_provider, '_providers', {})
+        set_provider(FakeProvider())
+        with patch.dict(os.environ, {'TIKUN_LLM_PROVIDER': 'fake', 'TIKUN_LLM_CACHE': '0'}):
+            sefirot = SefiraRegistry().get_all()
+
+        run = TikunEngine(sefirot=sefirot).run('Implementar programa de becas', gating_policy='continue')
+
+        assert run['errors'] == {}
+        for name, sefira in sefirot.items():
+            metrics = sefira.get_metrics()
+            assert len(sefira.history) == 1, name
+            assert metrics['latency']['p50'] is not None, name
+            assert metrics['success_rate'] == 1.0, name
+
+    def test_failed_result_counts_as_error(self):
+        gevurah = Gevurah(api_key='test-key')
+
+        result = gevurah.process('no es un dict')
+
+        assert result['processing_successful'] is False
+        assert gevurah.get_metrics()['errors'] == 1
+        assert gevurah.history[-1]['error'] == result['error']
@@ -0,0 +1,100 @@
+"""
+Tests para el scoring estructurado de Keter (una llamada JSON para los cinco criterios)
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.sefirot.keter import Keter
+
+
+INPUT = {
+    'action': 'Implementar programa de ayuda con transparencia',
+    'context': 'Comunidad afectada',
+    'expected_outcome': 'Mejora del bienestar'
+}
+
+
+def _structured_keter(response_text):
+    keter = Keter(use_llm_scoring=False)
+    keter.use_llm_scoring = True
+    keter.gemini_client = Mock()
+    keter._call_gemini = Mock(return_value=response_text)
+    return keter
+
+
+class TestKeterStructuredScoring:
+    """Tests del modo llm_scoring_mode='structured'"""
+
+    def test_single_call_scores_all_five(self):
+        keter = _structured_keter(
+            '{"reduces_suffering": 8, "respects_free_will": 6, "promotes_harmony": 7,'
+            ' "justice_mercy_balance": 5, "aligned_with_truth": 9}'
+        )
+
+        result = keter.process(INPUT)
+
+        assert keter._call_gemini.call_count == 1
+        assert result['detailed_scores'] == {
+            'reduces_suffering': 8,
+            'respects_free_will': 6,
+            'promotes_harmony': 7,
+            'justice_mercy_balance': 5,
+            'aligned_with_truth': 9
+        }
+        assert len(result['llm_scored_criteria']) == 5
+
+    def test_missing_field_falls_back_to_heuristic(self):
+        keter = _structured_keter('{"reduces_suffering": 8, "aligned_with_truth": "n/a"}')
+        heuristic = Keter(use_llm_scoring=False).process(INPUT)['detailed_scores']
+
+        result = keter.process(INPUT)
+
+        scores = result['detailed_scores']
+        assert scores['reduces_suffering'] == 8
+        assert scores['aligned_with_truth'] == heuristic['aligned_with_truth']
+        assert scores['respects_free_will'] == heuristic['respects_free_will']
+        assert result['llm_scored_criteria'] == ['reduces_suffering']
+
+    def test_invalid_json_uses_heuristics(self):
+        keter = _structured_keter('SCORE: 7')
+        heuristic = Keter(use_llm_scoring=False).process(INPUT)['detailed_scores']
+
+        result = keter.process(INPUT)
+
+        assert result['detailed_scores'] == heuristic
+        assert result['llm_scored_criteria'] == []
+
+    def test_scores_are_clamped_and_fences_stripped(self):
+        keter = _structured_keter('```json\n{"reduces_suffering": 25, "promotes_harmony": -7.6}\n```')
+
+        scores = keter._llm_scores(INPUT['action'], INPUT['context'], INPUT['expected_outcome'])
+
+        assert scores == {'reduces_suffering': 10, 'promotes_harmony': -8}
+
+    def test_async_structured_call(self):
+        keter = Keter(use_llm_scoring=False)
+        keter.use_llm_scoring = True
+        keter.gemini_client = Mock()
+        keter._acall_gemini = AsyncMock(return_value='{"promotes_harmony": 4}')
+
+        result = asyncio.run(keter.aprocess(INPUT))
+
+        keter._acall_gemini.assert_awaited_once()
+        assert result['detailed_scores']['promotes_harmony'] == 4
+
+    def test_sdk_without_json_output_scores_per_criterion(self):
+        keter = _structured_keter('SCORE: 7')
+        keter.provider = Mock()
+        keter.provider.supports_json_output.return_value = False
+
+        result = keter.process(INPUT)
+
+        assert keter._call_gemini.call_count == len(Keter.LLM_CRITERIA)
+        assert len(result['llm_scored_criteria']) == len(Keter.LLM_CRITERIA)
+        assert keter._llm_cache_params()[2] == Keter.SCORING_MAX_OUTPUT_TOKENS
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            Keter(use_llm_scoring=False, llm_scoring_mode='otro')
@@ -0,0 +1,85 @@
+"""
+Tests para el motor de keywords compartido (src/core/lexicon.py)
+"""
+
+from src.core.lexicon import Lexicon, fold
+from src.sefirot.keter import Keter
+from src.sefirot.yesod import Yesod
+
+
+class TestFold:
+    """Normalizacion de mayusculas y acentos"""
+
+    def test_folds_case_and_accents(self):
+        assert fold("Autonomía y UNIÓN, Engaño") == "autonomia y union, engano"
+
+    def test_preserves_length(self):
+        text = "İstanbul ÆØÅ ß — ¿Qué?"
+        assert len(fold(text)) == len(text)
+
+
+class TestLexiconScan:
+    """Una pasada debe dar lo mismo que `kw in text` keyword por keyword"""
+
+    def test_counts_match_naive_substring_check(self):
+        groups = {
+            'a': ['tal vez', 'tal', 'vez', 'quizas', 'no se'],
+            'b': ['no se', 'posiblemente', 'sible']
+        }
+        lexicon = Lexicon(groups)
+        text = "Quizás no sé... tal vez, posiblemente. No se puede."
+
+        scan = lexicon.scan(text)
+        folded = fold(text)
+
+        for group, keywords in groups.items():
+            assert scan.count(group) == sum(1 for kw in keywords if kw in folded)
+
+    def test_prefix_keywords_at_same_position(self):
+        lexicon = Lexicon({'g': ['muy solido', 'muy']})
+
+        scan = lexicon.scan("Es muy sólido")
+
+        assert scan.found('g') == ['muy solido', 'muy']
+        assert scan.first('muy') == scan.first('muy solido') == 3
+
+    def test_positions_refer_to_original_text(self):
+        text = "Él DAÑA y daña"
+        scan = Lexicon({'neg': ['daña']}).scan(text)
+
+        assert scan.positions('daña') == [3, 10]
+        assert text[3:7] == "DAÑA"
+        assert scan.occurrences('neg') == 2
+
+    def test_word_start(self):
+        substring = Lexicon({'neg': ['daña']})
+        word_start = Lexicon({'neg': ['daña']}, word_start=True)
+        text = "participacion ciudadana"
+
+        assert substring.scan(text).count('neg') == 1
+        assert word_start.scan(text).count('neg') == 0
+        assert word_start.scan("esto dañaria").count('neg') == 1
+
+    def test_empty_lexicon(self):
+        assert Lexicon({'g': []}).scan("texto").count('g') == 0
+
+
+class TestScorersUseLexicon:
+    """Los scorers heuristicos ahora son insensibles a acentos"""
+
+    def test_keter_accent_insensitive(self):
+        keter = Keter(use_llm_scoring=False)
+
+        with_accent = keter.HEURISTIC_LEXICON.scan("Decisión con autonomía y unión")
+        without_accent = keter.HEURISTIC_LEXICON.scan("Decision con autonomia y union")
+
+        assert keter._score_free_will_respect(with_accent) == keter._score_free_will_respect(without_accent) == 3
+        assert keter._score_harmony_promotion(with_accent) == 2
+
+    def test_yesod_resource_context(self):
+        text = "Se necesita un Presupuesto de 500 USD y un facilitador local."
+
+        requirements = Yesod._parse_resource_requirements(Yesod.__new__(Yesod), text)
+
+        assert len(requirements['budget']) == 2
+        assert requirements['personnel'][0].endswith("facilitador local.")
@@ -0,0 +1,151 @@
+"""
+Tests para LLMCache (cache de respuestas LLM en memoria + SQLite)
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock
+
+from src.core.llm_cache import LLMCache
+from src.sefirot.binah import Binah
+from src.sefirot.chochmah_gemini import ChochmahGemini
+
+
+class TestLLMCacheKey:
+    """La clave depende de todos los parametros que afectan la respuesta"""
+
+    def test_key_changes_with_each_parameter(self):
+        base = LLMCache.make_key('gemini', 0.7, 4096, 'prompt')
+
+        assert base == LLMCache.make_key('gemini', 0.7, 4096, 'prompt')
+        assert base != LLMCache.make_key('otro', 0.7, 4096, 'prompt')
+        assert base != LLMCache.make_key('gemini', 0.8, 4096, 'prompt')
+        assert base != LLMCache.make_key('gemini', 0.7, 8192, 'prompt')
+        assert base != LLMCache.make_key('gemini', 0.7, 4096, 'prompt ')
+
+
+class TestLLMCacheTiers:
+    """Tests de los niveles de memoria y disco"""
+
+    def test_memory_lru_eviction(self):
+        cache = LLMCache(max_memory_entries=2)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+        cache.put('c', 'C')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 'A'
+        assert cache.stats()['memory_evictions'] == 1
+
+    def test_disk_tier_survives_new_instance(self, tmp_path):
+        db_path = str(tmp_path / 'cache.sqlite')
+        LLMCache(db_path=db_path).put('k', 'respuesta')
+
+        cache = LLMCache(db_path=db_path)
+
+        assert cache.get('k') == 'respuesta'
+        assert cache.get('k') == 'respuesta'
+        stats = cache.stats()
+        assert stats['disk_hits'] == 1
+        assert stats['memory_hits'] == 1
+
+    def test_ttl_expiration(self, tmp_path):
+        cache = LLMCache(db_path=str(tmp_path / 'cache.sqlite'), ttl_seconds=0.05)
+        cache.put('k', 'respuesta')
+        time.sleep(0.1)
+
+        assert cache.get('k') is None
+        assert cache.stats()['expirations'] >= 1
+
+    def test_disk_size_eviction_removes_least_recent(self, tmp_path):
+        cache = LLMCache(
+            max_memory_entries=1,
+            db_path=str(tmp_path / 'cache.sqlite'),
+            max_disk_bytes=25
+        )
+        cache.put('a', 'x' * 10)
+        time.sleep(0.01)
+        cache.put('b', 'y' * 10)
+        time.sleep(0.01)
+        cache.put('c', 'z' * 10)
+
+        stats = cache.stats()
+        assert stats['disk_evictions'] == 1
+        assert stats['disk_bytes'] == 20
+        assert cache.get('a') is None
+        assert cache.get('b') == 'y' * 10
+
+    def test_disk_hits_defer_accessed_at_until_next_write(self, tmp_path):
+        cache = LLMCache(
+            max_memory_entries=1,
+            db_path=str(tmp_path / 'cache.sqlite'),
+            max_disk_bytes=25
+        )
+        cache.put('a', 'x' * 10)
+        time.sleep(0.01)
+        cache.put('b', 'y' * 10)
+        changes = cache._db.total_changes
+
+        assert cache.get('a') == 'x' * 10
+        assert cache._db.total_changes == changes and not cache._db.in_transaction
+
+        # El acierto de 'a' cuenta para la eviccion: sale 'b'
+        time.sleep(0.01)
+        cache.put('c', 'z' * 10)
+        assert cache.get('b') is None
+        assert cache.get('a') == 'x' * 10
+
+    def test_async_disk_tier_runs_off_the_event_loop(self, tmp_path):
+        cache = LLMCache(max_memory_entries=1, db_path=str(tmp_path / 'cache.sqlite'))
+        threads = []
+        disk_get, disk_put = cache._disk_get, cache._disk_put
+        cache._disk_get = lambda *args: threads.append(threading.current_thread()) or disk_get(*args)
+        cache._disk_put = lambda *args: threads.append(threading.current_thread()) or disk_put(*args)
+
+        async def scenario():
+            await cache.aput('a', 'A')
+            await cache.aput('b', 'B')
+            return await cache.aget('a'), await cache.aget('b'), await cache.aget('c')
+
+        assert asyncio.run(scenario()) == ('A', 'B', None)
+        assert len(threads) == 5 and threading.main_thread() not in threads
+        assert cache.stats()['disk_hits'] == 2 and cache.stats()['misses'] == 1
+
+
+class TestSefiraCaching:
+    """Integracion con SefiraBase._call_llm / _acall_llm"""
+
+    def test_cached_sefira_calls_model_once(self):
+        binah = Binah(api_key="test-key")
+        binah.client = Mock()
+        binah.client.generate_content.return_value = Mock(text="CONTEXTO HISTORICO:\nx")
+        binah.enable_llm_cache(LLMCache())
+
+        input_data = {'insights': 'i', 'analysis': 'a', 'query': 'q'}
+        binah.process(input_data)
+        binah.process(input_data)
+
+        assert binah.client.generate_content.call_count == 1
+        cache_metrics = binah.get_metrics()['llm_cache']
+        assert cache_metrics['hits'] == 1
+        assert cache_metrics['misses'] == 1
+
+    def test_async_path_shares_cache(self):
+        binah = Binah(api_key="test-key")
+        binah.client = Mock()
+        binah.client.generate_content.return_value = Mock(text="CONTEXTO HISTORICO:\nx")
+        binah.client.generate_content_async = AsyncMock()
+        binah.enable_llm_cache(LLMCache())
+
+        input_data = {'insights': 'i', 'analysis': 'a', 'query': 'q'}
+        binah.process(input_data)
+        asyncio.run(binah.aprocess(input_data))
+
+        binah.client.generate_content_async.assert_not_awaited()
+
+    def test_high_temperature_sefira_does_not_opt_in(self):
+        assert ChochmahGemini.CACHE_LLM_RESPONSES is False
+        assert Binah.CACHE_LLM_RESPONSES is True
+        assert 'llm_cache' not in ChochmahGemini(api_key="test-key").get_metrics()
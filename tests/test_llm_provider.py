@@ -0,0 +1,168 @@
+"""
+Tests para la capa de proveedores de LLM (src/core/llm_provider.py)
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src.core.llm_provider import (
+    FakeProvider, GeminiProvider, LLMRequest, fake_response, get_provider, provider_name
+)
+from src.core.sefira_registry import SefiraRegistry
+from src.sefirot.binah import Binah
+from src.sefirot.gevurah import Gevurah
+from src.tikun_engine import TikunEngine
+
+
+ACTION = 'Implementar programa de becas educativas en comunidad rural con transparencia'
+
+
+class TestFakeProvider:
+    """Respuestas sinteticas con la forma que pide el prompt"""
+
+    def test_text_answers_prompt_headers(self):
+        text = fake_response("Responde con:\n\nSTAKEHOLDERS:\nRIESGOS SISTEMICOS:\n**SINTESIS CONTEXTUAL:**\n")
+
+        assert text.splitlines()[0] == "STAKEHOLDERS:"
+        assert "RIESGOS SISTEMICOS:" in text
+        assert "SINTESIS CONTEXTUAL:" in text
+
+    def test_json_follows_schema_or_prompt_keys(self):
+        schema = {'type': 'object', 'properties': {
+            'risks': {'type': 'array', 'items': {'type': 'string'}},
+            'score': {'type': 'integer'}
+        }}
+
+        from_schema = json.loads(fake_response("x", {'response_mime_type': 'application/json', 'response_schema': schema}))
+        from_prompt = json.loads(fake_response('{"justice": <entero>, "note": <texto>}', {'response_mime_type': 'application/json'}))
+
+        assert from_schema == {'risks': ['simulado'], 'score': 5}
+        assert from_prompt == {'justice': 5, 'note': 'simulado'}
+
+    def test_clients_are_shared_and_async_streams(self):
+        provider = FakeProvider(latency=0.01, chunk_size=4)
+
+        assert provider.client('m') is provider.client('m')
+        assert provider.client('m') is not provider.client('otro')
+
+        async def run():
+            chunks = await provider.client('m').generate_content_async("TITULO:\n", stream=True)
+            return [chunk.text async for chunk in chunks]
+
+        chunks = asyncio.run(run())
+        assert len(chunks) > 1
+        assert ''.join(chunks) == fake_response("TITULO:\n")
+        assert provider.generate(LLMRequest("hola")).provider == 'fake'
+        assert provider.calls == 2
+
+    def test_anthropic_surface(self):
+        provider = FakeProvider()
+
+        response = provider.client().messages.create(
+            model='m', max_tokens=10, system="UNDERSTANDING:\n", messages=[{'role': 'user', 'content': 'q'}]
+        )
+        aresponse = asyncio.run(provider.async_client().messages.create(
+            model='m', max_tokens=10, messages=[{'role': 'user', 'content': 'INSIGHTS:\n'}]
+        ))
+
+        assert response.content[0].text.startswith("UNDERSTANDING:")
+        assert aresponse.content[0].text.startswith("INSIGHTS:")
+
+
+class TestProviderSelection:
+    """Un proveedor por proceso; modelo por etapa"""
+
+    def test_registry_of_providers(self):
+        assert get_provider('gemini', 'k1') is get_provider('gemini', 'k1')
+        assert get_provider('gemini', 'k1') is not get_provider('gemini', 'k2')
+        with pytest.raises(ValueError):
+            get_provider('desconocido')
+
+    def test_model_per_stage(self):
+        provider = GeminiProvider('k')
+        env = {'TIKUN_MODEL_GEVURAH': 'gemini-pro', 'TIKUN_GEMINI_MODEL': 'gemini-flash'}
+
+        with patch.dict(os.environ, env):
+            assert provider.model_for('gevurah') == 'gemini-pro'
+            assert provider.model_for('binah') == 'gemini-flash'
+        with patch.dict(os.environ, {}, clear=True):
+            assert provider.model_for('binah') == GeminiProvider.DEFAULT_MODEL
+
+    def test_json_output_support_follows_the_sdk(self):
+        provider = GeminiProvider('k')
+        assert provider.supports_json_output()
+
+        class OldGenerationConfig:
+            def __init__(self, temperature=None, max_output_tokens=None):
+                pass
+
+        old = GeminiProvider('k')
+        with patch.object(old, '_genai', return_value=type('genai', (), {'GenerationConfig': OldGenerationConfig})):
+            assert not old.supports_json_output()
+        assert FakeProvider().supports_json_output()
+
+    def test_sefirot_share_clients(self):
+        with patch.dict(os.environ, {'TIKUN_MODEL_GEVURAH': 'gemini-pro'}):
+            binah = Binah(api_key='shared-key')
+            gevurah = Gevurah(api_key='shared-key')
+            other = Binah(api_key='shared-key')
+
+        assert binah.provider is gevurah.provider
+        assert binah.client is other.client
+        assert gevurah.model_name == 'gemini-pro'
+        assert gevurah.client is not binah.client
+
+
+class TestLazyLoading:
+    """Los SDK se importan en la primera llamada, no al importar ni al construir"""
+
+    def test_client_is_built_on_first_use(self):
+        provider = FakeProvider()
+        lazy = provider.lazy_client('m')
+
+        assert lazy is provider.lazy_client('m')
+        assert not lazy.resolved
+        assert lazy.generate_content('hola').text
+        assert lazy.resolve() is provider.client('m')
+
+    def test_imports_do_not_load_provider_sdks(self):
+        code = (
+            "import sys\n"
+            "import src.sefirot\n"
+            "from src.tikun_service import TikunService\n"
+            "from src.sefirot import Binah\n"
+            "from src.sefirot.chochmah import ANTHROPIC_AVAILABLE\n"
+            "Binah(api_key='k')\n"
+            "print(sorted(m for m in ('google.generativeai', 'anthropic') if m in sys.modules))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+
+        assert out.stdout.strip() == '[]'
+
+
+class TestOfflineTree:
+    """TIKUN_LLM_PROVIDER=fake: el Arbol completo corre sin red"""
+
+    def test_default_tree_runs_with_fake_provider(self):
+        env = {'TIKUN_LLM_PROVIDER': 'fake', 'TIKUN_LLM_CACHE': '0'}
+        with patch.dict(os.environ, env):
+            assert provider_name('gemini') == 'fake'
+            sefirot = SefiraRegistry().get_all()
+
+        assert all(sefira.provider.NAME == 'fake' for sefira in sefirot.values())
+        assert all(sefira.rate_limiter is None for sefira in sefirot.values())
+
+        run = TikunEngine(sefirot=sefirot).run(ACTION)
+
+        assert run['errors'] == {}
+        assert set(run['results']) == set(sefirot)
+        keter = run['results'].pop('keter')
+        assert all(result['processing_successful'] for result in run['results'].values())
+        assert keter['llm_scored_criteria']
@@ -0,0 +1,137 @@
+"""
+Tests para PipelineExecutor (lotes con una cola y un pool de workers por Sefira)
+"""
+
+import asyncio
+import time
+import pytest
+
+from src.pipeline_executor import PipelineExecutor
+from src.tikun_engine import TikunEngine, SefiraNode
+from src.tikun_service import batch_item, run_response
+from src.core.sefirotic_base import SefiraBase, SefiraPosition
+
+
+class StageSefira(SefiraBase):
+    """Etapa de prueba: tarda 'delay' segundos por accion y cuenta el solapamiento"""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        super().__init__(SefiraPosition.MALCHUT)
+        self.delay = delay
+        self.fail_on = fail_on
+        self.active = 0
+        self.max_active = 0
+        self.seen = []
+
+    def process(self, input_data):
+        raise NotImplementedError
+
+    async def aprocess(self, input_data):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            self.seen.append(input_data['action'])
+            if input_data['action'] == self.fail_on:
+                raise RuntimeError('boom')
+            return {'processing_successful': True, 'action': input_data['action']}
+        finally:
+            self.active -= 1
+
+    def validate_alignment(self):
+        return {'is_aligned': True}
+
+
+def _action(request, results):
+    return {'action': request['action']}
+
+
+def _chain(*delays, fail_on=None):
+    names = [f's{i}' for i in range(len(delays))]
+    sefirot = {name: StageSefira(delay) for name, delay in zip(names, delays)}
+    if fail_on:
+        sefirot['s0'].fail_on = fail_on
+    nodes = [SefiraNode(name, names[:i][-1:], _action) for i, name in enumerate(names)]
+    return sefirot, TikunEngine(sefirot=sefirot, nodes=nodes)
+
+
+class TestPipelineExecutor:
+    """Cada etapa trabaja en una accion distinta a la vez"""
+
+    def test_stages_overlap_across_actions(self):
+        sefirot, engine = _chain(0.05, 0.05, 0.05)
+        executor = PipelineExecutor(engine, max_workers=3)
+        actions = [f'accion {i}' for i in range(6)]
+
+        start = time.perf_counter()
+        batch = executor.run(actions)
+        elapsed = time.perf_counter() - start
+
+        assert [entry['run']['results']['s2']['action'] for entry in batch] == actions
+        # En serie serian 6 x 0.15s; en pipeline ~ (6 + 2) x 0.05s
+        assert elapsed < 0.6
+        assert all(sefira.max_active == 1 for sefira in sefirot.values())
+        assert sefirot['s1'].seen == actions
+
+    def test_failure_skips_only_that_action(self):
+        _, engine = _chain(0.0, 0.0, fail_on='falla')
+
+        batch = PipelineExecutor(engine, max_workers=2).run(['buena', 'falla', {'context': 'x'}])
+
+        assert batch[0]['run']['errors'] == {}
+        assert batch[1]['run']['errors'] == {'s0': 'RuntimeError: boom'}
+        assert batch[1]['run']['skipped'] == {'s1': 'dependencia no disponible: s0'}
+        assert batch[2]['run'] is None and 'ValueError' in batch[2]['error']
+
+    def test_workers_follow_observed_latency(self):
+        sefirot, engine = _chain(0.01, 0.04)
+        executor = PipelineExecutor(engine, max_workers=7)
+
+        executor.run([f'accion {i}' for i in range(12)])
+        metrics = executor.get_metrics()
+
+        assert metrics['stages']['s1']['workers'] > metrics['stages']['s0']['workers']
+        assert metrics['bottleneck'] == 's1'
+        assert metrics['last_batch']['items'] == 12
+        assert sefirot['s1'].max_active > 1
+        assert 's1' in sefirot['s0'].get_metrics()['connected_channels']
+
+    def test_join_waits_for_every_channel_and_gating_applies(self):
+        class Verdict(StageSefira):
+            async def aprocess(self, input_data):
+                result = await super().aprocess(input_data)
+                return dict(result, aligned=input_data['action'] != 'rechazada', alignment_score=0.1)
+
+        sefirot = {'keter': Verdict(0.02), 'a': StageSefira(0.0), 'b': StageSefira(0.03), 'c': StageSefira()}
+        nodes = [
+            SefiraNode('keter', [], _action),
+            SefiraNode('a', [], _action),
+            SefiraNode('b', ['a'], _action),
+            SefiraNode('c', ['a', 'b'], _action),
+        ]
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop')
+
+        batch = PipelineExecutor(engine, max_workers=4).run(['aceptada', 'rechazada'])
+
+        assert set(batch[0]['run']['results']) == {'keter', 'a', 'b', 'c'}
+        assert batch[0]['run']['critical_path'] == ['keter', 'a', 'b', 'c']
+        assert batch[1]['run']['gating']['stopped_by'] == 'keter'
+        assert set(batch[1]['run']['skipped']) == {'a', 'b', 'c'}
+        assert sefirot['c'].seen == ['aceptada']
+
+    def test_run_has_the_keys_of_an_engine_run(self):
+        _, engine = _chain(0.0, 0.0)
+
+        batch = PipelineExecutor(engine, max_workers=2).run(['accion'])
+        run = batch[0]['run']
+
+        assert set(run) == set(engine.run('accion'))
+        assert run['speculation']['nodes'] == [] and run['early_starts'] == {}
+        assert run_response(run)['tokens']['calls'] == 0
+        assert batch_item(batch[0])['success']
+
+    def test_needs_one_worker_per_stage(self):
+        _, engine = _chain(0.0, 0.0, 0.0)
+
+        with pytest.raises(ValueError):
+            PipelineExecutor(engine, max_workers=2)
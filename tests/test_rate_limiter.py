@@ -0,0 +1,132 @@
+"""
+Tests para el limitador de cuota compartido (src/core/rate_limiter.py)
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock
+
+from src.core.rate_limiter import RateLimiter, current_priority, llm_priority
+from src.core.sefirotic_base import SefiraBase, SefiraPosition
+from src.sefirot.gevurah import Gevurah
+from src.tikun_engine import TikunEngine, SefiraNode
+
+
+def _drained(rpm=600, tpm=1_000_000):
+    """Limitador sin cuota disponible: 600 RPM = una llamada cada 0.1s"""
+    limiter = RateLimiter(rpm, tpm)
+    limiter.requests.level = 0
+    return limiter
+
+
+class TestRateLimiter:
+    """Token buckets RPM/TPM con cola de prioridad"""
+
+    def test_burst_then_waits_for_refill(self):
+        limiter = RateLimiter(600, 1_000_000)
+        for _ in range(600):
+            limiter.acquire(10)
+
+        start = time.perf_counter()
+        ticket = limiter.acquire(10)
+
+        assert 0.05 < time.perf_counter() - start < 0.5
+        assert ticket.waited > 0.05
+        assert limiter.stats()['priorities']['interactive']['throttled'] == 1
+
+    def test_tpm_bucket_and_release_adjust(self):
+        limiter = RateLimiter(1000, 6000)
+
+        ticket = limiter.acquire(1000)
+        assert limiter.stats()['tokens_available'] == pytest.approx(5000, abs=5)
+
+        limiter.release(ticket, used_tokens=200)
+        stats = limiter.stats()
+        assert stats['tokens_available'] == pytest.approx(5800, abs=5)
+        assert stats['tokens_used'] == 200
+
+    def test_priority_class_then_later_stage_first(self):
+        limiter = _drained()
+        order = []
+
+        async def call(name, priority, stage):
+            with llm_priority(priority, stage):
+                await limiter.aacquire(10)
+            order.append(name)
+
+        async def run():
+            await asyncio.gather(
+                call('batch', 'batch', 9),
+                call('nuevo', 'interactive', 0),
+                call('avanzado', 'interactive', 5),
+            )
+
+        asyncio.run(run())
+
+        assert order == ['avanzado', 'nuevo', 'batch']
+        assert limiter.stats()['max_queue_depth'] == 3
+
+    def test_cancelled_waiter_leaves_queue(self):
+        limiter = _drained(rpm=6)
+
+        async def run():
+            task = asyncio.ensure_future(limiter.aacquire(10))
+            await asyncio.sleep(0.01)
+            assert limiter.stats()['queue_depth'] == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+
+        assert limiter.stats()['queue_depth'] == 0
+
+    def test_invalid_priority(self):
+        with pytest.raises(ValueError):
+            with llm_priority('urgente'):
+                pass
+
+
+class PrioritySefira(SefiraBase):
+    def __init__(self):
+        super().__init__(SefiraPosition.MALCHUT)
+        self.seen = []
+
+    def process(self, input_data):
+        self.seen.append(current_priority())
+        return {'processing_successful': True}
+
+    def validate_alignment(self):
+        return {'is_aligned': True}
+
+
+class TestRateLimiterIntegration:
+    """Las Sefirot de Gemini pasan por el limitador con la prioridad del motor"""
+
+    def test_gemini_call_acquires_and_reports(self):
+        gevurah = Gevurah(api_key="test-key")
+        gevurah.client = Mock()
+        gevurah.client.generate_content.return_value = Mock(text="ADVERTENCIAS:\n- w1")
+        limiter = RateLimiter(1000, 1_000_000)
+        gevurah.enable_rate_limiter(limiter)
+
+        gevurah.process({'action': 'Programa piloto', 'giving_opportunities': ['a']})
+
+        stats = gevurah.get_metrics()['rate_limiter']['shared']
+        assert stats['priorities']['interactive']['acquired'] == 1
+        assert stats['tokens_reserved'] > stats['tokens_used'] > 0
+
+    def test_engine_marks_stage_and_batch_class(self):
+        sefirot = {'a': PrioritySefira(), 'b': PrioritySefira()}
+        nodes = [
+            SefiraNode('a', [], lambda request, results: {}),
+            SefiraNode('b', ['a'], lambda request, results: {})
+        ]
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        engine.run('accion')
+        engine.run_batch(['accion'])
+
+        assert sefirot['a'].seen == [('interactive', 0), ('batch', 0)]
+        assert sefirot['b'].seen == [('interactive', 1), ('batch', 1)]
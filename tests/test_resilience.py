@@ -0,0 +1,183 @@
+"""
+Tests para reintentos, backoff y circuit breaker (src/core/resilience.py)
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock
+
+from src.core.resilience import (
+    FATAL, RETRYABLE, CircuitBreaker, CircuitOpenError, LLMCallError, Resilience, RetryPolicy,
+    classify_error
+)
+from src.sefirot.gevurah import Gevurah
+from src.sefirot.hod import Hod
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class PermissionDenied(Exception):
+    code = 403
+
+
+class BlockedPromptException(Exception):
+    pass
+
+
+def _flaky(failures, error=ServiceUnavailable):
+    """Funcion que falla 'failures' veces y despues responde 'ok'"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error('fallo')
+        return 'ok'
+
+    return fn, calls
+
+
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay=0.0)
+
+
+class TestClassifyError:
+
+    def test_retryable(self):
+        assert classify_error(ServiceUnavailable()) == RETRYABLE
+        assert classify_error(ResourceExhausted()) == RETRYABLE
+        assert classify_error(TimeoutError()) == RETRYABLE
+        assert classify_error(ConnectionResetError()) == RETRYABLE
+
+    def test_fatal(self):
+        assert classify_error(PermissionDenied()) == FATAL
+        assert classify_error(BlockedPromptException()) == FATAL
+        assert classify_error(ValueError('respuesta sin texto')) == FATAL
+        assert classify_error(CircuitOpenError('abierto')) == FATAL
+
+    def test_follows_cause(self):
+        try:
+            try:
+                raise ResourceExhausted('cuota')
+            except ResourceExhausted as e:
+                raise LLMCallError('Error llamando a Gemini') from e
+        except LLMCallError as wrapped:
+            assert classify_error(wrapped) == RETRYABLE
+
+
+class TestResilience:
+
+    def test_retries_until_success(self):
+        fn, calls = _flaky(2)
+        resilience = Resilience(NO_WAIT)
+
+        assert resilience.call(fn) == 'ok'
+        assert len(calls) == 3
+        assert resilience.stats['retries'] == 2
+        assert resilience.stats['recovered'] == 1
+
+    def test_gives_up_after_max_attempts(self):
+        fn, calls = _flaky(5)
+        resilience = Resilience(NO_WAIT)
+
+        with pytest.raises(ServiceUnavailable):
+            resilience.call(fn)
+        assert len(calls) == 3
+        assert resilience.stats['failed_retryable'] == 1
+
+    def test_fatal_is_not_retried(self):
+        fn, calls = _flaky(1, error=PermissionDenied)
+        resilience = Resilience(NO_WAIT)
+
+        with pytest.raises(PermissionDenied):
+            resilience.call(fn)
+        assert len(calls) == 1
+        assert resilience.stats['failed_fatal'] == 1
+
+    def test_backoff_has_jitter_and_cap(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+
+        delays = [policy.backoff(5) for _ in range(50)]
+
+        assert all(0 <= delay <= 3.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_async_deadline_cuts_the_attempt(self):
+        async def slow():
+            await asyncio.sleep(1)
+
+        resilience = Resilience(RetryPolicy(base_delay=0.0, deadline=0.05))
+
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(resilience.acall(slow))
+
+        assert time.perf_counter() - start < 0.5
+        assert resilience.stats['deadline_exceeded'] == 1
+
+
+class TestCircuitBreaker:
+
+    def test_opens_fails_fast_and_recovers(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+        resilience = Resilience(RetryPolicy(max_attempts=1), breaker)
+        fn, calls = _flaky(2)
+
+        for _ in range(2):
+            with pytest.raises(ServiceUnavailable):
+                resilience.call(fn)
+        assert breaker.state == 'open'
+
+        with pytest.raises(CircuitOpenError):
+            resilience.call(fn)
+        assert len(calls) == 2
+        assert resilience.stats['circuit_open'] == 1
+
+        time.sleep(0.06)
+        assert resilience.call(fn) == 'ok'
+        assert resilience.snapshot()['circuit'] == {
+            'state': 'closed', 'consecutive_failures': 0, 'times_opened': 1
+        }
+
+    def test_fatal_errors_do_not_open(self):
+        breaker = CircuitBreaker('test', failure_threshold=1)
+        resilience = Resilience(RetryPolicy(max_attempts=1), breaker)
+
+        with pytest.raises(BlockedPromptException):
+            resilience.call(_flaky(1, error=BlockedPromptException)[0])
+
+        assert breaker.state == 'closed'
+
+
+class TestSefirotResilience:
+    """Las Sefirot reintentan a traves de SefiraBase._call_llm"""
+
+    def test_transient_error_is_retried(self):
+        gevurah = Gevurah(api_key="test-key")
+        gevurah.client = Mock()
+        gevurah.client.generate_content.side_effect = [
+            ResourceExhausted('429'), Mock(text="ADVERTENCIAS:\n- w1")
+        ]
+        gevurah.resilience = Resilience(NO_WAIT, CircuitBreaker('test'))
+
+        result = gevurah.process({'action': 'Programa piloto', 'giving_opportunities': ['a']})
+
+        assert result['processing_successful'] is True
+        assert result['warnings'] == ['w1']
+        assert gevurah.get_metrics()['resilience']['recovered'] == 1
+
+    def test_hod_keeps_the_original_error(self):
+        hod = Hod(api_key="test-key")
+        hod.client = Mock()
+        hod.client.generate_content.side_effect = PermissionDenied('clave invalida')
+
+        with pytest.raises(LLMCallError) as info:
+            hod._call_gemini('prompt')
+
+        assert isinstance(info.value.__cause__, PermissionDenied)
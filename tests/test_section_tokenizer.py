@@ -0,0 +1,286 @@
+"""
+Tests para el tokenizador de secciones compartido (src/core/section_tokenizer.py)
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from src.core.section_tokenizer import SectionTokenizer
+from src.core.sefirotic_base import listen_sections
+from src.sefirot.binah import Binah
+from src.sefirot.chesed import Chesed
+from src.sefirot.chochmah import Chochmah
+from src.sefirot.chochmah_gemini import ChochmahGemini
+from src.sefirot.gevurah import Gevurah
+from src.sefirot.hod import Hod
+from src.sefirot.malchut import Malchut
+
+
+SECTIONS = SectionTokenizer({
+    'understanding': ['COMPRENSION', 'UNDERSTANDING'],
+    'analysis': ['ANALISIS', 'ANALYSIS'],
+    'insights': ['INSIGHTS']
+})
+
+
+class TestSectionTokenizer:
+    """Una sola pasada localiza todos los encabezados"""
+
+    def test_split_spanish_and_english_aliases(self):
+        text = "COMPRENSION: breve\nmas texto\n\nANALYSIS:\nlinea 1\nlinea 2\n"
+
+        sections = SECTIONS.split(text)
+
+        assert sections == {
+            'understanding': "breve\nmas texto",
+            'analysis': "linea 1\nlinea 2",
+            'insights': ''
+        }
+
+    def test_accents_case_and_markdown_decoration(self):
+        text = "## Comprensión:\nuno\n**ANÁLISIS:** dos\n1. Insights:\ntres"
+
+        sections = SECTIONS.split(text)
+
+        assert sections == {'understanding': "uno", 'analysis': "dos", 'insights': "tres"}
+
+    def test_header_must_start_the_line(self):
+        text = "ANALISIS:\nEl ANALISIS: previo no abre seccion\nAnalisis de riesgos: tampoco"
+
+        sections = SECTIONS.split_lines(text)
+
+        assert sections['analysis'] == [
+            "El ANALISIS: previo no abre seccion",
+            "Analisis de riesgos: tampoco"
+        ]
+
+    def test_split_keeps_first_occurrence_and_lines_accumulate(self):
+        text = "INSIGHTS: a\nANALISIS: b\nINSIGHTS: c"
+
+        assert SECTIONS.split(text)['insights'] == "a"
+        assert SECTIONS.split_lines(text)['insights'] == ["a", "c"]
+        assert SECTIONS.split_lines(text, include_inline=False)['insights'] == []
+
+    def test_without_colon(self):
+        tokenizer = SectionTokenizer({'stakeholders': ['STAKEHOLDERS']}, require_colon=False)
+
+        assert tokenizer.split_lines("### Stakeholders\n- comunidad")['stakeholders'] == ["- comunidad"]
+        assert tokenizer.split_lines("STAKEHOLDERS (clave): gobierno")['stakeholders'] == ["gobierno"]
+        assert tokenizer.split_lines("STAKEHOLDERSHIP: no")['stakeholders'] == []
+
+    def test_uppercase_only(self):
+        tokenizer = SectionTokenizer({'docs': ['DOCUMENTACION'], 'plan': ['PLAN']}, uppercase_only=True)
+
+        sections = tokenizer.split("PLAN:\n- Documentación: informe\nDOCUMENTACIÓN:\nmanual")
+
+        assert sections == {'plan': "- Documentación: informe", 'docs': "manual"}
+
+    def test_positions_refer_to_original_text(self):
+        text = "Intro\nANÁLISIS: x\nINSIGHTS: y"
+
+        first, second = SECTIONS.tokenize(text)
+
+        assert text[first.start:first.end] == "ANÁLISIS: x\n"
+        assert second.start == first.end
+        assert second.end == len(text)
+
+    def test_no_headers(self):
+        assert SECTIONS.tokenize("") == []
+        assert SECTIONS.split("texto libre") == {'understanding': '', 'analysis': '', 'insights': ''}
+
+
+class TestSectionStream:
+    """Tokenizacion incremental de respuestas en streaming"""
+
+    TEXT = "Intro\nCOMPRENSION: breve\nmas\n## Análisis\nlinea\nINSIGHTS: final"
+
+    def test_any_chunking_matches_tokenize(self):
+        tokenizer = SectionTokenizer(SECTIONS.headers, require_colon=False)
+        expected = [(s.key, s.content) for s in tokenizer.tokenize(self.TEXT)]
+
+        for size in (1, 2, 5, 13, len(self.TEXT)):
+            stream = tokenizer.stream()
+            got = []
+            for i in range(0, len(self.TEXT), size):
+                got += [(s.key, s.content) for s in stream.feed(self.TEXT[i:i + size])]
+            got += [(s.key, s.content) for s in stream.close()]
+            assert got == expected
+            assert stream.text == self.TEXT
+
+    def test_section_completes_when_next_header_arrives(self):
+        stream = SECTIONS.stream()
+
+        assert stream.feed("COMPRENSION: breve\nmas\nANALI") == []
+        completed = stream.feed("SIS: x\n")
+        assert [(s.key, s.content) for s in completed] == [('understanding', "breve\nmas")]
+        assert [(s.key, s.content) for s in stream.close()] == [('analysis', "x")]
+        assert stream.close() == []
+
+    def test_repeated_header_accumulates_like_split_lines(self):
+        text = "ANALISIS: a1\na2\nINSIGHTS: i1\nANALISIS: a3\nINSIGHTS: i2"
+        expected = {key: '\n'.join(lines) for key, lines in SECTIONS.split_lines(text).items()}
+
+        for size in (1, 4, len(text)):
+            stream = SECTIONS.stream()
+            streamed = {}
+            for i in range(0, len(text), size):
+                for section in stream.feed(text[i:i + size]):
+                    streamed[section.key] = stream.value(section.key)
+            for section in stream.close():
+                streamed[section.key] = stream.value(section.key)
+            assert streamed == {'analysis': expected['analysis'], 'insights': expected['insights']}
+            assert streamed['analysis'] == "a1\na2\na3"
+
+
+class TestSefiraStreaming:
+    """listen_sections: las Sefirot de Gemini entregan cada seccion al completarse"""
+
+    RESPONSE = ["STAKEHOLDERS\n- comunidad\n", "RIESGOS SISTEMICOS:\n- r1\n", "SINTESIS CONTEXTUAL: fin"]
+
+    def _binah(self):
+        binah = Binah(api_key="test-key")
+        binah.client = Mock()
+        return binah
+
+    def test_sync_stream(self):
+        binah = self._binah()
+        binah.client.generate_content.return_value = [Mock(text=chunk) for chunk in self.RESPONSE]
+        seen = []
+
+        with listen_sections(lambda key, value: seen.append((key, value))):
+            result = binah.process({'analysis': 'analisis', 'action': 'accion'})
+
+        assert seen == [
+            ('stakeholders', "- comunidad"),
+            ('systemic_risks', "- r1"),
+            ('contextual_synthesis', "fin")
+        ]
+        assert result['raw_response'] == ''.join(self.RESPONSE)
+        assert result['systemic_risks'] == "- r1"
+        assert binah.client.generate_content.call_args.kwargs['stream'] is True
+
+    def test_async_stream(self):
+        binah = self._binah()
+
+        async def chunks():
+            for chunk in self.RESPONSE:
+                yield Mock(text=chunk)
+
+        binah.client.generate_content_async = AsyncMock(return_value=chunks())
+        seen = []
+
+        async def run():
+            with listen_sections(lambda key, value: seen.append(key)):
+                return await binah.aprocess({'analysis': 'analisis', 'action': 'accion'})
+
+        result = asyncio.run(run())
+
+        assert seen == ['stakeholders', 'systemic_risks', 'contextual_synthesis']
+        assert result['stakeholders'] == "- comunidad"
+
+    def test_repeated_header_streams_final_value(self):
+        binah = self._binah()
+        response = self.RESPONSE[:2] + ["STAKEHOLDERS:\n- gobierno\n", self.RESPONSE[2]]
+        binah.client.generate_content.return_value = [Mock(text=chunk) for chunk in response]
+        seen = {}
+
+        with listen_sections(lambda key, value: seen.__setitem__(key, value)):
+            result = binah.process({'analysis': 'analisis', 'action': 'accion'})
+
+        assert seen['stakeholders'] == "- comunidad\n- gobierno"
+        assert seen['stakeholders'] == result['stakeholders']
+
+    def test_no_listener_no_stream(self):
+        binah = self._binah()
+        binah.client.generate_content.return_value = Mock(text=''.join(self.RESPONSE))
+
+        binah.process({'analysis': 'analisis', 'action': 'accion'})
+
+        assert binah.client.generate_content.call_args.kwargs['stream'] is False
+
+    def test_json_mode_and_claude_do_not_stream(self):
+        binah = self._binah()
+        binah.set_output_mode('json')
+
+        assert not binah.supports_streaming()
+        assert not Chochmah.__new__(Chochmah).supports_streaming()
+
+
+class TestSefirotUseSectionTokenizer:
+    """Los parsers de las Sefirot comparten el tokenizador"""
+
+    def test_chochmah_gemini_fallback_to_analysis(self):
+        parser = ChochmahGemini.__new__(ChochmahGemini)
+
+        parsed = parser._parse_response("Sin estructura")
+
+        assert parsed['analysis'] == "Sin estructura"
+
+    def test_chochmah_claude_multiline_sections(self):
+        parser = Chochmah.__new__(Chochmah)
+
+        parsed = parser._parse_response("UNDERSTANDING: a\nb\nRECOMENDACIÓN:\nc")
+
+        assert parsed['understanding'] == "a\nb"
+        assert parsed['recommendation'] == "c"
+
+    def test_binah_keeps_inline_content(self):
+        parser = Binah.__new__(Binah)
+
+        parsed = parser._parse_response("CONTEXTO HISTORICO: antes\nmas\nRIESGOS SISTEMICOS:\n- r1")
+
+        assert parsed['historical_context'] == "antes\nmas"
+        assert parsed['systemic_risks'] == "- r1"
+
+    def test_chesed_beneficiary_subsections(self):
+        parser = Chesed.__new__(Chesed)
+        response = (
+            "OPORTUNIDADES DE DAR:\n- uno\n- dos\n"
+            "BENEFICIARIOS:\n- Primarios: estudiantes\n- Secundarios: familias\n"
+            "- Largo plazo: la region\n"
+            "IMPACTO DE BONDAD: ignorado\nalto impacto\n"
+        )
+
+        parsed = parser._parse_response(response)
+
+        assert parsed['giving_opportunities'] == ["uno", "dos"]
+        assert parsed['beneficiaries'] == {
+            'primary': ["estudiantes"],
+            'secondary': ["familias"],
+            'tertiary': ["la region"]
+        }
+        assert parsed['compassion_impact'] == "alto impacto"
+        assert parsed['limits_needed'] == []
+
+    def test_gevurah_list_items(self):
+        parser = Gevurah.__new__(Gevurah)
+
+        parsed = parser._parse_response("NECESSARY LIMITS:\n* limite\n- otro\nBALANCE REQUERIDO:\ntexto")
+
+        assert parsed['necessary_boundaries'] == ["limite", "otro"]
+        assert parsed['balance_analysis'] == "texto"
+
+    def test_hod_raw_sections(self):
+        parser = Hod.__new__(Hod)
+        response = "PLAN ESTRUCTURADO:\nFASE 1: inicio\nDOCUMENTACION:\n- manual\nMENSAJES CLAVE:\nhola"
+
+        parsed = parser._parse_response(response, {})
+
+        assert parsed['structured_plan_text'] == "FASE 1: inicio"
+        assert parsed['documentation_text'] == "- manual"
+        assert parsed['precision_evaluation'] == ""
+
+    def test_malchut_sections_with_fallback(self):
+        parser = Malchut.__new__(Malchut)
+        response = (
+            "ACCIONES EJECUTADAS:\n- Se selecciono la comunidad piloto\n"
+            "RESULTADOS TANGIBLES:\n50 estudiantes inscritos\n"
+            "RESPONSABILIDADES:\nCoordinador: seguimiento semanal del piloto\n"
+        )
+
+        parsed = parser._parse_response(response, {})
+
+        assert [a['action'] for a in parsed['actions_executed']] == ["Se selecciono la comunidad piloto"]
+        assert parsed['results_achieved']['description'] == "50 estudiantes inscritos"
+        assert parsed['responsibilities_assigned'] == {'Coordinador': "seguimiento semanal del piloto"}
+        assert parsed['world_updated']['description'] == response[:300]
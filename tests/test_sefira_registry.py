@@ -0,0 +1,120 @@
+"""
+Tests para SefiraRegistry (instancias compartidas y perezosas)
+"""
+
+import threading
+import time
+import pytest
+
+from src.core.sefira_registry import SefiraRegistry, get_registry
+from src.core.sefirotic_base import SefiraBase, SefiraPosition
+
+
+class CountingSefira(SefiraBase):
+    """Sefira de prueba cuyo _steps actualiza un contador sin atomicidad"""
+
+    def __init__(self):
+        super().__init__(SefiraPosition.MALCHUT)
+        self.processed = 0
+
+    def process(self, input_data):
+        return self._drive(self._steps(input_data))
+
+    def _steps(self, input_data):
+        response = yield str(input_data)
+        current = self.processed
+        time.sleep(0.001)
+        self.processed = current + 1
+        return {'processing_successful': True, 'response': response}
+
+    def _call_gemini(self, prompt):
+        return prompt
+
+    def validate_alignment(self):
+        return {'is_aligned': True}
+
+
+class TestSefiraRegistry:
+    """Tests de construccion perezosa y reutilizacion"""
+
+    def test_builds_lazily_and_reuses(self):
+        built = []
+
+        def factory():
+            built.append(1)
+            return CountingSefira()
+
+        registry = SefiraRegistry({'malchut': factory, 'otra': factory})
+
+        assert registry.stats()['instances'] == 0
+
+        first = registry.get('malchut')
+        second = registry.get('malchut')
+
+        assert first is second
+        assert len(built) == 1
+        stats = registry.stats()
+        assert stats['registered'] == 2
+        assert stats['instances'] == 1
+        assert set(stats['build_times']) == {'malchut'}
+
+    def test_concurrent_get_builds_once(self):
+        built = []
+
+        def slow_factory():
+            built.append(1)
+            time.sleep(0.05)
+            return CountingSefira()
+
+        registry = SefiraRegistry({'malchut': slow_factory})
+        instances = []
+        threads = [
+            threading.Thread(target=lambda: instances.append(registry.get('malchut')))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(built) == 1
+        assert all(instance is instances[0] for instance in instances)
+
+    def test_unknown_sefira(self):
+        registry = SefiraRegistry({'malchut': CountingSefira})
+
+        assert 'daat' not in registry
+        with pytest.raises(KeyError):
+            registry.get('daat')
+
+    def test_clear_rebuilds(self):
+        registry = SefiraRegistry({'malchut': CountingSefira})
+        first = registry.get('malchut')
+
+        registry.clear()
+
+        assert registry.stats()['instances'] == 0
+        assert registry.get('malchut') is not first
+
+    def test_default_registry_knows_ten_sefirot(self):
+        registry = get_registry()
+
+        assert registry is get_registry()
+        assert len(registry.names()) == 10
+
+
+class TestSharedInstanceThreadSafety:
+    """Una instancia compartida mantiene metricas consistentes entre hilos"""
+
+    def test_state_updates_are_serialized(self):
+        sefira = CountingSefira()
+        threads = [
+            threading.Thread(target=sefira.process, args=(i,))
+            for i in range(20)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sefira.processed == 20
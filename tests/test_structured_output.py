@@ -0,0 +1,192 @@
+"""
+Tests para el modo de salida JSON (src/core/structured_output.py y SefiraBase.set_output_mode)
+"""
+
+import asyncio
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.core.llm_cache import LLMCache
+from src.core.llm_provider import GeminiProvider
+from src.core.sefira_registry import _default_factory
+from src.core.structured_output import (
+    JSON_INSTRUCTION, coerce_to_schema, load_json_object, schema_from_sections
+)
+from src.sefirot.chesed import Chesed
+from src.sefirot.gevurah import Gevurah
+from src.sefirot.hod import Hod
+from src.sefirot.keter import Keter
+
+
+GEVURAH_JSON = json.dumps({
+    'chesed_excesses': ['- exceso 1', 'exceso 2'],
+    'necessary_boundaries': ['limite'],
+    'justice_criteria': [],
+    'restrictions': ['r1', ''],
+    'warnings': ['w1'],
+    'balance_analysis': 'Balance claro'
+})
+
+GEVURAH_TEXT = """EXCESOS DE CHESED:
+- exceso 1
+- exceso 2
+LIMITES NECESARIOS:
+- limite
+RESTRICCIONES:
+- r1
+ADVERTENCIAS:
+- w1
+BALANCE REQUERIDO:
+Balance claro
+"""
+
+GEVURAH_INPUT = {'action': 'Programa piloto', 'giving_opportunities': ['a']}
+
+
+def _gevurah(response_text, mode='json'):
+    gevurah = Gevurah(api_key="test-key")
+    gevurah.client = Mock()
+    gevurah.client.generate_content.return_value = Mock(text=response_text)
+    gevurah.set_output_mode(mode)
+    return gevurah
+
+
+class TestSchemaHelpers:
+    """Esquema derivado de la tabla de secciones y ajuste del JSON"""
+
+    def test_schema_from_sections(self):
+        schema = Gevurah.RESPONSE_SCHEMA
+
+        assert schema['type'] == 'object'
+        assert list(schema['properties']) == Gevurah.SECTIONS.keys()
+        assert schema['properties']['warnings']['type'] == 'array'
+        assert schema['properties']['balance_analysis']['type'] == 'string'
+        assert schema['required'] == Gevurah.SECTIONS.keys()
+
+    def test_schema_overrides(self):
+        beneficiaries = Chesed.RESPONSE_SCHEMA['properties']['beneficiaries']
+
+        assert beneficiaries['type'] == 'object'
+        assert set(beneficiaries['properties']) == {'primary', 'secondary', 'tertiary'}
+
+    def test_load_json_object(self):
+        assert load_json_object('```json\n{"a": 1}\n```') == {'a': 1}
+        assert load_json_object('[1, 2]') is None
+        assert load_json_object('SECCION: texto') is None
+
+    def test_coerce_fills_missing_and_wrong_types(self):
+        schema = schema_from_sections(Gevurah.SECTIONS, list_sections=Gevurah.LIST_SECTIONS)
+
+        data = coerce_to_schema({'warnings': 'w1\n- w2', 'balance_analysis': ['x'], 'extra': 1}, schema)
+
+        assert data['warnings'] == ['w1', 'w2']
+        assert data['balance_analysis'] == ''
+        assert data['restrictions'] == []
+        assert 'extra' not in data
+
+
+class TestJsonOutputMode:
+    """Sefirot con output_mode='json'"""
+
+    def test_json_mode_loads_reply_directly(self):
+        gevurah = _gevurah(GEVURAH_JSON)
+
+        result = gevurah.process(GEVURAH_INPUT)
+
+        assert result['processing_successful'] is True
+        assert result['chesed_excesses'] == ['exceso 1', 'exceso 2']
+        assert result['restrictions'] == ['r1']
+        assert result['balance_analysis'] == 'Balance claro'
+
+        prompt = gevurah.client.generate_content.call_args.args[0]
+        config = gevurah.client.generate_content.call_args.kwargs['generation_config']
+        assert prompt.endswith(JSON_INSTRUCTION)
+        assert config.response_mime_type == 'application/json'
+        assert config.response_schema == Gevurah.RESPONSE_SCHEMA
+
+    def test_json_and_text_modes_give_same_sections(self):
+        from_json = _gevurah(GEVURAH_JSON).process(GEVURAH_INPUT)
+        from_text = _gevurah(GEVURAH_TEXT, mode='text').process(GEVURAH_INPUT)
+
+        for key in Gevurah.SECTIONS.keys():
+            assert from_json[key] == from_text[key]
+
+    def test_invalid_json_falls_back_to_text_parser(self):
+        gevurah = _gevurah(GEVURAH_TEXT)
+
+        result = gevurah.process(GEVURAH_INPUT)
+
+        assert result['warnings'] == ['w1']
+        assert gevurah.output_mode_stats['json']['json_fallbacks'] == 1
+
+    def test_async_json_mode(self):
+        gevurah = _gevurah(GEVURAH_JSON)
+        gevurah.client.generate_content_async = AsyncMock(return_value=Mock(text=GEVURAH_JSON))
+
+        result = asyncio.run(gevurah.aprocess(GEVURAH_INPUT))
+
+        assert result['necessary_boundaries'] == ['limite']
+        config = gevurah.client.generate_content_async.call_args.kwargs['generation_config']
+        assert config.response_mime_type == 'application/json'
+
+    def test_hod_json_sections_go_through_section_parsers(self):
+        hod = Hod(api_key="test-key")
+        hod.client = Mock()
+        hod.client.generate_content.return_value = Mock(text=json.dumps({
+            'structured_plan_text': 'Fase 1: preparar\nFase 2: ejecutar',
+            'documentation_text': '- Manual del facilitador local'
+        }))
+        hod.set_output_mode('json')
+
+        result = hod.process({'action': 'Programa piloto'})
+
+        assert set(result['structured_plan']) == {'phase_1', 'phase_2'}
+        assert result['documentation'] == ['Manual del facilitador local']
+        assert result['precision_evaluation'] == ''
+
+    def test_modes_use_separate_cache_entries(self):
+        gevurah = _gevurah(GEVURAH_TEXT, mode='text')
+        gevurah.enable_llm_cache(LLMCache())
+
+        gevurah.process(GEVURAH_INPUT)
+        gevurah.set_output_mode('json')
+        gevurah.process(GEVURAH_INPUT)
+
+        assert gevurah.client.generate_content.call_count == 2
+
+    def test_metrics_report_savings(self):
+        gevurah = _gevurah(GEVURAH_TEXT, mode='text')
+        gevurah.process(GEVURAH_INPUT)
+        gevurah.client.generate_content.return_value = Mock(text=GEVURAH_JSON)
+        gevurah.set_output_mode('json')
+        gevurah.process(GEVURAH_INPUT)
+
+        report = gevurah.get_metrics()['output_modes']
+
+        assert report['current'] == 'json'
+        assert report['text']['responses'] == report['json']['responses'] == 1
+        assert report['text']['avg_output_chars'] == len(GEVURAH_TEXT)
+        savings = report['json_savings']
+        assert savings['output_tokens_per_response'] == pytest.approx(
+            (len(GEVURAH_TEXT) - len(GEVURAH_JSON)) / Gevurah.CHARS_PER_TOKEN
+        )
+        assert 'parse_ms_per_response' in savings
+
+    def test_invalid_modes(self):
+        gevurah = Gevurah(api_key="test-key")
+
+        with pytest.raises(ValueError):
+            gevurah.set_output_mode('xml')
+        with pytest.raises(ValueError):
+            Keter(use_llm_scoring=False).set_output_mode('json')
+
+    @pytest.mark.parametrize('supported, mode', [(True, 'json'), (False, 'text')])
+    def test_env_json_mode_needs_sdk_support(self, supported, mode):
+        env = {'TIKUN_OUTPUT_MODE': 'json', 'TIKUN_LLM_PROVIDER': 'gemini', 'TIKUN_LLM_CACHE': '0', 'TIKUN_RATE_LIMIT': '0'}
+        with patch.dict(os.environ, env), \
+                patch.object(GeminiProvider, 'supports_json_output', return_value=supported):
+            gevurah = _default_factory('gevurah', 'Gevurah', {'api_key': 'test-key'})()
+
+        assert gevurah.output_mode == mode
@@ -0,0 +1,564 @@
+"""
+Tests para TikunEngine (orquestador DAG de las Sefirot)
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock
+
+from src.tikun_engine import TikunEngine, SefiraNode, default_tree
+from src.core.section_tokenizer import SectionTokenizer
+from src.core.sefirotic_base import SefiraBase, SefiraPosition
+from src.sefirot.keter import Keter
+
+
+class SlowSefira(SefiraBase):
+    """Sefira de prueba que tarda 'delay' segundos y registra sus tiempos"""
+
+    def __init__(self, delay=0.0, result=None, error=None):
+        super().__init__(SefiraPosition.MALCHUT)
+        self.delay = delay
+        self.result = result if result is not None else {'processing_successful': True}
+        self.error = error
+        self.started_at = None
+        self.inputs = []
+
+    def process(self, input_data):
+        self.started_at = time.perf_counter()
+        self.inputs.append(input_data)
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return dict(self.result)
+
+    def validate_alignment(self):
+        return {'is_aligned': True}
+
+
+def _passthrough(request, results):
+    return {'action': request['action'], 'upstream': sorted(results)}
+
+
+class TestTikunEngineScheduling:
+    """Tests de planificacion del grafo"""
+
+    def test_independent_nodes_run_concurrently(self):
+        """Nodos sin dependencias entre si deben solaparse"""
+        sefirot = {'a': SlowSefira(0.2), 'b': SlowSefira(0.2)}
+        nodes = [SefiraNode('a', [], _passthrough), SefiraNode('b', [], _passthrough)]
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'a', 'b'}
+        assert run['total_time'] < 0.35
+        assert run['sequential_time'] >= 0.4
+
+    def test_dependencies_wait_for_upstream(self):
+        """Un nodo no arranca hasta que sus dependencias terminan"""
+        sefirot = {'a': SlowSefira(0.1), 'b': SlowSefira(0.0)}
+        nodes = [SefiraNode('a', [], _passthrough), SefiraNode('b', ['a'], _passthrough)]
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        run = engine.run('accion')
+
+        assert sefirot['b'].inputs[0]['upstream'] == ['a']
+        assert sefirot['b'].started_at >= sefirot['a'].started_at + 0.1
+        assert run['critical_path'] == ['a', 'b']
+
+    def test_timeout_skips_dependents(self):
+        """Un nodo que expira se reporta como error y sus dependientes se omiten"""
+        sefirot = {'a': SlowSefira(0.5), 'b': SlowSefira(), 'c': SlowSefira()}
+        nodes = [
+            SefiraNode('a', [], _passthrough, timeout=0.05),
+            SefiraNode('b', ['a'], _passthrough),
+            SefiraNode('c', ['b'], _passthrough),
+        ]
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        run = engine.run('accion')
+
+        assert 'timeout' in run['errors']['a']
+        assert set(run['skipped']) == {'b', 'c'}
+        assert sefirot['b'].inputs == []
+
+    def test_unsuccessful_result_is_error(self):
+        """processing_successful=False cuenta como fallo del nodo"""
+        sefirot = {
+            'a': SlowSefira(result={'processing_successful': False, 'error': 'sin cliente'}),
+            'b': SlowSefira(),
+        }
+        nodes = [SefiraNode('a', [], _passthrough), SefiraNode('b', ['a'], _passthrough)]
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        run = engine.run('accion')
+
+        assert run['errors'] == {'a': 'sin cliente'}
+        assert 'b' in run['skipped']
+
+    def test_exception_is_reported(self):
+        sefirot = {'a': SlowSefira(error=ValueError('malo'))}
+        engine = TikunEngine(sefirot=sefirot, nodes=[SefiraNode('a', [], _passthrough)])
+
+        run = engine.run('accion')
+
+        assert run['errors'] == {'a': 'ValueError: malo'}
+
+
+class TestTikunEngineGraph:
+    """Tests de validacion del grafo"""
+
+    def test_default_tree_is_valid(self):
+        sefirot = {node.name: SlowSefira() for node in default_tree()}
+        engine = TikunEngine(sefirot=sefirot)
+
+        assert [n.name for n in engine.nodes][:2] == ['keter', 'chochmah']
+
+    def test_cycle_detected(self):
+        sefirot = {'a': SlowSefira(), 'b': SlowSefira()}
+        nodes = [SefiraNode('a', ['b'], _passthrough), SefiraNode('b', ['a'], _passthrough)]
+
+        with pytest.raises(ValueError, match="Ciclo"):
+            TikunEngine(sefirot=sefirot, nodes=nodes)
+
+    def test_missing_sefira(self):
+        with pytest.raises(ValueError, match="No hay Sefira"):
+            TikunEngine(sefirot={}, nodes=[SefiraNode('a', [], _passthrough)])
+
+
+REJECTED = {
+    'processing_successful': True,
+    'aligned': False,
+    'alignment_score': 0.4,
+    'suggested_modifications': ['Incluir consulta comunitaria']
+}
+ALIGNED = {'processing_successful': True, 'aligned': True, 'alignment_score': 0.8}
+
+
+class VerdictSefira(SlowSefira):
+    """Keter de prueba que devuelve un veredicto distinto en cada llamada"""
+
+    def __init__(self, *verdicts):
+        super().__init__()
+        self.verdicts = list(verdicts)
+
+    def process(self, input_data):
+        self.inputs.append(input_data)
+        return dict(self.verdicts[min(len(self.inputs), len(self.verdicts)) - 1])
+
+
+def _gated_tree(keter):
+    sefirot = {'keter': keter, 'a': SlowSefira(result={'processing_successful': True, 'score': 0.2}),
+               'b': SlowSefira()}
+    nodes = [
+        SefiraNode('keter', [], _passthrough),
+        SefiraNode('a', [], _passthrough),
+        SefiraNode('b', ['a'], _passthrough),
+    ]
+    return sefirot, nodes
+
+
+class TestTikunEngineGating:
+    """Politicas de gating tras el veredicto de Keter y umbrales intermedios"""
+
+    def test_continue_runs_everything(self):
+        sefirot, nodes = _gated_tree(VerdictSefira(REJECTED))
+
+        run = TikunEngine(sefirot=sefirot, nodes=nodes).run('accion')
+
+        assert set(run['results']) == {'keter', 'a', 'b'}
+        assert run['gating']['policy'] == 'continue'
+        assert run['gating']['stopped_by'] is None
+
+    def test_stop_skips_all_downstream(self):
+        sefirot, nodes = _gated_tree(VerdictSefira(REJECTED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop')
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'keter'}
+        assert sefirot['a'].inputs == []
+        assert set(run['skipped']) == {'a', 'b'}
+        assert all(reason.startswith('gating: Keter rechazo') for reason in run['skipped'].values())
+        assert run['gating']['stopped_by'] == 'keter'
+
+    def test_stop_lets_aligned_action_through(self):
+        sefirot, nodes = _gated_tree(VerdictSefira(ALIGNED))
+
+        run = TikunEngine(sefirot=sefirot, nodes=nodes).run('accion', gating_policy='stop')
+
+        assert set(run['results']) == {'keter', 'a', 'b'}
+        assert run['critical_path'] == ['keter', 'a', 'b']
+
+    def test_modifications_loop_realigns_action(self):
+        keter = VerdictSefira(REJECTED, ALIGNED)
+        sefirot, nodes = _gated_tree(keter)
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='modifications')
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'keter', 'a', 'b'}
+        assert run['results']['keter']['aligned'] is True
+        assert 'Incluir consulta comunitaria' in run['effective_action']
+        assert sefirot['a'].inputs[0]['action'] == run['effective_action']
+        assert [r['aligned'] for r in run['gating']['modification_rounds']] == [True]
+
+    def test_modifications_loop_gives_up(self):
+        keter = VerdictSefira(REJECTED)
+        sefirot, nodes = _gated_tree(keter)
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='modifications')
+
+        run = engine.run('accion')
+
+        # Sin modificaciones nuevas tras la primera ronda no se reintenta
+        assert len(keter.inputs) == 2
+        assert set(run['skipped']) == {'a', 'b'}
+        assert run['effective_action'] == 'accion'
+
+    def test_threshold_skips_dependents(self):
+        sefirot, nodes = _gated_tree(VerdictSefira(ALIGNED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, thresholds={'a': {'score': 0.5}})
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'keter', 'a'}
+        assert run['skipped']['b'] == 'gating: a.score=0.20 por debajo del umbral 0.5'
+        assert run['gating']['stopped_by'] == 'a'
+
+    def test_invalid_policy(self):
+        sefirot, nodes = _gated_tree(VerdictSefira(ALIGNED))
+
+        with pytest.raises(ValueError, match="gating_policy"):
+            TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='maybe')
+
+
+class LLMSefira(SlowSefira):
+    """Sefira de prueba que pasa por _call_llm (prompt y respuesta de 400 caracteres)"""
+
+    def _call_model(self, prompt):
+        time.sleep(self.delay)
+        return 'r' * 400
+
+    def process(self, input_data):
+        self.inputs.append(input_data)
+        self._call_llm('p' * 400)
+        return dict(self.result)
+
+
+def _speculative_tree(keter, chochmah_delay=0.0):
+    sefirot = {'keter': keter, 'chochmah': LLMSefira(chochmah_delay), 'binah': SlowSefira()}
+    nodes = [
+        SefiraNode('keter', [], _passthrough),
+        SefiraNode('chochmah', [], _passthrough),
+        SefiraNode('binah', ['chochmah'], _passthrough),
+    ]
+    return sefirot, nodes
+
+
+class SlowVerdictSefira(VerdictSefira):
+    """Keter de prueba que tarda 0.1s en decidir"""
+
+    def process(self, input_data):
+        time.sleep(0.1)
+        return super().process(input_data)
+
+
+class TestTikunEngineSpeculation:
+    """Chochmah arranca antes del veredicto de Keter"""
+
+    def test_confirmed_speculation_keeps_work(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(ALIGNED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop', speculate=['chochmah'])
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'keter', 'chochmah', 'binah'}
+        assert sefirot['binah'].inputs[0]['upstream'] == ['chochmah', 'keter']
+        assert run['speculation']['outcome'] == 'confirmed'
+        assert 0 < run['speculation']['latency_saved'] <= run['timings']['keter'] + 0.05
+        assert run['llm_usage']['chochmah'] == {
+            'calls': 1, 'cached': 0, 'prompt_chars': 400, 'output_chars': 400,
+            'prompt_tokens': 0, 'output_tokens': 0, 'cached_tokens': 0, 'cost_usd': 0.0
+        }
+
+    def test_rejected_speculation_is_discarded(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(REJECTED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop', speculate=['chochmah'])
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'keter'}
+        assert run['speculation']['outcome'] == 'discarded'
+        assert run['speculation']['discarded'] == ['chochmah']
+        assert run['speculation']['wasted_tokens_est'] == 800 // SefiraBase.CHARS_PER_TOKEN
+        assert run['skipped']['chochmah'].endswith('(especulativo descartado)')
+        assert run['skipped']['binah'].startswith('gating: Keter rechazo')
+        assert sefirot['binah'].inputs == []
+
+    def test_running_speculation_is_cancelled(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(REJECTED), chochmah_delay=0.5)
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop', speculate=['chochmah'])
+
+        start = time.perf_counter()
+        run = engine.run('accion')
+
+        assert time.perf_counter() - start < 0.4
+        assert run['speculation']['cancelled'] == ['chochmah']
+        # El prompt ya se envio: cuenta como desperdicio
+        assert run['speculation']['wasted_tokens_est'] == 100
+
+    def test_modified_action_restarts_speculation(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(REJECTED, ALIGNED))
+        engine = TikunEngine(
+            sefirot=sefirot, nodes=nodes, gating_policy='modifications', speculate=['chochmah']
+        )
+
+        run = engine.run('accion')
+
+        assert run['speculation']['outcome'] == 'restarted'
+        assert [i['action'] for i in sefirot['chochmah'].inputs] == ['accion', run['effective_action']]
+        assert sefirot['binah'].inputs[0]['action'] == run['effective_action']
+
+    def test_metrics_accumulate(self):
+        keter = SlowVerdictSefira(ALIGNED, REJECTED)
+        sefirot, nodes = _speculative_tree(keter)
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop', speculate=['chochmah'])
+
+        engine.run('accion')
+        engine.run('accion')
+        metrics = engine.get_speculation_metrics()
+
+        assert metrics['runs'] == 2
+        assert metrics['confirmed'] == metrics['discarded'] == 1
+        assert metrics['confirm_rate'] == 0.5
+        assert metrics['wasted_tokens_est'] == 200
+        assert metrics['latency_saved'] > 0
+
+    def test_speculative_node_needs_speculative_dependencies(self):
+        sefirot, nodes = _speculative_tree(VerdictSefira(ALIGNED))
+
+        with pytest.raises(ValueError, match="no es especulativo"):
+            TikunEngine(sefirot=sefirot, nodes=nodes, speculate=['binah'])
+
+
+class StreamingSefira(SlowSefira):
+    """Sefira de prueba cuya respuesta llega en fragmentos cada 'delay' segundos"""
+
+    SECTIONS = SectionTokenizer({'first': ['FIRST'], 'second': ['SECOND']})
+    CHUNKS = ["FIRST: uno\n", "SECOND: dos\n", "mas\n", "fin"]
+
+    async def _acall_gemini(self, prompt, stream=False):
+        async def chunks():
+            for chunk in self.CHUNKS:
+                await asyncio.sleep(self.delay)
+                yield chunk
+
+        if stream:
+            return chunks()
+        return ''.join([chunk async for chunk in chunks()])
+
+    async def aprocess(self, input_data):
+        self.started_at = time.perf_counter()
+        self.inputs.append(input_data)
+        text = await self._acall_llm('prompt')
+        if self.error:
+            raise self.error
+        sections = self.SECTIONS.split_lines(text)
+        return {'processing_successful': True, **{k: '\n'.join(v) for k, v in sections.items()}}
+
+
+def _reads_first(request, results):
+    return {'first': results['a']['first']}
+
+
+def _streaming_tree(parent, child):
+    sefirot = {'a': parent, 'b': child}
+    nodes = [
+        SefiraNode('a', [], _passthrough),
+        SefiraNode('b', ['a'], _reads_first, reads={'a': ['first']}),
+    ]
+    return sefirot, nodes
+
+
+class TestTikunEngineStreaming:
+    """Un nodo arranca en cuanto las secciones que lee estan completas"""
+
+    def test_child_starts_before_parent_finishes(self):
+        sefirot, nodes = _streaming_tree(StreamingSefira(0.1), SlowSefira())
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, streaming=True)
+
+        run = engine.run('accion')
+
+        assert set(run['results']) == {'a', 'b'}
+        assert sefirot['b'].inputs == [{'first': 'uno'}]
+        assert sefirot['b'].started_at < sefirot['a'].started_at + run['timings']['a'] - 0.1
+        assert run['early_starts']['b']['a'] >= 0.1
+        assert run['results']['a']['second'] == 'dos\nmas\nfin'
+
+    def test_without_streaming_child_waits(self):
+        sefirot, nodes = _streaming_tree(StreamingSefira(0.05), SlowSefira())
+
+        run = TikunEngine(sefirot=sefirot, nodes=nodes).run('accion')
+
+        assert run['early_starts'] == {}
+        assert sefirot['b'].inputs == [{'first': 'uno'}]
+
+    def test_parent_failure_cancels_early_child(self):
+        parent = StreamingSefira(0.05, error=RuntimeError('sin cuota'))
+        sefirot, nodes = _streaming_tree(parent, SlowSefira(1.0))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, streaming=True)
+
+        start = time.perf_counter()
+        run = engine.run('accion')
+
+        assert time.perf_counter() - start < 0.8
+        assert 'sin cuota' in run['errors']['a']
+        assert run['skipped']['b'] == 'dependencia no disponible: a'
+        assert 'b' not in run['results']
+
+    def test_thresholds_disable_early_start(self):
+        sefirot, nodes = _streaming_tree(StreamingSefira(0.05), SlowSefira())
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, streaming=True, thresholds={'a': {'score': 0.5}})
+
+        run = engine.run('accion')
+
+        assert run['early_starts'] == {}
+
+    def test_reads_must_be_a_dependency(self):
+        sefirot, _ = _streaming_tree(StreamingSefira(), SlowSefira())
+        nodes = [SefiraNode('a', [], _passthrough), SefiraNode('b', [], _reads_first, reads={'a': ['first']})]
+
+        with pytest.raises(ValueError, match="sin depender"):
+            TikunEngine(sefirot=sefirot, nodes=nodes)
+
+
+class TestTikunEngineEvents:
+    """stream()/astream(): cada resultado en cuanto esta listo, Keter primero"""
+
+    def test_keter_verdict_comes_first(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(ALIGNED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        events = list(engine.stream('accion'))
+
+        assert [(e['type'], e.get('sefira')) for e in events] == [
+            ('result', 'keter'), ('result', 'chochmah'), ('result', 'binah'), ('done', None)
+        ]
+        assert events[0]['result']['aligned'] is True
+        assert set(events[-1]['run']['results']) == {'keter', 'chochmah', 'binah'}
+
+    def test_discarded_speculation_is_not_streamed(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(REJECTED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes, gating_policy='stop', speculate=['chochmah'])
+
+        events = list(engine.stream('accion'))
+
+        assert [(e['type'], e.get('sefira')) for e in events] == [
+            ('result', 'keter'), ('skipped', 'chochmah'), ('skipped', 'binah'), ('done', None)
+        ]
+        assert events[2]['reason'].startswith('gating: Keter rechazo')
+
+    def test_errors_are_streamed(self):
+        sefirot = {'a': SlowSefira(error=RuntimeError('boom')), 'b': SlowSefira()}
+        nodes = [SefiraNode('a', [], _passthrough), SefiraNode('b', ['a'], _passthrough)]
+
+        events = list(TikunEngine(sefirot=sefirot, nodes=nodes).stream('accion'))
+
+        assert events[0] == {'type': 'error', 'sefira': 'a', 'error': 'RuntimeError: boom'}
+        assert events[1]['type'] == 'skipped'
+
+    def test_astream(self):
+        sefirot, nodes = _speculative_tree(SlowVerdictSefira(ALIGNED))
+        engine = TikunEngine(sefirot=sefirot, nodes=nodes)
+
+        async def collect():
+            return [event async for event in engine.astream('accion')]
+
+        events = asyncio.run(collect())
+
+        assert events[0]['sefira'] == 'keter'
+        assert events[-1]['type'] == 'done'
+
+
+class CountingSefira(SlowSefira):
+    """SlowSefira que registra cuantas ejecuciones se solapan"""
+
+    def __init__(self, delay=0.0):
+        super().__init__(delay)
+        self.active = 0
+        self.max_active = 0
+
+    async def aprocess(self, input_data):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            self.inputs.append(input_data)
+            if input_data['action'] == 'falla':
+                raise RuntimeError('boom')
+            return {'processing_successful': True, 'action': input_data['action']}
+        finally:
+            self.active -= 1
+
+
+class TestTikunEngineBatch:
+    """run_batch()/arun_batch(): muchas acciones con concurrencia acotada"""
+
+    def _engine(self, delay=0.05):
+        sefira = CountingSefira(delay)
+        return sefira, TikunEngine(sefirot={'a': sefira}, nodes=[SefiraNode('a', [], _passthrough)])
+
+    def test_results_in_input_order_with_bounded_concurrency(self):
+        sefira, engine = self._engine()
+        actions = [f'accion {i}' for i in range(6)]
+
+        batch = engine.run_batch(actions, concurrency=2)
+
+        assert [entry['index'] for entry in batch] == list(range(6))
+        assert [entry['run']['results']['a']['action'] for entry in batch] == actions
+        assert sefira.max_active == 2
+
+    def test_failures_stay_in_their_item(self):
+        sefira, engine = self._engine(delay=0.0)
+
+        batch = engine.run_batch([
+            'buena',
+            {'action': 'falla'},
+            {'context': 'sin accion'},
+            {'action': 'otra', 'context': 'ctx', 'expected_outcome': 'ok'}
+        ])
+
+        assert batch[0]['error'] is None and batch[0]['run']['errors'] == {}
+        assert batch[1]['run']['errors'] == {'a': 'RuntimeError: boom'}
+        assert batch[2]['run'] is None and 'ValueError' in batch[2]['error']
+        assert batch[3]['action'] == 'otra'
+        assert sefira.inputs[-1]['action'] == 'otra'
+
+    def test_invalid_concurrency(self):
+        _, engine = self._engine()
+
+        with pytest.raises(ValueError):
+            engine.run_batch(['a'], concurrency=0)
+
+
+class TestKeterConcurrentScoring:
+    """Los criterios LLM de Keter se evaluan en paralelo"""
+
+    def test_llm_scores_run_concurrently(self):
+        keter = Keter(use_llm_scoring=False, llm_scoring_mode='per_criterion')
+        keter.use_llm_scoring = True
+        keter.gemini_client = Mock()
+
+        def slow_score(criterion, description, action, context):
+            time.sleep(0.2)
+            return 5
+
+        keter._llm_semantic_score = slow_score
+
+        start = time.perf_counter()
+        scores = keter._llm_scores('accion', 'contexto')
+        elapsed = time.perf_counter() - start
+
+        assert scores == {'justice_mercy_balance': 5, 'aligned_with_truth': 5}
+        assert elapsed < 0.35
@@ -0,0 +1,128 @@
+"""
+Tests para el servicio de las funciones callable (src/tikun_service.py) y
+su servidor local (src/callable_server.py)
+"""
+
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from src.callable_server import CallableServer
+from src.core import llm_provider
+from src.core.sefira_registry import SefiraRegistry
+from src.tikun_engine import empty_speculation_stats, get_speculation_stats
+from src.tikun_service import ServiceError, TikunService
+
+
+OFFLINE = {'TIKUN_LLM_PROVIDER': 'fake', 'TIKUN_LLM_CACHE': '0'}
+ACTION = 'Implementar programa de becas educativas en comunidad rural con transparencia'
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Servicio sobre un registro propio, con el proveedor falso"""
+    monkeypatch.setattr(llm_provider, '_providers', {})
+    with patch.dict(os.environ, OFFLINE):
+        yield TikunService(SefiraRegistry())
+
+
+def _post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read()), response.headers
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read()), e.headers
+
+
+class TestTikunService:
+    """Validacion y forma de las respuestas, sin Firebase"""
+
+    @pytest.mark.parametrize('data, message', [
+        ({}, 'Action is required'),
+        ({'action': 'x', 'gating_policy': 'nunca'}, 'gating_policy'),
+        ({'action': 'x', 'thresholds': {'tiferet': {'harmony_score': 'alto'}}}, 'thresholds'),
+        ({'action': 'x', 'speculate': ['binah']}, 'speculate')
+    ])
+    def test_invalid_action_params(self, service, data, message):
+        with pytest.raises(ServiceError) as error:
+            service.process_action(data)
+
+        assert error.value.code == 'INVALID_ARGUMENT'
+        assert message in error.value.message
+
+    def test_process_action(self, service):
+        response = service.process_action({'action': ACTION, 'gating_policy': 'continue'})
+
+        assert response['success'] is True
+        assert len(response['results']) == 10
+        assert set(response['timings']['stages']) == set(response['results'])
+
+    def test_unknown_sefira_is_invalid_argument(self, service):
+        with pytest.raises(ServiceError) as error:
+            service.process_sefira({'sefira': 'daat'})
+
+        assert error.value.code == 'INVALID_ARGUMENT'
+
+    def test_sefira_error_is_internal(self, service):
+        with patch.object(service.registry, 'get') as get:
+            get.return_value.process.side_effect = RuntimeError('sin cuota')
+            with pytest.raises(ServiceError) as error:
+                service.process_sefira({'sefira': 'Binah', 'input_data': {}})
+
+        assert error.value.code == 'INTERNAL'
+        assert 'sin cuota' in error.value.message
+
+    def test_speculation_metrics_accumulate_across_requests(self, service):
+        assert service.speculation_stats is get_speculation_stats()
+        service = TikunService(service.registry, speculation_stats=empty_speculation_stats())
+        data = {'action': ACTION, 'gating_policy': 'stop', 'speculate': ['chochmah']}
+
+        first = service.process_action(data)
+        service.process_action(data)
+        metrics = service.speculation_metrics()
+
+        assert metrics['runs'] == 2
+        assert metrics[first['speculation']['outcome']] == 2
+        assert metrics['confirm_rate'] == (1.0 if first['speculation']['outcome'] == 'confirmed' else 0.0)
+
+
+class TestCallableServer:
+    """Protocolo callable sobre HTTP y limite de concurrencia de la instancia"""
+
+    def test_callable_protocol(self, service):
+        with CallableServer(service) as server:
+            status, body, headers = _post(f'{server.url}/process_action', {'data': {'action': ACTION}})
+            invalid = _post(f'{server.url}/process_action', {'data': {}})
+            missing = _post(f'{server.url}/daat', {'data': {}})
+            malformed = _post(f'{server.url}/process_action', {'action': ACTION})
+
+        assert status == 200
+        assert body['result']['success'] is True
+        assert float(headers['X-Tikun-Queue-Seconds']) >= 0
+        assert invalid[:2] == (400, {'error': {'status': 'INVALID_ARGUMENT', 'message': 'Action is required'}})
+        assert missing[0] == 404
+        assert malformed[1]['error']['status'] == 'INVALID_ARGUMENT'
+
+    def test_busy_instance_rejects_with_resource_exhausted(self, service):
+        release = threading.Event()
+        server = CallableServer(service, concurrency=1, queue_timeout=0.05)
+        server.functions['process_action'] = lambda data: release.wait(5) and {'ok': True}
+
+        with server:
+            first = threading.Thread(target=_post, args=(f'{server.url}/process_action', {'data': {}}))
+            first.start()
+            while server.stats()['in_flight'] == 0:
+                pass
+            status, body, _ = _post(f'{server.url}/process_action', {'data': {}})
+            release.set()
+            first.join()
+
+        assert status == 429
+        assert body['error']['status'] == 'RESOURCE_EXHAUSTED'
+        assert server.stats()['rejected'] == 1
@@ -0,0 +1,114 @@
+"""
+Tests para las trazas por peticion (src/core/tracing.py)
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.core import llm_provider
+from src.core.llm_provider import FakeProvider, set_provider
+from src.core.sefira_registry import SefiraRegistry
+from src.core.tracing import (
+    ChromeTraceSink, JsonlSink, MemorySink, add_sink, chrome_trace, current_span,
+    jsonl_to_chrome, remove_sink, span
+)
+from src.tikun_engine import TikunEngine
+
+
+@pytest.fixture
+def sink():
+    memory = add_sink(MemorySink())
+    yield memory
+    remove_sink(memory)
+
+
+class TestSpans:
+    def test_disabled_tracing_creates_nothing(self):
+        with span('nada', 'sefira') as s:
+            assert s is None
+            assert current_span() is None
+
+    def test_nesting_and_llm_wait(self, sink):
+        with span('run', 'run') as run:
+            with span('binah', 'sefira') as sefira:
+                with span('build_prompt'):
+                    pass
+                with span('llm', 'llm', model='m') as llm:
+                    assert current_span() is llm
+
+        by_name = {s.name: s for s in sink.spans}
+        assert [s.name for s in sink.spans] == ['build_prompt', 'llm', 'binah', 'run']
+        assert len({s.trace_id for s in sink.spans}) == 1
+        assert by_name['llm'].parent_id == sefira.span_id
+        assert by_name['llm'].lane == 'binah'
+        assert sefira.attrs['llm_wait'] == pytest.approx(llm.duration)
+        assert sefira.attrs['local'] == pytest.approx(sefira.duration - llm.duration)
+        assert 'cpu' in by_name['build_prompt'].attrs
+        assert run.parent_id is None
+
+    def test_errors_are_recorded(self, sink):
+        with pytest.raises(ValueError):
+            with span('llm', 'llm'):
+                raise ValueError('cuota')
+
+        assert sink.spans[0].attrs['error'] == 'ValueError: cuota'
+
+
+class TestExport:
+    def test_chrome_trace_puts_each_sefira_on_its_lane(self, sink):
+        with span('run', 'run'):
+            for name in ('keter', 'chochmah'):
+                with span(name, 'sefira'):
+                    with span('llm', 'llm'):
+                        pass
+
+        events = chrome_trace(sink.spans)['traceEvents']
+        complete = [e for e in events if e['ph'] == 'X']
+        lanes = {e['args']['name'].split()[-1]: e['tid'] for e in events if e['ph'] == 'M'}
+
+        assert len(complete) == 5
+        assert set(lanes) == {'run', 'keter', 'chochmah'}
+        assert {e['tid'] for e in complete if e['name'] in ('keter', 'llm')} >= {lanes['keter']}
+        assert all(e['dur'] >= 0 for e in complete)
+
+    def test_jsonl_and_chrome_sinks(self, tmp_path):
+        jsonl = add_sink(JsonlSink(str(tmp_path / 'spans.jsonl')))
+        chrome = add_sink(ChromeTraceSink(str(tmp_path / 'run.trace.json')))
+        try:
+            with span('binah', 'sefira'):
+                with span('llm', 'llm'):
+                    pass
+        finally:
+            for s in (jsonl, chrome):
+                remove_sink(s)
+                s.close()
+
+        lines = (tmp_path / 'spans.jsonl').read_text().splitlines()
+        streamed = json.loads((tmp_path / 'run.trace.json').read_text().replace(',\n]', '\n]'))
+        converted = jsonl_to_chrome(str(tmp_path / 'spans.jsonl'), str(tmp_path / 'converted.json'))
+
+        assert [json.loads(line)['name'] for line in lines] == ['llm', 'binah']
+        assert len([e for e in streamed if e['ph'] == 'X']) == 2
+        assert converted == 2
+
+
+class TestTracedRun:
+    def test_tree_run_has_run_sefira_and_llm_spans(self, sink, monkeypatch):
+        monkeypatch.setattr(llm_provider, '_providers', {})
+        set_provider(FakeProvider(latency=0.005))
+        with patch.dict(os.environ, {'TIKUN_LLM_PROVIDER': 'fake', 'TIKUN_LLM_CACHE': '0'}):
+            sefirot = SefiraRegistry().get_all()
+        run = TikunEngine(sefirot=sefirot).run('Implementar programa de becas', gating_policy='continue')
+
+        assert run['errors'] == {}
+        roots = [s for s in sink.spans if s.category == 'run']
+        assert len(roots) == 1
+        trace = sink.trace(roots[0].trace_id)
+        sefirot_spans = {s.name: s for s in trace if s.category == 'sefira'}
+        assert set(sefirot_spans) == set(sefirot)
+        assert sum(1 for s in trace if s.category == 'llm') >= len(sefirot)
+        assert all(s.attrs['llm_wait'] >= 0.005 for s in sefirot_spans.values())
+        assert any(s.name == 'parse_response' for s in trace)
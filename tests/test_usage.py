@@ -0,0 +1,123 @@
+"""
+Tests para tokens y costo de las llamadas al LLM (src/core/usage.py)
+"""
+
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.core import llm_provider
+from src.core.llm_provider import FakeProvider, set_provider
+from src.core.sefira_registry import SefiraRegistry
+from src.core.usage import UsageLedger, estimate_cost, price_for, token_usage
+from src.pipeline_executor import PipelineExecutor
+from src.tikun_engine import TikunEngine
+from src.tikun_service import TikunService
+
+
+class TestTokenUsage:
+    def test_gemini_usage_metadata(self):
+        response = SimpleNamespace(usage_metadata=SimpleNamespace(
+            prompt_token_count=1200, candidates_token_count=300,
+            thoughts_token_count=50, cached_content_token_count=1000
+        ))
+
+        assert token_usage(response) == {'prompt_tokens': 1200, 'output_tokens': 350, 'cached_tokens': 1000}
+
+    def test_anthropic_usage(self):
+        response = SimpleNamespace(usage=SimpleNamespace(
+            input_tokens=100, output_tokens=40, cache_read_input_tokens=900, cache_creation_input_tokens=0
+        ))
+
+        assert token_usage(response) == {'prompt_tokens': 1000, 'output_tokens': 40, 'cached_tokens': 900}
+
+    def test_missing_or_mocked_usage(self):
+        assert token_usage(SimpleNamespace(text='hola')) is None
+        assert token_usage(MagicMock()) is None
+
+
+class TestCost:
+    def test_longest_prefix_and_cached_price(self):
+        usage = {'prompt_tokens': 1_000_000, 'output_tokens': 1_000_000, 'cached_tokens': 500_000}
+
+        assert price_for('gemini-2.5-flash-lite') == price_for('gemini-2.5-flash')
+        assert estimate_cost('gemini-2.0-flash-exp', usage) == pytest.approx(0.05 + 0.0125 + 0.40)
+        assert estimate_cost('modelo-desconocido', usage) is None
+
+
+class TestUsageLedger:
+    def test_accumulates_per_user_and_forgets_least_recent(self):
+        ledger = UsageLedger(max_users=2)
+        usage = {'calls': 2, 'prompt_tokens': 10, 'output_tokens': 5, 'cached_tokens': 0, 'cost_usd': 0.01}
+
+        ledger.record('ana', usage)
+        ledger.record('beto', usage)
+        totals = ledger.record('ana', usage)
+        ledger.record(None, usage)
+
+        assert totals['requests'] == 2
+        assert totals['prompt_tokens'] == 20
+        assert totals['cost_usd'] == pytest.approx(0.02)
+        assert ledger.user('beto') is None
+        assert ledger.user(UsageLedger.ANONYMOUS)['calls'] == 2
+        assert ledger.top(1)[0]['uid'] == 'ana'
+        assert ledger.stats()['users'] == 2
+
+
+class TestRunUsage:
+    @pytest.fixture
+    def registry(self, monkeypatch):
+        monkeypatch.setattr(llm_provider, '_providers', {})
+        set_provider(FakeProvider())
+        registry = SefiraRegistry()
+        with patch.dict(os.environ, {'TIKUN_LLM_PROVIDER': 'fake', 'TIKUN_LLM_CACHE': '0'}):
+            registry.get_all()
+        return registry
+
+    @pytest.fixture
+    def sefirot(self, registry):
+        return registry.get_all()
+
+    def test_tokens_per_sefira_and_per_run(self, sefirot):
+        run = TikunEngine(sefirot=sefirot).run('Implementar programa de becas', gating_policy='continue')
+
+        assert run['errors'] == {}
+        for name, usage in run['llm_usage'].items():
+            assert usage['prompt_tokens'] > 0, name
+            assert sefirot[name].get_metrics()['tokens']['prompt_tokens'] >= usage['prompt_tokens']
+        assert run['tokens']['prompt_tokens'] == sum(u['prompt_tokens'] for u in run['llm_usage'].values())
+        assert run['tokens']['calls'] >= len(sefirot)
+
+    def test_pipeline_run_has_the_same_totals(self, sefirot):
+        engine = TikunEngine(sefirot=sefirot)
+        action = 'Implementar programa de becas'
+
+        single = engine.run(action, gating_policy='continue')
+        run = PipelineExecutor(engine, max_workers=len(sefirot)).run([action], gating_policy='continue')[0]['run']
+
+        assert {**run['tokens'], 'cost_usd': pytest.approx(single['tokens']['cost_usd'])} == single['tokens']
+        assert run['tokens']['prompt_tokens'] == sum(u['prompt_tokens'] for u in run['llm_usage'].values()) > 0
+
+    def test_streaming_run_counts_tokens_once(self, sefirot):
+        run = TikunEngine(sefirot=sefirot, streaming=True).run('Implementar programa de becas', gating_policy='continue')
+
+        for usage in run['llm_usage'].values():
+            assert usage['prompt_tokens'] // usage['calls'] == pytest.approx(
+                usage['prompt_chars'] // usage['calls'] // 4, abs=1
+            )
+
+    def test_service_reports_request_and_user_usage(self, registry):
+        service = TikunService(registry, ledger=UsageLedger())
+
+        first = service.process_action({'action': 'Implementar programa de becas', 'gating_policy': 'continue'}, uid='ana')
+        second = service.process_sefira({'sefira': 'keter', 'input_data': {'action': 'Abrir comedor'}}, uid='ana')
+
+        assert first['tokens']['prompt_tokens'] == first['usage']['request']['prompt_tokens'] > 0
+        assert 'keter' in first['tokens']['stages']
+        assert second['usage']['request']['calls'] == 1
+        assert second['usage']['user']['requests'] == 2
+        assert second['usage']['user']['prompt_tokens'] == (
+            first['usage']['request']['prompt_tokens'] + second['usage']['request']['prompt_tokens']
+        )